@@ -22,7 +22,10 @@ from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional
 from dataclasses import dataclass
 from dotenv import load_dotenv
-import anthropic
+
+from .llm_client import get_llm_pool
+from .prompt_cache import build_cached_request, usage_dict
+from .crm_writer import CRMJournalError, get_crm_writer
 
 load_dotenv()
 
@@ -140,12 +143,37 @@ TOOLS = [
 ]
 
 
+async def log_collection_activity(invoice_id: str, activity_type: str, notes: Optional[str] = None,
+                                  next_action_date: Optional[str] = None) -> Dict:
+    """Log collection activity to the CRM audit trail (write-behind; returns once the record is journaled)."""
+    writer = get_crm_writer()
+    seq = writer.submit("collection_activity", f"invoice:{invoice_id}", {
+        "invoice_id": invoice_id,
+        "activity_type": activity_type,
+        "notes": notes,
+        "next_action_date": next_action_date,
+        "timestamp": datetime.now().isoformat()
+    })
+    try:
+        await writer.journaled(seq)
+    except CRMJournalError as e:
+        return {"success": False, "logged": False, "invoice_id": invoice_id, "error": str(e)}
+
+    return {
+        "success": True,
+        "logged": True,
+        "queued": True,
+        "invoice_id": invoice_id,
+        "activity_type": activity_type
+    }
+
+
 @dataclass
 class CollectionsAgent:
     """Collections agent for AR follow-up."""
 
     def __init__(self):
-        self.client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+        self.llm = get_llm_pool()
         self.conversation: List[Dict] = []
 
     async def analyze_account(self, invoice: Dict[str, Any]) -> Dict[str, Any]:
@@ -164,24 +192,24 @@ What action should we take?"""
 
         self.conversation.append({"role": "user", "content": prompt})
 
-        response = self.client.messages.create(
+        response = await self.llm.create(**build_cached_request(
             model="claude-sonnet-4-20250514",
             max_tokens=1024,
             system=SYSTEM_PROMPT,
             tools=TOOLS,
             messages=self.conversation
-        )
+        ))
 
-        result = {"recommendation": "", "actions_taken": []}
+        result = {"recommendation": "", "actions_taken": [], "usage": usage_dict(response.usage)}
 
         for block in response.content:
             if block.type == "text":
                 result["recommendation"] = block.text
             elif block.type == "tool_use":
-                result["actions_taken"].append({
-                    "tool": block.name,
-                    "input": block.input
-                })
+                action = {"tool": block.name, "input": block.input}
+                if block.name == "log_collection_activity":
+                    action["result"] = await log_collection_activity(**block.input)
+                result["actions_taken"].append(action)
 
         return result
 
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Conversation Window - Kipper Energy Solutions
+==============================================
+
+Token-budgeted conversation history for long calls and chats.
+
+The last few turns are sent verbatim. Older turns are folded into a compact
+running summary by a cheap model in a background task, so the request size
+(and per-turn latency) stays flat however long the conversation runs.
+
+- A turn starts at a plain user message and runs through every assistant,
+  tool_use and tool_result message that follows, so folding never separates
+  a tool_use from its tool_result
+- Folding runs after a turn is answered, never on the caller's hot path;
+  turns stay verbatim until their summary is ready
+- If the summary model fails, a short extractive summary is used instead
+
+Tuning (environment):
+- CONTEXT_KEEP_TURNS: Turns always kept verbatim (default 6)
+- CONTEXT_TOKEN_BUDGET: Approximate token budget for verbatim history (default 4000)
+"""
+
+import os
+import json
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional, Callable, Awaitable
+
+logger = logging.getLogger("context_window")
+
+# =============================================================================
+# Configuration
+# =============================================================================
+
+CONTEXT_KEEP_TURNS = int(os.getenv("CONTEXT_KEEP_TURNS", "6"))
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "4000"))
+
+SUMMARY_MODEL = "claude-3-5-haiku-20241022"
+
+SUMMARY_PROMPT = """You maintain a running summary of a customer conversation for Kipper Energy Solutions, an MEP contractor.
+
+Merge the new turns into the existing summary. Keep only facts needed to continue the conversation:
+customer name, phone, service address, trade, issue, appointments or confirmation numbers,
+prices quoted, tool outcomes, and open questions. Write at most 120 words of plain prose."""
+
+Summarizer = Callable[[str, List[Dict[str, Any]]], Awaitable[str]]
+
+# =============================================================================
+# Turn Helpers
+# =============================================================================
+
+def estimate_tokens(messages: List[Dict[str, Any]]) -> int:
+    """Rough token count (~4 characters per token)."""
+    return len(json.dumps(messages, default=str)) // 4
+
+
+def is_turn_start(message: Dict[str, Any]) -> bool:
+    """True for a user message that isn't carrying tool results."""
+    if message.get("role") != "user":
+        return False
+    content = message.get("content")
+    if isinstance(content, str):
+        return True
+    return not any(block.get("type") == "tool_result" for block in content)
+
+
+def split_turns(messages: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """Group messages into turns, each starting at a plain user message."""
+    turns: List[List[Dict[str, Any]]] = []
+    for message in messages:
+        if is_turn_start(message) or not turns:
+            turns.append([message])
+        else:
+            turns[-1].append(message)
+    return turns
+
+
+def render_transcript(messages: List[Dict[str, Any]]) -> str:
+    """Plain-text transcript of messages, including tool calls and results."""
+    lines = []
+    for message in messages:
+        role = "Customer" if message["role"] == "user" else "Assistant"
+        content = message["content"]
+        if isinstance(content, str):
+            lines.append(f"{role}: {content}")
+            continue
+        for block in content:
+            if block.get("type") == "text":
+                lines.append(f"{role}: {block['text']}")
+            elif block.get("type") == "tool_use":
+                lines.append(f"Tool call {block['name']}: {json.dumps(block['input'], default=str)}")
+            elif block.get("type") == "tool_result":
+                lines.append(f"Tool result: {block.get('content')}")
+    return "\n".join(lines)
+
+
+def fallback_summary(previous: str, messages: List[Dict[str, Any]], max_chars: int = 800) -> str:
+    """Extractive summary used when the summary model is unavailable."""
+    merged = f"{previous}\n{render_transcript(messages)}".strip()
+    return merged[-max_chars:]
+
+
+async def summarize_turns(llm: Any, previous: str, messages: List[Dict[str, Any]]) -> str:
+    """Fold turns into the running summary with a cheap Claude model."""
+    response = await llm.create(
+        model=SUMMARY_MODEL,
+        max_tokens=300,
+        system=SUMMARY_PROMPT,
+        messages=[{
+            "role": "user",
+            "content": f"Existing summary:\n{previous or '(none)'}\n\nNew turns:\n{render_transcript(messages)}"
+        }]
+    )
+    return "".join(block.text for block in response.content if block.type == "text").strip()
+
+# =============================================================================
+# Conversation Window
+# =============================================================================
+
+class ConversationWindow:
+    """Conversation history with recent turns verbatim and older turns summarized."""
+
+    def __init__(
+        self,
+        summarizer: Optional[Summarizer] = None,
+        keep_turns: int = CONTEXT_KEEP_TURNS,
+        token_budget: int = CONTEXT_TOKEN_BUDGET
+    ):
+        self.messages: List[Dict[str, Any]] = []
+        self.summary = ""
+        self.summarizer = summarizer
+        self.keep_turns = keep_turns
+        self.token_budget = token_budget
+        self.folded_turns = 0
+        self._fold_task: Optional[asyncio.Task] = None
+
+    # List-style access so callers can keep treating this as the history
+    def append(self, message: Dict[str, Any]):
+        self.messages.append(message)
+
+    def __len__(self) -> int:
+        return len(self.messages)
+
+    def __iter__(self):
+        return iter(self.messages)
+
+    def __getitem__(self, index):
+        return self.messages[index]
+
+    def summary_context(self) -> Optional[str]:
+        """System text carrying the running summary, if there is one."""
+        if not self.summary:
+            return None
+        return f"Summary of the earlier part of this conversation:\n{self.summary}"
+
+    def maybe_fold(self):
+        """
+        Start folding old turns in the background if the window is over budget.
+
+        Call after a turn has been answered. Does nothing while a previous
+        fold is still running.
+        """
+        if self._fold_task and not self._fold_task.done():
+            return
+
+        turns = split_turns(self.messages)
+        fold = 0
+        while len(turns) - fold > 1 and (
+            len(turns) - fold > self.keep_turns
+            or estimate_tokens([m for turn in turns[fold:] for m in turn]) > self.token_budget
+        ):
+            fold += 1
+
+        if fold == 0:
+            return
+
+        head = [message for turn in turns[:fold] for message in turn]
+        self._fold_task = asyncio.create_task(self._fold(head, fold))
+
+    async def _fold(self, head: List[Dict[str, Any]], turn_count: int):
+        try:
+            if self.summarizer is None:
+                raise RuntimeError("no summarizer configured")
+            summary = await self.summarizer(self.summary, head)
+        except Exception as e:
+            logger.warning(f"Summary model unavailable, using extractive summary: {e}")
+            summary = fallback_summary(self.summary, head)
+
+        # History is only ever appended to, so the folded turns are still the
+        # head of the window
+        if self.messages[:len(head)] == head:
+            del self.messages[:len(head)]
+            self.summary = summary
+            self.folded_turns += turn_count
+
+    def trim(self, keep_turns: int = 1) -> int:
+        """
+        Fold all but the last keep_turns turns into the summary right away.
+
+        Uses the extractive summary, so it never waits on a model; meant for
+        enforcing a hard memory cap rather than routine folding. Returns the
+        number of turns folded.
+        """
+        if self._fold_task and not self._fold_task.done():
+            self._fold_task.cancel()
+        self._fold_task = None
+
+        turns = split_turns(self.messages)
+        fold = max(0, len(turns) - keep_turns)
+        if fold:
+            head = [message for turn in turns[:fold] for message in turn]
+            self.summary = fallback_summary(self.summary, head)
+            del self.messages[:len(head)]
+            self.folded_turns += fold
+        return fold
+
+    async def wait_for_fold(self):
+        """Wait for any in-flight fold (used at shutdown and in tests)."""
+        if self._fold_task:
+            await self._fold_task
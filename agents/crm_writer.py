@@ -0,0 +1,623 @@
+#!/usr/bin/env python3
+"""
+CRM Write-Behind Queue - Kipper Energy Solutions
+=================================================
+
+Activity records (call dispositions, collections activity, dispatch
+notifications) are written to Coperniq off the caller's critical path.
+
+- A tool hands a record to submit(), which returns its sequence number
+  at once; a journal thread appends submitted records to an on-disk
+  journal and fsyncs them a group at a time, so the caller (usually the
+  event loop) never waits on the disk
+- A record survives a crash once its group is fsynced, normally within a
+  few milliseconds; sync() waits for that, and tools await journaled()
+  before telling the model a record was saved
+- A failed journal write is retried with backoff; until it succeeds the
+  records count as not durable and sync() / journaled() raise
+  CRMJournalError
+- A background flusher drains records in submission order, coalescing
+  up to CRM_BATCH_SIZE of them into one Coperniq request
+- Records are grouped by entity (call, invoice, work order) inside a
+  batch and a batch is never skipped past on failure, so each entity's
+  records reach the CRM in the order they were logged
+- At most CRM_QUEUE_MAX records are held in memory; past that they stay
+  in the journal only and are read back as the queue drains
+- Failed batches retry with exponential backoff; after CRM_MAX_RETRIES
+  they move to a dead-letter file so one bad record can't wedge the queue
+- Each worker process journals to its own file (its pid in the name), so
+  sequence numbers, acks and compaction never cross workers
+- Records left in the journal by a crash are replayed on the next start,
+  along with the journals of workers that are no longer running, and
+  close() drains the queue on shutdown
+
+Tuning (environment):
+- CRM_JOURNAL_PATH: Journal file name (default crm_journal.jsonl); each
+  worker writes crm_journal.<pid>.jsonl, with its ack checkpoint and dead
+  letters next to it
+- CRM_QUEUE_MAX: Records held in memory before spilling (default 10000)
+- CRM_BATCH_SIZE: Records per Coperniq request (default 50)
+- CRM_FLUSH_INTERVAL: Seconds the flusher waits to fill a batch (default 0.25)
+- CRM_MAX_RETRIES: Attempts per batch before dead-lettering (default 5)
+- CRM_API_URL: Coperniq REST base URL (default https://api.coperniq.io/v1)
+"""
+
+import os
+import re
+import json
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Deque
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger("crm_writer")
+
+# =============================================================================
+# Configuration
+# =============================================================================
+
+CRM_JOURNAL_PATH = os.getenv("CRM_JOURNAL_PATH", "crm_journal.jsonl")
+CRM_QUEUE_MAX = int(os.getenv("CRM_QUEUE_MAX", "10000"))
+CRM_BATCH_SIZE = int(os.getenv("CRM_BATCH_SIZE", "50"))
+CRM_FLUSH_INTERVAL = float(os.getenv("CRM_FLUSH_INTERVAL", "0.25"))
+CRM_MAX_RETRIES = int(os.getenv("CRM_MAX_RETRIES", "5"))
+CRM_API_URL = os.getenv("CRM_API_URL", "https://api.coperniq.io/v1")
+COPERNIQ_API_KEY = os.getenv("COPERNIQ_API_KEY")
+
+RETRY_BASE_SECONDS = 0.5
+RETRY_MAX_SECONDS = 30.0
+JOURNAL_WAIT_SECONDS = 5.0
+
+
+class CRMJournalError(OSError):
+    """Records could not be written to the journal, so they would not survive a crash."""
+
+
+def worker_journal_path(path: str = CRM_JOURNAL_PATH, pid: Optional[int] = None) -> str:
+    """This worker's journal: crm_journal.jsonl -> crm_journal.<pid>.jsonl."""
+    root, ext = os.path.splitext(path)
+    return f"{root}.{os.getpid() if pid is None else pid}{ext}"
+
+
+def _pid_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+# =============================================================================
+# Records
+# =============================================================================
+
+@dataclass
+class CRMRecord:
+    """One activity record bound for the CRM."""
+
+    seq: int
+    kind: str
+    entity: str
+    payload: Dict[str, Any] = field(default_factory=dict)
+    created_at: float = field(default_factory=time.time)
+
+    def encode(self) -> str:
+        return json.dumps(asdict(self), separators=(",", ":"), default=str)
+
+    @classmethod
+    def decode(cls, line: str) -> "CRMRecord":
+        return cls(**json.loads(line))
+
+
+def coalesce(records: List[CRMRecord]) -> List[Dict[str, Any]]:
+    """Group a batch by entity, keeping submission order within each entity."""
+    grouped: Dict[str, List[Dict[str, Any]]] = {}
+    for record in records:
+        grouped.setdefault(record.entity, []).append({
+            "seq": record.seq,
+            "kind": record.kind,
+            "payload": record.payload,
+            "created_at": record.created_at
+        })
+    return [{"entity": entity, "activities": activities} for entity, activities in grouped.items()]
+
+
+def read_ack(ack_path: str) -> int:
+    """Last sequence number the CRM acknowledged, from an ack checkpoint."""
+    try:
+        with open(ack_path, encoding="utf-8") as f:
+            return int(f.read().strip() or 0)
+    except FileNotFoundError:
+        return 0
+
+
+def read_journal(journal_path: str, from_seq: int, limit: int) -> List[CRMRecord]:
+    """Up to `limit` journaled records from `from_seq` on, skipping torn lines."""
+    records = []
+    try:
+        with open(journal_path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = CRMRecord.decode(line)
+                except (ValueError, TypeError):
+                    logger.warning("Skipping torn CRM journal line")
+                    continue
+                if record.seq >= from_seq:
+                    records.append(record)
+                    if len(records) >= limit:
+                        break
+    except FileNotFoundError:
+        pass
+    return records
+
+# =============================================================================
+# Sinks
+# =============================================================================
+
+class CRMSink:
+    """Destination for flushed batches. write_batch raises to signal a retry."""
+
+    async def write_batch(self, records: List[CRMRecord]):
+        raise NotImplementedError
+
+    async def aclose(self):
+        pass
+
+
+class LogSink(CRMSink):
+    """Logs records instead of sending them; used when Coperniq isn't configured."""
+
+    async def write_batch(self, records: List[CRMRecord]):
+        for record in records:
+            logger.info(f"CRM {record.kind} [{record.entity}]: {record.payload}")
+
+
+class CoperniqSink(CRMSink):
+    """Posts coalesced batches to the Coperniq activity endpoint."""
+
+    def __init__(self, api_key: str = COPERNIQ_API_KEY, base_url: str = CRM_API_URL, timeout: float = 10.0):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def write_batch(self, records: List[CRMRecord]):
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        response = await self._client.post(
+            f"{self.base_url}/activities/batch",
+            headers={"x-api-key": self.api_key, "Content-Type": "application/json"},
+            json={"entities": coalesce(records)}
+        )
+        response.raise_for_status()
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def default_sink() -> CRMSink:
+    return CoperniqSink() if COPERNIQ_API_KEY else LogSink()
+
+# =============================================================================
+# Writer
+# =============================================================================
+
+class CRMWriter:
+    """
+    Journal-backed write-behind queue.
+
+    submit() never touches the disk and is safe to call from agent code
+    running in threads; the journal thread does the writes, and the
+    flusher runs on whichever event loop last submitted.
+
+    Without a journal_path the writer uses this worker's journal and
+    adopts the unacknowledged records of workers that have exited.
+    """
+
+    def __init__(
+        self,
+        sink: Optional[CRMSink] = None,
+        journal_path: Optional[str] = None,
+        max_queue: int = CRM_QUEUE_MAX,
+        batch_size: int = CRM_BATCH_SIZE,
+        flush_interval: float = CRM_FLUSH_INTERVAL,
+        max_retries: int = CRM_MAX_RETRIES
+    ):
+        self.sink = sink or default_sink()
+        self.journal_path = journal_path or worker_journal_path(CRM_JOURNAL_PATH)
+        self.ack_path = f"{self.journal_path}.ack"
+        self.dead_letter_path = f"{self.journal_path}.dead"
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+
+        self._lock = threading.Lock()
+        self._journaled = threading.Condition(self._lock)
+        self._io_lock = threading.Lock()
+        self._unwritten: List[CRMRecord] = []
+        self._journal_thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._queue: Deque[CRMRecord] = deque()
+        self._spilled_from: Optional[int] = None  # first seq held only on disk
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+        self.written = 0
+        self.dead_lettered = 0
+        self.retries = 0
+        self.last_error: Optional[str] = None
+        self.journal_error: Optional[str] = None
+
+        self.acked_seq = self._read_ack()
+        self.last_seq = self.acked_seq
+        self._recover()
+        self.durable_seq = self.last_seq
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+        if journal_path is None:
+            self._adopt_orphans(CRM_JOURNAL_PATH)
+
+    # -------------------------------------------------------------------------
+    # Journal
+    # -------------------------------------------------------------------------
+
+    def _read_ack(self) -> int:
+        return read_ack(self.ack_path)
+
+    def _write_ack(self, seq: int):
+        tmp = f"{self.ack_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(str(seq))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.ack_path)
+
+    def _read_journal(self, from_seq: int, limit: int) -> List[CRMRecord]:
+        return read_journal(self.journal_path, from_seq, limit)
+
+    def _recover(self):
+        """Requeue records journaled but never acknowledged by the CRM."""
+        pending = self._read_journal(self.acked_seq + 1, self.max_queue + 1)
+        if not pending:
+            return
+        self._queue.extend(pending[:self.max_queue])
+        self.last_seq = pending[-1].seq
+        if len(pending) > self.max_queue:
+            self._spilled_from = pending[self.max_queue].seq
+            # The tail of the journal may hold more; find the true last seq
+            for record in self._read_journal(self._spilled_from, 1 << 62):
+                self.last_seq = record.seq
+        logger.info(f"Replaying CRM journal from seq {self.acked_seq + 1} to {self.last_seq}")
+
+    def _adopt_orphans(self, base_path: str):
+        """Take over the unacknowledged records of workers that are gone."""
+        base = Path(base_path)
+        pattern = re.compile(rf"{re.escape(base.stem)}\.(\d+){re.escape(base.suffix)}$")
+        for path in sorted(base.parent.glob(f"{base.stem}.*{base.suffix}")):
+            match = pattern.match(path.name)
+            if not match or int(match.group(1)) == os.getpid() or _pid_running(int(match.group(1))):
+                continue
+            claimed = f"{path}.adopting.{os.getpid()}"
+            try:
+                os.replace(path, claimed)  # only one surviving worker wins the rename
+            except FileNotFoundError:
+                continue
+
+            ack_path = f"{path}.ack"
+            records = read_journal(claimed, read_ack(ack_path) + 1, 1 << 62)
+            for record in records:
+                self.submit(record.kind, record.entity, record.payload)
+            try:
+                self.sync()
+            except CRMJournalError as e:
+                # Leave the orphan for the next start; its records are also queued here
+                logger.error(f"Could not journal records adopted from worker {match.group(1)}: {e}")
+                os.replace(claimed, path)
+                continue
+            if records:
+                logger.info(f"Adopted {len(records)} CRM records from exited worker {match.group(1)}")
+            for leftover in (claimed, ack_path):
+                try:
+                    os.remove(leftover)
+                except FileNotFoundError:
+                    pass
+
+    def _compact(self):
+        """Truncate the journal once everything in it has been acknowledged."""
+        with self._lock:
+            if self._queue or self._spilled_from is not None or self.acked_seq != self.last_seq:
+                return
+            if self.durable_seq != self.last_seq:
+                return  # the journal thread still has records to write
+            with self._io_lock:
+                self._journal.truncate(0)
+                self._journal.seek(0)
+
+    def _append(self, records: List[CRMRecord]):
+        with self._io_lock:
+            if self._journal.closed:
+                self._journal = open(self.journal_path, "a", encoding="utf-8")
+            offset = self._journal.tell()
+            try:
+                self._journal.write("".join(record.encode() + "\n" for record in records))
+                self._journal.flush()
+                os.fsync(self._journal.fileno())
+            except Exception:
+                self._discard_partial(offset)
+                raise
+
+    def _discard_partial(self, offset: int):
+        """Cut a failed group out of the journal, so retrying it can't leave duplicates."""
+        try:
+            self._journal.close()
+        except OSError:
+            pass
+        try:
+            os.truncate(self.journal_path, offset)
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+        except OSError as e:
+            logger.error(f"CRM journal {self.journal_path} could not be reopened: {e}")
+
+    def _journal_loop(self):
+        """Journal thread: write and fsync whatever has been submitted, a group at a time."""
+        delay = RETRY_BASE_SECONDS
+        while True:
+            with self._journaled:
+                while not self._unwritten and not self._stopping:
+                    self._journaled.wait()
+                if not self._unwritten:
+                    return
+                records, self._unwritten = self._unwritten, []
+            try:
+                self._append(records)
+            except Exception as e:
+                with self._journaled:
+                    self.journal_error = f"{type(e).__name__}: {e}"
+                    self._unwritten[:0] = records
+                    self._journaled.notify_all()
+                    logger.error(f"CRM journal write failed, {len(self._unwritten)} records are in memory only: {e}")
+                    if self._stopping:
+                        return
+                    self._journaled.wait_for(lambda: self._stopping, delay)
+                delay = min(delay * 2, RETRY_MAX_SECONDS)
+                continue
+
+            delay = RETRY_BASE_SECONDS
+            with self._journaled:
+                self.journal_error = None
+                self.durable_seq = records[-1].seq
+                self._journaled.notify_all()
+
+    def sync(self, seq: Optional[int] = None, timeout: Optional[float] = None) -> bool:
+        """
+        Block until record ``seq`` (by default, everything submitted so far)
+        is fsynced; False on timeout. Raises CRMJournalError if the journal
+        write failed and hasn't succeeded on retry yet.
+        """
+        with self._journaled:
+            target = self.last_seq if seq is None else seq
+            if not self._journaled.wait_for(lambda: self.durable_seq >= target or self.journal_error, timeout):
+                return False
+            if self.durable_seq < target:
+                raise CRMJournalError(f"CRM journal write failed: {self.journal_error}")
+            return True
+
+    async def journaled(self, seq: int, timeout: float = JOURNAL_WAIT_SECONDS):
+        """Wait, off the event loop, until record ``seq`` survives a crash; raises CRMJournalError if it doesn't."""
+        if not await asyncio.to_thread(self.sync, seq, timeout):
+            raise CRMJournalError(f"CRM record {seq} not journaled within {timeout:g}s")
+
+    # -------------------------------------------------------------------------
+    # Producer
+    # -------------------------------------------------------------------------
+
+    def submit(self, kind: str, entity: str, payload: Dict[str, Any]) -> int:
+        """Enqueue one record for the journal and the CRM; returns its sequence number."""
+        with self._lock:
+            self.last_seq += 1
+            record = CRMRecord(self.last_seq, kind, entity, payload)
+            self._unwritten.append(record)
+            self._journaled.notify_all()
+            if self._journal_thread is None or not self._journal_thread.is_alive():
+                self._stopping = False
+                self._journal_thread = threading.Thread(target=self._journal_loop, name="crm-journal", daemon=True)
+                self._journal_thread.start()
+            if self._spilled_from is None and len(self._queue) < self.max_queue:
+                self._queue.append(record)
+            elif self._spilled_from is None:
+                self._spilled_from = record.seq
+        self._wake()
+        return record.seq
+
+    def _wake(self):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+
+        if loop is not None and (self._task is None or self._task.done() or self._loop is not loop):
+            self._start(loop)
+        elif loop is None and self._loop is not None and not self._loop.is_closed():
+            # Submitted from a worker thread; nudge the flusher on its own loop
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+            return
+
+        if self._wakeup is not None and loop is self._loop:
+            self._wakeup.set()
+
+    def _start(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+        self._closing = False
+        self._task = loop.create_task(self._run())
+
+    async def start(self):
+        """Start flushing (replays any records recovered from the journal)."""
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._start(loop)
+        self._wakeup.set()
+
+    # -------------------------------------------------------------------------
+    # Flusher
+    # -------------------------------------------------------------------------
+
+    def _refill(self):
+        """Pull spilled records back from the journal once memory has room."""
+        with self._lock:
+            if self._queue or self._spilled_from is None:
+                return
+            target = self.last_seq
+            if not self._journaled.wait_for(lambda: self.durable_seq >= target or self.journal_error):
+                return
+            if self.durable_seq < target:
+                return  # not on disk yet; the next pass tries again
+            records = self._read_journal(self._spilled_from, self.max_queue + 1)
+            self._queue.extend(records[:self.max_queue])
+            self._spilled_from = records[self.max_queue].seq if len(records) > self.max_queue else None
+
+    def _next_batch(self) -> List[CRMRecord]:
+        with self._lock:
+            return [self._queue[i] for i in range(min(self.batch_size, len(self._queue)))]
+
+    def _ack(self, batch: List[CRMRecord]):
+        with self._lock:
+            for _ in batch:
+                self._queue.popleft()
+            self.acked_seq = batch[-1].seq
+        self._write_ack(self.acked_seq)
+
+    def _dead_letter(self, batch: List[CRMRecord]):
+        with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+            for record in batch:
+                f.write(record.encode() + "\n")
+        self.dead_lettered += len(batch)
+        logger.error(f"CRM batch of {len(batch)} dead-lettered after {self.max_retries} attempts: {self.last_error}")
+
+    async def _deliver(self, batch: List[CRMRecord]):
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                await self.sink.write_batch(batch)
+                self.written += len(batch)
+                return
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                if attempt == self.max_retries:
+                    break
+                self.retries += 1
+                delay = min(RETRY_BASE_SECONDS * 2 ** (attempt - 1), RETRY_MAX_SECONDS)
+                logger.warning(f"CRM write failed (attempt {attempt}), retrying in {delay:.1f}s: {self.last_error}")
+                await asyncio.sleep(delay)
+        self._dead_letter(batch)
+
+    async def _run(self):
+        while True:
+            if self._spilled_from is not None:
+                await asyncio.to_thread(self._refill)
+            batch = self._next_batch()
+            if not batch:
+                await asyncio.to_thread(self._compact)
+                if self._closing:
+                    return
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            if len(batch) < self.batch_size and not self._closing:
+                # Give a burst a moment to fill the batch
+                await asyncio.sleep(self.flush_interval)
+                if self._spilled_from is not None:
+                    await asyncio.to_thread(self._refill)
+                batch = self._next_batch()
+
+            await self._deliver(batch)
+            await asyncio.to_thread(self._ack, batch)
+
+    # -------------------------------------------------------------------------
+    # Lifecycle
+    # -------------------------------------------------------------------------
+
+    @property
+    def pending(self) -> int:
+        return self.last_seq - self.acked_seq
+
+    async def flush(self, timeout: Optional[float] = None):
+        """Wait until every record submitted so far has left the queue."""
+        await self.start()
+        target = self.last_seq
+
+        async def drained():
+            while self.acked_seq < target:
+                await asyncio.sleep(0.01)
+
+        await asyncio.wait_for(drained(), timeout)
+
+    async def aclose(self, timeout: float = 30.0):
+        """Drain the queue, then stop the flusher and close the journal."""
+        if self.pending:
+            await self.start()
+        if self._task is not None and not self._task.done() and self._loop is asyncio.get_running_loop():
+            self._closing = True
+            self._wakeup.set()
+            try:
+                await asyncio.wait_for(self._task, timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"CRM queue drain timed out with {self.pending} records left in the journal")
+                self._task.cancel()
+        await self.sink.aclose()
+        with self._journaled:
+            self._stopping = True
+            self._journaled.notify_all()
+        if self._journal_thread is not None:
+            await asyncio.to_thread(self._journal_thread.join)
+        with self._io_lock:
+            self._journal.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue counters for health checks."""
+        return {
+            "pending": self.pending,
+            "unjournaled": self.last_seq - self.durable_seq,
+            "journal_error": self.journal_error,
+            "in_memory": len(self._queue),
+            "spilled": self._spilled_from is not None,
+            "written": self.written,
+            "retries": self.retries,
+            "dead_lettered": self.dead_lettered,
+            "last_error": self.last_error
+        }
+
+
+_writer: Optional[CRMWriter] = None
+
+
+def get_crm_writer() -> CRMWriter:
+    """Return the process-wide CRM writer."""
+    global _writer
+    if _writer is None:
+        _writer = CRMWriter()
+    return _writer
+
+
+async def close_crm_writer():
+    """Drain and close the process-wide writer (call from app shutdown)."""
+    global _writer
+    if _writer is not None:
+        await _writer.aclose()
+        _writer = None
@@ -22,7 +22,10 @@ from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional
 from dataclasses import dataclass
 from dotenv import load_dotenv
-import anthropic
+
+from .llm_client import get_llm_pool
+from .prompt_cache import build_cached_request, usage_dict
+from .crm_writer import CRMJournalError, get_crm_writer
 
 load_dotenv()
 
@@ -33,7 +36,19 @@ load_dotenv()
 AGENT_NAME = "Dispatch Agent"
 AGENT_VERSION = "1.0.0"
 
-SYSTEM_PROMPT = """You are the Dispatch Agent for Kipper Energy Solutions, a multi-trade MEP contractor.
+# Conditions that get immediate dispatch: id -> label and the trade that responds.
+# The voice server's safety classifier (voice_ai/safety.py) matches callers
+# against these same ids.
+EMERGENCY_TYPES = {
+    "gas_leak": {"label": "Gas leak", "trade": "Plumbing"},
+    "flooding": {"label": "Flooding/water damage", "trade": "Plumbing"},
+    "no_heat": {"label": "No heat (winter)", "trade": "HVAC"},
+    "no_ac": {"label": "No AC (summer, elderly/medical)", "trade": "HVAC"},
+    "electrical_fire": {"label": "Electrical fire risk", "trade": "Electrical"},
+    "refrigeration_failure": {"label": "Refrigeration failure (commercial food)", "trade": "HVAC"},
+}
+
+SYSTEM_PROMPT = f"""You are the Dispatch Agent for Kipper Energy Solutions, a multi-trade MEP contractor.
 
 ## Your Role
 Assign the right technician to work orders based on skills, location, and availability.
@@ -66,12 +81,7 @@ Assign the right technician to work orders based on skills, location, and availa
 - Tennessee (Nashville, Memphis)
 
 ## Emergency Types (Immediate Dispatch)
-- Gas leak
-- Flooding/water damage
-- No heat (winter)
-- No AC (summer, elderly/medical)
-- Electrical fire risk
-- Refrigeration failure (commercial food)
+{chr(10).join(f"- {emergency['label']}" for emergency in EMERGENCY_TYPES.values())}
 
 ## Output Format
 When assigning a technician, provide:
@@ -279,12 +289,27 @@ def check_technician_schedule(technician_id: str, date: Optional[str] = None) ->
     }
 
 
-def send_dispatch_notification(technician_id: str, work_order_id: str, priority: str, message: Optional[str] = None) -> Dict:
-    """Send notification to technician (mock)."""
+async def send_dispatch_notification(technician_id: str, work_order_id: str, priority: str,
+                                     message: Optional[str] = None) -> Dict:
+    """Send notification to technician (mock) and log the dispatch event to the CRM once it is journaled."""
     tech = next((t for t in TECHNICIANS if t["id"] == technician_id), None)
 
+    writer = get_crm_writer()
+    seq = writer.submit("dispatch_notification", f"work_order:{work_order_id}", {
+        "technician_id": technician_id,
+        "work_order_id": work_order_id,
+        "priority": priority,
+        "message": message,
+        "timestamp": datetime.now().isoformat()
+    })
+    try:
+        await writer.journaled(seq)
+    except CRMJournalError as e:
+        return {"success": False, "work_order_id": work_order_id, "notification_sent": False, "error": str(e)}
+
     return {
         "success": True,
+        "queued": True,
         "technician": tech["name"] if tech else technician_id,
         "work_order_id": work_order_id,
         "priority": priority,
@@ -302,7 +327,7 @@ class DispatchAgent:
     """Dispatch agent for technician assignment."""
 
     def __init__(self):
-        self.client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+        self.llm = get_llm_pool()
         self.conversation: List[Dict] = []
 
     async def dispatch(self, work_order: Dict[str, Any]) -> Dict[str, Any]:
@@ -331,23 +356,23 @@ Please recommend the best technician for this job and explain your reasoning."""
         self.conversation.append({"role": "user", "content": prompt})
 
         # Call Claude
-        response = self.client.messages.create(
+        response = await self.llm.create(**build_cached_request(
             model="claude-sonnet-4-20250514",
             max_tokens=1024,
             system=SYSTEM_PROMPT,
             tools=TOOLS,
             messages=self.conversation
-        )
+        ))
 
         # Process response and tool calls
-        result = {"recommendation": "", "assignment": None}
+        result = {"recommendation": "", "assignment": None, "usage": usage_dict(response.usage)}
 
         for block in response.content:
             if block.type == "text":
                 result["recommendation"] = block.text
 
             elif block.type == "tool_use":
-                tool_result = self._execute_tool(block.name, block.input)
+                tool_result = await self._execute_tool(block.name, block.input)
 
                 # Add to conversation for follow-up
                 self.conversation.append({
@@ -364,7 +389,7 @@ Please recommend the best technician for this job and explain your reasoning."""
 
         return result
 
-    def _execute_tool(self, tool_name: str, tool_input: Dict) -> Dict:
+    async def _execute_tool(self, tool_name: str, tool_input: Dict) -> Dict:
         """Execute a tool by name."""
         if tool_name == "get_available_technicians":
             return get_available_technicians(**tool_input)
@@ -375,7 +400,7 @@ Please recommend the best technician for this job and explain your reasoning."""
         elif tool_name == "check_technician_schedule":
             return check_technician_schedule(**tool_input)
         elif tool_name == "send_dispatch_notification":
-            return send_dispatch_notification(**tool_input)
+            return await send_dispatch_notification(**tool_input)
         else:
             return {"error": f"Unknown tool: {tool_name}"}
 
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Shared Claude Client - Kipper Energy Solutions
+===============================================
+
+One process-wide AsyncAnthropic client shared by every voice session and
+agent, instead of a fresh synchronous client per session.
+
+- Keep-alive HTTP connection pool, so calls skip TCP/TLS setup; warm()
+  opens a connection ahead of a call after the pool has sat idle
+- Cap on concurrent Claude requests, so a call spike queues instead of
+  tripping rate limits
+- Async all the way down, so a slow LLM round trip never blocks the
+  event loop for other callers
+- Live, record or replay transport (see llm_transport.py), so the same
+  callers run offline against recorded responses
+
+Tuning (environment):
+- LLM_MAX_CONNECTIONS: Total pooled HTTP connections (default 100)
+- LLM_MAX_KEEPALIVE: Idle connections kept warm (default 20)
+- LLM_KEEPALIVE_EXPIRY: Seconds an idle connection stays open (default 60)
+- LLM_MAX_CONCURRENT_REQUESTS: In-flight Claude requests (default 32)
+- LLM_TIMEOUT: Per-request timeout in seconds (default 30)
+"""
+
+import os
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional
+
+import anthropic
+import httpx
+from dotenv import load_dotenv
+
+from .llm_transport import build_transport, LLM_TRANSPORT
+
+load_dotenv()
+
+# =============================================================================
+# Configuration
+# =============================================================================
+
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "20"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+LLM_MAX_CONCURRENT_REQUESTS = int(os.getenv("LLM_MAX_CONCURRENT_REQUESTS", "32"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+
+# =============================================================================
+# Client Pool
+# =============================================================================
+
+class LLMClientPool:
+    """Shared AsyncAnthropic client with a bounded number of in-flight requests."""
+
+    def __init__(
+        self,
+        client: Optional[Any] = None,
+        max_concurrent_requests: int = LLM_MAX_CONCURRENT_REQUESTS
+    ):
+        self._client = client
+        self.max_concurrent_requests = max_concurrent_requests
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.total_requests = 0
+        self.last_used = float("-inf")
+
+    @property
+    def client(self) -> anthropic.AsyncAnthropic:
+        """The underlying client (or record/replay transport), built on first use."""
+        if self._client is None:
+            self._client = build_transport(self._live_client)
+        return self._client
+
+    @staticmethod
+    def _live_client() -> anthropic.AsyncAnthropic:
+        http_client = anthropic.DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_MAX_KEEPALIVE,
+                keepalive_expiry=LLM_KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(LLM_TIMEOUT, connect=5.0)
+        )
+        return anthropic.AsyncAnthropic(
+            api_key=os.getenv("ANTHROPIC_API_KEY"),
+            http_client=http_client,
+            max_retries=2
+        )
+
+    async def create(self, **kwargs) -> Any:
+        """Send a messages.create request once a request slot is free."""
+        async with self._slot():
+            return await self.client.messages.create(**kwargs)
+
+    @asynccontextmanager
+    async def stream(self, **kwargs):
+        """Open a messages.stream request once a request slot is free."""
+        async with self._slot():
+            async with self.client.messages.stream(**kwargs) as stream:
+                yield stream
+
+    @asynccontextmanager
+    async def _slot(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent_requests)
+
+        async with self._semaphore:
+            self.in_flight += 1
+            self.total_requests += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            self.last_used = time.monotonic()
+            try:
+                yield
+            finally:
+                self.in_flight -= 1
+
+    async def warm(self, model: str):
+        """
+        Open a pooled connection before it's needed, with a token count
+        (no tokens billed). Skipped while a recent request still holds a
+        keep-alive connection, and for transports without count_tokens.
+        """
+        if time.monotonic() - self.last_used < LLM_KEEPALIVE_EXPIRY / 2:
+            return
+        count_tokens = getattr(self.client.messages, "count_tokens", None)
+        if count_tokens is None:
+            return
+        self.last_used = time.monotonic()
+        try:
+            await count_tokens(model=model, messages=[{"role": "user", "content": "hello"}])
+        except Exception:
+            pass  # best effort; the real request will connect on its own
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool counters for health checks."""
+        return {
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "total_requests": self.total_requests,
+            "max_concurrent_requests": self.max_concurrent_requests,
+            "transport": LLM_TRANSPORT
+        }
+
+    async def aclose(self):
+        """Close pooled connections."""
+        if self._client is not None and hasattr(self._client, "close"):
+            await self._client.close()
+        self._client = None
+
+
+_pool: Optional[LLMClientPool] = None
+
+
+def get_llm_pool() -> LLMClientPool:
+    """Return the process-wide client pool."""
+    global _pool
+    if _pool is None:
+        _pool = LLMClientPool()
+    return _pool
+
+
+async def close_llm_pool():
+    """Close the process-wide pool (call from app shutdown)."""
+    global _pool
+    if _pool is not None:
+        await _pool.aclose()
+        _pool = None
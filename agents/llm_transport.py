@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+LLM Transport - Kipper Energy Solutions
+========================================
+
+Pluggable backend behind the shared Claude client pool, so every Claude
+caller (voice sessions, the chat UI, the agent fleet) can run against
+recorded responses instead of the network.
+
+Modes (LLM_TRANSPORT):
+- live: Requests go to the Anthropic API (default)
+- record: Requests go to the API and each response is saved as a fixture
+  named by a hash of the request
+- replay: Responses are served from fixtures, with optional injected
+  latency; no API key or network needed. A request with no fixture
+  raises FixtureMissingError naming the hash to record
+
+Replay makes tests and benchmarks deterministic and free, and isolates
+our own overhead from the API's: with zero injected latency anything a
+benchmark measures is ours.
+
+Request hashes ignore transport-only arguments (timeouts, headers) and
+timestamps, which tool results embed and which change every run: ISO
+ones, and compact YYYYMMDDHHMMSS ones such as work order confirmation
+numbers (WO-20261017093015).
+
+Tuning (environment):
+- LLM_TRANSPORT: live | record | replay (default live); anything else is an error
+- LLM_FIXTURES_DIR: Fixture directory (default tests/fixtures/llm)
+- LLM_REPLAY_LATENCY: Seconds before a replayed response / first token (default 0)
+- LLM_REPLAY_TOKEN_DELAY: Seconds between replayed streamed words (default 0)
+"""
+
+import os
+import re
+import json
+import asyncio
+import hashlib
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from anthropic.types import Message
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# =============================================================================
+# Configuration
+# =============================================================================
+
+LLM_TRANSPORT = os.getenv("LLM_TRANSPORT", "live").lower()
+LLM_FIXTURES_DIR = os.getenv("LLM_FIXTURES_DIR", "tests/fixtures/llm")
+LLM_REPLAY_LATENCY = float(os.getenv("LLM_REPLAY_LATENCY", "0"))
+LLM_REPLAY_TOKEN_DELAY = float(os.getenv("LLM_REPLAY_TOKEN_DELAY", "0"))
+
+# Arguments that change how a request is sent, not what Claude sees
+TRANSPORT_ARGS = {"timeout", "extra_headers", "extra_query", "extra_body", "stream"}
+TIMESTAMP_PATTERN = re.compile(
+    r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(\.\d+)?"
+    # Compact YYYYMMDDHHMMSS, as in confirmation numbers; must be a plausible date
+    r"|(?<!\d)20\d{2}(0[1-9]|1[0-2])(0[1-9]|[12]\d|3[01])([01]\d|2[0-3])[0-5]\d[0-5]\d(?!\d)"
+)
+TRANSPORT_MODES = {"live", "record", "replay"}
+
+
+class FixtureMissingError(KeyError):
+    """No recorded response for a request in replay mode."""
+
+# =============================================================================
+# Request Hashing
+# =============================================================================
+
+def _plain(value: Any) -> Any:
+    """Request arguments as plain JSON data (SDK content blocks included)."""
+    if hasattr(value, "model_dump"):
+        return _plain(value.model_dump(mode="json", exclude_none=True))
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    if isinstance(value, str):
+        return TIMESTAMP_PATTERN.sub("<timestamp>", value)
+    return value
+
+
+def normalize_request(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    return _plain({k: v for k, v in kwargs.items() if k not in TRANSPORT_ARGS})
+
+
+def request_key(kwargs: Dict[str, Any]) -> str:
+    """Stable hash of what Claude would see for a messages request."""
+    canonical = json.dumps(normalize_request(kwargs), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()[:32]
+
+# =============================================================================
+# Fixtures
+# =============================================================================
+
+class FixtureStore:
+    """One JSON file per request hash."""
+
+    def __init__(self, directory: str = LLM_FIXTURES_DIR):
+        self.directory = Path(directory)
+
+    def path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def load(self, kwargs: Dict[str, Any]) -> Message:
+        key = request_key(kwargs)
+        try:
+            data = json.loads(self.path(key).read_text())
+        except FileNotFoundError:
+            raise FixtureMissingError(
+                f"No recorded response {key} for model {kwargs.get('model')} "
+                f"in {self.directory}; run with LLM_TRANSPORT=record to capture it"
+            ) from None
+        return Message.model_validate(data["response"])
+
+    def save(self, kwargs: Dict[str, Any], response: Message):
+        key = request_key(kwargs)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = self.path(key).with_suffix(".tmp")
+        tmp.write_text(json.dumps({
+            "request": normalize_request(kwargs),
+            "response": response.model_dump(mode="json")
+        }, indent=2, sort_keys=True))
+        os.replace(tmp, self.path(key))
+
+# =============================================================================
+# Record
+# =============================================================================
+
+class _RecordingStream:
+    """Passes a live stream through and saves its final message."""
+
+    def __init__(self, manager: Any, kwargs: Dict[str, Any], fixtures: FixtureStore):
+        self._manager = manager
+        self._kwargs = kwargs
+        self._fixtures = fixtures
+        self._stream = None
+
+    async def __aenter__(self):
+        self._stream = await self._manager.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc):
+        return await self._manager.__aexit__(*exc)
+
+    @property
+    def text_stream(self):
+        return self._stream.text_stream
+
+    async def get_final_message(self) -> Message:
+        message = await self._stream.get_final_message()
+        self._fixtures.save(self._kwargs, message)
+        return message
+
+
+class _RecordingMessages:
+    def __init__(self, live: Any, fixtures: FixtureStore):
+        self._live = live
+        self._fixtures = fixtures
+
+    async def create(self, **kwargs) -> Message:
+        response = await self._live.messages.create(**kwargs)
+        self._fixtures.save(kwargs, response)
+        return response
+
+    def stream(self, **kwargs) -> _RecordingStream:
+        return _RecordingStream(self._live.messages.stream(**kwargs), kwargs, self._fixtures)
+
+
+class RecordingTransport:
+    """Live client that writes every response to the fixture store."""
+
+    def __init__(self, live: Any, fixtures: Optional[FixtureStore] = None):
+        self.live = live
+        self.fixtures = fixtures or FixtureStore()
+        self.messages = _RecordingMessages(live, self.fixtures)
+
+    async def close(self):
+        await self.live.close()
+
+# =============================================================================
+# Replay
+# =============================================================================
+
+class ReplayStream:
+    """Serves a recorded message as a stream of words."""
+
+    def __init__(self, message: Message, latency: float, token_delay: float):
+        self.message = message
+        self.latency = latency
+        self.token_delay = token_delay
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    @property
+    def text_stream(self):
+        return self._words()
+
+    async def _words(self):
+        await asyncio.sleep(self.latency)
+        self.latency = 0.0
+        for block in self.message.content:
+            if block.type != "text":
+                continue
+            words = block.text.split(" ")
+            for i, word in enumerate(words):
+                yield word if i == len(words) - 1 else word + " "
+                if self.token_delay:
+                    await asyncio.sleep(self.token_delay)
+
+    async def get_final_message(self) -> Message:
+        await asyncio.sleep(self.latency)  # tool-only replies never stream text
+        return self.message
+
+
+class _ReplayMessages:
+    def __init__(self, transport: "ReplayTransport"):
+        self._transport = transport
+
+    async def create(self, **kwargs) -> Message:
+        message = self._transport.lookup(kwargs)
+        await asyncio.sleep(self._transport.latency)
+        return message
+
+    def stream(self, **kwargs) -> ReplayStream:
+        return ReplayStream(self._transport.lookup(kwargs), self._transport.latency, self._transport.token_delay)
+
+
+class ReplayTransport:
+    """AsyncAnthropic-shaped client that answers from recorded fixtures."""
+
+    def __init__(
+        self,
+        fixtures: Optional[FixtureStore] = None,
+        latency: float = LLM_REPLAY_LATENCY,
+        token_delay: float = LLM_REPLAY_TOKEN_DELAY
+    ):
+        self.fixtures = fixtures or FixtureStore()
+        self.latency = latency
+        self.token_delay = token_delay
+        self.served = 0
+        self.messages = _ReplayMessages(self)
+
+    def lookup(self, kwargs: Dict[str, Any]) -> Message:
+        message = self.fixtures.load(kwargs)
+        self.served += 1
+        return message
+
+    async def close(self):
+        pass
+
+# =============================================================================
+# Factory
+# =============================================================================
+
+def llm_configured() -> bool:
+    """Whether Claude calls can be served (an API key, or fixtures to replay)."""
+    return LLM_TRANSPORT == "replay" or bool(os.getenv("ANTHROPIC_API_KEY"))
+
+
+def build_transport(live_factory, mode: str = LLM_TRANSPORT) -> Any:
+    """
+    Client for the configured mode. live_factory builds the real
+    AsyncAnthropic client and is only called when the mode needs one.
+    An unknown mode raises ValueError rather than quietly going live.
+    """
+    if mode not in TRANSPORT_MODES:
+        raise ValueError(f"Unknown LLM_TRANSPORT {mode!r}; expected one of {', '.join(sorted(TRANSPORT_MODES))}")
+    if mode == "replay":
+        return ReplayTransport()
+    if mode == "record":
+        return RecordingTransport(live_factory())
+    return live_factory()
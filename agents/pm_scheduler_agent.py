@@ -22,7 +22,9 @@ from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional
 from dataclasses import dataclass
 from dotenv import load_dotenv
-import anthropic
+
+from .llm_client import get_llm_pool
+from .prompt_cache import build_cached_request, usage_dict
 
 load_dotenv()
 
@@ -135,7 +137,7 @@ class PMSchedulerAgent:
     """PM Scheduler agent for maintenance scheduling."""
 
     def __init__(self):
-        self.client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+        self.llm = get_llm_pool()
         self.conversation: List[Dict] = []
 
     async def schedule_visits(self, request: Dict[str, Any]) -> Dict[str, Any]:
@@ -153,15 +155,15 @@ Please identify visits that need scheduling and create appointments."""
 
         self.conversation.append({"role": "user", "content": prompt})
 
-        response = self.client.messages.create(
+        response = await self.llm.create(**build_cached_request(
             model="claude-sonnet-4-20250514",
             max_tokens=1024,
             system=SYSTEM_PROMPT,
             tools=TOOLS,
             messages=self.conversation
-        )
+        ))
 
-        result = {"plan": "", "appointments_created": []}
+        result = {"plan": "", "appointments_created": [], "usage": usage_dict(response.usage)}
 
         for block in response.content:
             if block.type == "text":
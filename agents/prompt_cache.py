@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Prompt Caching - Kipper Energy Solutions
+=========================================
+
+Shared request builder that marks the large static prefix of every Claude
+call (tool schemas + system prompt) as cacheable.
+
+Claude reads the prompt in the order tools → system → messages, so a cache
+breakpoint on the last tool and on the system block covers everything that
+stays the same between turns. The prefix only hits if it is byte-identical,
+so tools keep their declared order and the system prompt goes first, with
+any per-call context in later, uncached blocks.
+
+A prefix shorter than the model's minimum (1024 tokens for Sonnet and
+Opus, 2048 for Haiku) is never cached; prefix_tokens() and
+min_cacheable_tokens() let callers check before trimming the prefix.
+Cache writes bill at 1.25x the input price and cache reads at 0.1x
+(CACHE_WRITE_PRICE / CACHE_READ_PRICE).
+
+Usage:
+    request = build_cached_request(
+        model=CLAUDE_MODEL, max_tokens=1024,
+        system=SYSTEM_PROMPT, tools=TOOLS, messages=conversation
+    )
+    response = client.messages.create(**request)
+    usage.add(response.usage)
+"""
+
+import json
+from dataclasses import dataclass, asdict
+from typing import Dict, Any, List, Optional
+
+CACHE_CONTROL = {"type": "ephemeral"}
+
+# Shortest prefix the API will cache, by model family (tokens)
+MIN_CACHEABLE_TOKENS = {"haiku": 2048}
+DEFAULT_MIN_CACHEABLE_TOKENS = 1024
+
+# Price of cached prompt tokens relative to uncached input tokens
+CACHE_WRITE_PRICE = 1.25
+CACHE_READ_PRICE = 0.1
+
+
+def min_cacheable_tokens(model: str) -> int:
+    """Shortest prompt prefix `model` will cache."""
+    for family, tokens in MIN_CACHEABLE_TOKENS.items():
+        if family in model:
+            return tokens
+    return DEFAULT_MIN_CACHEABLE_TOKENS
+
+
+def prefix_tokens(system: str, tools: Optional[List[Dict[str, Any]]] = None) -> int:
+    """Rough size of the cached prefix (tools + system), ~4 characters per token."""
+    return (len(json.dumps(tools or [])) + len(system)) // 4
+
+
+def cached_system(system: str, context: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """System prompt as a cacheable block, followed by uncached context blocks."""
+    blocks = [{"type": "text", "text": system, "cache_control": CACHE_CONTROL}]
+    blocks.extend({"type": "text", "text": text} for text in context or [] if text)
+    return blocks
+
+
+def cached_tools(tools: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Copy of the tool list with a cache breakpoint on the last tool."""
+    if not tools:
+        return []
+    return [*tools[:-1], {**tools[-1], "cache_control": CACHE_CONTROL}]
+
+
+def build_cached_request(
+    model: str,
+    max_tokens: int,
+    system: str,
+    messages: List[Dict[str, Any]],
+    tools: Optional[List[Dict[str, Any]]] = None,
+    context: Optional[List[str]] = None,
+    **extra
+) -> Dict[str, Any]:
+    """
+    Build messages.create / messages.stream kwargs with a cacheable prefix.
+
+    Args:
+        model: Claude model ID
+        max_tokens: Response token limit
+        system: Static system prompt (cached)
+        messages: Conversation history
+        tools: Static tool definitions (cached), in a fixed order
+        context: Per-call system text placed after the cached prefix
+        **extra: Any other request parameters (tool_choice, temperature...)
+
+    Returns:
+        Request kwargs
+    """
+    request = {
+        "model": model,
+        "max_tokens": max_tokens,
+        "system": cached_system(system, context),
+        "messages": messages,
+        **extra
+    }
+    if tools:
+        request["tools"] = cached_tools(tools)
+    return request
+
+
+@dataclass
+class TokenUsage:
+    """Running token totals, including prompt-cache reads and writes."""
+
+    requests: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_creation_input_tokens: int = 0
+    cache_read_input_tokens: int = 0
+
+    def add(self, usage: Any) -> "TokenUsage":
+        """Accumulate a response.usage object."""
+        self.requests += 1
+        self.input_tokens += getattr(usage, "input_tokens", 0) or 0
+        self.output_tokens += getattr(usage, "output_tokens", 0) or 0
+        self.cache_creation_input_tokens += getattr(usage, "cache_creation_input_tokens", 0) or 0
+        self.cache_read_input_tokens += getattr(usage, "cache_read_input_tokens", 0) or 0
+        return self
+
+    @property
+    def billed_input_tokens(self) -> float:
+        """Prompt tokens weighted by price: cache writes cost more, reads far less."""
+        return (self.input_tokens + CACHE_WRITE_PRICE * self.cache_creation_input_tokens
+                + CACHE_READ_PRICE * self.cache_read_input_tokens)
+
+    @property
+    def cache_hit_rate(self) -> float:
+        """Share of prompt tokens served from the cache."""
+        prompt_tokens = self.input_tokens + self.cache_creation_input_tokens + self.cache_read_input_tokens
+        return self.cache_read_input_tokens / prompt_tokens if prompt_tokens else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), "cache_hit_rate": round(self.cache_hit_rate, 3)}
+
+
+def usage_dict(usage: Any) -> Dict[str, Any]:
+    """Token counts for a single response."""
+    return TokenUsage().add(usage).as_dict()
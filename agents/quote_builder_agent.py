@@ -22,7 +22,9 @@ from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional
 from dataclasses import dataclass
 from dotenv import load_dotenv
-import anthropic
+
+from .llm_client import get_llm_pool
+from .prompt_cache import build_cached_request, usage_dict
 
 load_dotenv()
 
@@ -166,7 +168,7 @@ class QuoteBuilderAgent:
     """Quote builder agent for proposal generation."""
 
     def __init__(self):
-        self.client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+        self.llm = get_llm_pool()
         self.conversation: List[Dict] = []
 
     async def build_quote(self, survey_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -194,15 +196,15 @@ Please:
 
         self.conversation.append({"role": "user", "content": prompt})
 
-        response = self.client.messages.create(
+        response = await self.llm.create(**build_cached_request(
             model="claude-sonnet-4-20250514",
             max_tokens=2048,
             system=SYSTEM_PROMPT,
             tools=TOOLS,
             messages=self.conversation
-        )
+        ))
 
-        result = {"proposal_summary": "", "pricing_options": [], "rebates": [], "roi": None}
+        result = {"proposal_summary": "", "pricing_options": [], "rebates": [], "roi": None, "usage": usage_dict(response.usage)}
 
         for block in response.content:
             if block.type == "text":
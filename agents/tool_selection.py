@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Tool Selection - Kipper Energy Solutions
+=========================================
+
+Sends Claude only the tool schemas a conversation is likely to need,
+instead of the agent's whole TOOLS list on every request.
+
+A tool is offered when:
+- it is always on (escalation and other tools that must never be missing)
+- the latest user text matches its intent pattern, a cheap local regex
+- it has been offered earlier in the conversation, or appears in a
+  tool_use block in the history
+
+Offered tools stay offered for the rest of the conversation and always
+come back in the agent's declared order. A request built from text that
+may not stand (a speculative request on a partial transcript) selects with
+commit=False, so a misheard word can't add a tool for good. The tool list is the front of the
+cached prompt prefix (see prompt_cache.py), so a conversation moves through
+a handful of growing prefixes instead of a different prefix every turn.
+
+A prefix under the model's minimum cacheable size is never cached, and a
+smaller uncached prompt usually costs more than a larger cached one. With
+min_tokens set, a subset whose schemas come to fewer estimated tokens than
+that is replaced by the full list.
+
+Usage:
+    selector = ToolSelector(TOOLS, TOOL_INTENTS, always=["escalate_to_human"],
+                            min_tokens=min_cacheable_tokens(MODEL) - prefix_tokens(SYSTEM_PROMPT))
+    request = build_cached_request(..., tools=selector.select(conversation))
+"""
+
+import re
+import json
+from typing import Dict, Any, Iterable, List, Optional, Set
+
+
+def latest_user_text(messages: List[Dict[str, Any]]) -> str:
+    """Text of the most recent user message that isn't only tool results."""
+    for message in reversed(messages):
+        if message["role"] != "user":
+            continue
+        content = message["content"]
+        if isinstance(content, str):
+            return content
+        text = " ".join(block.get("text", "") for block in content if block.get("type") == "text")
+        if text:
+            return text
+    return ""
+
+
+def used_tools(messages: List[Dict[str, Any]]) -> Set[str]:
+    """Names of tools Claude has called in the conversation so far."""
+    return {
+        block["name"]
+        for message in messages
+        if message["role"] == "assistant" and not isinstance(message["content"], str)
+        for block in message["content"]
+        if block.get("type") == "tool_use"
+    }
+
+
+class ToolSelector:
+    """
+    Per-conversation tool subset.
+
+    Args:
+        tools: The agent's full tool list, in its declared order
+        intents: Regex per tool name, matched against the latest user text
+        always: Tools offered on every request
+        min_tokens: Send every tool when the subset's schemas come to fewer
+            estimated tokens than this (0 never falls back)
+    """
+
+    def __init__(
+        self,
+        tools: List[Dict[str, Any]],
+        intents: Dict[str, str],
+        always: Iterable[str] = (),
+        min_tokens: int = 0
+    ):
+        names = [tool["name"] for tool in tools]
+        unknown = (set(intents) | set(always)) - set(names)
+        if unknown:
+            raise ValueError(f"Unknown tools: {sorted(unknown)}")
+
+        self.tools = tools
+        self.intents = {name: re.compile(pattern, re.IGNORECASE) for name, pattern in intents.items()}
+        self.offered: Set[str] = set(always)
+        self.min_tokens = min_tokens
+
+    def select(
+        self,
+        messages: List[Dict[str, Any]],
+        text: Optional[str] = None,
+        commit: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        Tools to send with the next request.
+
+        Args:
+            messages: Conversation history
+            text: Text to read intent from; defaults to the latest user text
+            commit: Keep newly matched tools offered for later requests
+
+        Returns:
+            A subset of tools in declared order, or every tool if the subset
+            is under min_tokens
+        """
+        text = latest_user_text(messages) if text is None else text
+        offered = self.offered | used_tools(messages)
+        offered |= {name for name, pattern in self.intents.items() if pattern.search(text)}
+        if commit:
+            self.offered = offered
+        subset = [tool for tool in self.tools if tool["name"] in offered]
+        if self.min_tokens and len(json.dumps(subset)) // 4 < self.min_tokens:
+            return self.tools
+        return subset
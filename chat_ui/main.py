@@ -17,9 +17,11 @@ Run: uvicorn chat_ui.main:app --reload --port 8000
 """
 
 import os
+import sys
 import json
 import asyncio
 from datetime import datetime
+from pathlib import Path
 from typing import Dict, Any, List, Optional
 from contextlib import asynccontextmanager
 
@@ -30,7 +32,13 @@ from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import httpx
 from dotenv import load_dotenv
-import anthropic
+
+# Shared agent-fleet modules live in the repo root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from agents.prompt_cache import build_cached_request, TokenUsage
+from agents.context_window import ConversationWindow, summarize_turns
+from agents.llm_client import get_llm_pool
+from agents.llm_transport import llm_configured
 
 load_dotenv()
 
@@ -201,22 +209,23 @@ You have access to real-time data from our Coperniq system including:
 """
 
     def __init__(self):
-        api_key = os.getenv("ANTHROPIC_API_KEY")
-        self.client = anthropic.Anthropic(api_key=api_key) if api_key else None
-        self.conversations: Dict[str, List[Dict]] = {}
+        self.llm = get_llm_pool() if llm_configured() else None
+        self.conversations: Dict[str, ConversationWindow] = {}
+        self.usage: Dict[str, TokenUsage] = {}
         self.coperniq = CoperniqClient()
 
     async def chat(self, conversation_id: str, message: str) -> str:
         """Process a chat message and return response."""
-        if not self.client:
+        if not self.llm:
             return "AI assistant not configured. Please set ANTHROPIC_API_KEY."
 
         # Initialize or get conversation
         if conversation_id not in self.conversations:
-            self.conversations[conversation_id] = []
+            self.conversations[conversation_id] = ConversationWindow(summarizer=self._summarize)
+        window = self.conversations[conversation_id]
 
         # Add user message
-        self.conversations[conversation_id].append({
+        window.append({
             "role": "user",
             "content": message
         })
@@ -226,25 +235,29 @@ You have access to real-time data from our Coperniq system including:
             context = await self._get_context_for_query(message)
 
             # Build messages with context
-            messages = self.conversations[conversation_id].copy()
+            messages = window.messages.copy()
             if context:
-                # Inject context into the latest user message
-                messages[-1]["content"] = f"{message}\n\n[System Context: {context}]"
+                # Inject context into the latest user message (request only,
+                # so lookups don't pile up in the history)
+                messages[-1] = {**messages[-1], "content": f"{message}\n\n[System Context: {context}]"}
 
-            response = self.client.messages.create(
+            response = await self.llm.create(**build_cached_request(
                 model="claude-sonnet-4-20250514",
                 max_tokens=1024,
                 system=self.SYSTEM_PROMPT,
-                messages=messages
-            )
+                messages=messages,
+                context=[window.summary_context()]
+            ))
+            self.usage.setdefault(conversation_id, TokenUsage()).add(response.usage)
 
             assistant_response = response.content[0].text
 
             # Add assistant response to history
-            self.conversations[conversation_id].append({
+            window.append({
                 "role": "assistant",
                 "content": assistant_response
             })
+            window.maybe_fold()
 
             return assistant_response
 
@@ -276,6 +289,14 @@ You have access to real-time data from our Coperniq system including:
 
         return " | ".join(context_parts) if context_parts else ""
 
+    async def _summarize(self, previous: str, messages: List[Dict]) -> str:
+        """Fold old turns into the running summary (runs in the background)."""
+        return await summarize_turns(self.llm, previous, messages)
+
+    def get_usage(self, conversation_id: str) -> Dict[str, Any]:
+        """Token and prompt-cache totals for a conversation."""
+        return self.usage.get(conversation_id, TokenUsage()).as_dict()
+
 # =============================================================================
 # Agent Dashboard
 # =============================================================================
@@ -373,6 +394,7 @@ async def chat_endpoint(request: ChatRequest) -> JSONResponse:
     return JSONResponse({
         "response": response,
         "conversation_id": conversation_id,
+        "usage": chat_manager.get_usage(conversation_id),
         "timestamp": datetime.now().isoformat()
     })
 
@@ -0,0 +1,208 @@
+"""
+Unit tests for call lifecycle analytics
+
+Tests cover:
+- Calls per status, durations and ring-to-answer times
+- Concurrent-call high-water marks
+- Dispositions joined to the call's final status
+- Rolling windows and bucket expiry
+- Snapshots surviving a restart, one file per worker
+- Workers sharing events, whichever worker a callback reaches
+- The /voice/status webhook and /voice/analytics endpoint
+"""
+
+import os
+import time
+import asyncio
+import subprocess
+from pathlib import Path
+
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent / "voice_ai"))
+
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+import call_analytics
+from call_analytics import CallAnalytics, worker_snapshot_path
+from campaigns import CampaignEngine, CampaignStore, Dialer
+
+
+# ==============================================================================
+# FIXTURES
+# ==============================================================================
+
+@pytest.fixture
+def analytics(tmp_path):
+    return CallAnalytics(str(tmp_path / "analytics.json"))
+
+
+def rfc2822(at: float) -> str:
+    return time.strftime("%a, %d %b %Y %H:%M:%S +0000", time.gmtime(at))
+
+
+def call(analytics, call_sid, ring_at, answer_after, duration, status="completed"):
+    """Feed one call's status callbacks (Twilio timestamps, whole seconds)."""
+    analytics.ingest({"CallSid": call_sid, "CallStatus": "ringing", "Timestamp": rfc2822(ring_at)})
+    if answer_after is not None:
+        analytics.ingest({"CallSid": call_sid, "CallStatus": "in-progress",
+                          "Timestamp": rfc2822(ring_at + answer_after)})
+    analytics.ingest({"CallSid": call_sid, "CallStatus": status, "CallDuration": str(duration),
+                      "Timestamp": rfc2822(ring_at + (answer_after or 0) + duration)})
+
+
+# ==============================================================================
+# AGGREGATION TESTS
+# ==============================================================================
+
+class TestCallAnalytics:
+    """Test the aggregation pipeline"""
+
+    def test_ingest_only_queues(self, analytics):
+        analytics.ingest({"CallSid": "CA1", "CallStatus": "ringing"})
+
+        assert analytics.buckets == {}
+        assert analytics.summary()["pending_events"] == 1
+
+    def test_status_duration_and_ring_time(self, analytics):
+        now = int(time.time()) - 120
+        call(analytics, "CA1", now, 4, 90)
+        call(analytics, "CA2", now, None, 0, status="no-answer")
+
+        assert analytics.aggregate() == 5
+        window = analytics.window(60)
+
+        assert window["calls_by_status"] == {"ringing": 2, "in-progress": 1, "completed": 1, "no-answer": 1}
+        assert window["ring_to_answer_seconds"]["buckets"]["le_5"] == 1
+        assert window["ring_to_answer_seconds"]["mean"] == 4
+        assert window["duration_seconds"]["buckets"]["le_120"] == 1
+        assert analytics.open_calls == {}
+
+    def test_concurrency_high_water(self, analytics):
+        for sid in ("CA1", "CA2", "CA3"):
+            analytics.ingest({"CallSid": sid, "CallStatus": "in-progress"})
+        analytics.ingest({"CallSid": "CA1", "CallStatus": "completed", "CallDuration": "30"})
+        analytics.ingest({"CallSid": "CA4", "CallStatus": "in-progress"})
+        analytics.aggregate()
+
+        summary = analytics.summary()
+        assert summary["concurrent"] == 3
+        assert summary["concurrent_high_water"] == 3
+        assert summary["windows"]["5m"]["peak_concurrent"] == 3
+
+    def test_dispositions_join_final_status(self, analytics):
+        analytics.ingest({"CallSid": "CA1", "CallStatus": "in-progress"})
+        analytics.note_disposition("CA1", "appointment_scheduled")
+        analytics.ingest({"CallSid": "CA1", "CallStatus": "completed", "CallDuration": "200"})
+        analytics.ingest({"CallSid": "CA2", "CallStatus": "in-progress"})
+        analytics.ingest({"CallSid": "CA2", "CallStatus": "completed", "CallDuration": "20"})
+        analytics.aggregate()
+
+        assert analytics.window(5)["dispositions"] == {"appointment_scheduled": 1, "none": 1}
+
+    def test_windows_and_expiry(self, tmp_path):
+        analytics = CallAnalytics(str(tmp_path / "a.json"), retention_hours=1)
+        now = time.time()
+        call(analytics, "CA-old", now - 30 * 60, 2, 60)
+        call(analytics, "CA-ancient", now - 3 * 3600, 2, 60)
+        call(analytics, "CA-new", now - 60, 2, 30)
+        analytics.aggregate()
+
+        summary = analytics.summary()
+        assert set(summary["windows"]) == {"5m", "1h"}
+        assert summary["windows"]["5m"]["calls_by_status"]["completed"] == 1
+        assert summary["windows"]["1h"]["calls_by_status"]["completed"] == 2
+
+    def test_snapshot_survives_restart(self, analytics):
+        async def run():
+            analytics.start()
+            analytics.ingest({"CallSid": "CA1", "CallStatus": "in-progress"})
+            analytics.ingest({"CallSid": "CA2", "CallStatus": "completed", "CallDuration": "45"})
+            await analytics.stop()
+
+        asyncio.run(run())
+
+        restarted = CallAnalytics(str(analytics.snapshot_path))
+        restarted.load_snapshot()
+        assert restarted.window(5)["calls_by_status"] == {"in-progress": 1, "completed": 1}
+        assert restarted.concurrent == 1
+
+    def test_workers_snapshot_separately(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(call_analytics, "ANALYTICS_SNAPSHOT_PATH", str(tmp_path / "call_analytics.json"))
+        monkeypatch.setattr(call_analytics, "ANALYTICS_DB_PATH", str(tmp_path / "call_analytics.db"))
+        exited = subprocess.Popen([sys.executable, "-c", "pass"])
+        exited.wait()
+
+        gone = CallAnalytics(worker_snapshot_path(call_analytics.ANALYTICS_SNAPSHOT_PATH, exited.pid))
+        gone.ingest({"CallSid": "CA1", "CallStatus": "completed", "CallDuration": "45"})
+        gone.aggregate()
+        asyncio.run(gone.snapshot())
+        sibling_path = worker_snapshot_path(call_analytics.ANALYTICS_SNAPSHOT_PATH, os.getppid())
+        sibling = CallAnalytics(sibling_path)
+        sibling.ingest({"CallSid": "CA2", "CallStatus": "busy"})
+        sibling.aggregate()
+        asyncio.run(sibling.snapshot())
+
+        restarted = CallAnalytics()
+        restarted.load_snapshot()
+
+        assert restarted.snapshot_path == tmp_path / f"call_analytics.{os.getpid()}.json"
+        assert restarted.window(5)["calls_by_status"] == {"completed": 1}
+        assert not Path(gone.snapshot_path).exists()
+        # A running sibling's snapshot is its own business
+        assert Path(sibling_path).exists()
+
+
+    def test_split_workers_see_whole_calls(self, tmp_path):
+        db = str(tmp_path / "events.db")
+        worker_a = CallAnalytics(str(tmp_path / "a.json"), db_path=db)
+        worker_b = CallAnalytics(str(tmp_path / "b.json"), db_path=db)
+        now = time.time()
+
+        # Twilio's callbacks for one call land on different workers, and the
+        # disposition is logged by the worker holding the WebSocket
+        worker_a.ingest({"CallSid": "CA1", "CallStatus": "ringing", "Timestamp": rfc2822(now - 60)})
+        worker_b.ingest({"CallSid": "CA1", "CallStatus": "in-progress", "Timestamp": rfc2822(now - 57)})
+        worker_b.note_disposition("CA1", "appointment_scheduled")
+
+        async def run():
+            await worker_b.refresh()
+            concurrent = worker_b.concurrent
+            worker_a.ingest({"CallSid": "CA1", "CallStatus": "completed", "CallDuration": "57",
+                             "Timestamp": rfc2822(now)})
+            # worker B's late retry of the answer callback lands after the final status
+            worker_b.ingest({"CallSid": "CA1", "CallStatus": "in-progress", "Timestamp": rfc2822(now - 57)})
+            await worker_a.refresh()
+            await worker_b.refresh()
+            return concurrent
+
+        assert asyncio.run(run()) == 1
+        for worker in (worker_a, worker_b):
+            window = worker.window(5)
+            assert worker.concurrent == 0
+            assert worker.high_water == 1
+            assert window["dispositions"] == {"appointment_scheduled": 1}
+            assert window["ring_to_answer_seconds"]["count"] == 1
+        worker_a.shared.close()
+        worker_b.shared.close()
+
+
+# ==============================================================================
+# ENDPOINT TESTS
+# ==============================================================================
+
+class TestAnalyticsEndpoint:
+    """Test the webhook feeding the JSON endpoint"""
+
+    def test_status_webhooks_reach_endpoint(self, analytics, tmp_path, monkeypatch):
+        monkeypatch.setattr(server, "call_analytics", analytics)
+        monkeypatch.setattr(server, "campaign_engine", CampaignEngine(CampaignStore(str(tmp_path / "c.db")), Dialer()))
+        client = TestClient(server.app)
+
+        for status in ("ringing", "in-progress", "completed"):
+            client.post("/voice/status", data={"CallSid": "CA-web", "CallStatus": status, "CallDuration": "75"})
+
+        summary = client.get("/voice/analytics").json()
+        assert summary["windows"]["5m"]["calls_by_status"] == {"ringing": 1, "in-progress": 1, "completed": 1}
+        assert summary["concurrent_high_water"] == 1
@@ -0,0 +1,381 @@
+"""
+Unit tests for the outbound campaign engine
+
+Tests cover:
+- Calls-per-second limit and live-call cap, shared across processes
+- Retry with backoff on busy / no-answer, giving up after max attempts
+- Queue persistence across restarts
+- Twilio dialer against a local Twilio stand-in
+- Campaign, status-callback and answered-call endpoints
+"""
+
+import json
+import time
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs
+
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent / "voice_ai"))
+
+from fastapi.testclient import TestClient
+
+import server
+import campaigns
+from call_analytics import CallAnalytics
+from drain import DrainController
+from post_call import PostCallQueue
+from transcript_store import TranscriptStore
+from campaigns import CampaignEngine, CampaignStore, Dialer, TwilioDialer
+
+
+# ==============================================================================
+# FIXTURES
+# ==============================================================================
+
+class FakeDialer(Dialer):
+    """Records dial times and hands out CallSids; outcomes come from handle_status."""
+
+    def __init__(self, fail_numbers=()):
+        self.dialed = []
+        self.fail_numbers = set(fail_numbers)
+
+    async def dial(self, to_number, reason, customer_name=None):
+        if to_number in self.fail_numbers:
+            raise RuntimeError("invalid number")
+        self.dialed.append((time.monotonic(), to_number, f"CA{len(self.dialed):04d}"))
+        return self.dialed[-1][2]
+
+
+def targets(count):
+    return [{"to_number": f"+1205555{i:04d}", "customer_name": f"Customer {i}"} for i in range(count)]
+
+
+async def wait_until(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        await asyncio.sleep(0.01)
+
+
+# ==============================================================================
+# RATE AND CONCURRENCY TESTS
+# ==============================================================================
+
+class TestLimits:
+    """Test the calls-per-second limit and live-call cap"""
+
+    def test_calls_per_second_limit(self, tmp_path):
+        dialer = FakeDialer()
+
+        async def run():
+            engine = CampaignEngine(CampaignStore(str(tmp_path / "c.db")), dialer,
+                                    calls_per_second=20, max_live_calls=100, workers=4)
+            await engine.create_campaign("PM reminders", "pm_reminder", targets(6))
+            await engine.start()
+            await wait_until(lambda: len(dialer.dialed) == 6)
+            await engine.stop()
+
+        asyncio.run(run())
+
+        times = [t for t, _, _ in dialer.dialed]
+        # Six calls at 20/s with a burst of one need at least five intervals
+        assert times[-1] - times[0] >= 5 / 20 * 0.9
+
+    def test_live_call_cap(self, tmp_path):
+        dialer = FakeDialer()
+
+        async def run():
+            engine = CampaignEngine(CampaignStore(str(tmp_path / "c.db")), dialer,
+                                    calls_per_second=1000, max_live_calls=2, workers=4)
+            await engine.create_campaign("Collections", "collections", targets(3))
+            await engine.start()
+            await wait_until(lambda: len(dialer.dialed) == 2)
+            await asyncio.sleep(0.2)
+            capped = len(dialer.dialed)
+            await engine.handle_status(dialer.dialed[0][2], "completed")
+            await wait_until(lambda: len(dialer.dialed) == 3)
+            await engine.stop()
+            return capped
+
+        assert asyncio.run(run()) == 2
+
+    def test_calls_per_second_shared_across_processes(self, tmp_path):
+        dialer = FakeDialer()
+        path = str(tmp_path / "c.db")
+
+        async def run():
+            # Two engines with their own connections stand in for two server processes
+            engines = [CampaignEngine(CampaignStore(path), dialer, calls_per_second=20,
+                                      max_live_calls=100, workers=2) for _ in range(2)]
+            await engines[0].create_campaign("PM reminders", "pm_reminder", targets(8))
+            for engine in engines:
+                await engine.start()
+            await wait_until(lambda: len(dialer.dialed) == 8)
+            for engine in engines:
+                await engine.stop()
+
+        asyncio.run(run())
+
+        times = sorted(t for t, _, _ in dialer.dialed)
+        assert times[-1] - times[0] >= 7 / 20 * 0.9
+
+    def test_dial_slots_are_spaced(self, tmp_path):
+        async def run():
+            store = CampaignStore(str(tmp_path / "c.db"))
+            slots = [await store.reserve_dial_slot(0.5) for _ in range(3)]
+            await store.close()
+            return slots
+
+        slots = asyncio.run(run())
+
+        assert [round(b - a, 3) for a, b in zip(slots, slots[1:])] == [0.5, 0.5]
+
+
+# ==============================================================================
+# RETRY TESTS
+# ==============================================================================
+
+class TestRetries:
+    """Test busy / no-answer handling"""
+
+    def test_busy_retries_then_fails(self, tmp_path):
+        dialer = FakeDialer()
+
+        async def run():
+            engine = CampaignEngine(CampaignStore(str(tmp_path / "c.db")), dialer,
+                                    calls_per_second=1000, workers=1, max_attempts=2, retry_seconds=0.05)
+            campaign_id = await engine.create_campaign("PM reminders", "pm_reminder", targets(1))
+            await engine.start()
+            await wait_until(lambda: len(dialer.dialed) == 1)
+            await engine.handle_status(dialer.dialed[0][2], "busy")
+            await wait_until(lambda: len(dialer.dialed) == 2)
+            await engine.handle_status(dialer.dialed[1][2], "no-answer")
+            progress = await engine.store.progress(campaign_id)
+            await engine.stop()
+            return progress
+
+        progress = asyncio.run(run())
+
+        assert progress["failed"] == 1
+        assert progress["attempts"] == 2
+        assert progress["done"] is True
+        retry_gap = dialer.dialed[1][0] - dialer.dialed[0][0]
+        assert retry_gap >= 0.04
+
+    def test_dial_errors_count_as_attempts(self, tmp_path):
+        dialer = FakeDialer(fail_numbers={"+12055550000"})
+
+        async def run():
+            engine = CampaignEngine(CampaignStore(str(tmp_path / "c.db")), dialer,
+                                    calls_per_second=1000, workers=2, max_attempts=1)
+            campaign_id = await engine.create_campaign("Collections", "collections", targets(2))
+            await engine.start()
+            await wait_until(lambda: len(dialer.dialed) == 1)
+            await engine.handle_status(dialer.dialed[0][2], "completed")
+            progress = await engine.store.progress(campaign_id)
+            await engine.stop()
+            return progress
+
+        progress = asyncio.run(run())
+
+        assert (progress["completed"], progress["failed"]) == (1, 1)
+
+    def test_unknown_call_is_not_a_campaign_call(self, tmp_path):
+        engine = CampaignEngine(CampaignStore(str(tmp_path / "c.db")), FakeDialer())
+
+        assert asyncio.run(engine.handle_status("CA-inbound", "completed")) is False
+
+
+# ==============================================================================
+# PERSISTENCE TESTS
+# ==============================================================================
+
+class TestPersistence:
+    """Test that the queue survives a restart"""
+
+    def test_claimed_but_undialed_targets_are_requeued(self, tmp_path):
+        path = str(tmp_path / "c.db")
+
+        async def run():
+            store = CampaignStore(path, worker="w1")
+            campaign_id = await store.create("PM reminders", "pm_reminder", targets(2))
+            await store.claim(max_live_calls=10)  # server stops before dialing
+            await store.close()
+
+            restarted = CampaignStore(path, worker="w1")
+            await restarted.requeue_interrupted(older_than=0, own=True)
+            progress = await restarted.progress(campaign_id)
+            await restarted.close()
+            return progress
+
+        progress = asyncio.run(run())
+
+        assert (progress["queued"], progress["dialing"], progress["attempts"]) == (2, 0, 0)
+
+    def test_sibling_claims_requeued_only_when_stale(self, tmp_path):
+        path = str(tmp_path / "c.db")
+
+        async def run():
+            sibling = CampaignStore(path, worker="w1")
+            campaign_id = await sibling.create("Collections", "collections", targets(2))
+            await sibling.claim(max_live_calls=10)  # w1 is about to dial
+
+            starting = CampaignStore(path, worker="w2")
+            fresh = await starting.requeue_interrupted(older_than=time.time() - 120)
+            stale = await starting.requeue_interrupted(older_than=time.time() + 1)
+            progress = await starting.progress(campaign_id)
+            for store in (sibling, starting):
+                await store.close()
+            return fresh, stale, progress
+
+        fresh, stale, progress = asyncio.run(run())
+
+        assert (fresh, stale) == (0, 1)
+        assert (progress["queued"], progress["dialing"]) == (2, 0)
+
+    def test_reaper_leaves_claims_in_flight_alone(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(campaigns, "REAP_INTERVAL_SECONDS", 0)
+        monkeypatch.setattr(campaigns, "POLL_SECONDS", 0.02)
+
+        class SlowDialer(FakeDialer):
+            async def dial(self, to_number, reason, customer_name=None):
+                await asyncio.sleep(0.3)
+                return await super().dial(to_number, reason, customer_name)
+
+        dialer = SlowDialer()
+
+        async def run():
+            store = CampaignStore(str(tmp_path / "c.db"))
+            # Every claim is past the timeout at once, so only in-flight tracking protects it
+            engine = CampaignEngine(store, dialer, calls_per_second=1000, workers=2, claim_timeout=-1)
+            await engine.create_campaign("PM reminders", "pm_reminder", targets(1))
+            await engine.start()
+            await wait_until(lambda: len(dialer.dialed) == 1)
+            await asyncio.sleep(0.5)
+            await engine.stop()
+            rows = store._execute("SELECT status, attempts, call_sid FROM campaign_targets")
+            await store.close()
+            return rows
+
+        rows = asyncio.run(run())
+
+        assert [number for _, number, _ in dialer.dialed] == ["+12055550000"]
+        assert rows == [("live", 1, "CA0000")]
+
+
+# ==============================================================================
+# TWILIO STAND-IN TESTS
+# ==============================================================================
+
+class FakeTwilioHandler(BaseHTTPRequestHandler):
+    """Answers the Calls.json create endpoint like Twilio does."""
+
+    requests = []
+
+    def do_POST(self):
+        body = parse_qs(self.rfile.read(int(self.headers["Content-Length"])).decode())
+        FakeTwilioHandler.requests.append((self.path, body))
+        payload = json.dumps({"sid": f"CA{len(FakeTwilioHandler.requests):032d}", "status": "queued",
+                              "to": body["To"][0], "from": body["From"][0]}).encode()
+        self.send_response(201)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestTwilioDialer:
+    """Test the Twilio dialer against a local stand-in"""
+
+    def test_dials_through_shared_client_off_the_loop(self):
+        httpd = HTTPServer(("127.0.0.1", 0), FakeTwilioHandler)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        dialer = TwilioDialer("AC" + "0" * 32, "token", "+12055550100",
+                              base_url=f"http://127.0.0.1:{httpd.server_port}")
+
+        async def run():
+            return await asyncio.gather(*(dialer.dial(f"+1205555000{i}", "pm_reminder", "Jane Doe") for i in range(3)))
+
+        try:
+            sids = asyncio.run(run())
+        finally:
+            httpd.shutdown()
+
+        assert len(set(sids)) == 3
+        path, body = FakeTwilioHandler.requests[0]
+        assert path.endswith("/Calls.json")
+        assert body["From"] == ["+12055550100"]
+        assert body["StatusCallback"][0].endswith("/voice/status")
+        assert body["StatusCallbackEvent"] == ["initiated", "ringing", "answered", "completed"]
+        assert body["Url"][0].endswith("/voice/outbound-twiml?reason=pm_reminder&customer_name=Jane+Doe")
+
+
+# ==============================================================================
+# ENDPOINT TESTS
+# ==============================================================================
+
+class TestCampaignEndpoints:
+    """Test queueing a campaign and driving it with status callbacks"""
+
+    def test_campaign_lifecycle(self, tmp_path, monkeypatch):
+        dialer = FakeDialer()
+        engine = CampaignEngine(CampaignStore(str(tmp_path / "c.db")), dialer,
+                                calls_per_second=1000, workers=2)
+        monkeypatch.setattr(server, "campaign_engine", engine)
+        monkeypatch.setattr(server, "call_analytics", CallAnalytics(str(tmp_path / "analytics.json")))
+        monkeypatch.setattr(server, "worker_drain", DrainController(server.active_sessions))
+
+        with TestClient(server.app) as client:
+            created = client.post("/campaigns", json={
+                "name": "Spring AC tune-ups", "reason": "pm_reminder", "targets": targets(2)
+            }).json()
+            deadline = time.monotonic() + 3
+            while len(dialer.dialed) < 2 and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+            for _, _, call_sid in dialer.dialed:
+                status = client.post("/voice/status", data={"CallSid": call_sid, "CallStatus": "completed"})
+                assert status.json()["campaign_call"] is True
+
+            progress = client.get(f"/campaigns/{created['campaign_id']}").json()
+
+        assert created["queued"] == 2
+        assert progress["completed"] == 2
+        assert progress["done"] is True
+
+    def test_unknown_campaign_404(self, tmp_path, monkeypatch):
+        engine = CampaignEngine(CampaignStore(str(tmp_path / "c.db")), FakeDialer())
+        monkeypatch.setattr(server, "campaign_engine", engine)
+
+        assert TestClient(server.app).get("/campaigns/999").status_code == 404
+
+    def test_answered_call_connects_with_campaign_context(self):
+        response = TestClient(server.app).post(
+            "/voice/outbound-twiml?reason=collections&customer_name=Jane+Doe", data={"CallSid": "CA-out"}
+        )
+
+        assert response.headers["content-type"].startswith("application/xml")
+        assert 'action="https://testserver/voice/handoff"' in response.text
+        assert "<ConversationRelay" in response.text
+        assert 'url="wss://testserver/ws/voice/CA-out?reason=collections&amp;customer_name=Jane+Doe"' in response.text
+
+    def test_outbound_session_opens_with_its_reason(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(server, "transcripts", TranscriptStore(str(tmp_path / "transcripts")))
+        monkeypatch.setattr(server, "call_analytics", CallAnalytics(str(tmp_path / "analytics.json")))
+        monkeypatch.setattr(server, "worker_drain", DrainController(server.active_sessions))
+        monkeypatch.setattr(server, "post_call", PostCallQueue(enabled=False))
+
+        with TestClient(server.app).websocket_connect("/ws/voice/CA-out?reason=pm_reminder&customer_name=Jane") as ws:
+            greeting = ws.receive_json()["content"]
+            context = server.active_sessions["CA-out"].caller_context
+            ws.send_json({"type": "hangup"})
+
+        assert "Am I speaking with Jane?" in greeting
+        assert "preventive maintenance" in context
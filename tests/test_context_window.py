@@ -0,0 +1,167 @@
+"""
+Unit tests for the bounded conversation window
+
+Tests cover:
+- Turn splitting around tool_use / tool_result pairs
+- Background folding into a running summary
+- Fallback summary when the summary model fails
+"""
+
+import asyncio
+import pytest
+from pathlib import Path
+
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from agents.context_window import ConversationWindow, split_turns, estimate_tokens
+
+
+# ==============================================================================
+# FIXTURES
+# ==============================================================================
+
+def user(text):
+    return {"role": "user", "content": text}
+
+
+def assistant(text):
+    return {"role": "assistant", "content": [{"type": "text", "text": text}]}
+
+
+def tool_turn(n):
+    """A caller turn whose answer needed one tool call."""
+    return [
+        user(f"question {n}"),
+        {"role": "assistant", "content": [
+            {"type": "tool_use", "id": f"toolu_{n}", "name": "check_service_area", "input": {"state": "AL"}}
+        ]},
+        {"role": "user", "content": [
+            {"type": "tool_result", "tool_use_id": f"toolu_{n}", "content": "{}"}
+        ]},
+        assistant(f"answer {n}"),
+    ]
+
+
+def fill(window, turns):
+    for n in range(turns):
+        for message in tool_turn(n):
+            window.append(message)
+
+
+# ==============================================================================
+# TURN SPLITTING TESTS
+# ==============================================================================
+
+class TestSplitTurns:
+    """Test turn grouping"""
+
+    def test_tool_results_stay_with_their_turn(self):
+        messages = tool_turn(1) + tool_turn(2)
+        turns = split_turns(messages)
+
+        assert len(turns) == 2
+        assert turns[0] == tool_turn(1)
+
+    def test_estimate_grows_with_history(self):
+        assert estimate_tokens(tool_turn(1) * 2) > estimate_tokens(tool_turn(1))
+
+
+# ==============================================================================
+# FOLDING TESTS
+# ==============================================================================
+
+class TestConversationWindow:
+    """Test background folding"""
+
+    def test_folds_turns_beyond_keep_limit(self):
+        seen = []
+
+        async def summarizer(previous, messages):
+            seen.append(messages)
+            return "Customer in Mobile asked about service."
+
+        async def run():
+            window = ConversationWindow(summarizer=summarizer, keep_turns=3, token_budget=100_000)
+            fill(window, 5)
+            window.maybe_fold()
+            await window.wait_for_fold()
+            return window
+
+        window = asyncio.run(run())
+
+        assert window.folded_turns == 2
+        assert len(split_turns(window.messages)) == 3
+        assert window.messages[0] == user("question 2")
+        assert seen[0] == tool_turn(0) + tool_turn(1)
+        assert "Mobile" in window.summary_context()
+
+    def test_token_budget_folds_even_under_turn_limit(self):
+        async def summarizer(previous, messages):
+            return "summary"
+
+        async def run():
+            window = ConversationWindow(summarizer=summarizer, keep_turns=50, token_budget=150)
+            fill(window, 4)
+            window.maybe_fold()
+            await window.wait_for_fold()
+            return window
+
+        window = asyncio.run(run())
+
+        assert estimate_tokens(window.messages) <= 150 or len(split_turns(window.messages)) == 1
+        assert window.folded_turns >= 1
+
+    def test_history_stays_verbatim_until_summary_ready(self):
+        release = None
+
+        async def summarizer(previous, messages):
+            await release.wait()
+            return "summary"
+
+        async def run():
+            nonlocal release
+            release = asyncio.Event()
+            window = ConversationWindow(summarizer=summarizer, keep_turns=1)
+            fill(window, 3)
+            window.maybe_fold()
+            await asyncio.sleep(0)
+            before = len(window.messages)
+            # New turn arrives while the fold is still running
+            window.append(user("question 3"))
+            release.set()
+            await window.wait_for_fold()
+            return before, window
+
+        before, window = asyncio.run(run())
+
+        assert before == 12
+        assert window.messages == tool_turn(2) + [user("question 3")]
+
+    def test_fallback_summary_when_model_fails(self):
+        async def summarizer(previous, messages):
+            raise RuntimeError("overloaded")
+
+        async def run():
+            window = ConversationWindow(summarizer=summarizer, keep_turns=1)
+            fill(window, 2)
+            window.maybe_fold()
+            await window.wait_for_fold()
+            return window
+
+        window = asyncio.run(run())
+
+        assert "question 0" in window.summary
+        assert window.messages[0] == user("question 1")
+
+    def test_trim_folds_immediately_without_the_model(self):
+        async def summarizer(previous, messages):
+            raise AssertionError("trim must not wait on the summary model")
+
+        window = ConversationWindow(summarizer=summarizer, keep_turns=10)
+        fill(window, 3)
+
+        assert window.trim() == 2
+        assert window.messages == tool_turn(2)
+        assert "question 1" in window.summary
+        assert window.folded_turns == 2
@@ -0,0 +1,334 @@
+"""
+Unit tests for the CRM write-behind queue
+
+Tests cover:
+- Records are journaled off the caller's thread and flushed in batches
+- Failed journal writes are never reported as durable
+- Per-entity ordering, including across retries
+- Spilling past the in-memory bound
+- Replay of unacknowledged records after a crash
+- Per-worker journals, and adopting those of exited workers
+- Dead-lettering after repeated failures
+- Tools that log through the queue
+"""
+
+import os
+import time
+import asyncio
+import subprocess
+from pathlib import Path
+
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "voice_ai"))
+
+import pytest
+
+from agents import crm_writer
+from agents.crm_writer import CRMWriter, CRMSink, CRMRecord, CRMJournalError, coalesce, worker_journal_path
+
+
+# ==============================================================================
+# FIXTURES
+# ==============================================================================
+
+class FakeSink(CRMSink):
+    """Collects batches; fails the first `failures` writes."""
+
+    def __init__(self, failures=0, delay=0.0):
+        self.batches = []
+        self.failures = failures
+        self.delay = delay
+
+    async def write_batch(self, records):
+        await asyncio.sleep(self.delay)
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("503 from Coperniq")
+        self.batches.append([(r.entity, r.payload.get("n")) for r in records])
+
+    @property
+    def delivered(self):
+        return [item for batch in self.batches for item in batch]
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return str(tmp_path / "crm.jsonl")
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(crm_writer, "RETRY_BASE_SECONDS", 0.01)
+
+
+# ==============================================================================
+# QUEUE TESTS
+# ==============================================================================
+
+class TestWriteBehind:
+    """Test journaling, batching and ordering"""
+
+    def test_submit_is_durable_before_flush(self, journal):
+        writer = CRMWriter(FakeSink(), journal_path=journal)
+
+        seq = writer.submit("call_disposition", "call:CA1", {"n": 1})
+
+        assert writer.sync(timeout=2)
+        lines = Path(journal).read_text().splitlines()
+        assert seq == 1
+        assert CRMRecord.decode(lines[0]).entity == "call:CA1"
+        assert writer.pending == 1
+
+    def test_submit_does_not_wait_for_fsync(self, journal, monkeypatch):
+        fsync = os.fsync
+        monkeypatch.setattr(crm_writer.os, "fsync", lambda fd: (time.sleep(0.3), fsync(fd)))
+        writer = CRMWriter(FakeSink(), journal_path=journal)
+
+        started = time.perf_counter()
+        seqs = [writer.submit("call_disposition", f"call:CA{n}", {"n": n}) for n in range(5)]
+        elapsed = time.perf_counter() - started
+
+        assert elapsed < 0.1
+        assert seqs == [1, 2, 3, 4, 5]
+        assert writer.sync(timeout=2)
+        assert len(Path(journal).read_text().splitlines()) == 5
+        assert writer.stats()["unjournaled"] == 0
+
+    def test_failed_journal_write_is_not_durable(self, journal, monkeypatch):
+        fsync = os.fsync
+        broken = [True]
+
+        def flaky_fsync(fd):
+            if broken[0]:
+                raise OSError(28, "No space left on device")
+            fsync(fd)
+
+        monkeypatch.setattr(crm_writer.os, "fsync", flaky_fsync)
+        writer = CRMWriter(FakeSink(), journal_path=journal)
+
+        seq = writer.submit("call_disposition", "call:CA1", {"n": 1})
+
+        with pytest.raises(CRMJournalError):
+            writer.sync(seq, timeout=2)
+        assert writer.durable_seq == 0
+        assert writer.stats()["journal_error"].startswith("OSError")
+        assert Path(journal).read_text() == ""
+
+        broken[0] = False  # disk freed; the journal thread retries after its backoff
+        deadline = time.monotonic() + 5
+        while writer.stats()["journal_error"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert writer.sync(seq, timeout=2)
+        assert [CRMRecord.decode(line).seq for line in Path(journal).read_text().splitlines()] == [1]
+
+    def test_burst_is_coalesced_into_batches(self, journal):
+        sink = FakeSink()
+
+        async def run():
+            writer = CRMWriter(sink, journal_path=journal, batch_size=10, flush_interval=0.05)
+            for n in range(25):
+                writer.submit("dispatch_notification", f"work_order:WO-{n % 3}", {"n": n})
+            await writer.aclose()
+            return writer
+
+        writer = asyncio.run(run())
+
+        assert [len(batch) for batch in sink.batches] == [10, 10, 5]
+        assert writer.pending == 0
+        # Fully acknowledged journal is compacted
+        assert Path(journal).read_text() == ""
+
+    def test_entity_order_survives_retries(self, journal):
+        sink = FakeSink(failures=2)
+
+        async def run():
+            writer = CRMWriter(sink, journal_path=journal, batch_size=2, flush_interval=0)
+            for n in range(6):
+                writer.submit("collection_activity", "invoice:INV-1", {"n": n})
+            await writer.flush(timeout=5)
+            stats = writer.stats()
+            await writer.aclose()
+            return stats
+
+        stats = asyncio.run(run())
+
+        assert [n for _, n in sink.delivered] == list(range(6))
+        assert stats["retries"] == 2
+
+    def test_spills_past_memory_bound(self, journal):
+        sink = FakeSink()
+
+        async def run():
+            writer = CRMWriter(sink, journal_path=journal, max_queue=3, batch_size=2, flush_interval=0)
+            for n in range(10):
+                writer.submit("call_disposition", "call:CA1", {"n": n})
+            in_memory = writer.stats()["in_memory"]
+            await writer.aclose()
+            return in_memory
+
+        assert asyncio.run(run()) == 3
+        assert [n for _, n in sink.delivered] == list(range(10))
+
+    def test_submit_from_worker_thread(self, journal):
+        sink = FakeSink()
+
+        async def run():
+            writer = CRMWriter(sink, journal_path=journal, flush_interval=0)
+            await writer.start()
+            await asyncio.to_thread(writer.submit, "dispatch_notification", "work_order:WO-1", {"n": 1})
+            await writer.flush(timeout=2)
+            await writer.aclose()
+
+        asyncio.run(run())
+
+        assert sink.delivered == [("work_order:WO-1", 1)]
+
+    def test_coalesce_groups_by_entity(self):
+        records = [CRMRecord(i, "k", entity, {"n": i}) for i, entity in enumerate(["a", "b", "a"])]
+
+        grouped = coalesce(records)
+
+        assert [g["entity"] for g in grouped] == ["a", "b"]
+        assert [a["seq"] for a in grouped[0]["activities"]] == [0, 2]
+
+
+# ==============================================================================
+# RECOVERY TESTS
+# ==============================================================================
+
+class TestRecovery:
+    """Test crash replay and dead-lettering"""
+
+    def test_unacked_records_replay_once(self, journal):
+        crashed = CRMWriter(FakeSink(), journal_path=journal)
+        for n in range(3):
+            crashed.submit("call_disposition", f"call:CA{n}", {"n": n})
+        crashed.sync()
+        # Process dies here: nothing was flushed
+
+        sink = FakeSink()
+
+        async def run():
+            restarted = CRMWriter(sink, journal_path=journal, flush_interval=0)
+            restarted.submit("call_disposition", "call:CA9", {"n": 9})
+            await restarted.aclose()
+
+        asyncio.run(run())
+        assert [n for _, n in sink.delivered] == [0, 1, 2, 9]
+
+        again = FakeSink()
+        asyncio.run(CRMWriter(again, journal_path=journal).aclose())
+        assert again.delivered == []
+
+    def test_workers_journal_separately(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(crm_writer, "CRM_JOURNAL_PATH", str(tmp_path / "crm_journal.jsonl"))
+        exited = subprocess.Popen([sys.executable, "-c", "pass"])
+        exited.wait()
+
+        gone = CRMWriter(FakeSink(), journal_path=worker_journal_path(crm_writer.CRM_JOURNAL_PATH, exited.pid))
+        for n in range(3):
+            gone.submit("call_disposition", "call:CA1", {"n": n})
+        gone.sync()
+        gone._write_ack(1)  # the CRM had taken the first record
+        sibling_path = worker_journal_path(crm_writer.CRM_JOURNAL_PATH, os.getppid())
+        sibling = CRMWriter(FakeSink(), journal_path=sibling_path)
+        sibling.submit("call_disposition", "call:CA2", {"n": 9})
+        sibling.sync()
+
+        sink = FakeSink()
+
+        async def run():
+            writer = CRMWriter(sink, flush_interval=0)
+            await writer.aclose()
+            return writer
+
+        writer = asyncio.run(run())
+
+        assert writer.journal_path == str(tmp_path / f"crm_journal.{os.getpid()}.jsonl")
+        assert Path(f"{writer.journal_path}.ack").exists()
+        assert [n for _, n in sink.delivered] == [1, 2]
+        assert not Path(gone.journal_path).exists()
+        # A running sibling's journal is its own business
+        assert len(Path(sibling_path).read_text().splitlines()) == 1
+
+    def test_dead_letters_after_max_retries(self, journal):
+        sink = FakeSink(failures=3)
+
+        async def run():
+            writer = CRMWriter(sink, journal_path=journal, flush_interval=0, max_retries=3)
+            writer.submit("collection_activity", "invoice:INV-1", {"n": 1})
+            writer.submit("collection_activity", "invoice:INV-1", {"n": 2})
+            await writer.aclose()
+            return writer.stats()
+
+        stats = asyncio.run(run())
+
+        assert stats["dead_lettered"] == 2
+        assert len(Path(f"{journal}.dead").read_text().splitlines()) == 2
+
+
+# ==============================================================================
+# TOOL TESTS
+# ==============================================================================
+
+class TestTools:
+    """Test tools that log through the queue"""
+
+    def test_call_disposition_returns_before_crm_write(self, journal, monkeypatch):
+        import server
+
+        sink = FakeSink(delay=0.5)
+        monkeypatch.setattr(crm_writer, "_writer", CRMWriter(sink, journal_path=journal, flush_interval=0))
+
+        async def run():
+            result = await server.execute_tool("log_call_disposition", {
+                "disposition": "appointment_scheduled", "call_sid": "CA123"
+            })
+            written_before_return = len(sink.batches)
+            journaled_before_return = Path(journal).read_text().splitlines()
+            await crm_writer.close_crm_writer()
+            return result, written_before_return, journaled_before_return
+
+        result, written_before_return, journaled_before_return = asyncio.run(run())
+
+        assert result["logged"] is True
+        assert written_before_return == 0
+        # ...but not before the record would survive a crash
+        assert [CRMRecord.decode(line).entity for line in journaled_before_return] == ["call:CA123"]
+        assert sink.delivered == [("call:CA123", None)]
+
+    def test_dispatch_and_collections_log_events(self, journal, monkeypatch):
+        from agents.dispatch_agent import send_dispatch_notification
+        from agents.collections_agent import log_collection_activity
+
+        writer = CRMWriter(FakeSink(), journal_path=journal)
+        monkeypatch.setattr(crm_writer, "_writer", writer)
+
+        async def run():
+            await send_dispatch_notification("tech-001", "WO-1", "urgent")
+            return Path(journal).read_text().splitlines(), \
+                await log_collection_activity("INV-1", "promise_to_pay", next_action_date="2026-11-01")
+
+        after_dispatch, result = asyncio.run(run())
+
+        assert len(after_dispatch) == 1
+        assert result["logged"] is True
+        entities = [CRMRecord.decode(line).entity for line in Path(journal).read_text().splitlines()]
+        assert entities == ["work_order:WO-1", "invoice:INV-1"]
+
+    def test_tool_reports_unsaved_disposition(self, journal, monkeypatch):
+        import server
+
+        def failing_fsync(fd):
+            raise OSError(5, "Input/output error")
+
+        monkeypatch.setattr(crm_writer.os, "fsync", failing_fsync)
+        monkeypatch.setattr(crm_writer, "_writer", CRMWriter(FakeSink(), journal_path=journal, flush_interval=0))
+
+        result = asyncio.run(server.execute_tool("log_call_disposition", {
+            "disposition": "appointment_scheduled", "call_sid": "CA123"
+        }))
+
+        assert result["success"] is False and result["logged"] is False
+        assert "Input/output error" in result["error"]
@@ -0,0 +1,292 @@
+"""
+Unit tests for the record/replay LLM transport
+
+Tests cover:
+- Request hashing (transport args, timestamps, SDK blocks vs dicts)
+- Recording create() and stream() responses, then replaying them
+- Injected replay latency, missing fixtures and unknown modes
+- Voice sessions, the chat UI and agents running on replayed responses
+"""
+
+import time
+import asyncio
+from pathlib import Path
+
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "voice_ai"))
+
+import pytest
+from anthropic.types import Message, TextBlock, ToolUseBlock, Usage
+
+from agents import crm_writer
+from agents.crm_writer import CRMWriter, LogSink
+from agents.llm_client import LLMClientPool
+from agents.llm_transport import (
+    FixtureStore, FixtureMissingError, RecordingTransport, ReplayTransport,
+    build_transport, request_key
+)
+
+
+# ==============================================================================
+# FIXTURES
+# ==============================================================================
+
+def make_message(*blocks) -> Message:
+    content = [TextBlock(type="text", text=b) if isinstance(b, str) else b for b in blocks]
+    return Message(
+        id="msg_live", type="message", role="assistant", model="claude-sonnet-4-20250514",
+        content=content, stop_reason="tool_use" if any(b.type == "tool_use" for b in content) else "end_turn",
+        stop_sequence=None, usage=Usage(input_tokens=100, output_tokens=20)
+    )
+
+
+class LiveStream:
+    def __init__(self, message):
+        self.message = message
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    @property
+    def text_stream(self):
+        async def words():
+            for block in self.message.content:
+                if block.type == "text":
+                    yield block.text
+        return words()
+
+    async def get_final_message(self):
+        return self.message
+
+
+class LiveMessages:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        return self.responses.pop(0)
+
+    def stream(self, **kwargs):
+        self.calls += 1
+        return LiveStream(self.responses.pop(0))
+
+
+class LiveClient:
+    """Stands in for AsyncAnthropic while recording."""
+
+    def __init__(self, responses):
+        self.messages = LiveMessages(responses)
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def fixtures(tmp_path):
+    return FixtureStore(str(tmp_path / "llm"))
+
+
+@pytest.fixture(autouse=True)
+def crm_journal(tmp_path, monkeypatch):
+    monkeypatch.setattr(crm_writer, "_writer", CRMWriter(LogSink(), journal_path=str(tmp_path / "crm.jsonl")))
+
+
+REQUEST = {
+    "model": "claude-sonnet-4-20250514",
+    "max_tokens": 256,
+    "messages": [{"role": "user", "content": "Do you service Mobile?"}]
+}
+
+
+# ==============================================================================
+# HASHING TESTS
+# ==============================================================================
+
+class TestRequestKey:
+    """Test what does and doesn't change a request hash"""
+
+    def test_ignores_transport_args(self):
+        assert request_key(REQUEST) == request_key({**REQUEST, "timeout": 5, "extra_headers": {"x": "1"}})
+
+    def test_content_changes_key(self):
+        other = {**REQUEST, "messages": [{"role": "user", "content": "Do you service Atlanta?"}]}
+        assert request_key(REQUEST) != request_key(other)
+
+    def test_timestamps_are_normalized(self):
+        def with_result(ts):
+            return {**REQUEST, "messages": [{"role": "user", "content": f'{{"logged": true, "timestamp": "{ts}"}}'}]}
+
+        assert request_key(with_result("2026-01-05T09:12:44.120331")) == request_key(with_result("2026-10-17T16:01:02.5"))
+
+    def test_confirmation_numbers_are_normalized(self):
+        def with_result(number):
+            return {**REQUEST, "messages": [{"role": "user", "content": f"Your confirmation number is {number}."}]}
+
+        assert request_key(with_result("WO-20260105091244")) == request_key(with_result("WO-20261017160102"))
+        # Other long digit runs still count
+        assert request_key(with_result("WO-12345678901234")) != request_key(with_result("WO-12345678901235"))
+
+    def test_sdk_blocks_hash_like_dicts(self):
+        block = ToolUseBlock(type="tool_use", id="toolu_1", name="check_service_area", input={"state": "AL"})
+        as_dict = {"type": "tool_use", "id": "toolu_1", "name": "check_service_area", "input": {"state": "AL"}}
+
+        assert request_key({**REQUEST, "messages": [{"role": "assistant", "content": [block]}]}) == \
+            request_key({**REQUEST, "messages": [{"role": "assistant", "content": [as_dict]}]})
+
+
+# ==============================================================================
+# RECORD / REPLAY TESTS
+# ==============================================================================
+
+class TestRecordReplay:
+    """Test recording responses and serving them back"""
+
+    def test_create_round_trip(self, fixtures):
+        recorder = RecordingTransport(LiveClient([make_message("Yes, we cover Mobile.")]), fixtures)
+        recorded = asyncio.run(recorder.messages.create(**REQUEST))
+
+        replayed = asyncio.run(ReplayTransport(fixtures).messages.create(**REQUEST))
+
+        assert replayed == recorded
+        assert len(list(fixtures.directory.glob("*.json"))) == 1
+
+    def test_stream_round_trip(self, fixtures):
+        message = make_message("Yes, we cover Mobile and Baldwin County.")
+
+        async def consume(client):
+            async with client.messages.stream(**REQUEST) as stream:
+                text = "".join([t async for t in stream.text_stream])
+                return text, await stream.get_final_message()
+
+        asyncio.run(consume(RecordingTransport(LiveClient([message]), fixtures)))
+        text, final = asyncio.run(consume(ReplayTransport(fixtures)))
+
+        assert text == "Yes, we cover Mobile and Baldwin County."
+        assert final == message
+
+    def test_injected_latency(self, fixtures):
+        asyncio.run(RecordingTransport(LiveClient([make_message("Yes.")]), fixtures).messages.create(**REQUEST))
+        replay = ReplayTransport(fixtures, latency=0.05)
+
+        started = time.perf_counter()
+        asyncio.run(replay.messages.create(**REQUEST))
+
+        assert time.perf_counter() - started >= 0.05
+        assert replay.served == 1
+
+    def test_missing_fixture_names_the_hash(self, fixtures):
+        with pytest.raises(FixtureMissingError, match=request_key(REQUEST)):
+            asyncio.run(ReplayTransport(fixtures).messages.create(**REQUEST))
+
+    def test_replay_never_builds_a_live_client(self):
+        def live_factory():
+            raise AssertionError("live client built in replay mode")
+
+        assert isinstance(build_transport(live_factory, mode="replay"), ReplayTransport)
+        assert build_transport(lambda: "live", mode="live") == "live"
+
+    def test_unknown_mode_is_an_error(self):
+        def live_factory():
+            raise AssertionError("live client built for a misspelled mode")
+
+        with pytest.raises(ValueError, match="replya"):
+            build_transport(live_factory, mode="replya")
+
+
+# ==============================================================================
+# CALLER TESTS
+# ==============================================================================
+
+def record_then_replay(fixtures, responses, run):
+    """Run a caller against a recording live client, then again on replay."""
+    recorded = asyncio.run(run(LLMClientPool(client=RecordingTransport(LiveClient(responses), fixtures))))
+    replayed = asyncio.run(run(LLMClientPool(client=ReplayTransport(fixtures))))
+    return recorded, replayed
+
+
+class TestCallers:
+    """Test Claude callers running on replayed responses"""
+
+    def test_voice_session_with_tool_round_trip(self, fixtures):
+        from server import VoiceAISession
+
+        async def run(pool):
+            session = VoiceAISession("CA-replay")
+            session.llm = pool
+            return await session.process_message("Book me in and log it")
+
+        # log_call_disposition puts a fresh timestamp in the follow-up request
+        recorded, replayed = record_then_replay(fixtures, [
+            make_message(ToolUseBlock(type="tool_use", id="toolu_1", name="log_call_disposition",
+                                      input={"disposition": "appointment_scheduled"})),
+            make_message("All set, you're logged for tomorrow."),
+        ], run)
+
+        assert recorded == replayed == "All set, you're logged for tomorrow."
+
+    def test_booking_replays_at_another_time(self, fixtures, monkeypatch):
+        import server
+        from datetime import datetime
+
+        class Clock(datetime):
+            current = datetime(2026, 10, 17, 9, 30, 15)
+
+            @classmethod
+            def now(cls, tz=None):
+                return cls.current
+
+        monkeypatch.setattr(server, "datetime", Clock)
+
+        async def run(pool):
+            session = server.VoiceAISession("CA-booking")
+            session.llm = pool
+            return await session.process_message("My AC is out, can someone come tomorrow?")
+
+        responses = [
+            make_message(ToolUseBlock(type="tool_use", id="toolu_1", name="schedule_service_call", input={
+                "customer_name": "Jane Doe", "service_address": "12 Oak St, Mobile AL", "trade": "HVAC"
+            })),
+            make_message("You're booked; a technician will call to confirm."),
+        ]
+        recorded = asyncio.run(run(LLMClientPool(client=RecordingTransport(LiveClient(responses), fixtures))))
+        # The confirmation number in the tool result is minted from the clock
+        Clock.current = datetime(2026, 10, 18, 14, 2, 59)
+        replayed = asyncio.run(run(LLMClientPool(client=ReplayTransport(fixtures))))
+
+        assert recorded == replayed == "You're booked; a technician will call to confirm."
+
+    def test_chat_manager(self, fixtures, monkeypatch):
+        from chat_ui import main as chat_ui
+
+        async def no_context(message):
+            return ""
+
+        async def run(pool):
+            manager = chat_ui.ChatManager()
+            manager.llm = pool
+            monkeypatch.setattr(manager, "_get_context_for_query", no_context)
+            return await manager.chat("conv-1", "What are your office hours?")
+
+        recorded, replayed = record_then_replay(fixtures, [make_message("Mon-Fri 7am-6pm.")], run)
+
+        assert recorded == replayed == "Mon-Fri 7am-6pm."
+
+    def test_collections_agent(self, fixtures):
+        from agents.collections_agent import CollectionsAgent
+
+        invoice = {"id": "INV-1", "customer_name": "ABC Manufacturing", "amount_due": 4500.0, "days_past_due": 35}
+
+        async def run(pool):
+            agent = CollectionsAgent()
+            agent.llm = pool
+            return await agent.analyze_account(invoice)
+
+        recorded, replayed = record_then_replay(fixtures, [make_message("Send a 30-day reminder.")], run)
+
+        assert recorded["recommendation"] == replayed["recommendation"] == "Send a 30-day reminder."
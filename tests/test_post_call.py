@@ -0,0 +1,295 @@
+"""
+Unit tests for post-call summaries
+
+Tests cover:
+- Structured summaries from a forced tool call, written to the CRM queue
+- Retries, then a transcript-only write-up when the model keeps failing
+- Skipping empty calls and dropping past the queue bound
+- Bounded concurrency
+- Hangup handing the call off without waiting for its summary
+- The disposition Claude logs during the call reaching the write-up
+"""
+
+import time
+import asyncio
+from pathlib import Path
+
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "voice_ai"))
+
+import pytest
+from anthropic.types import Message, TextBlock, ToolUseBlock, Usage
+from fastapi.testclient import TestClient
+
+import server
+import post_call as post_call_module
+from agents import crm_writer
+from agents.crm_writer import CRMWriter, CRMSink
+from agents.llm_client import LLMClientPool
+from call_analytics import CallAnalytics
+from drain import DrainController
+from post_call import PostCallQueue, SUMMARY_TOOL
+from session_store import SessionState
+from transcript_store import TranscriptStore
+
+
+# ==============================================================================
+# FIXTURES
+# ==============================================================================
+
+SUMMARY = {
+    "customer_name": "Jane Doe",
+    "service_address": "44 Peachtree Street, Atlanta, GA",
+    "trade": "HVAC",
+    "issue": "AC blowing warm air",
+    "outcome": "appointment_scheduled",
+    "appointment": "Friday afternoon",
+    "follow_up_required": False,
+    "summary": "Jane's AC is blowing warm air; booked a technician for Friday afternoon.",
+}
+
+
+def summary_message(summary=SUMMARY) -> Message:
+    return Message(
+        id="msg_summary", type="message", role="assistant", model="claude-test",
+        content=[ToolUseBlock(type="tool_use", id="toolu_1", name=SUMMARY_TOOL["name"], input=summary)],
+        stop_reason="tool_use", stop_sequence=None,
+        usage=Usage(input_tokens=400, output_tokens=80)
+    )
+
+
+class FakeMessages:
+    """Returns a summary after `delay`; raises for the first `failures` calls."""
+
+    def __init__(self, failures=0, delay=0.0):
+        self.failures = failures
+        self.delay = delay
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def create(self, **kwargs):
+        self.requests.append(kwargs)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.failures:
+                self.failures -= 1
+                raise RuntimeError("529 overloaded")
+            return summary_message()
+        finally:
+            self.in_flight -= 1
+
+
+class FakeClient:
+    def __init__(self, **kwargs):
+        self.messages = FakeMessages(**kwargs)
+
+
+class ReplyClient:
+    """Answers every voice turn at once."""
+
+    def __init__(self):
+        self.messages = self
+
+    async def create(self, **kwargs):
+        return Message(
+            id="msg_reply", type="message", role="assistant", model="claude-test",
+            content=[TextBlock(type="text", text="Sure, we can help.")],
+            stop_reason="end_turn", stop_sequence=None,
+            usage=Usage(input_tokens=100, output_tokens=10)
+        )
+
+
+class DispositionClient:
+    """Logs a disposition on the first voice turn, then answers."""
+
+    def __init__(self):
+        self.messages = self
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        if self.calls == 1:
+            content = [ToolUseBlock(type="tool_use", id="toolu_d", name="log_call_disposition",
+                                    input={"disposition": "information_provided"})]
+            stop_reason = "tool_use"
+        else:
+            content = [TextBlock(type="text", text="Glad I could help. Goodbye!")]
+            stop_reason = "end_turn"
+        return Message(
+            id=f"msg_{self.calls}", type="message", role="assistant", model="claude-test",
+            content=content, stop_reason=stop_reason, stop_sequence=None,
+            usage=Usage(input_tokens=100, output_tokens=10)
+        )
+
+
+class RecordingSink(CRMSink):
+    def __init__(self):
+        self.records = []
+
+    async def write_batch(self, records):
+        self.records.extend(records)
+
+
+@pytest.fixture
+def sink(tmp_path, monkeypatch):
+    sink = RecordingSink()
+    monkeypatch.setattr(crm_writer, "_writer", CRMWriter(sink, journal_path=str(tmp_path / "crm.jsonl")))
+    return sink
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(post_call_module, "RETRY_BASE_SECONDS", 0.01)
+
+
+def ended_call(call_sid="CA-done") -> SessionState:
+    return SessionState(
+        call_sid=call_sid,
+        messages=[
+            {"role": "user", "content": "My AC is blowing warm air"},
+            {"role": "assistant", "content": [{"type": "text", "text": "I can book a technician."}]},
+        ],
+        trade="HVAC",
+        call_disposition="appointment_scheduled",
+        started_at="2026-01-15T10:00:00",
+        turns=1
+    )
+
+
+def queue(client, **kwargs) -> PostCallQueue:
+    return PostCallQueue(llm=LLMClientPool(client=client), enabled=True, **kwargs)
+
+
+async def written(queue, sink):
+    await queue.flush(timeout=5)
+    await crm_writer.get_crm_writer().flush(timeout=5)
+    return [r for r in sink.records if r.kind == "call_summary"]
+
+
+# ==============================================================================
+# QUEUE TESTS
+# ==============================================================================
+
+class TestPostCallQueue:
+    """Test turning ended calls into CRM write-ups"""
+
+    def test_summary_written_to_crm(self, sink):
+        client = FakeClient()
+        summaries = queue(client)
+
+        async def run():
+            assert summaries.submit(ended_call())
+            return await written(summaries, sink)
+
+        records = asyncio.run(run())
+
+        assert len(records) == 1
+        assert records[0].entity == "call:CA-done"
+        assert records[0].payload["issue"] == "AC blowing warm air"
+        assert records[0].payload["source"] == "model"
+        assert records[0].payload["disposition"] == "appointment_scheduled"
+
+        request = client.messages.requests[0]
+        assert request["tool_choice"] == {"type": "tool", "name": "record_call_summary"}
+        assert "My AC is blowing warm air" in request["messages"][0]["content"]
+
+    def test_retries_then_falls_back_to_transcript(self, sink):
+        summaries = queue(FakeClient(failures=10), max_retries=3)
+
+        async def run():
+            summaries.submit(ended_call())
+            return await written(summaries, sink)
+
+        records = asyncio.run(run())
+
+        assert records[0].payload["source"] == "fallback"
+        assert "warm air" in records[0].payload["summary"]
+        assert summaries.stats()["retries"] == 2
+        assert summaries.stats()["fallbacks"] == 1
+
+    def test_transient_failure_retried(self, sink):
+        summaries = queue(FakeClient(failures=1))
+
+        async def run():
+            summaries.submit(ended_call())
+            return await written(summaries, sink)
+
+        assert asyncio.run(run())[0].payload["source"] == "model"
+
+    def test_empty_calls_skipped_and_queue_bounded(self):
+        summaries = queue(FakeClient(), max_queue=1)
+
+        assert not summaries.submit(SessionState(call_sid="CA-silent"))
+        assert summaries.submit(ended_call("CA-1"))
+        assert not summaries.submit(ended_call("CA-2"))
+        assert summaries.stats()["dropped"] == 1
+
+    def test_concurrency_is_bounded(self, sink):
+        client = FakeClient(delay=0.05)
+        summaries = queue(client, concurrency=2)
+
+        async def run():
+            for n in range(6):
+                summaries.submit(ended_call(f"CA-{n}"))
+            return await written(summaries, sink)
+
+        assert len(asyncio.run(run())) == 6
+        assert client.messages.max_in_flight == 2
+
+
+# ==============================================================================
+# HANGUP TESTS
+# ==============================================================================
+
+class TestHangup:
+    """Test that hangup hands the call off without waiting"""
+
+    def test_hangup_does_not_wait_for_summary(self, sink, tmp_path, monkeypatch):
+        summaries = queue(FakeClient(delay=2.0))
+        monkeypatch.setattr(server, "post_call", summaries)
+        monkeypatch.setattr(server, "transcripts", TranscriptStore(str(tmp_path / "transcripts")))
+        monkeypatch.setattr(server, "call_analytics", CallAnalytics(str(tmp_path / "analytics.json")))
+        monkeypatch.setattr(server, "worker_drain", DrainController(server.active_sessions, poll_interval=0.01))
+        llm = LLMClientPool(client=ReplyClient())
+        monkeypatch.setattr(server, "get_llm_pool", lambda: llm)
+        monkeypatch.setattr(server, "VOICE_STREAMING", False)
+
+        started = time.perf_counter()
+        with TestClient(server.app).websocket_connect("/ws/voice/CA-hangup") as ws:
+            ws.receive_json()  # greeting
+            ws.send_json({"type": "transcript", "content": "My furnace is making a rattling noise"})
+            ws.receive_json()
+            ws.send_json({"type": "hangup"})
+        elapsed = time.perf_counter() - started
+
+        assert elapsed < 1.5
+        assert summaries.stats()["submitted"] == 1
+        assert "CA-hangup" not in server.active_sessions
+
+    def test_logged_disposition_reaches_summary(self, sink, tmp_path, monkeypatch):
+        summaries = queue(FakeClient())
+        transcripts = TranscriptStore(str(tmp_path / "transcripts"))
+        monkeypatch.setattr(server, "post_call", summaries)
+        monkeypatch.setattr(server, "transcripts", transcripts)
+        monkeypatch.setattr(server, "call_analytics", CallAnalytics(str(tmp_path / "analytics.json")))
+        monkeypatch.setattr(server, "worker_drain", DrainController(server.active_sessions, poll_interval=0.01))
+        llm = LLMClientPool(client=DispositionClient())
+        monkeypatch.setattr(server, "get_llm_pool", lambda: llm)
+        monkeypatch.setattr(server, "VOICE_STREAMING", False)
+
+        with TestClient(server.app).websocket_connect("/ws/voice/CA-logged") as ws:
+            ws.receive_json()  # greeting
+            ws.send_json({"type": "transcript", "content": "That answers it, thanks. Bye"})
+            ws.receive_json()
+            ws.send_json({"type": "hangup"})
+
+        records = asyncio.run(written(summaries, sink))
+        asyncio.run(transcripts.flush())
+        call_end = [e for e in transcripts.load("CA-logged") if e["type"] == "call_end"]
+
+        assert records[0].payload["disposition"] == "information_provided"
+        assert call_end[0]["disposition"] == "information_provided"
@@ -0,0 +1,100 @@
+"""
+Unit tests for per-turn tool selection
+
+Tests cover:
+- Intent patterns picking tools from the latest user text
+- Sticky offers and tools already used in the history
+- Previewing a selection without committing it
+- Declared tool order, so cached prefixes repeat
+- Falling back to every tool when the subset is too small to cache
+"""
+
+import pytest
+from pathlib import Path
+
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from agents.tool_selection import ToolSelector, latest_user_text, used_tools
+
+
+# ==============================================================================
+# FIXTURES
+# ==============================================================================
+
+TOOLS = [{"name": name, "description": name, "input_schema": {"type": "object"}}
+         for name in ("book", "price", "escalate", "log")]
+
+INTENTS = {
+    "book": r"\b(?:book|appointment)\b",
+    "price": r"\b(?:how much|price)\b",
+    "log": r"\b(?:bye|thanks)\b",
+}
+
+
+@pytest.fixture
+def selector():
+    return ToolSelector(TOOLS, INTENTS, always=["escalate"])
+
+
+def names(tools):
+    return [tool["name"] for tool in tools]
+
+
+def user(text):
+    return {"role": "user", "content": text}
+
+
+# ==============================================================================
+# SELECTION TESTS
+# ==============================================================================
+
+class TestToolSelector:
+    """Test choosing the tools sent with a request"""
+
+    def test_always_on_tools_only_without_intent(self, selector):
+        assert names(selector.select([user("Hello?")])) == ["escalate"]
+
+    def test_intent_adds_tools_in_declared_order(self, selector):
+        tools = selector.select([user("How much to book an appointment?")])
+
+        assert names(tools) == ["book", "price", "escalate"]
+
+    def test_offers_are_sticky(self, selector):
+        messages = [user("What's the price?")]
+        selector.select(messages)
+        messages += [{"role": "assistant", "content": [{"type": "text", "text": "Fifty dollars."}]},
+                     user("Okay, let's do it")]
+
+        assert names(selector.select(messages)) == ["price", "escalate"]
+
+    def test_uncommitted_selection_is_not_sticky(self, selector):
+        preview = selector.select([user("How much to book")], commit=False)
+
+        assert names(preview) == ["book", "price", "escalate"]
+        assert selector.offered == {"escalate"}
+        assert names(selector.select([user("Hello?")])) == ["escalate"]
+
+    def test_tools_in_history_stay_offered(self, selector):
+        messages = [
+            user("Hi"),
+            {"role": "assistant", "content": [{"type": "tool_use", "id": "t1", "name": "book", "input": {}}]},
+            {"role": "user", "content": [{"type": "tool_result", "tool_use_id": "t1", "content": "{}"}]},
+        ]
+
+        assert used_tools(messages) == {"book"}
+        assert latest_user_text(messages) == "Hi"
+        assert names(selector.select(messages)) == ["book", "escalate"]
+
+    def test_explicit_text_overrides_history(self, selector):
+        assert names(selector.select([], text="thanks, bye")) == ["escalate", "log"]
+
+    def test_small_subset_falls_back_to_every_tool(self):
+        selector = ToolSelector(TOOLS, INTENTS, always=["escalate"], min_tokens=100)
+
+        assert selector.select([user("What's the price?")]) == TOOLS
+        assert selector.offered == {"escalate", "price"}
+
+    def test_unknown_tool_names_rejected(self):
+        with pytest.raises(ValueError):
+            ToolSelector(TOOLS, {"refund": r"refund"})
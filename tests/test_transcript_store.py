@@ -0,0 +1,207 @@
+"""
+Unit tests for the call transcript store
+
+Tests cover:
+- record() buffering without touching disk until a flush
+- Holding each call's events until it ends, then writing one member
+- Reading one call back from interleaved batches
+- Segment rotation, midnight rollover and the per-day index
+- Reading a call straight from its lookup file
+- Overlapping flushes keeping a call's events ahead of its end
+- Dropping events when the buffer is full
+- A disabled store
+"""
+
+import gzip
+import time
+import asyncio
+from datetime import date, timedelta
+from pathlib import Path
+
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent / "voice_ai"))
+
+import pytest
+
+import transcript_store
+from transcript_store import TranscriptStore
+
+
+# ==============================================================================
+# FIXTURES
+# ==============================================================================
+
+@pytest.fixture
+def store(tmp_path):
+    return TranscriptStore(str(tmp_path / "transcripts"), flush_seconds=60)
+
+
+def today() -> str:
+    return date.today().isoformat()
+
+
+# ==============================================================================
+# STORE TESTS
+# ==============================================================================
+
+class TestTranscriptStore:
+    """Test batched writes, rotation and lookups"""
+
+    def test_record_does_not_touch_disk(self, store):
+        store.record("CA1", "caller", text="Hi")
+
+        assert not store.directory.exists()
+        assert store.stats()["buffered"] == 1
+
+    def test_calls_read_back_from_interleaved_batches(self, store):
+        async def run():
+            store.record("CA1", "caller", text="My AC is out")
+            store.record("CA2", "caller", text="Do you do solar?")
+            await store.flush()
+            store.record("CA1", "assistant", text="Let me get someone out there")
+            await store.flush()
+            await store.close()
+
+        asyncio.run(run())
+
+        events = store.load("CA1")
+        assert [e["text"] for e in events] == ["My AC is out", "Let me get someone out there"]
+        assert [e["seq"] for e in events] == [0, 1]
+        assert store.load("CA2", day=today())[0]["text"] == "Do you do solar?"
+        assert store.calls(today()) == ["CA1", "CA2"]
+
+    def test_call_is_one_member_written_when_it_ends(self, store):
+        async def run():
+            for turn in range(3):
+                store.record("CA1", "caller", text=f"turn {turn}")
+                store.record("CA2", "caller", text=f"turn {turn}")
+                await store.flush()
+            assert not store.directory.exists()
+            assert store.stats()["open_calls"] == 2
+            store.end_call("CA1")
+            await store.flush()
+
+        asyncio.run(run())
+
+        index = (store.directory / today() / "index.jsonl").read_text().splitlines()
+        assert len(index) == 1
+        assert [e["text"] for e in store.load("CA1")] == ["turn 0", "turn 1", "turn 2"]
+        assert store.load("CA2") == []
+        assert store.stats()["held"] == 3
+
+    def test_segments_are_valid_gzip(self, store):
+        async def run():
+            for i in range(3):
+                store.record(f"CA{i}", "caller", text="hello")
+                store.end_call(f"CA{i}")
+                await store.flush()
+
+        asyncio.run(run())
+
+        segments = list((store.directory / today()).glob("segment-*.jsonl.gz"))
+        assert len(segments) == 1
+        with gzip.open(segments[0], "rt") as f:
+            assert len(f.read().splitlines()) == 3
+
+    def test_segments_rotate_at_size_cap(self, tmp_path):
+        store = TranscriptStore(str(tmp_path / "transcripts"), segment_bytes=1)
+
+        async def run():
+            for i in range(3):
+                store.record(f"CA{i}", "caller", text=f"turn {i}")
+                store.end_call(f"CA{i}")
+                await store.flush()
+
+        asyncio.run(run())
+
+        assert len(list((store.directory / today()).glob("segment-*"))) == 3
+        assert [store.load(f"CA{i}")[0]["text"] for i in range(3)] == ["turn 0", "turn 1", "turn 2"]
+
+    def test_open_calls_written_into_their_day_at_midnight(self, store, monkeypatch):
+        yesterday = date.today() - timedelta(days=1)
+        clock = {"today": yesterday}
+
+        class Clock(date):
+            @classmethod
+            def today(cls):
+                return clock["today"]
+
+        monkeypatch.setattr(transcript_store, "date", Clock)
+
+        async def run():
+            store.record("CA1", "caller", text="Just before midnight")
+            await store.flush()
+            clock["today"] = date.today()
+            store.record("CA1", "caller", text="Just after")
+            await store.flush()
+            store.end_call("CA1")
+            await store.flush()
+
+        asyncio.run(run())
+
+        assert store.call_days("CA1") == [yesterday.isoformat(), today()]
+        assert store.load("CA1", day=yesterday.isoformat())[0]["text"] == "Just before midnight"
+        assert [e["text"] for e in store.load("CA1")] == ["Just before midnight", "Just after"]
+
+    def test_load_seeks_from_the_lookup_file(self, store):
+        async def run():
+            store.record("CA1", "caller", text="Hi")
+            store.end_call("CA1")
+            await store.flush()
+
+        asyncio.run(run())
+        # Day indexes aren't read at all
+        (store.directory / today() / "index.jsonl").write_text("not json\n")
+
+        assert store.load("CA1")[0]["text"] == "Hi"
+        assert store.load("CA1", day="2020-01-01") == []
+        assert store.load("CA-unknown") == []
+
+    def test_overlapping_flushes_keep_events_before_the_end(self, store, monkeypatch):
+        write_batch = store._write_batch
+
+        def slow_with_events(batch, ended, everything=False):
+            if batch:
+                time.sleep(0.1)  # the batch with the call's last events is slow to write
+            write_batch(batch, ended, everything)
+
+        monkeypatch.setattr(store, "_write_batch", slow_with_events)
+
+        async def run():
+            store.record("CA1", "caller", text="Goodbye")
+            first = asyncio.create_task(store.flush())  # e.g. the background writer
+            await asyncio.sleep(0)
+            store.end_call("CA1")
+            await store.flush()  # e.g. a drain's flush_buffers
+            await first
+
+        asyncio.run(run())
+
+        assert [e["text"] for e in store.load("CA1")] == ["Goodbye"]
+        assert store.stats()["held"] == 0
+
+    def test_full_buffer_drops_new_events(self, tmp_path):
+        store = TranscriptStore(str(tmp_path / "transcripts"), buffer_max=2)
+        for i in range(5):
+            store.record("CA1", "caller", text=str(i))
+
+        assert store.stats()["buffered"] == 2
+
+    def test_writer_flushes_in_background(self, tmp_path):
+        store = TranscriptStore(str(tmp_path / "transcripts"), flush_seconds=0.01)
+
+        async def run():
+            store.record("CA1", "caller", text="Hi")
+            store.end_call("CA1")
+            await asyncio.sleep(0.2)
+
+        asyncio.run(run())
+
+        assert store.load("CA1")[0]["text"] == "Hi"
+
+    def test_disabled_store(self):
+        store = TranscriptStore("")
+        store.record("CA1", "caller", text="Hi")
+
+        assert store.stats()["buffered"] == 0
+        assert store.load("CA1") == []
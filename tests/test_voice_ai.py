@@ -0,0 +1,1554 @@
+"""
+Unit tests for the Voice AI server
+
+Tests cover:
+- Clause-level speech chunking
+- Streaming responses and tool follow-ups
+- Shared non-blocking Claude client pool
+- Parallel multi-tool execution loop
+- Prompt caching and usage accounting
+- Per-turn latency metrics
+- Fast-path intent router
+- Fuzzy pricing phrase index
+- ZIP and city service-area index
+- Session store backends
+- Barge-in cancellation
+- Speculative responses on partial transcripts
+- Session reaper, per-call caps and the global session limit
+- Load-test harness against a fake-LLM server
+- Call transcripts recorded from a session
+- Drain mode for deploys
+- Caller-ID prefetch
+- Emergency safety classifier and escalation
+- Filler responses for turns over the latency budget
+"""
+
+import time
+import socket
+import asyncio
+import threading
+import pytest
+from pathlib import Path
+
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent / "voice_ai"))
+
+from anthropic.types import Message, TextBlock, ToolUseBlock, Usage
+
+from fastapi.testclient import TestClient
+
+import server
+from server import SpeechChunker, VoiceAISession
+from agents import crm_writer
+from agents.crm_writer import CRMWriter, LogSink
+from agents.llm_client import LLMClientPool
+from agents.prompt_cache import build_cached_request, TokenUsage, min_cacheable_tokens, prefix_tokens
+from voice_metrics import MetricsRegistry, TurnTimer
+from intent_router import IntentRouter
+from pricing_index import PricingIndex, PRICING_TABLE
+from bench_pricing import CORPUS, evaluate
+import bench_tools
+from service_area import ServiceAreaIndex, haversine_miles
+from session_store import MemorySessionStore, SQLiteSessionStore
+from loadtest import install_fake_llm, run_load, percentile
+from speculation import Speculator, transcript_similarity
+import session_limits
+from session_limits import SessionReaper, BUSY_MESSAGE, HANDOFF_MESSAGE, CALLBACK_MESSAGE
+from transcript_store import TranscriptStore
+from call_analytics import CallAnalytics
+from drain import DrainController, DRAIN_MESSAGE
+from safety import SafetyClassifier
+from fillers import TurnDeadline, FILLERS
+from post_call import PostCallQueue
+from prefetch import CallerPrefetcher, CustomerContext, CustomerDirectory, normalize_phone
+
+
+@pytest.fixture(autouse=True)
+def crm_journal(tmp_path, monkeypatch):
+    """Keep CRM records logged by tools out of the working directory."""
+    monkeypatch.setattr(crm_writer, "_writer", CRMWriter(LogSink(), journal_path=str(tmp_path / "crm.jsonl")))
+
+
+@pytest.fixture(autouse=True)
+def transcripts(tmp_path, monkeypatch):
+    """Keep call transcripts out of the working directory."""
+    store = TranscriptStore(str(tmp_path / "transcripts"))
+    monkeypatch.setattr(server, "transcripts", store)
+    return store
+
+
+@pytest.fixture(autouse=True)
+def call_analytics(tmp_path, monkeypatch):
+    """Keep call analytics snapshots out of the working directory."""
+    monkeypatch.setattr(server, "call_analytics", CallAnalytics(str(tmp_path / "analytics.json")))
+
+
+@pytest.fixture(autouse=True)
+def post_call(monkeypatch):
+    """No post-call summaries unless a test sets up a queue."""
+    monkeypatch.setattr(server, "post_call", PostCallQueue(enabled=False))
+
+
+@pytest.fixture(autouse=True)
+def worker_drain(monkeypatch):
+    """A fresh, not-draining controller for every test."""
+    controller = DrainController(server.active_sessions, poll_interval=0.01)
+    controller.on_drained(server.flush_buffers)
+    monkeypatch.setattr(server, "worker_drain", controller)
+    return controller
+
+
+# ==============================================================================
+# FAKE CLAUDE CLIENT
+# ==============================================================================
+
+def make_message(*blocks, input_tokens: int = 100, output_tokens: int = 20) -> Message:
+    """Build a Claude response from text strings and ToolUseBlocks."""
+    content = [
+        TextBlock(type="text", text=block) if isinstance(block, str) else block
+        for block in blocks
+    ]
+    has_tool = any(block.type == "tool_use" for block in content)
+    return Message(
+        id="msg_test",
+        type="message",
+        role="assistant",
+        model=server.CLAUDE_MODEL,
+        content=content,
+        stop_reason="tool_use" if has_tool else "end_turn",
+        stop_sequence=None,
+        usage=Usage(input_tokens=input_tokens, output_tokens=output_tokens),
+    )
+
+
+def tool_use(name: str, tool_input: dict, tool_id: str = "toolu_1") -> ToolUseBlock:
+    return ToolUseBlock(type="tool_use", id=tool_id, name=name, input=tool_input)
+
+
+class FakeStream:
+    """Async context manager mimicking AsyncMessageStreamManager."""
+
+    def __init__(self, message: Message, delay: float = 0.0):
+        self.message = message
+        self.delay = delay
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    @property
+    def text_stream(self):
+        return self._tokens()
+
+    async def _tokens(self):
+        for block in self.message.content:
+            if block.type != "text":
+                continue
+            for word in block.text.split(" "):
+                await asyncio.sleep(self.delay)
+                yield word + " "
+
+    async def get_final_message(self) -> Message:
+        return self.message
+
+
+class FakeMessages:
+    """Serves scripted responses to create() and stream() in order."""
+
+    def __init__(self, responses, delay: float = 0.0):
+        self.responses = list(responses)
+        self.delay = delay
+        self.requests = []
+
+    async def create(self, **kwargs):
+        self.requests.append(kwargs)
+        await asyncio.sleep(self.delay)
+        return self.responses.pop(0)
+
+    def stream(self, **kwargs):
+        self.requests.append(kwargs)
+        return FakeStream(self.responses.pop(0), self.delay)
+
+
+class FakeClient:
+    def __init__(self, responses, delay: float = 0.0):
+        self.messages = FakeMessages(responses, delay)
+
+
+def use_fake_claude(monkeypatch, responses, delay: float = 0.0) -> FakeClient:
+    """Route every new VoiceAISession to a scripted client."""
+    client = FakeClient(responses, delay)
+    pool = LLMClientPool(client=client)
+    monkeypatch.setattr(server, "get_llm_pool", lambda: pool)
+    return client
+
+
+async def collect(chunks):
+    return [chunk async for chunk in chunks]
+
+
+# ==============================================================================
+# SPEECH CHUNKER TESTS
+# ==============================================================================
+
+class TestSpeechChunker:
+    """Test clause-level chunking of streamed text"""
+
+    def test_flushes_on_sentence_end(self):
+        chunker = SpeechChunker()
+        assert chunker.feed("Sure thing. Let me") == ["Sure thing."]
+        assert chunker.flush() == ["Let me"]
+
+    def test_waits_for_enough_text_before_clause_break(self):
+        chunker = SpeechChunker()
+        assert chunker.feed("Okay, so ") == []
+        assert chunker.feed("the technician can come tomorrow, or ") == [
+            "Okay, so the technician can come tomorrow,"
+        ]
+
+    def test_does_not_split_prices(self):
+        chunker = SpeechChunker()
+        assert chunker.feed("It runs $89.50 total") == []
+        assert chunker.flush() == ["It runs $89.50 total"]
+
+
+# ==============================================================================
+# STREAMING TESTS
+# ==============================================================================
+
+class TestStreamMessage:
+    """Test streamed responses from VoiceAISession"""
+
+    def test_streams_text_in_chunks(self):
+        session = VoiceAISession("CA-test")
+        session.llm = LLMClientPool(client=FakeClient([
+            make_message("Hi there. We can get someone out tomorrow morning.")
+        ]))
+
+        chunks = asyncio.run(collect(session.stream_message("My AC is broken")))
+
+        assert chunks == ["Hi there.", "We can get someone out tomorrow morning."]
+        assert session.conversation[-1]["role"] == "assistant"
+
+    def test_runs_tool_before_streaming_follow_up(self):
+        session = VoiceAISession("CA-test")
+        session.llm = LLMClientPool(client=FakeClient([
+            make_message("Let me check.", tool_use("check_service_area", {"state": "GA"})),
+            make_message("Good news, we cover Georgia."),
+        ]))
+
+        chunks = asyncio.run(collect(session.stream_message("Can you check Georgia for me?")))
+
+        assert chunks == ["Let me check.", "Good news, we cover Georgia."]
+        roles = [message["role"] for message in session.conversation]
+        assert roles == ["user", "assistant", "user", "assistant"]
+        assert session.conversation[2]["content"][0]["type"] == "tool_result"
+
+
+# ==============================================================================
+# CLIENT POOL TESTS
+# ==============================================================================
+
+class TestLLMClientPool:
+    """Test that voice sessions share one non-blocking client"""
+
+    def test_sessions_share_process_wide_pool(self):
+        assert VoiceAISession("CA-1").llm is VoiceAISession("CA-2").llm
+
+    def test_simultaneous_calls_overlap(self):
+        calls = 10
+        delay = 0.2
+        pool = LLMClientPool(
+            client=FakeClient([make_message("Sure.") for _ in range(calls)], delay=delay)
+        )
+        sessions = [VoiceAISession(f"CA-{i}") for i in range(calls)]
+        for session in sessions:
+            session.llm = pool
+
+        async def run():
+            started = time.perf_counter()
+            replies = await asyncio.gather(*(
+                session.process_message("Hello") for session in sessions
+            ))
+            return replies, time.perf_counter() - started
+
+        replies, elapsed = asyncio.run(run())
+
+        assert replies == ["Sure."] * calls
+        # Serial execution would take calls * delay = 2s
+        assert elapsed < delay * 3
+        assert pool.peak_in_flight == calls
+
+    def test_concurrency_cap_queues_excess_requests(self):
+        delay = 0.1
+        pool = LLMClientPool(
+            client=FakeClient([make_message("Sure.") for _ in range(4)], delay=delay),
+            max_concurrent_requests=2
+        )
+
+        async def run():
+            started = time.perf_counter()
+            await asyncio.gather(*(pool.create(messages=[]) for _ in range(4)))
+            return time.perf_counter() - started
+
+        elapsed = asyncio.run(run())
+
+        assert pool.peak_in_flight == 2
+        assert elapsed >= delay * 2
+
+    def test_warm_only_when_idle(self):
+        client = FakeClient([make_message("Sure.")])
+        counted = []
+
+        async def count_tokens(**kwargs):
+            counted.append(kwargs["model"])
+
+        client.messages.count_tokens = count_tokens
+        pool = LLMClientPool(client=client)
+
+        async def run():
+            await pool.warm("claude-sonnet-4-20250514")
+            await pool.warm("claude-sonnet-4-20250514")
+
+        asyncio.run(run())
+
+        assert counted == ["claude-sonnet-4-20250514"]
+
+
+# ==============================================================================
+# TOOL LOOP TESTS
+# ==============================================================================
+
+class TestToolLoop:
+    """Test the bounded, parallel tool-use loop"""
+
+    def test_all_tools_in_a_turn_share_one_round_trip(self):
+        client = FakeClient([
+            make_message(
+                tool_use("check_service_area", {"state": "AL"}, "toolu_1"),
+                tool_use("schedule_service_call", {
+                    "customer_name": "Jane Doe",
+                    "service_address": "1 Main St, Mobile, AL",
+                    "trade": "HVAC",
+                    "issue_description": "AC not cooling"
+                }, "toolu_2"),
+                tool_use("log_call_disposition", {"disposition": "appointment_scheduled"}, "toolu_3"),
+            ),
+            make_message("You're all set for tomorrow."),
+        ])
+        session = VoiceAISession("CA-test")
+        session.llm = LLMClientPool(client=client)
+
+        reply = asyncio.run(session.process_message("Book me an AC visit in Mobile"))
+
+        assert reply == "You're all set for tomorrow."
+        assert len(client.messages.requests) == 2
+        tool_results = session.conversation[2]["content"]
+        assert [r["tool_use_id"] for r in tool_results] == ["toolu_1", "toolu_2", "toolu_3"]
+
+    def test_tools_run_concurrently(self, monkeypatch):
+        async def slow_tool(tool_name, tool_input):
+            await asyncio.sleep(0.1)
+            return {"ok": tool_name}
+
+        monkeypatch.setattr(server, "execute_tool", slow_tool)
+        session = VoiceAISession("CA-test")
+        session.llm = LLMClientPool(client=FakeClient([
+            make_message(*(tool_use("check_service_area", {}, f"toolu_{i}") for i in range(3))),
+            make_message("Done."),
+        ]))
+
+        started = time.perf_counter()
+        asyncio.run(session.process_message("Check everything"))
+
+        assert time.perf_counter() - started < 0.25
+
+    def test_keeps_going_until_claude_stops_asking(self):
+        client = FakeClient([
+            make_message("One moment.", tool_use("check_service_area", {"state": "TN"}, "toolu_1")),
+            make_message(tool_use("get_pricing_estimate", {"service_type": "ac tune-up", "trade": "HVAC"}, "toolu_2")),
+            make_message("We cover Tennessee and a tune-up runs about a hundred dollars."),
+        ])
+        session = VoiceAISession("CA-test")
+        session.llm = LLMClientPool(client=client)
+
+        chunks = asyncio.run(collect(session.stream_message("Tune-up price in Nashville?")))
+
+        assert chunks[0] == "One moment."
+        assert len(client.messages.requests) == 3
+        assert session.conversation[-1]["role"] == "assistant"
+
+    def test_step_limit_forces_spoken_answer(self, monkeypatch):
+        monkeypatch.setattr(server, "MAX_TOOL_STEPS", 1)
+        client = FakeClient([
+            make_message(tool_use("check_service_area", {"state": "GA"}, "toolu_1")),
+            make_message("We do serve Georgia."),
+        ])
+        session = VoiceAISession("CA-test")
+        session.llm = LLMClientPool(client=client)
+
+        asyncio.run(session.process_message("Georgia?"))
+
+        assert "tool_choice" not in client.messages.requests[0]
+        assert client.messages.requests[1]["tool_choice"] == {"type": "none"}
+
+
+# ==============================================================================
+# PROMPT CACHING TESTS
+# ==============================================================================
+
+class TestPromptCaching:
+    """Test cacheable request prefixes and cache usage accounting"""
+
+    def test_marks_system_and_last_tool_cacheable(self):
+        request = build_cached_request(
+            model="m", max_tokens=10, system="prompt", tools=server.TOOLS, messages=[]
+        )
+
+        assert request["system"][0]["cache_control"] == {"type": "ephemeral"}
+        assert request["tools"][-1]["cache_control"] == {"type": "ephemeral"}
+        assert all("cache_control" not in tool for tool in request["tools"][:-1])
+        assert all("cache_control" not in tool for tool in server.TOOLS)
+
+    def test_prefix_is_identical_across_turns(self):
+        session = VoiceAISession("CA-test")
+        first = session._claude_request(0)
+        session.conversation.append({"role": "user", "content": "hi"})
+        second = session._claude_request(0)
+
+        assert first["system"] == second["system"]
+        assert first["tools"] == second["tools"]
+
+    def test_tool_subset_grows_in_declared_order(self, monkeypatch):
+        monkeypatch.setattr(server, "TOOL_SUBSET_MIN_TOKENS", 0)
+        session = VoiceAISession("CA-subset")
+        session.conversation.append({"role": "user", "content": "How much is a furnace tune-up?"})
+        first = [tool["name"] for tool in session._claude_request(0)["tools"]]
+        session.conversation.append({"role": "assistant", "content": [{"type": "text", "text": "About $89."}]})
+        session.conversation.append({"role": "user", "content": "Okay"})
+        second = [tool["name"] for tool in session._claude_request(0)["tools"]]
+
+        assert first == ["schedule_service_call", "get_pricing_estimate", "escalate_to_human"]
+        assert second == first
+        restored = VoiceAISession.restore(session.snapshot())
+        assert [tool["name"] for tool in restored._claude_request(0)["tools"]] == first
+
+    def test_subset_under_cache_minimum_sends_every_tool(self):
+        session = VoiceAISession("CA-small")
+        session.conversation.append({"role": "user", "content": "How much is a furnace tune-up?"})
+
+        assert session._claude_request(0)["tools"][:-1] == server.TOOLS[:-1]
+        assert prefix_tokens(server.SYSTEM_PROMPT, server.TOOLS) >= min_cacheable_tokens(server.CLAUDE_MODEL)
+
+    def test_tool_subset_offers_what_replayed_calls_need(self):
+        _, misses = bench_tools.evaluate()
+
+        assert misses == []
+
+    def test_session_accumulates_cache_tokens(self):
+        cached = make_message("Sure.")
+        cached.usage.cache_read_input_tokens = 1500
+        session = VoiceAISession("CA-test")
+        session.llm = LLMClientPool(client=FakeClient([cached]))
+
+        asyncio.run(session.process_message("Hello"))
+
+        assert session.usage.cache_read_input_tokens == 1500
+        assert session.usage.as_dict()["cache_hit_rate"] == pytest.approx(1500 / 1600, abs=0.001)
+
+
+# ==============================================================================
+# METRICS TESTS
+# ==============================================================================
+
+class TestMetrics:
+    """Test per-turn latency metrics"""
+
+    def test_summary_quantiles_and_exposition(self):
+        registry = MetricsRegistry()
+        for ms in range(1, 101):
+            registry.observe("voice_tool_seconds", ms / 1000, tool="check_service_area")
+
+        assert registry.quantile("voice_tool_seconds", 0.5, tool="check_service_area") == pytest.approx(0.051)
+        text = registry.render()
+        assert 'voice_tool_seconds{tool="check_service_area",quantile="0.99"}' in text
+        assert 'voice_tool_seconds_count{tool="check_service_area"} 100' in text
+
+    def test_timer_labels_tool_and_trade(self):
+        registry = MetricsRegistry()
+        timer = TurnTimer(registry, trade="HVAC")
+        with timer.tool("get_pricing_estimate"):
+            pass
+        timer.finish()
+
+        assert registry.counter_value("voice_turns_total", trade="HVAC") == 1
+        assert registry.quantile("voice_tool_seconds", 0.5, tool="get_pricing_estimate", trade="HVAC") is not None
+        assert "response_sent" in timer.stages
+
+    def test_websocket_turn_populates_metrics_endpoint(self, monkeypatch):
+        use_fake_claude(monkeypatch, [
+            make_message("Let me check.", tool_use("check_service_area", {"state": "FL"})),
+            make_message("Yes, we serve Florida."),
+        ])
+        client = TestClient(server.app)
+
+        with client.websocket_connect("/ws/voice/CA-metrics") as ws:
+            ws.receive_json()  # greeting
+            ws.send_json({"type": "transcript", "content": "Is my place in Florida covered?"})
+            frames = []
+            while not frames or not frames[-1].get("last"):
+                frames.append(ws.receive_json())
+            ws.send_json({"type": "hangup"})
+
+        assert [f["content"] for f in frames] == ["Let me check.", "Yes, we serve Florida.", ""]
+        text = client.get("/metrics").text
+        for stage in ("llm_request_start", "first_token", "first_response_sent", "response_sent"):
+            assert f'stage="{stage}"' in text
+        assert 'voice_tool_seconds_count{tool="check_service_area",trade="unknown"}' in text
+        assert 'voice_llm_call_seconds_count{kind="follow_up",trade="unknown"}' in text
+
+
+# ==============================================================================
+# FAST-PATH ROUTER TESTS
+# ==============================================================================
+
+@pytest.fixture
+def router():
+    return IntentRouter(
+        server.check_service_area, server.get_pricing_estimate, service_area=server.service_area_index
+    )
+
+
+class TestIntentRouter:
+    """Test deterministic answers for simple questions"""
+
+    @pytest.mark.parametrize("utterance,in_area", [
+        ("Do you service Birmingham?", True),
+        ("are y'all in Mobile, Alabama", True),
+        ("Do you guys cover Texas?", False),
+    ])
+    def test_service_area_questions(self, router, utterance, in_area):
+        routed = router.route(utterance)
+
+        assert routed.tool == "check_service_area"
+        assert routed.tool_result["in_service_area"] is in_area
+
+    def test_pricing_question(self, router):
+        routed = router.route("How much is an AC tune-up?")
+
+        assert routed.tool_input == {"service_type": "ac tune-up", "trade": "HVAC"}
+        assert routed.answer.startswith("An AC tune-up typically runs $89 to $149")
+
+    def test_pricing_question_in_callers_words(self, router):
+        routed = router.route("How much to replace my hot water heater?")
+
+        assert routed.tool_result["matched_service"] == "water heater replacement"
+        assert routed.answer.startswith("A water heater replacement typically runs $1,200 to $3,500")
+
+    @pytest.mark.parametrize("utterance", [
+        "My AC stopped working last night",
+        "Do you service Columbus?",
+        "How much is an AC tune-up and can I book one for Monday?",
+        "I smell gas, do you service Atlanta?",
+        "How much for the thing we talked about?",
+    ])
+    def test_falls_back_when_unsure(self, router, utterance):
+        assert router.route(utterance) is None
+
+    def test_fast_path_skips_claude_but_keeps_context(self, monkeypatch):
+        client = use_fake_claude(monkeypatch, [])
+        session = VoiceAISession("CA-fast")
+
+        reply = asyncio.run(session.process_message("Do you service Nashville?"))
+
+        assert reply.startswith("Yes, we serve Nashville")
+        assert client.messages.requests == []
+        assert [m["role"] for m in session.conversation] == ["user", "assistant"]
+        assert server.metrics.counter_value("voice_fast_path_total", result="hit", intent="service_area") >= 1
+
+
+# ==============================================================================
+# PRICING INDEX TESTS
+# ==============================================================================
+
+@pytest.fixture(scope="module")
+def pricing_index():
+    return PricingIndex(PRICING_TABLE)
+
+
+class TestPricingIndex:
+    """Test synonym, typo and cross-trade pricing matches"""
+
+    @pytest.mark.parametrize("phrase,trade,service", [
+        ("tune up for my air conditioner", "HVAC", "ac tune-up"),
+        ("hot water heater repair", "Plumbing", "water heater repair"),
+        ("generater install", "Electrical", "generator installation"),
+        ("fix my a c", "HVAC", "ac repair"),
+    ])
+    def test_spoken_variants(self, pricing_index, phrase, trade, service):
+        assert pricing_index.match(phrase, trade_hint=trade).service == service
+
+    def test_typo_scores_below_exact(self, pricing_index):
+        exact = pricing_index.match("generator installation")
+        typo = pricing_index.match("generater installation")
+
+        assert typo.service == exact.service
+        assert typo.score < exact.score
+
+    def test_ambiguous_or_unknown_returns_none(self, pricing_index):
+        assert pricing_index.match("inspection") is None
+        assert pricing_index.match("roof replacement") is None
+
+    def test_corpus_accuracy(self, pricing_index):
+        correct, misses = evaluate(pricing_index)
+
+        assert correct / len(CORPUS) >= 0.95, misses
+
+    def test_tool_reports_match(self):
+        result = server.get_pricing_estimate({"service_type": "new hot water heater", "trade": "HVAC"})
+
+        assert result["matched_service"] == "water heater replacement"
+        assert result["trade"] == "Plumbing"
+        assert result["match_score"] >= 0.6
+
+    def test_tool_falls_back_to_varies(self):
+        result = server.get_pricing_estimate({"service_type": "roof replacement", "trade": "Solar"})
+
+        assert result["estimate"] == "Varies"
+
+
+# ==============================================================================
+# SERVICE AREA INDEX TESTS
+# ==============================================================================
+
+@pytest.fixture(scope="module")
+def service_area():
+    return ServiceAreaIndex.load()
+
+
+class TestServiceAreaIndex:
+    """Test ZIP → city → state resolution and nearest branch"""
+
+    def test_zip_resolves_city_and_branch(self, service_area):
+        match = service_area.resolve(zip_code="36602-1234")
+
+        assert match.matched_by == "zip"
+        assert (match.city, match.state, match.nearest_branch) == ("Mobile", "AL", "Mobile")
+        assert match.in_service_area
+
+    def test_zip_outside_served_prefixes(self, service_area):
+        match = service_area.resolve(zip_code="10001", state="AL")
+
+        assert match.matched_by == "zip"
+        assert not match.in_service_area
+
+    def test_city_resolves_nearest_branch(self, service_area):
+        match = service_area.resolve(city="Destin", state="FL")
+
+        assert match.matched_by == "city"
+        assert match.nearest_branch == "Pensacola"
+        assert 30 < match.distance_miles < 60
+
+    def test_city_name_variants(self, service_area):
+        assert service_area.resolve(city="saint petersburg", state="FL").city == "St. Petersburg"
+        # Decatur is in both Alabama and Georgia
+        assert service_area.state_for_city("Decatur") is None
+
+    def test_falls_back_to_state(self, service_area):
+        match = service_area.resolve(city="Smallville", state="tn")
+
+        assert match.matched_by == "state"
+        assert match.in_service_area
+        assert match.nearest_branch is None
+
+    def test_haversine(self):
+        # Atlanta to Savannah is roughly 215 miles as the crow flies
+        assert 200 < haversine_miles(33.749, -84.388, 32.081, -81.091) < 230
+
+    def test_tool_uses_zip_before_state(self):
+        result = server.check_service_area({"zip_code": "37203", "state": "GA"})
+
+        assert result["in_service_area"] is True
+        assert result["state"] == "TN"
+        assert result["nearest_branch"] == "Nashville"
+
+    def test_router_answers_zip_question(self, router):
+        routed = router.route("Do you service 36602?")
+
+        assert routed.tool_input == {"zip_code": "36602"}
+        assert routed.answer.startswith("Yes, we serve Mobile. Our Mobile branch")
+
+
+# ==============================================================================
+# SESSION STORE TESTS
+# ==============================================================================
+
+def conversation_session(call_sid="CA-store"):
+    session = VoiceAISession(call_sid)
+    session.conversation.append({"role": "user", "content": "My AC is out in Mobile"})
+    session.conversation.append({"role": "assistant", "content": [{"type": "text", "text": "Sorry to hear that."}]})
+    session.conversation.summary = "Customer called earlier about a noisy furnace."
+    session.trade = "HVAC"
+    session.usage.input_tokens = 1200
+    return session
+
+
+class TestSessionStore:
+    """Test snapshots shared between workers"""
+
+    def test_sqlite_store_shared_between_workers(self, tmp_path):
+        path = str(tmp_path / "sessions.db")
+
+        async def run():
+            worker_a, worker_b = SQLiteSessionStore(path), SQLiteSessionStore(path)
+            await worker_a.save(conversation_session("CA-1").snapshot())
+            await worker_b.save(conversation_session("CA-2").snapshot())
+            counts = (await worker_a.count(), await worker_b.count())
+            state = await worker_b.load("CA-1")
+            await worker_a.delete("CA-1")
+            remaining = await worker_b.count()
+            await worker_a.close()
+            await worker_b.close()
+            return counts, state, remaining
+
+        counts, state, remaining = asyncio.run(run())
+
+        assert counts == (2, 2)
+        assert remaining == 1
+        restored = VoiceAISession.restore(state)
+        assert restored.conversation.messages == conversation_session().conversation.messages
+        assert restored.conversation.summary.startswith("Customer called earlier")
+        assert restored.trade == "HVAC"
+        assert restored.usage.input_tokens == 1200
+
+    def test_expired_snapshots_not_counted(self, tmp_path):
+        async def run():
+            store = SQLiteSessionStore(str(tmp_path / "sessions.db"), ttl_seconds=60)
+            await store.save(conversation_session().snapshot())
+            store._execute("UPDATE voice_sessions SET updated_at = updated_at - 120")
+            result = (await store.count(), await store.load("CA-store"))
+            await store.close()
+            return result
+
+        assert asyncio.run(run()) == (0, None)
+
+    def test_memory_store_evicts_least_recent(self):
+        async def run():
+            store = MemorySessionStore(max_sessions=2)
+            for call_sid in ("CA-1", "CA-2", "CA-3"):
+                await store.save(conversation_session(call_sid).snapshot())
+            return await store.count(), await store.load("CA-1")
+
+        assert asyncio.run(run()) == (2, None)
+
+    def test_websocket_resumes_saved_call(self, monkeypatch):
+        fake = use_fake_claude(monkeypatch, [make_message("We'll get someone out to you.")])
+        store = MemorySessionStore()
+        monkeypatch.setattr(server, "session_store", store)
+        asyncio.run(store.save(conversation_session("CA-resume").snapshot()))
+        client = TestClient(server.app)
+
+        with client.websocket_connect("/ws/voice/CA-resume") as ws:
+            # No greeting on resume; the first frame is the answer
+            ws.send_json({"type": "transcript", "content": "Can someone come out tomorrow?"})
+            frames = []
+            while not frames or not frames[-1].get("last"):
+                frames.append(ws.receive_json())
+            ws.send_json({"type": "hangup"})
+
+        assert frames[0]["content"] == "We'll get someone out to you."
+        sent = fake.messages.requests[0]["messages"]
+        assert sent[0]["content"] == "My AC is out in Mobile"
+        assert sent[2]["content"] == "Can someone come out tomorrow?"
+        assert asyncio.run(store.count()) == 0
+
+
+# ==============================================================================
+# BARGE-IN TESTS
+# ==============================================================================
+
+def receive_reply(ws):
+    """Frames up to and including the closing ``last: True`` frame."""
+    frames = []
+    while not frames or not frames[-1].get("last"):
+        frames.append(ws.receive_json())
+    return frames
+
+
+class TestBargeIn:
+    """Test cancelling stale answers when the caller talks over the bot"""
+
+    def test_abandon_keeps_finished_tools_and_spoken_text(self):
+        session = VoiceAISession("CA-abandon")
+        session._begin_turn("Book me for Tuesday and check Georgia")
+        session.conversation.append({"role": "assistant", "content": [
+            {"type": "text", "text": "Booking that now."},
+            {"type": "tool_use", "id": "toolu_1", "name": "schedule_service_call", "input": {}},
+        ]})
+        session.conversation.append({"role": "user", "content": [
+            {"type": "tool_result", "tool_use_id": "toolu_1", "content": "{}"},
+        ]})
+        session.conversation.append({"role": "assistant", "content": [
+            {"type": "text", "text": "You're booked. Let me also check Georgia."},
+            {"type": "tool_use", "id": "toolu_2", "name": "check_service_area", "input": {"state": "GA"}},
+        ]})
+
+        session.abandon_turn(heard="Booking that now. You're booked.")
+
+        assert [m["role"] for m in session.conversation] == ["user", "assistant", "user", "assistant"]
+        assert session.conversation[1]["content"] == [
+            {"type": "tool_use", "id": "toolu_1", "name": "schedule_service_call", "input": {}}
+        ]
+        assert session.conversation[3]["content"] == [
+            {"type": "text", "text": "Booking that now. You're booked."}
+        ]
+
+    def test_new_transcript_cancels_stale_answer(self, monkeypatch):
+        stale = "Let me look into that for you. " + " ".join(["Our technicians are certified."] * 20)
+        fake = use_fake_claude(monkeypatch, [
+            make_message(stale),
+            make_message("Sure, Georgia is covered."),
+        ], delay=0.01)
+        client = TestClient(server.app)
+        before = server.metrics.counter_value("voice_barge_in_total", reason="transcript")
+
+        with client.websocket_connect("/ws/voice/CA-barge") as ws:
+            ws.receive_json()  # greeting
+            ws.send_json({"type": "transcript", "content": "Tell me about your company"})
+            first = ws.receive_json()
+            ws.send_json({"type": "transcript", "content": "Actually, can you check Georgia?"})
+            frames = receive_reply(ws)
+            ws.send_json({"type": "hangup"})
+
+        assert first["content"] == "Let me look into that for you."
+        assert frames[-2]["content"] == "Sure, Georgia is covered."
+        assert server.metrics.counter_value("voice_barge_in_total", reason="transcript") == before + 1
+
+        # The stale turn is recorded only as far as it was spoken
+        history = fake.messages.requests[1]["messages"]
+        assert [m["role"] for m in history] == ["user", "assistant", "user", "assistant"]
+        spoken = history[1]["content"][0]["text"]
+        assert spoken.startswith("Let me look into that for you.")
+        assert len(spoken) < len(stale)
+
+    def test_interrupt_after_reply_trims_to_heard_text(self, monkeypatch):
+        fake = use_fake_claude(monkeypatch, [
+            make_message("We have openings Monday. We also have openings Tuesday afternoon."),
+        ])
+        client = TestClient(server.app)
+
+        with client.websocket_connect("/ws/voice/CA-heard") as ws:
+            ws.receive_json()  # greeting
+            ws.send_json({"type": "transcript", "content": "When can someone come out?"})
+            receive_reply(ws)
+            ws.send_json({"type": "interrupt", "utteranceUntilInterrupt": "We have openings Monday."})
+            ws.send_json({"type": "hangup"})
+
+        history = fake.messages.requests[0]["messages"]
+        assert history[-1]["content"] == [{"type": "text", "text": "We have openings Monday."}]
+
+    def test_cancelled_reply_closes_stream_at_once(self):
+        closed = []
+
+        class StreamingSession:
+            def stream_message(self, user_text, timer, speculation=None):
+                self.stream = self._stream(user_text)  # kept alive, so only an explicit close runs the finally
+                return self.stream
+
+            async def _stream(self, user_text):
+                try:
+                    yield "Let me look into that for you."
+                    yield "Our technicians are certified."
+                finally:
+                    closed.append(user_text)
+
+            def note_spoken(self, chunk):
+                pass
+
+        class SlowSocket(RecordingSocket):
+            async def send_json(self, data):
+                await asyncio.sleep(10)  # the caller talks over the first chunk
+
+        async def run():
+            task = asyncio.create_task(server.send_streamed_response(
+                SlowSocket(), StreamingSession(), "Tell me about your company", TurnTimer()
+            ))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            return list(closed)
+
+        assert asyncio.run(run()) == ["Tell me about your company"]
+
+
+# ==============================================================================
+# SPECULATION TESTS
+# ==============================================================================
+
+def enable_speculation(monkeypatch):
+    monkeypatch.setattr(server, "VOICE_SPECULATIVE", True)
+    monkeypatch.setattr(server, "Speculator", lambda session: Speculator(session, stable_seconds=0.01))
+
+
+class TestSpeculation:
+    """Test starting Claude on partial transcripts"""
+
+    def test_similarity_ignores_case_and_punctuation(self):
+        assert transcript_similarity("My AC stopped cooling.", "my ac stopped cooling") == 1.0
+        assert transcript_similarity("my ac stopped cooling", "my ac stopped cooling today") > 0.85
+        assert transcript_similarity("my ac stopped cooling", "how much is a panel upgrade") < 0.3
+
+    def test_matching_final_reuses_speculative_response(self, monkeypatch):
+        enable_speculation(monkeypatch)
+        fake = use_fake_claude(monkeypatch, [make_message("Sorry to hear that. Let's get someone out.")])
+        before = server.metrics.counter_value("voice_speculation_total", result="hit")
+
+        with TestClient(server.app).websocket_connect("/ws/voice/CA-spec-hit") as ws:
+            ws.receive_json()  # greeting
+            ws.send_json({"type": "transcript", "content": "My air conditioner stopped", "last": False})
+            ws.send_json({"type": "transcript", "content": "My air conditioner stopped cooling", "last": False})
+            time.sleep(0.1)
+            ws.send_json({"type": "transcript", "content": "My air conditioner stopped cooling."})
+            frames = receive_reply(ws)
+            ws.send_json({"type": "hangup"})
+
+        assert len(fake.messages.requests) == 1
+        assert fake.messages.requests[0]["messages"][-1]["content"] == "My air conditioner stopped cooling"
+        assert frames[0]["content"] == "Sorry to hear that."
+        assert server.metrics.counter_value("voice_speculation_total", result="hit") == before + 1
+
+    def test_mismatch_reissues_and_never_runs_speculative_tools(self, monkeypatch):
+        enable_speculation(monkeypatch)
+        tools_run = []
+
+        async def recording_tool(tool_name, tool_input):
+            tools_run.append(tool_name)
+            return {"success": True}
+
+        monkeypatch.setattr(server, "execute_tool", recording_tool)
+        fake = use_fake_claude(monkeypatch, [
+            make_message(tool_use("log_call_disposition", {"disposition": "appointment_scheduled"})),
+            make_message("A banging furnace is worth a look. When are you free?"),
+        ])
+        wasted_before = server.metrics.counter_value("voice_speculation_wasted_tokens_total")
+        missed_before = server.metrics.counter_value("voice_speculation_total", result="mismatch")
+
+        with TestClient(server.app).websocket_connect("/ws/voice/CA-spec-miss") as ws:
+            ws.receive_json()  # greeting
+            ws.send_json({"type": "transcript", "content": "Go ahead and book that", "last": False})
+            time.sleep(0.1)
+            ws.send_json({"type": "transcript", "content": "Actually my furnace is making a banging noise"})
+            receive_reply(ws)
+            ws.send_json({"type": "hangup"})
+
+        assert tools_run == []
+        assert len(fake.messages.requests) == 2
+        assert server.metrics.counter_value("voice_speculation_total", result="mismatch") == missed_before + 1
+        assert server.metrics.counter_value("voice_speculation_wasted_tokens_total") == wasted_before + 120
+
+    def test_speculation_does_not_add_tools(self, monkeypatch):
+        monkeypatch.setattr(server, "TOOL_SUBSET_MIN_TOKENS", 0)
+        fake = FakeClient([make_message("It runs about $89.")])
+        session = VoiceAISession("CA-spec-tools")
+        session.llm = LLMClientPool(client=fake)
+
+        asyncio.run(session.speculate("How much does a tune-up cost"))
+        speculative_tools = [tool["name"] for tool in fake.messages.requests[0]["tools"]]
+
+        assert "get_pricing_estimate" in speculative_tools
+        assert session.tool_selector.offered == set(server.ALWAYS_TOOLS)
+
+    def test_fast_path_answer_discards_speculation(self, monkeypatch):
+        enable_speculation(monkeypatch)
+        fake = use_fake_claude(monkeypatch, [make_message("Yes, we cover Alabama.")])
+        before = server.metrics.counter_value("voice_speculation_total", result="fast_path")
+
+        with TestClient(server.app).websocket_connect("/ws/voice/CA-spec-fast") as ws:
+            ws.receive_json()  # greeting
+            ws.send_json({"type": "transcript", "content": "Do you service Alabama", "last": False})
+            time.sleep(0.1)
+            ws.send_json({"type": "transcript", "content": "Do you service Alabama?"})
+            receive_reply(ws)
+            ws.send_json({"type": "hangup"})
+
+        assert len(fake.messages.requests) == 1  # the speculation, thrown away
+        assert server.metrics.counter_value("voice_speculation_total", result="fast_path") == before + 1
+
+
+# ==============================================================================
+# SESSION LIMIT TESTS
+# ==============================================================================
+
+class TestSessionLimits:
+    """Test the reaper, per-call caps and the global session limit"""
+
+    def test_reaper_drops_orphaned_and_cancels_stuck_sessions(self):
+        async def run():
+            sessions = {sid: VoiceAISession(sid) for sid in ("CA-live", "CA-orphan", "CA-stuck")}
+            handlers = {sid: asyncio.create_task(asyncio.sleep(10)) for sid in ("CA-live", "CA-stuck")}
+            for sid, task in handlers.items():
+                sessions[sid].connection_task = task
+            sessions["CA-stuck"].last_activity -= 60
+
+            reaped = SessionReaper(sessions, idle_timeout=10).sweep()
+            await asyncio.sleep(0)
+            stuck_cancelled = handlers["CA-stuck"].cancelled()
+            handlers["CA-live"].cancel()
+            return reaped, set(sessions), stuck_cancelled
+
+        reaped, remaining, stuck_cancelled = asyncio.run(run())
+
+        assert reaped == ["CA-orphan", "CA-stuck"]
+        assert remaining == {"CA-live"}
+        assert stuck_cancelled
+
+    def test_idle_socket_is_ended_and_released(self, monkeypatch):
+        monkeypatch.setattr(server, "VOICE_IDLE_TIMEOUT_SECONDS", 0.1)
+        before = server.metrics.counter_value("voice_sessions_ended_total", reason="idle")
+
+        with TestClient(server.app).websocket_connect("/ws/voice/CA-idle") as ws:
+            ws.receive_json()  # greeting
+            end = ws.receive_json()  # caller never speaks again
+
+        assert end["type"] == "end"
+        assert "CA-idle" not in server.active_sessions
+        assert server.metrics.counter_value("voice_sessions_ended_total", reason="idle") == before + 1
+
+    def test_turn_cap_hands_off(self, monkeypatch):
+        monkeypatch.setattr(server, "VOICE_MAX_TURNS", 1)
+        use_fake_claude(monkeypatch, [make_message("Happy to help with that.")])
+
+        with TestClient(server.app).websocket_connect("/ws/voice/CA-turns") as ws:
+            ws.receive_json()  # greeting
+            ws.send_json({"type": "transcript", "content": "My water heater is leaking"})
+            receive_reply(ws)
+            ws.send_json({"type": "transcript", "content": "Also, my disposal is jammed"})
+            handoff, end = ws.receive_json(), ws.receive_json()
+
+        assert handoff["content"] == HANDOFF_MESSAGE
+        assert end["type"] == "end"
+
+    def test_turn_cap_handoff_reaches_a_person(self, monkeypatch):
+        monkeypatch.setattr(session_limits, "VOICE_HANDOFF_NUMBER", "+12515550100")
+        client = TestClient(server.app)
+
+        async def run():
+            socket = RecordingSocket()
+            await session_limits.end_call(socket, "max_turns", HANDOFF_MESSAGE)
+            await session_limits.end_call(socket, "idle")
+            return [frame["handoffData"] for frame in socket.sent if frame["type"] == "end"]
+
+        max_turns, idle = asyncio.run(run())
+        transferred = client.post("/voice/handoff", data={"CallSid": "CA-turns", "HandoffData": max_turns}).text
+        dropped = client.post("/voice/handoff", data={"CallSid": "CA-idle", "HandoffData": idle}).text
+
+        assert "+12515550100</Dial>" in transferred
+        assert "<Dial" not in dropped
+
+    def test_memory_cap_folds_old_turns(self, monkeypatch):
+        monkeypatch.setattr(server, "VOICE_MAX_SESSION_BYTES", 600)
+        replies = [make_message(f"Answer number {i}. " + "Details. " * 10) for i in range(3)]
+        use_fake_claude(monkeypatch, replies)
+        before = server.metrics.counter_value("voice_session_trims_total")
+
+        with TestClient(server.app).websocket_connect("/ws/voice/CA-memory") as ws:
+            ws.receive_json()  # greeting
+            for i in range(3):
+                ws.send_json({"type": "transcript", "content": f"Question number {i}"})
+                receive_reply(ws)
+            session = server.active_sessions["CA-memory"]
+            history, summary = list(session.conversation.messages), session.conversation.summary
+            ws.send_json({"type": "hangup"})
+
+        assert server.metrics.counter_value("voice_session_trims_total") > before
+        assert history[0]["content"] == "Question number 2"
+        assert "Question number 0" in summary
+
+    def test_global_limit_turns_calls_away(self, monkeypatch):
+        monkeypatch.setattr(server, "VOICE_MAX_ACTIVE_SESSIONS", 0)
+        client = TestClient(server.app)
+        before = server.metrics.counter_value("voice_calls_rejected_total", reason="capacity")
+
+        twiml = client.post("/voice/inbound", data={"CallSid": "CA-busy", "From": "+12055550100"}).text
+        with client.websocket_connect("/ws/voice/CA-busy") as ws:
+            busy, end = ws.receive_json(), ws.receive_json()
+
+        assert "<Say" in twiml and "<Hangup" in twiml and "<Connect" not in twiml
+        assert busy["content"] == BUSY_MESSAGE
+        assert end["type"] == "end"
+        assert server.metrics.counter_value("voice_calls_rejected_total", reason="capacity") == before + 2
+
+
+# ==============================================================================
+# LOAD TEST HARNESS TESTS
+# ==============================================================================
+
+class TestLoadTest:
+    """Test the load generator against a live server with a fake Claude"""
+
+    def test_percentile_nearest_rank(self):
+        values = [i / 100 for i in range(1, 101)]
+        assert (percentile(values, 50), percentile(values, 99)) == (0.5, 0.99)
+        assert percentile([], 95) == 0.0
+
+    def test_simulated_calls_report_latency(self, monkeypatch):
+        import uvicorn
+        from agents import llm_client
+
+        monkeypatch.setattr(llm_client, "_pool", None)
+        fake = install_fake_llm(latency=0.05, jitter=0.0, token_delay=0.0, tool_rate=0.5)
+
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        uvicorn_server = uvicorn.Server(uvicorn.Config(server.app, host="127.0.0.1", port=port, log_level="warning"))
+        thread = threading.Thread(target=uvicorn_server.run, daemon=True)
+        thread.start()
+        while not uvicorn_server.started:
+            time.sleep(0.01)
+
+        try:
+            report = asyncio.run(run_load(f"ws://127.0.0.1:{port}", calls=6, ramp=0.1, think_time=0.01, timeout=5))
+        finally:
+            uvicorn_server.should_exit = True
+            thread.join(timeout=5)
+
+        summary = report.summary()
+        assert (summary["calls"], summary["failed_calls"]) == (6, 0)
+        assert summary["turns"] == sum(len(r.turn_latency) for r in report.results) > 6
+        assert summary["turn_ms"]["p50"] > 0
+        assert fake.messages.requests > 0
+
+
+# ==============================================================================
+# TRANSCRIPT TESTS
+# ==============================================================================
+
+class TestTranscripts:
+    """Test what a voice session writes to the transcript store"""
+
+    def test_turn_with_tools_is_recorded(self, transcripts):
+        session = VoiceAISession("CA-transcript")
+        session.llm = LLMClientPool(client=FakeClient([
+            make_message("Let me check.", tool_use("check_service_area", {"state": "AL"}, "toolu_1")),
+            make_message("Yes, we cover Mobile."),
+        ]))
+
+        async def run():
+            await session.process_message("My furnace is rattling, can someone look at it?")
+            transcripts.end_call("CA-transcript")
+            await transcripts.flush()
+
+        asyncio.run(run())
+
+        events = transcripts.load("CA-transcript")
+        assert [e["type"] for e in events] == ["caller", "assistant", "tool_call", "tool_result", "assistant"]
+        assert events[0]["text"] == "My furnace is rattling, can someone look at it?"
+        assert events[2]["input"] == {"state": "AL"}
+        assert events[-1]["text"] == "Yes, we cover Mobile."
+
+    def test_fast_path_and_barge_in_are_recorded(self, transcripts):
+        session = VoiceAISession("CA-fast")
+        session.llm = LLMClientPool(client=FakeClient([]))
+
+        async def run():
+            await session.process_message("Do you service Birmingham?")
+            session._begin_turn("Can someone come out today?")
+            session.abandon_turn("Let me check")
+            transcripts.end_call("CA-fast")
+            await transcripts.flush()
+
+        asyncio.run(run())
+
+        kinds = [e["type"] for e in transcripts.load("CA-fast")]
+        assert kinds[:2] == ["caller", "assistant"]
+        assert kinds[-2:] == ["caller", "barge_in"]
+
+
+# ==============================================================================
+# DRAIN MODE TESTS
+# ==============================================================================
+
+class RecordingSocket:
+    """Collects frames; an end frame lets the call's handler exit."""
+
+    def __init__(self):
+        self.sent = []
+        self.ended = asyncio.Event()
+
+    async def send_json(self, data):
+        self.sent.append(data)
+        if data["type"] == "end":
+            self.ended.set()
+
+
+class TestDrain:
+    """Test taking a worker out of rotation"""
+
+    def test_drain_refuses_new_calls(self, worker_drain):
+        client = TestClient(server.app)
+        assert client.get("/health").status_code == 200
+
+        with TestClient(server.app) as live:
+            live.post("/admin/drain")
+            health = live.get("/health")
+            inbound = live.post("/voice/inbound", data={"CallSid": "CA-new", "From": "+12055550100"})
+
+        assert health.status_code == 503
+        assert health.json()["status"] == "draining"
+        assert inbound.status_code == 503
+
+    def test_admin_token_required_when_set(self, monkeypatch):
+        monkeypatch.setattr(server, "VOICE_ADMIN_TOKEN", "s3cret")
+        client = TestClient(server.app)
+
+        assert client.post("/admin/drain", headers={"X-Admin-Token": "wrong"}).status_code == 403
+        assert not server.worker_drain.draining
+
+    def test_calls_finish_before_flush(self):
+        flushed = []
+
+        async def run():
+            sessions = {"CA-1": VoiceAISession("CA-1")}
+            controller = DrainController(sessions, deadline=5, poll_interval=0.01)
+
+            async def flush():
+                flushed.append(set(sessions))
+
+            controller.on_drained(flush)
+            controller.begin("test")
+            await asyncio.sleep(0.05)
+            sessions.clear()  # caller hangs up
+            await controller.wait()
+            return controller.status()
+
+        status = asyncio.run(run())
+
+        assert flushed == [set()]
+        assert status["drained"] is True
+
+    def test_deadline_hands_off_live_calls(self):
+        async def run():
+            session = VoiceAISession("CA-long")
+            session.websocket = RecordingSocket()
+            session.connection_task = asyncio.create_task(session.websocket.ended.wait())
+            controller = DrainController({"CA-long": session}, deadline=0.05, poll_interval=0.01)
+
+            controller.begin("test")
+            await controller.wait()
+            return session.websocket.sent, session.connection_task.done()
+
+        sent, handler_done = asyncio.run(run())
+
+        assert sent[0]["content"] == DRAIN_MESSAGE
+        assert sent[1]["type"] == "end" and '"drain"' in sent[1]["handoffData"]
+        assert handler_done
+
+    def test_live_call_is_handed_off_through_websocket(self, worker_drain):
+        worker_drain.deadline = 0.05
+
+        with TestClient(server.app) as client:
+            with client.websocket_connect("/ws/voice/CA-drain") as ws:
+                ws.receive_json()  # greeting
+                client.post("/admin/drain")
+                handoff, end = ws.receive_json(), ws.receive_json()
+
+        assert handoff["content"] == DRAIN_MESSAGE
+        assert end["type"] == "end"
+
+    def test_handed_off_call_is_dialed_through(self, monkeypatch):
+        monkeypatch.setattr(session_limits, "VOICE_HANDOFF_NUMBER", "+12515550100")
+        monkeypatch.setattr(session_limits, "VOICE_ONCALL_NUMBER", "+12515550199")
+        client = TestClient(server.app)
+
+        office = client.post("/voice/handoff", data={"CallSid": "CA-1", "HandoffData": '{"reason": "drain"}'})
+        on_call = client.post("/voice/handoff", data={
+            "CallSid": "CA-2", "HandoffData": '{"reason": "drain", "priority": "emergency"}'
+        })
+        hung_up = client.post("/voice/handoff", data={"CallSid": "CA-3"})
+
+        assert "<Dial timeout=\"30\">+12515550100</Dial>" in office.text
+        assert "+12515550199</Dial>" in on_call.text
+        assert "<Dial" not in hung_up.text and "<Hangup" in hung_up.text
+
+    def test_handoff_without_a_line_takes_a_callback(self, monkeypatch):
+        monkeypatch.setattr(session_limits, "VOICE_HANDOFF_NUMBER", None)
+        monkeypatch.setattr(session_limits, "VOICE_ONCALL_NUMBER", None)
+
+        response = TestClient(server.app).post("/voice/handoff", data={
+            "CallSid": "CA-cb", "From": "+12055550100", "HandoffData": '{"reason": "drain"}'
+        })
+
+        assert CALLBACK_MESSAGE in response.text
+        assert "<Dial" not in response.text
+        assert crm_writer.get_crm_writer().last_seq >= 1
+
+
+# ==============================================================================
+# CALLER-ID PREFETCH TESTS
+# ==============================================================================
+
+JANE = CustomerContext(
+    phone="+12055550100",
+    contact={"id": "c1", "name": "Jane Doe", "email": "jane@example.com"},
+    work_orders=[{"id": "t1", "title": "AC not cooling", "status": "SCHEDULED", "scheduledDate": "2026-10-20"}],
+    assets=[{"id": "a1", "make": "Carrier", "model": "24ACC6", "installDate": "2019-05-01"}],
+    service_plan={"name": "Comfort Club", "status": "active", "renewalDate": "2027-01-01"}
+)
+
+
+class FakeDirectory(CustomerDirectory):
+    def __init__(self, customers, delay: float = 0.0):
+        self.customers = customers
+        self.delay = delay
+        self.lookups = []
+
+    async def lookup(self, phone):
+        self.lookups.append(phone)
+        await asyncio.sleep(self.delay)
+        return self.customers.get(phone)
+
+
+def system_text(request):
+    return "\n".join(block["text"] for block in request["system"])
+
+
+class TestPrefetch:
+    """Test looking callers up while the call connects"""
+
+    @pytest.mark.parametrize("raw,normalized", [
+        ("+12055550100", "+12055550100"),
+        ("(205) 555-0100", "+12055550100"),
+        ("1-205-555-0100", "+12055550100"),
+        ("+442071234567", "+442071234567"),
+        ("anonymous", None),
+    ])
+    def test_normalize_phone(self, raw, normalized):
+        assert normalize_phone(raw) == normalized
+
+    def test_context_lists_what_we_know(self):
+        context = JANE.as_context()
+
+        assert "Jane Doe" in context
+        assert "AC not cooling (SCHEDULED, scheduled 2026-10-20)" in context
+        assert "Carrier 24ACC6 (installed 2019-05-01)" in context
+        assert "Comfort Club (active, renews 2027-01-01)" in context
+
+    def test_lookup_by_normalized_number(self):
+        directory = FakeDirectory({"+12055550100": JANE})
+        prefetcher = CallerPrefetcher(directory)
+
+        async def run():
+            prefetcher.start("CA1", "(205) 555-0100")
+            prefetcher.start("CA2", "+12055550199")
+            return await prefetcher.take("CA1"), await prefetcher.take("CA2"), await prefetcher.take("CA3")
+
+        assert asyncio.run(run()) == (JANE, None, None)
+        assert directory.lookups == ["+12055550100", "+12055550199"]
+
+    def test_slow_lookup_is_not_waited_for(self):
+        prefetcher = CallerPrefetcher(FakeDirectory({"+12055550100": JANE}, delay=1), wait_timeout=0.05)
+
+        async def run():
+            prefetcher.start("CA1", "+12055550100")
+            return await prefetcher.take("CA1")
+
+        assert asyncio.run(run()) is None
+
+    def test_expired_lookup_is_dropped(self):
+        prefetcher = CallerPrefetcher(FakeDirectory({"+12055550100": JANE}), ttl=0)
+
+        async def run():
+            prefetcher.start("CA1", "+12055550100")
+            await asyncio.sleep(0.01)
+            return await prefetcher.take("CA1")
+
+        assert asyncio.run(run()) is None
+
+    def test_first_turn_carries_caller_context(self):
+        prefetcher = CallerPrefetcher(FakeDirectory({"+12055550100": JANE}))
+        client = FakeClient([make_message("Hi Jane, is this about the AC visit?"),
+                             make_message("Great, see you then.")])
+        session = VoiceAISession("CA-jane")
+        session.llm = LLMClientPool(client=client)
+
+        async def run():
+            prefetcher.start("CA-jane", "+12055550100")
+            session.prefetch = asyncio.create_task(prefetcher.take("CA-jane"))
+            await session.process_message("Hey, I'm calling about my appointment")
+            await session.process_message("Yes, still good for the 20th")
+
+        asyncio.run(run())
+
+        first, second = client.messages.requests
+        assert "Jane Doe" in system_text(first)
+        assert "Jane Doe" in system_text(second)
+        assert VoiceAISession.restore(session.snapshot()).caller_context == session.caller_context
+
+
+# ==============================================================================
+# SAFETY CLASSIFIER TESTS
+# ==============================================================================
+
+@pytest.fixture
+def classifier():
+    return SafetyClassifier()
+
+
+class TestSafetyClassifier:
+    """Test emergency detection ahead of the LLM"""
+
+    @pytest.mark.parametrize("utterance,emergency", [
+        ("I smell gas in the kitchen, it's really strong", "gas_leak"),
+        ("My basement is flooding, a pipe burst", "flooding"),
+        ("We have no heat and it's freezing in here", "no_heat"),
+        ("The outlet is sparking and there's smoke", "electrical_fire"),
+        ("Our walk-in cooler is down and the food is spoiling", "refrigeration_failure"),
+    ])
+    def test_emergencies_escalate(self, classifier, utterance, emergency):
+        hit = classifier.classify(utterance)
+
+        assert hit.emergency == emergency
+        assert classifier.should_escalate(hit)
+
+    @pytest.mark.parametrize("utterance", [
+        "There's no gas smell, just a weird clicking noise",
+        "I don't smell gas but the pilot light is out",
+        "It's not flooding anymore, the plumber fixed it",
+        "How much is an AC tune-up?",
+    ])
+    def test_negated_or_unrelated(self, classifier, utterance):
+        assert classifier.classify(utterance) is None
+
+    @pytest.mark.parametrize("utterance", [
+        "How much is smoke alarm testing?",
+        "Do you install smoke detectors",
+        "We need a CO detector installed",
+        "Do you guys do flood restoration?",
+        "I'd like a quote on a sump pump for flooding",
+        "Can you install a gas fireplace with flames",
+        "i quit smoking",
+    ])
+    def test_products_and_services_do_not_escalate(self, classifier, utterance):
+        assert not classifier.should_escalate(classifier.classify(utterance))
+
+    @pytest.mark.parametrize("utterance,emergency", [
+        ("Smoke is coming out of the outlet", "electrical_fire"),
+        ("Our CO alarm is going off", "gas_leak"),
+        ("There's water in the basement", "flooding"),
+    ])
+    def test_hazard_context_escalates(self, classifier, utterance, emergency):
+        hit = classifier.classify(utterance)
+
+        assert hit.emergency == emergency
+        assert classifier.should_escalate(hit)
+
+    def test_hedges_and_past_lower_confidence(self, classifier):
+        hedged = classifier.classify("Maybe a little gas smell, not sure")
+        past = classifier.classify("We had a gas leak last year, now I need a tune-up")
+
+        assert hedged.emergency == past.emergency == "gas_leak"
+        assert not classifier.should_escalate(hedged)
+        assert not classifier.should_escalate(past)
+
+    def test_negation_ends_at_clause_break(self, classifier):
+        hit = classifier.classify("No, I'm not calling about billing, I smell gas")
+
+        assert hit.emergency == "gas_leak"
+
+    def test_runs_in_microseconds(self, classifier):
+        utterance = "Hi, my basement is flooding and water is everywhere, can someone come out"
+        started = time.perf_counter()
+        for _ in range(1000):
+            classifier.classify(utterance)
+
+        assert (time.perf_counter() - started) / 1000 < 0.001
+
+    def test_escalates_before_claude_replies(self, monkeypatch):
+        escalations, dispatches = [], []
+
+        async def fake_escalate(params):
+            escalations.append(params)
+            return {"success": True}
+
+        async def fake_dispatch(technician_id, work_order_id, priority, message=None):
+            dispatches.append((technician_id, priority))
+            return {"success": True}
+
+        monkeypatch.setattr(server, "escalate_to_human", fake_escalate)
+        monkeypatch.setattr(server, "send_dispatch_notification", fake_dispatch)
+        client = use_fake_claude(monkeypatch, [
+            make_message("Please leave the house now. Help is on the way."),
+            make_message("A technician is on the way."),
+        ], delay=0.05)
+
+        with TestClient(server.app).websocket_connect("/ws/voice/CA-gas") as ws:
+            ws.receive_json()  # greeting
+            ws.send_json({"type": "transcript", "content": "I smell gas really strong in my kitchen"})
+            receive_reply(ws)
+            ws.send_json({"type": "transcript", "content": "Yes the gas smell is still there"})
+            receive_reply(ws)
+
+        assert len(escalations) == 1 and escalations[0]["priority"] == "emergency"
+        assert dispatches == [("tech-301", "emergency")]
+        assert "Gas leak" in system_text(client.messages.requests[0])
+        assert "leave the building" in system_text(client.messages.requests[0])
+
+
+# ==============================================================================
+# LATENCY BUDGET TESTS
+# ==============================================================================
+
+class TestFillers:
+    """Test filling the silence on slow turns"""
+
+    def respond(self, monkeypatch, responses, tool_seconds=0.0, delay=0.0):
+        async def slow_tool(tool_name, tool_input):
+            await asyncio.sleep(tool_seconds)
+            return {"success": True}
+
+        monkeypatch.setattr(server, "execute_tool", slow_tool)
+        monkeypatch.setattr(server, "TurnDeadline", lambda timer, send: TurnDeadline(timer, send, budget=0.05))
+        session = VoiceAISession("CA-filler")
+        session.llm = LLMClientPool(client=FakeClient(responses, delay))
+        websocket = RecordingSocket()
+
+        async def run():
+            await server.respond_to_caller(websocket, session, "Can someone come out Tuesday?", TurnTimer())
+
+        asyncio.run(run())
+        return [frame["content"] for frame in websocket.sent]
+
+    def test_slow_tool_gets_one_filler(self, monkeypatch, transcripts):
+        before = server.metrics.counter_value("voice_latency_budget_missed_total", tool="schedule_service_call")
+
+        spoken = self.respond(monkeypatch, [
+            make_message(tool_use("schedule_service_call", {"preferred_date": "Tuesday"})),
+            make_message("You're booked for Tuesday."),
+        ], tool_seconds=0.3)
+
+        assert spoken[0] == FILLERS["schedule_service_call"]
+        assert spoken.count(FILLERS["schedule_service_call"]) == 1
+        assert "You're booked for Tuesday." in spoken
+        assert server.metrics.counter_value(
+            "voice_latency_budget_missed_total", tool="schedule_service_call") == before + 1
+
+        transcripts.end_call("CA-filler")
+        asyncio.run(transcripts.flush())
+        assert "filler" in [e["type"] for e in transcripts.load("CA-filler")]
+
+    def test_slow_claude_gets_generic_filler(self, monkeypatch):
+        before = server.metrics.counter_value("voice_latency_budget_missed_total", tool="llm")
+
+        spoken = self.respond(monkeypatch, [make_message("Tuesday works.")], delay=0.1)
+
+        assert spoken[0] == "One moment."
+        assert server.metrics.counter_value("voice_latency_budget_missed_total", tool="llm") == before + 1
+
+    def test_fast_turn_has_no_filler(self, monkeypatch):
+        spoken = self.respond(monkeypatch, [make_message("Tuesday works.")])
+
+        assert "One moment." not in spoken
+        assert spoken[0].startswith("Tuesday")
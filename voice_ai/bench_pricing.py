@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Pricing Matcher Benchmark - Kipper Energy Solutions
+====================================================
+
+Compares the compiled pricing index against the original substring scan on a
+corpus of service descriptions as they come out of speech-to-text: synonyms,
+filler words, plurals and misrecognized words.
+
+Usage:
+    python bench_pricing.py
+    python bench_pricing.py --iterations 2000
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from pricing_index import PricingIndex, PRICING_TABLE
+
+# (transcribed phrase, trade Claude passed, expected service or None for no match)
+CORPUS = [
+    ("ac tune-up", "HVAC", "ac tune-up"),
+    ("tune up for my air conditioner", "HVAC", "ac tune-up"),
+    ("air conditioning maintenance", "HVAC", "ac tune-up"),
+    ("a/c tuneup", "HVAC", "ac tune-up"),
+    ("annual checkup on the ac unit", "HVAC", "ac tune-up"),
+    ("furnace tune up", "HVAC", "furnace tune-up"),
+    ("heating system maintenance", "HVAC", "furnace tune-up"),
+    ("fernace tune up", "HVAC", "furnace tune-up"),
+    ("my air conditioner is broken", "HVAC", "ac repair"),
+    ("fix my a c", "HVAC", "ac repair"),
+    ("air conditionor not working", "HVAC", "ac repair"),
+    ("new heat pump", "HVAC", "heat pump installation"),
+    ("heat pump install", "HVAC", "heat pump installation"),
+    ("install a new central air system", "HVAC", "ac installation"),
+    ("diagnostic visit", "HVAC", "service call"),
+    ("what's the trip charge", "HVAC", "service call"),
+    ("drain cleaning", "Plumbing", "drain cleaning"),
+    ("clogged drain", "Plumbing", "drain cleaning"),
+    ("clean out my drains", "Plumbing", "drain cleaning"),
+    ("drian cleaning", "Plumbing", "drain cleaning"),
+    ("hot water heater repair", "Plumbing", "water heater repair"),
+    ("water heater went out", "Plumbing", "water heater repair"),
+    ("fix the hot water tank", "Plumbing", "water heater repair"),
+    ("new hot water heater", "Plumbing", "water heater replacement"),
+    ("replace my water heater", "Plumbing", "water heater replacement"),
+    ("water heeter replacement", "Plumbing", "water heater replacement"),
+    ("leaking pipe repair", "Plumbing", "leak repair"),
+    ("fix a leak", "Plumbing", "leak repair"),
+    ("outlet repair", "Electrical", "outlet repair"),
+    ("fix a plug that's not working", "Electrical", "outlet repair"),
+    ("broken outlets", "Electrical", "outlet repair"),
+    ("panel upgrade", "Electrical", "panel upgrade"),
+    ("upgrade my breaker box", "Electrical", "panel upgrade"),
+    ("electrical panel upgraded", "Electrical", "panel upgrade"),
+    ("ev charger install", "Electrical", "ev charger installation"),
+    ("install a tesla charger", "Electrical", "ev charger installation"),
+    ("electric car charger installation", "Electrical", "ev charger installation"),
+    ("generator installation", "Electrical", "generator installation"),
+    ("backup generator put in", "Electrical", "generator installation"),
+    ("generater install", "Electrical", "generator installation"),
+    ("generac install", "Electrical", "generator installation"),
+    ("solar system inspection", "Solar", "system inspection"),
+    ("clean my solar panels", "Solar", "panel cleaning"),
+    ("solar panel cleaning", "Solar", "panel cleaning"),
+    ("replace the inverter", "Solar", "inverter replacement"),
+    ("inverter replacment", "Solar", "inverter replacement"),
+    ("powerwall install", "Solar", "battery installation"),
+    ("home battery installation", "Solar", "battery installation"),
+    ("sprinkler inspection", "Fire Protection", "sprinkler inspection"),
+    ("fire sprinkler system inspected", "Fire Protection", "sprinkler inspection"),
+    ("sprinkler inspektion", "Fire Protection", "sprinkler inspection"),
+    ("smoke alarm testing", "Fire Protection", "alarm testing"),
+    ("test the fire alarms", "Fire Protection", "alarm testing"),
+    ("fire extinguisher recharge", "Fire Protection", "extinguisher service"),
+    ("extinguisher service", "Fire Protection", "extinguisher service"),
+    # Claude passed the wrong trade
+    ("water heater replacement", "HVAC", "water heater replacement"),
+    ("panel upgrade", "Solar", "panel upgrade"),
+    # Nothing in the table fits
+    ("roof replacement", "Solar", None),
+    ("duct cleaning", "HVAC", None),
+    ("inspection", "Solar", None),
+]
+
+
+def evaluate(index: PricingIndex):
+    """Return (correct, misses) for the index over the corpus."""
+    correct, misses = 0, []
+    for phrase, trade, expected in CORPUS:
+        match = index.match(phrase, trade_hint=trade)
+        got = match.service if match else None
+        if got == expected:
+            correct += 1
+        else:
+            misses.append((phrase, expected, got))
+    return correct, misses
+
+
+def time_per_query(fn, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for phrase, trade, _ in CORPUS:
+            fn(phrase, trade)
+    return (time.perf_counter() - started) / (iterations * len(CORPUS))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pricing phrase matcher")
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    index = PricingIndex(PRICING_TABLE)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    correct, misses = evaluate(index)
+    baseline = sum(
+        1 for phrase, trade, expected in CORPUS
+        if (index.linear_scan(phrase, trade) is not None) == (expected is not None)
+        and (expected is None or index.linear_scan(phrase, trade) == PRICING_TABLE[trade].get(expected))
+    )
+
+    indexed_us = time_per_query(lambda p, t: index.match(p, trade_hint=t), args.iterations) * 1e6
+    linear_us = time_per_query(index.linear_scan, args.iterations) * 1e6
+
+    print(f"Corpus: {len(CORPUS)} phrases")
+    print(f"Index build: {build_ms:.1f} ms")
+    print(f"Substring scan accuracy: {baseline}/{len(CORPUS)} ({baseline / len(CORPUS):.0%})")
+    print(f"Pricing index accuracy:  {correct}/{len(CORPUS)} ({correct / len(CORPUS):.0%})")
+    print(f"Substring scan: {linear_us:.1f} us/query")
+    print(f"Pricing index:  {indexed_us:.1f} us/query")
+    for phrase, expected, got in misses:
+        print(f"  miss: {phrase!r} expected {expected!r} got {got!r}")
+
+
+if __name__ == "__main__":
+    main()
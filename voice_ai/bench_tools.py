@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Tool Subset Benchmark - Kipper Energy Solutions
+================================================
+
+Replays scripted calls turn by turn and compares sending every tool schema
+with sending what the server would: the subset ToolSelector picks, or every
+tool when that subset leaves the prefix under the model's cache minimum.
+Reports prompt size per request, how many distinct tool lists (cache
+prefixes) a call goes through, whether every tool Claude needed was
+selected, and what the prompts bill as once caching is counted.
+
+Offline, prompt sizes are estimated (~4 characters per token) and the
+replayed calls share one simulated prompt cache: a prefix under the cache
+minimum bills in full, a new prefix is a cache write (1.25x) and a repeated
+one a cache read (0.1x). With --live each request is sent both ways
+through the shared client pool with max_tokens=1, and the API's uncached,
+cache-write and cache-read input tokens and response times are reported;
+LLM_TRANSPORT=record / replay apply as usual.
+
+Usage:
+    python bench_tools.py
+    python bench_tools.py --live
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+from pathlib import Path
+from statistics import mean
+from typing import Dict, Any, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from server import TOOLS, TOOL_INTENTS, ALWAYS_TOOLS, TOOL_SUBSET_MIN_TOKENS, SYSTEM_PROMPT, CLAUDE_MODEL
+from agents.context_window import estimate_tokens
+from agents.llm_client import get_llm_pool, close_llm_pool
+from agents.prompt_cache import build_cached_request, TokenUsage, min_cacheable_tokens, prefix_tokens
+from agents.tool_selection import ToolSelector
+
+# Calls as (caller turn, tools Claude calls answering it)
+CONVERSATIONS = [
+    [
+        ("Hi, my AC stopped cooling last night", []),
+        ("I'm in Mobile, Alabama, 36602", ["check_service_area"]),
+        ("Can someone come out tomorrow morning?", []),
+        ("John Smith, 123 Main Street, Mobile", ["schedule_service_call"]),
+        ("No, that's everything, thanks", ["log_call_disposition"]),
+    ],
+    [
+        ("How much do you charge for a water heater replacement?", ["get_pricing_estimate"]),
+        ("Okay, and do you guys go to Savannah?", ["check_service_area"]),
+        ("Great, I'll call back when I'm ready. Bye", ["log_call_disposition"]),
+    ],
+    [
+        ("Hello?", []),
+        ("I need to talk to a real person about my bill", ["escalate_to_human"]),
+    ],
+    [
+        ("I want to get a quote on a panel upgrade", ["get_pricing_estimate"]),
+        ("Yeah, let's book it for Friday afternoon", []),
+        ("Jane Doe, 44 Peachtree Street, Atlanta, Georgia", ["check_service_area", "schedule_service_call"]),
+        ("Thank you so much", ["log_call_disposition"]),
+    ],
+    [
+        ("Sorry, wrong number", ["log_call_disposition"]),
+    ],
+    [
+        ("My walk-in cooler is warm and I've got a restaurant full of food", ["escalate_to_human"]),
+        ("It's at 210 Dauphin Street in Mobile", ["check_service_area", "schedule_service_call"]),
+        ("How much is the emergency service fee?", ["get_pricing_estimate"]),
+        ("Okay, that's it", ["log_call_disposition"]),
+    ],
+]
+
+
+def replay(conversation) -> List[Dict[str, Any]]:
+    """First request of each turn: the selected subset, and the tools the server would send."""
+    selector = ToolSelector(TOOLS, TOOL_INTENTS, always=ALWAYS_TOOLS, min_tokens=TOOL_SUBSET_MIN_TOKENS)
+    messages: List[Dict[str, Any]] = []
+    turns = []
+
+    for text, called in conversation:
+        messages.append({"role": "user", "content": text})
+
+        started = time.perf_counter()
+        sent = selector.select(messages)
+        select_us = (time.perf_counter() - started) * 1e6
+
+        turns.append({
+            "messages": list(messages),
+            "selected": [tool for tool in TOOLS if tool["name"] in selector.offered],
+            "sent": sent,
+            "select_us": select_us,
+            "missed": [name for name in called if name not in selector.offered],
+        })
+
+        if called:
+            messages.append({"role": "assistant", "content": [
+                {"type": "tool_use", "id": f"toolu_{i}", "name": name, "input": {}}
+                for i, name in enumerate(called)
+            ]})
+            messages.append({"role": "user", "content": [
+                {"type": "tool_result", "tool_use_id": f"toolu_{i}", "content": "{}"}
+                for i, _ in enumerate(called)
+            ]})
+        messages.append({"role": "assistant", "content": [{"type": "text", "text": "Okay."}]})
+
+    return turns
+
+
+def request(messages, tools) -> Dict[str, Any]:
+    return build_cached_request(model=CLAUDE_MODEL, max_tokens=1, system=SYSTEM_PROMPT,
+                                tools=tools, messages=messages)
+
+
+def evaluate():
+    """Return (turns, misses) over every scripted call."""
+    turns, misses = [], []
+    for conversation in CONVERSATIONS:
+        replayed = replay(conversation)
+        turns.append(replayed)
+        for (text, _), turn in zip(conversation, replayed):
+            misses.extend((text, name) for name in turn["missed"])
+    return turns, misses
+
+
+LABELS = {"all tools": lambda turn: TOOLS, "subset": lambda turn: turn["selected"], "as sent": lambda turn: turn["sent"]}
+
+
+def simulate_billing(turns, tools_for) -> TokenUsage:
+    """Estimated usage of the replayed calls in order, sharing one prompt cache."""
+    minimum = min_cacheable_tokens(CLAUDE_MODEL)
+    cached = set()
+    usage = TokenUsage()
+    for call in turns:
+        for turn in call:
+            tools = tools_for(turn)
+            total = estimate_tokens([request(turn["messages"], tools)])
+            prefix = prefix_tokens(SYSTEM_PROMPT, tools)
+            key = tuple(tool["name"] for tool in tools)
+            usage.requests += 1
+            if prefix < minimum:
+                usage.input_tokens += total
+                continue
+            usage.input_tokens += total - prefix
+            if key in cached:
+                usage.cache_read_input_tokens += prefix
+            else:
+                cached.add(key)
+                usage.cache_creation_input_tokens += prefix
+    return usage
+
+
+async def measure_live(turns) -> Dict[str, Dict[str, float]]:
+    """API input token usage and response time per request, for each way of choosing tools."""
+    pool = get_llm_pool()
+    usage = {label: TokenUsage() for label in LABELS}
+    seconds = {label: [] for label in LABELS}
+    try:
+        for call in turns:
+            for turn in call:
+                for label, tools_for in LABELS.items():
+                    started = time.perf_counter()
+                    response = await pool.create(**request(turn["messages"], tools_for(turn)))
+                    seconds[label].append(time.perf_counter() - started)
+                    usage[label].add(response.usage)
+    finally:
+        await close_llm_pool()
+    return {label: {"usage": usage[label], "seconds": mean(seconds[label])} for label in LABELS}
+
+
+def print_usage(prefix: str, usage: TokenUsage):
+    n = usage.requests
+    print(f"{prefix} {usage.input_tokens / n:.0f} uncached + {usage.cache_creation_input_tokens / n:.0f} cache-write "
+          f"+ {usage.cache_read_input_tokens / n:.0f} cache-read tokens/request "
+          f"= {usage.billed_input_tokens / n:.0f} billed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-turn tool subsetting")
+    parser.add_argument("--live", action="store_true", help="Send each request to Claude both ways")
+    args = parser.parse_args()
+
+    turns, misses = evaluate()
+    flat = [turn for call in turns for turn in call]
+
+    full_tools = estimate_tokens(TOOLS)
+    subset_tools = mean(estimate_tokens(turn["selected"]) for turn in flat)
+    full_prompt = mean(estimate_tokens([request(t["messages"], TOOLS)]) for t in flat)
+    subset_prompt = mean(estimate_tokens([request(t["messages"], t["selected"])]) for t in flat)
+    prefixes = mean(len({tuple(tool["name"] for tool in t["selected"]) for t in call}) for call in turns)
+    fallbacks = sum(t["sent"] is TOOLS and t["selected"] != TOOLS for t in flat)
+
+    print(f"Replayed: {len(CONVERSATIONS)} calls, {len(flat)} turns")
+    print(f"Tool schemas:   {full_tools} -> {subset_tools:.0f} est. tokens/request")
+    print(f"Whole request:  {full_prompt:.0f} -> {subset_prompt:.0f} est. tokens/request "
+          f"({1 - subset_prompt / full_prompt:.0%} smaller)")
+    print(f"Tool lists per call: {prefixes:.1f} (1 with every tool)")
+    print(f"Cache minimum: {min_cacheable_tokens(CLAUDE_MODEL)} tokens; "
+          f"all tools + system {prefix_tokens(SYSTEM_PROMPT, TOOLS)} est., "
+          f"subsets fell back to every tool on {fallbacks} of {len(flat)} turns")
+    for label, tools_for in LABELS.items():
+        print_usage(f"Billed, {label + ':':10}", simulate_billing(turns, tools_for))
+    print(f"Selection: {mean(t['select_us'] for t in flat):.1f} us/turn")
+    print(f"Needed tools not selected: {len(misses)}")
+    for text, name in misses:
+        print(f"  miss: {name} for {text!r}")
+
+    if args.live:
+        live = asyncio.run(measure_live(turns))
+        for label, result in live.items():
+            print_usage(f"Live {label + ':':10}", result["usage"])
+            print(f"{'':16}{result['seconds'] * 1000:.0f} ms/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,508 @@
+#!/usr/bin/env python3
+"""
+Call Analytics - Kipper Energy Solutions
+=========================================
+
+Rolling call-lifecycle statistics fed by Twilio status callbacks
+(/voice/status) and the dispositions Claude logs during calls.
+
+- ingest() is a single deque append, so a burst of webhooks costs the
+  handler nothing; a background task drains the deque every
+  ANALYTICS_INTERVAL_SECONDS and does all the aggregation
+- Events land in one-minute buckets kept for ANALYTICS_RETENTION_HOURS;
+  the 5m / 1h / 24h windows are merged from buckets on request
+- Per window: calls per status, call duration and ring-to-answer
+  histograms, peak concurrent (answered, not yet ended) calls, and
+  finished calls by disposition
+- Buckets and calls still in progress are snapshotted to
+  this worker's snapshot file every ANALYTICS_SNAPSHOT_SECONDS and reloaded
+  on start, so a restart doesn't zero the dashboards
+
+A call's callbacks and its disposition can reach different workers, so
+the workers share their events through one SQLite log (ANALYTICS_DB_PATH,
+WAL mode, on the host's local disk). Each pass, a worker appends the events
+it received and folds in everyone's events after its cursor, so every
+worker reports the same statistics; don't sum the endpoint across workers.
+Callbacks arriving after a call's final status (another worker's batch
+landed late) don't reopen it.
+
+Each worker snapshots to its own file (call_analytics.<pid>.json), with its
+cursor into the log. A restarted worker has a new pid, so on start it takes
+over the snapshot of one worker that has exited.
+
+Configuration (environment):
+- ANALYTICS_DB_PATH: Event log shared by the workers on the host (default call_analytics.db);
+  empty keeps statistics per worker
+- ANALYTICS_SNAPSHOT_PATH: Snapshot file name, before the pid is added (default call_analytics.json);
+  empty disables snapshots
+- ANALYTICS_SNAPSHOT_SECONDS: Snapshot interval (default 60)
+- ANALYTICS_INTERVAL_SECONDS: Aggregation interval (default 1.0)
+- ANALYTICS_RETENTION_HOURS: Hours of one-minute buckets kept (default 24)
+"""
+
+import os
+import re
+import json
+import time
+import asyncio
+import logging
+import sqlite3
+import threading
+from bisect import bisect_left
+from collections import deque
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+from voice_metrics import metrics
+
+logger = logging.getLogger("voice_ai")
+
+ANALYTICS_DB_PATH = os.getenv("ANALYTICS_DB_PATH", "call_analytics.db")
+ANALYTICS_SNAPSHOT_PATH = os.getenv("ANALYTICS_SNAPSHOT_PATH", "call_analytics.json")
+ANALYTICS_SNAPSHOT_SECONDS = float(os.getenv("ANALYTICS_SNAPSHOT_SECONDS", "60"))
+ANALYTICS_INTERVAL_SECONDS = float(os.getenv("ANALYTICS_INTERVAL_SECONDS", "1.0"))
+ANALYTICS_RETENTION_HOURS = int(os.getenv("ANALYTICS_RETENTION_HOURS", "24"))
+
+WINDOWS = {"5m": 5, "1h": 60, "24h": 24 * 60}
+
+# Histogram upper bounds (seconds); the last bucket is open-ended
+DURATION_BOUNDS = [15, 30, 60, 120, 300, 600, 1200, 1800]
+RING_BOUNDS = [1, 2, 5, 10, 20, 30, 60]
+
+FINAL_STATUSES = {"completed", "busy", "no-answer", "failed", "canceled"}
+
+# Calls with no status for this long are assumed to have ended unreported
+OPEN_CALL_TTL = 4 * 3600
+
+PRUNE_INTERVAL_SECONDS = 60
+
+metrics.describe("voice_call_status_total", "Twilio call status callbacks, by status")
+
+
+def _histogram(bounds: List[int]) -> Dict[str, Any]:
+    return {"counts": [0] * (len(bounds) + 1), "sum": 0.0}
+
+
+def _observe(histogram: Dict[str, Any], bounds: List[int], value: float):
+    histogram["counts"][bisect_left(bounds, value)] += 1
+    histogram["sum"] += value
+
+
+def _merge_histograms(target: Dict[str, Any], source: Dict[str, Any]):
+    target["counts"] = [a + b for a, b in zip(target["counts"], source["counts"])]
+    target["sum"] += source["sum"]
+
+
+def _histogram_summary(histogram: Dict[str, Any], bounds: List[int]) -> Dict[str, Any]:
+    count = sum(histogram["counts"])
+    labels = [f"le_{b}" for b in bounds] + ["inf"]
+    return {
+        "count": count,
+        "mean": round(histogram["sum"] / count, 2) if count else None,
+        "buckets": dict(zip(labels, histogram["counts"]))
+    }
+
+
+def _new_bucket() -> Dict[str, Any]:
+    return {
+        "statuses": {},
+        "duration": _histogram(DURATION_BOUNDS),
+        "ring_to_answer": _histogram(RING_BOUNDS),
+        "peak_concurrent": 0,
+        "dispositions": {}
+    }
+
+
+def _event_time(fields: Dict[str, Any], received: float) -> float:
+    """Twilio's own timestamp for the event when present (RFC 2822), else arrival time."""
+    stamp = fields.get("Timestamp")
+    if stamp:
+        try:
+            return parsedate_to_datetime(stamp).timestamp()
+        except (TypeError, ValueError):
+            pass
+    return received
+
+def worker_snapshot_path(path: str = ANALYTICS_SNAPSHOT_PATH, pid: Optional[int] = None) -> str:
+    """This worker's snapshot: call_analytics.json -> call_analytics.<pid>.json."""
+    root, ext = os.path.splitext(path)
+    return f"{root}.{os.getpid() if pid is None else pid}{ext}"
+
+
+def _pid_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+# =============================================================================
+# Shared Event Log
+# =============================================================================
+
+EVENTS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS analytics_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    received REAL NOT NULL,
+    fields TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS analytics_events_received ON analytics_events (received);
+"""
+
+
+class SharedEventLog:
+    """
+    Status and disposition events from every worker on the host, in one
+    SQLite table. Ids grow in commit order, so a worker's cursor never
+    skips a sibling's events.
+    """
+
+    def __init__(self, path: str = ANALYTICS_DB_PATH, retention_seconds: float = ANALYTICS_RETENTION_HOURS * 3600):
+        self.path = path
+        self.retention_seconds = retention_seconds
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pruned = 0.0
+
+    def _connection(self) -> sqlite3.Connection:
+        # Opened on first use so importing the server doesn't create the file
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=5)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(EVENTS_SCHEMA)
+        return self._conn
+
+    def exchange(self, events: List[tuple], after: int) -> Tuple[List[tuple], int]:
+        """Append this worker's events, then return every worker's events after ``after`` and the new cursor."""
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            if events:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    conn.executemany(
+                        "INSERT INTO analytics_events (kind, received, fields) VALUES (?, ?, ?)",
+                        [(kind, received, json.dumps(fields)) for kind, received, fields in events]
+                    )
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+            rows = conn.execute(
+                "SELECT id, kind, received, fields FROM analytics_events WHERE id > ? ORDER BY id", (after,)
+            ).fetchall()
+            if now - self._pruned >= PRUNE_INTERVAL_SECONDS:
+                self._pruned = now
+                conn.execute("DELETE FROM analytics_events WHERE received < ?", (now - self.retention_seconds,))
+
+        shared = [(kind, received, json.loads(fields)) for _, kind, received, fields in rows]
+        return shared, rows[-1][0] if rows else after
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+# =============================================================================
+# Analytics
+# =============================================================================
+
+class CallAnalytics:
+    """In-process aggregation of call status events."""
+
+    def __init__(
+        self,
+        snapshot_path: Optional[str] = None,
+        snapshot_seconds: float = ANALYTICS_SNAPSHOT_SECONDS,
+        interval: float = ANALYTICS_INTERVAL_SECONDS,
+        retention_hours: int = ANALYTICS_RETENTION_HOURS,
+        db_path: Optional[str] = None
+    ):
+        # With no snapshot path given, use this worker's snapshot and the shared event log
+        if snapshot_path is None:
+            db_path = ANALYTICS_DB_PATH if db_path is None else db_path
+        if snapshot_path is None and ANALYTICS_SNAPSHOT_PATH:
+            snapshot_path = worker_snapshot_path(ANALYTICS_SNAPSHOT_PATH)
+            self._orphans_of: Optional[str] = ANALYTICS_SNAPSHOT_PATH
+        else:
+            self._orphans_of = None
+        self.snapshot_path = Path(snapshot_path) if snapshot_path else None
+        self.shared = SharedEventLog(db_path, retention_hours * 3600) if db_path else None
+        self.snapshot_seconds = snapshot_seconds
+        self.interval = interval
+        self.retention_minutes = retention_hours * 60
+
+        # Raw events from webhooks; appended by handlers, drained by the aggregator
+        self._events: deque = deque()
+
+        # Aggregated state, touched only by the aggregator
+        self.buckets: Dict[int, Dict[str, Any]] = {}
+        self.open_calls: Dict[str, Dict[str, Any]] = {}
+        self.ended: Dict[str, float] = {}  # final status time of recently ended calls
+        self.high_water = 0
+        self._cursor = 0  # last shared event folded in
+        self._refreshing = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    # -------------------------------------------------------------------------
+    # Ingestion (request path)
+    # -------------------------------------------------------------------------
+
+    def ingest(self, fields: Dict[str, Any]):
+        """Queue a Twilio status callback (its form fields) for aggregation."""
+        self._events.append(("status", time.time(), dict(fields)))
+
+    def note_disposition(self, call_sid: str, disposition: str):
+        """Queue a disposition logged during a call, to join with its final status."""
+        self._events.append(("disposition", time.time(), {"CallSid": call_sid, "disposition": disposition}))
+
+    # -------------------------------------------------------------------------
+    # Aggregation (background)
+    # -------------------------------------------------------------------------
+
+    def _bucket(self, at: float) -> Dict[str, Any]:
+        minute = int(at // 60)
+        if minute not in self.buckets:
+            self.buckets[minute] = _new_bucket()
+        return self.buckets[minute]
+
+    def _take_queued(self) -> List[tuple]:
+        events = []
+        while self._events:
+            event = self._events.popleft()
+            if event[0] == "status":
+                metrics.inc("voice_call_status_total", status=event[2].get("CallStatus") or "unknown")
+            events.append(event)
+        return events
+
+    def _fold(self, events: List[tuple]) -> int:
+        for kind, received, fields in events:
+            if kind == "status":
+                self._apply_status(fields, _event_time(fields, received))
+            else:
+                self._apply_disposition(fields, received)
+
+        self._expire(time.time())
+        return len(events)
+
+    def aggregate(self) -> int:
+        """
+        Fold every queued event (and, with a shared log, every worker's new
+        events) into the buckets; returns how many were processed. Reads
+        the shared log on the calling thread; on the event loop use refresh().
+        """
+        events = self._take_queued()
+        if self.shared is not None:
+            events, self._cursor = self.shared.exchange(events, self._cursor)
+        return self._fold(events)
+
+    async def refresh(self) -> int:
+        """aggregate(), with the shared log read and written in a worker thread."""
+        async with self._refreshing:
+            events = self._take_queued()
+            if self.shared is not None:
+                try:
+                    events, self._cursor = await asyncio.to_thread(self.shared.exchange, events, self._cursor)
+                except Exception:
+                    self._events.extendleft(reversed(events))  # try them again next pass
+                    raise
+            return self._fold(events)
+
+    def _apply_status(self, fields: Dict[str, Any], at: float):
+        call_sid = fields.get("CallSid")
+        status = fields.get("CallStatus") or "unknown"
+        bucket = self._bucket(at)
+        bucket["statuses"][status] = bucket["statuses"].get(status, 0) + 1
+        if not call_sid or call_sid in self.ended:
+            return  # late callbacks for a call already over don't reopen it
+
+        call = self.open_calls.setdefault(call_sid, {"seen": at})
+        call["seen"] = at
+
+        if status == "ringing" and "ringing" not in call:
+            call["ringing"] = at
+            if "answered" in call:
+                # Another worker's answer callback was folded in first
+                _observe(bucket["ring_to_answer"], RING_BOUNDS, max(0.0, call["answered"] - at))
+        elif status == "in-progress" and "answered" not in call:
+            call["answered"] = at
+            if "ringing" in call:
+                _observe(bucket["ring_to_answer"], RING_BOUNDS, max(0.0, at - call["ringing"]))
+            self._update_concurrency(bucket)
+        elif status in FINAL_STATUSES:
+            self.open_calls.pop(call_sid, None)
+            self.ended[call_sid] = at
+
+            duration = fields.get("CallDuration")
+            if duration is not None:
+                _observe(bucket["duration"], DURATION_BOUNDS, float(duration))
+            elif "answered" in call:
+                _observe(bucket["duration"], DURATION_BOUNDS, max(0.0, at - call["answered"]))
+
+            disposition = call.get("disposition", "none")
+            bucket["dispositions"][disposition] = bucket["dispositions"].get(disposition, 0) + 1
+
+    def _apply_disposition(self, fields: Dict[str, Any], at: float):
+        call = self.open_calls.get(fields["CallSid"])
+        if call is not None:
+            call["disposition"] = fields["disposition"]
+            return
+        # Logged after (or without) a final status; count it on its own
+        bucket = self._bucket(at)
+        disposition = fields["disposition"]
+        bucket["dispositions"][disposition] = bucket["dispositions"].get(disposition, 0) + 1
+
+    def _update_concurrency(self, bucket: Dict[str, Any]):
+        concurrent = self.concurrent
+        bucket["peak_concurrent"] = max(bucket["peak_concurrent"], concurrent)
+        self.high_water = max(self.high_water, concurrent)
+
+    def _expire(self, now: float):
+        oldest = int(now // 60) - self.retention_minutes
+        for minute in [m for m in self.buckets if m <= oldest]:
+            del self.buckets[minute]
+        for call_sid in [sid for sid, call in self.open_calls.items() if now - call["seen"] > OPEN_CALL_TTL]:
+            del self.open_calls[call_sid]
+        for call_sid in [sid for sid, at in self.ended.items() if now - at > OPEN_CALL_TTL]:
+            del self.ended[call_sid]
+
+    @property
+    def concurrent(self) -> int:
+        return sum(1 for call in self.open_calls.values() if "answered" in call)
+
+    # -------------------------------------------------------------------------
+    # Reporting
+    # -------------------------------------------------------------------------
+
+    def window(self, minutes: int, now: Optional[float] = None) -> Dict[str, Any]:
+        """Statistics for the last `minutes` minutes (including the current one)."""
+        current = int((now or time.time()) // 60)
+        merged = _new_bucket()
+        for minute, bucket in self.buckets.items():
+            if minute <= current - minutes:
+                continue
+            for status, count in bucket["statuses"].items():
+                merged["statuses"][status] = merged["statuses"].get(status, 0) + count
+            for disposition, count in bucket["dispositions"].items():
+                merged["dispositions"][disposition] = merged["dispositions"].get(disposition, 0) + count
+            _merge_histograms(merged["duration"], bucket["duration"])
+            _merge_histograms(merged["ring_to_answer"], bucket["ring_to_answer"])
+            merged["peak_concurrent"] = max(merged["peak_concurrent"], bucket["peak_concurrent"])
+
+        return {
+            "calls_by_status": merged["statuses"],
+            "duration_seconds": _histogram_summary(merged["duration"], DURATION_BOUNDS),
+            "ring_to_answer_seconds": _histogram_summary(merged["ring_to_answer"], RING_BOUNDS),
+            "peak_concurrent": merged["peak_concurrent"],
+            "dispositions": merged["dispositions"]
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "windows": {
+                name: self.window(minutes)
+                for name, minutes in WINDOWS.items() if minutes <= self.retention_minutes
+            },
+            "concurrent": self.concurrent,
+            "concurrent_high_water": self.high_water,
+            "pending_events": len(self._events)
+        }
+
+    # -------------------------------------------------------------------------
+    # Snapshots
+    # -------------------------------------------------------------------------
+
+    def _state(self) -> Dict[str, Any]:
+        return {
+            "buckets": {str(minute): bucket for minute, bucket in self.buckets.items()},
+            "open_calls": self.open_calls,
+            "ended": self.ended,
+            "high_water": self.high_water,
+            "cursor": self._cursor
+        }
+
+    def _write_snapshot(self, state: Dict[str, Any]):
+        self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.snapshot_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(state))
+        os.replace(tmp, self.snapshot_path)
+
+    async def snapshot(self):
+        if self.snapshot_path is None:
+            return
+        state = json.loads(json.dumps(self._state()))  # copy before leaving the loop thread
+        try:
+            await asyncio.to_thread(self._write_snapshot, state)
+        except OSError as e:
+            logger.error(f"Call analytics snapshot failed: {e}")
+
+    def _adopt_orphan(self, base_path: str):
+        """Take over the snapshot of one worker that is gone (this worker's restarted self, usually)."""
+        base = Path(base_path)
+        pattern = re.compile(rf"{re.escape(base.stem)}\.(\d+){re.escape(base.suffix)}$")
+        for path in sorted(base.parent.glob(f"{base.stem}.*{base.suffix}")):
+            match = pattern.match(path.name)
+            if not match or int(match.group(1)) == os.getpid() or _pid_running(int(match.group(1))):
+                continue
+            try:
+                os.replace(path, self.snapshot_path)  # only one starting worker wins the rename
+            except FileNotFoundError:
+                continue
+            logger.info(f"Adopted call analytics snapshot of exited worker {match.group(1)}")
+            return
+
+    def load_snapshot(self):
+        if self.snapshot_path is None:
+            return
+        if self._orphans_of and not self.snapshot_path.exists():
+            self._adopt_orphan(self._orphans_of)
+        if not self.snapshot_path.exists():
+            return
+        try:
+            state = json.loads(self.snapshot_path.read_text())
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable call analytics snapshot: {e}")
+            return
+        self.buckets = {int(minute): bucket for minute, bucket in state.get("buckets", {}).items()}
+        self.open_calls = state.get("open_calls", {})
+        self.ended = state.get("ended", {})
+        self.high_water = state.get("high_water", 0)
+        self._cursor = state.get("cursor", 0)
+        self._expire(time.time())
+
+    # -------------------------------------------------------------------------
+    # Lifecycle
+    # -------------------------------------------------------------------------
+
+    async def _run(self):
+        last_snapshot = time.monotonic()
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.refresh()
+                if time.monotonic() - last_snapshot >= self.snapshot_seconds:
+                    last_snapshot = time.monotonic()
+                    await self.snapshot()
+            except Exception as e:
+                logger.error(f"Call analytics aggregation failed: {e}")
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self.load_snapshot()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.refresh()
+        await self.snapshot()
+        if self.shared is not None:
+            self.shared.close()
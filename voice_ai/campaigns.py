@@ -0,0 +1,516 @@
+#!/usr/bin/env python3
+"""
+Outbound Call Campaigns - Kipper Energy Solutions
+==================================================
+
+Dials large target lists (PM reminders, collections) through Twilio without
+blocking the voice server:
+
+- Targets are queued in SQLite, so a restart picks up where it left off
+- A small pool of worker tasks places calls, with the blocking Twilio SDK
+  running in a thread
+- Calls per second and the cap on live calls are both enforced through the
+  database, so they hold across every server process sharing it: each dial
+  claims the next free start time from a pacing row, and live calls are
+  counted before a target is claimed
+- Busy / no-answer outcomes from the status callback are retried with
+  exponential backoff up to CAMPAIGN_MAX_ATTEMPTS
+- Progress is counted per campaign and exported as metrics
+
+The Dialer is the only piece that talks to Twilio. Point TwilioDialer at a
+local stand-in with TWILIO_API_BASE_URL, or pass a different Dialer in tests.
+
+Configuration (environment):
+- CAMPAIGN_DB_PATH: SQLite queue file (default campaigns.db)
+- CAMPAIGN_CALLS_PER_SECOND: Outbound calls started per second, across all server processes (default 1)
+- CAMPAIGN_MAX_LIVE_CALLS: Calls ringing or in progress at once (default 20)
+- CAMPAIGN_WORKERS: Dialing tasks (default 4)
+- CAMPAIGN_MAX_ATTEMPTS: Dial attempts per target (default 3)
+- CAMPAIGN_RETRY_SECONDS: Backoff before the first retry, doubling after (default 300)
+- CAMPAIGN_CALL_TIMEOUT_SECONDS: Live calls with no final status after this are retried (default 900)
+- CAMPAIGN_CLAIM_TIMEOUT_SECONDS: Targets claimed but not dialed after this go back in the queue,
+  whichever process claimed them (default 120)
+"""
+
+import os
+import time
+import asyncio
+import sqlite3
+import logging
+import threading
+from urllib.parse import urlencode
+from dataclasses import dataclass
+from typing import Dict, Any, Iterable, List, Optional, Set
+
+from voice_metrics import metrics
+
+logger = logging.getLogger("voice_ai")
+
+CAMPAIGN_DB_PATH = os.getenv("CAMPAIGN_DB_PATH", "campaigns.db")
+CAMPAIGN_CALLS_PER_SECOND = float(os.getenv("CAMPAIGN_CALLS_PER_SECOND", "1"))
+CAMPAIGN_MAX_LIVE_CALLS = int(os.getenv("CAMPAIGN_MAX_LIVE_CALLS", "20"))
+CAMPAIGN_WORKERS = int(os.getenv("CAMPAIGN_WORKERS", "4"))
+CAMPAIGN_MAX_ATTEMPTS = int(os.getenv("CAMPAIGN_MAX_ATTEMPTS", "3"))
+CAMPAIGN_RETRY_SECONDS = float(os.getenv("CAMPAIGN_RETRY_SECONDS", "300"))
+CAMPAIGN_CALL_TIMEOUT_SECONDS = float(os.getenv("CAMPAIGN_CALL_TIMEOUT_SECONDS", "900"))
+CAMPAIGN_CLAIM_TIMEOUT_SECONDS = float(os.getenv("CAMPAIGN_CLAIM_TIMEOUT_SECONDS", "120"))
+TWILIO_API_BASE_URL = os.getenv("TWILIO_API_BASE_URL")
+
+POLL_SECONDS = 0.5
+REAP_INTERVAL_SECONDS = 30
+
+# Final CallStatus values from Twilio's status callback
+RETRY_STATUSES = {"busy", "no-answer"}
+FAILED_STATUSES = {"failed", "canceled"}
+
+metrics.describe("voice_campaign_calls_total", "Outbound campaign call attempts, by result")
+metrics.describe("voice_campaign_live_calls", "Campaign calls currently dialing or in progress")
+
+# =============================================================================
+# Persistent Queue
+# =============================================================================
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS campaigns (
+    id INTEGER PRIMARY KEY, name TEXT NOT NULL, reason TEXT NOT NULL, created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS campaign_targets (
+    id INTEGER PRIMARY KEY,
+    campaign_id INTEGER NOT NULL REFERENCES campaigns (id),
+    to_number TEXT NOT NULL,
+    customer_name TEXT,
+    reason TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    call_sid TEXT,
+    claimed_by TEXT,
+    last_result TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS campaign_targets_due ON campaign_targets (status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS campaign_targets_call ON campaign_targets (call_sid);
+CREATE TABLE IF NOT EXISTS dial_pacing (
+    id INTEGER PRIMARY KEY CHECK (id = 1), next_slot_at REAL NOT NULL
+);
+INSERT OR IGNORE INTO dial_pacing (id, next_slot_at) VALUES (1, 0);
+"""
+
+
+@dataclass
+class CampaignTarget:
+    """One number to call, as claimed by a dialing worker."""
+
+    id: int
+    campaign_id: int
+    to_number: str
+    customer_name: Optional[str]
+    reason: str
+    attempts: int
+
+
+class CampaignStore:
+    """
+    SQLite-backed campaign queue.
+
+    Same access pattern as the SQLite session store: one WAL connection,
+    serialized with a lock, with queries run in a worker thread. Claims
+    are tagged with ``worker`` (the pid by default) so a process only
+    takes back its own in-flight targets, or ones gone stale.
+    """
+
+    def __init__(self, path: str = CAMPAIGN_DB_PATH, worker: Optional[str] = None):
+        self.path = path
+        self.worker = worker or str(os.getpid())
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # Opened on first use so importing the server doesn't create the file
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=5)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(campaign_targets)")}
+            if "claimed_by" not in columns:
+                try:
+                    self._conn.execute("ALTER TABLE campaign_targets ADD COLUMN claimed_by TEXT")
+                except sqlite3.OperationalError:
+                    pass  # another process added it first
+        return self._conn
+
+    def _execute(self, sql: str, params: tuple = ()) -> List[tuple]:
+        with self._lock:
+            return self._connection().execute(sql, params).fetchall()
+
+    def _create(self, name: str, reason: str, targets: List[Dict[str, Any]]) -> int:
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN")
+            try:
+                campaign_id = conn.execute(
+                    "INSERT INTO campaigns (name, reason, created_at) VALUES (?, ?, ?)", (name, reason, now)
+                ).lastrowid
+                conn.executemany(
+                    "INSERT INTO campaign_targets (campaign_id, to_number, customer_name, reason, "
+                    "next_attempt_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(campaign_id, t["to_number"], t.get("customer_name"), t.get("reason") or reason, now, now)
+                     for t in targets]
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return campaign_id
+
+    async def create(self, name: str, reason: str, targets: List[Dict[str, Any]]) -> int:
+        """Queue a campaign; each target needs ``to_number``."""
+        return await asyncio.to_thread(self._create, name, reason, targets)
+
+    async def claim(self, max_live_calls: int) -> Optional[CampaignTarget]:
+        """Atomically take the next due target, unless the live-call cap is reached."""
+        now = time.time()
+        rows = await asyncio.to_thread(
+            self._execute,
+            "UPDATE campaign_targets SET status = 'dialing', attempts = attempts + 1, claimed_by = ?, "
+            "updated_at = ? "
+            "WHERE id = (SELECT id FROM campaign_targets WHERE status = 'queued' AND next_attempt_at <= ? "
+            "            ORDER BY next_attempt_at, id LIMIT 1) "
+            "AND (SELECT COUNT(*) FROM campaign_targets WHERE status IN ('dialing', 'live')) < ? "
+            "RETURNING id, campaign_id, to_number, customer_name, reason, attempts",
+            (self.worker, now, now, max_live_calls)
+        )
+        return CampaignTarget(*rows[0]) if rows else None
+
+    async def reserve_dial_slot(self, interval: float) -> float:
+        """
+        Atomically claim the next dial start time (epoch seconds).
+
+        Slots are ``interval`` apart across every process using the database;
+        a slot in the past means the caller may dial now.
+        """
+        rows = await asyncio.to_thread(
+            self._execute,
+            "UPDATE dial_pacing SET next_slot_at = MAX(next_slot_at, ?) + ? WHERE id = 1 "
+            "RETURNING next_slot_at - ?",
+            (time.time(), interval, interval)
+        )
+        return rows[0][0]
+
+    async def mark_live(self, target_id: int, call_sid: str):
+        await asyncio.to_thread(
+            self._execute,
+            "UPDATE campaign_targets SET status = 'live', call_sid = ?, updated_at = ? WHERE id = ?",
+            (call_sid, time.time(), target_id)
+        )
+
+    async def finish(self, target_id: int, status: str, result: str, next_attempt_at: Optional[float] = None):
+        """Record an attempt's outcome: 'queued' for a retry, or 'completed' / 'failed'."""
+        now = time.time()
+        await asyncio.to_thread(
+            self._execute,
+            "UPDATE campaign_targets SET status = ?, last_result = ?, next_attempt_at = ?, updated_at = ? "
+            "WHERE id = ?",
+            (status, result, next_attempt_at or now, now, target_id)
+        )
+
+    async def find_call(self, call_sid: str) -> Optional[tuple]:
+        """(target id, attempts, status) for a dialed call."""
+        rows = await asyncio.to_thread(
+            self._execute,
+            "SELECT id, attempts, status FROM campaign_targets WHERE call_sid = ?", (call_sid,)
+        )
+        return rows[0] if rows else None
+
+    async def stale_calls(self, older_than: float) -> List[tuple]:
+        """(target id, attempts) of live calls with no final status since ``older_than``."""
+        return await asyncio.to_thread(
+            self._execute,
+            "SELECT id, attempts FROM campaign_targets WHERE status = 'live' AND updated_at < ?", (older_than,)
+        )
+
+    async def requeue_interrupted(self, older_than: float, own: bool = False,
+                                  in_flight: Iterable[int] = ()) -> int:
+        """
+        Put targets claimed but never dialed back in the queue.
+
+        Covers claims by any process not touched since ``older_than`` and,
+        with ``own``, every claim recorded under this worker's name (only
+        safe at start, when they are left over from a previous run). Targets
+        in ``in_flight`` are being paced or dialed right now and are skipped.
+        Returns how many were requeued.
+        """
+        skip = list(in_flight)
+        sql = ("UPDATE campaign_targets SET status = 'queued', attempts = attempts - 1, claimed_by = NULL "
+               "WHERE status = 'dialing' AND call_sid IS NULL AND (updated_at < ? OR (? AND claimed_by = ?))")
+        if skip:
+            sql += f" AND id NOT IN ({', '.join('?' * len(skip))})"
+        rows = await asyncio.to_thread(
+            self._execute, sql + " RETURNING id", (older_than, own, self.worker, *skip)
+        )
+        return len(rows)
+
+    async def live_calls(self) -> int:
+        rows = await asyncio.to_thread(
+            self._execute, "SELECT COUNT(*) FROM campaign_targets WHERE status IN ('dialing', 'live')"
+        )
+        return rows[0][0]
+
+    async def progress(self, campaign_id: int) -> Optional[Dict[str, Any]]:
+        campaign = await asyncio.to_thread(
+            self._execute, "SELECT name, reason, created_at FROM campaigns WHERE id = ?", (campaign_id,)
+        )
+        if not campaign:
+            return None
+        rows = await asyncio.to_thread(
+            self._execute,
+            "SELECT status, COUNT(*), SUM(attempts) FROM campaign_targets WHERE campaign_id = ? GROUP BY status",
+            (campaign_id,)
+        )
+        counts = {status: 0 for status in ("queued", "dialing", "live", "completed", "failed")}
+        attempts = 0
+        for status, count, status_attempts in rows:
+            counts[status] = count
+            attempts += status_attempts or 0
+        total = sum(counts.values())
+        name, reason, created_at = campaign[0]
+        return {
+            "campaign_id": campaign_id,
+            "name": name,
+            "reason": reason,
+            "total": total,
+            **counts,
+            "attempts": attempts,
+            "done": counts["completed"] + counts["failed"] == total
+        }
+
+    async def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+# =============================================================================
+# Dialers
+# =============================================================================
+
+class Dialer:
+    """Places one outbound call and returns its CallSid."""
+
+    configured = True
+
+    async def dial(self, to_number: str, reason: str, customer_name: Optional[str] = None) -> str:
+        raise NotImplementedError
+
+
+class TwilioDialer(Dialer):
+    """Twilio REST dialer sharing one client; the blocking SDK call runs in a thread."""
+
+    def __init__(self, account_sid: Optional[str] = None, auth_token: Optional[str] = None,
+                 from_number: Optional[str] = None, base_url: Optional[str] = None):
+        self.account_sid = account_sid or os.getenv("TWILIO_ACCOUNT_SID")
+        self.auth_token = auth_token or os.getenv("TWILIO_AUTH_TOKEN")
+        self.from_number = from_number or os.getenv("TWILIO_PHONE_NUMBER")
+        self.base_url = base_url or TWILIO_API_BASE_URL
+        self._client = None
+
+    @property
+    def configured(self) -> bool:
+        return all([self.account_sid, self.auth_token, self.from_number])
+
+    @property
+    def client(self):
+        if self._client is None:
+            from twilio.rest import Client as TwilioClient
+
+            self._client = TwilioClient(self.account_sid, self.auth_token)
+            if self.base_url:
+                # Local Twilio stand-in for load and integration testing
+                self._client.api.base_url = self.base_url
+        return self._client
+
+    async def dial(self, to_number: str, reason: str, customer_name: Optional[str] = None) -> str:
+        base_url = os.getenv("BASE_URL", "https://localhost:8000")
+        # The answered call fetches its TwiML with the campaign context attached
+        context = {"reason": reason, **({"customer_name": customer_name} if customer_name else {})}
+        call = await asyncio.to_thread(
+            self.client.calls.create,
+            to=to_number,
+            from_=self.from_number,
+            url=f"{base_url}/voice/outbound-twiml?{urlencode(context)}",
+            status_callback=f"{base_url}/voice/status",
+            # Without these Twilio only reports the final status, and analytics never sees ringing or answer
+            status_callback_event=["initiated", "ringing", "answered", "completed"]
+        )
+        return call.sid
+
+# =============================================================================
+# Campaign Engine
+# =============================================================================
+
+class CampaignEngine:
+    """Worker pool that drains the campaign queue within the rate and live-call limits."""
+
+    def __init__(
+        self,
+        store: CampaignStore,
+        dialer: Dialer,
+        calls_per_second: float = CAMPAIGN_CALLS_PER_SECOND,
+        max_live_calls: int = CAMPAIGN_MAX_LIVE_CALLS,
+        workers: int = CAMPAIGN_WORKERS,
+        max_attempts: int = CAMPAIGN_MAX_ATTEMPTS,
+        retry_seconds: float = CAMPAIGN_RETRY_SECONDS,
+        call_timeout: float = CAMPAIGN_CALL_TIMEOUT_SECONDS,
+        claim_timeout: float = CAMPAIGN_CLAIM_TIMEOUT_SECONDS
+    ):
+        self.store = store
+        self.dialer = dialer
+        self.calls_per_second = calls_per_second
+        self.max_live_calls = max_live_calls
+        self.worker_count = workers
+        self.max_attempts = max_attempts
+        self.retry_seconds = retry_seconds
+        self.call_timeout = call_timeout
+        self.claim_timeout = claim_timeout
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._last_reap = 0.0
+        # Targets this engine has claimed and is pacing or dialing
+        self._in_flight: Set[int] = set()
+
+    @property
+    def running(self) -> bool:
+        return any(not task.done() for task in self._tasks)
+
+    async def start(self):
+        if self.running:
+            return
+        # Nothing is in flight yet, so this worker's own claims are from a previous run
+        await self.store.requeue_interrupted(time.time() - self.claim_timeout, own=True)
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.worker_count)]
+        logger.info(f"Campaign engine started: {self.worker_count} workers, "
+                    f"{self.calls_per_second:g} calls/s, {self.max_live_calls} live calls max")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def create_campaign(self, name: str, reason: str, targets: List[Dict[str, Any]]) -> int:
+        campaign_id = await self.store.create(name, reason, targets)
+        logger.info(f"Campaign {campaign_id} '{name}' queued with {len(targets)} targets")
+        self._wake()
+        return campaign_id
+
+    async def handle_status(self, call_sid: str, call_status: str) -> bool:
+        """
+        Apply a Twilio status callback. Returns True if the call belongs to a campaign.
+
+        Only final statuses change anything: completed finishes the target,
+        busy / no-answer schedule a retry, failed / canceled give up.
+        """
+        found = await self.store.find_call(call_sid)
+        if not found:
+            return False
+
+        target_id, attempts, status = found
+        if status != "live":
+            return True
+
+        if call_status == "completed":
+            await self.store.finish(target_id, "completed", call_status)
+            metrics.inc("voice_campaign_calls_total", result="completed")
+        elif call_status in RETRY_STATUSES:
+            await self._retry_or_fail(target_id, attempts, call_status)
+        elif call_status in FAILED_STATUSES:
+            await self.store.finish(target_id, "failed", call_status)
+            metrics.inc("voice_campaign_calls_total", result=call_status)
+        else:
+            return True
+
+        # A live-call slot just opened up
+        self._wake()
+        return True
+
+    async def _retry_or_fail(self, target_id: int, attempts: int, result: str):
+        metrics.inc("voice_campaign_calls_total", result=result)
+        if attempts >= self.max_attempts:
+            await self.store.finish(target_id, "failed", result)
+            return
+        backoff = self.retry_seconds * 2 ** (attempts - 1)
+        await self.store.finish(target_id, "queued", result, next_attempt_at=time.time() + backoff)
+
+    def _wake(self):
+        if self._wakeup:
+            self._wakeup.set()
+
+    async def _worker(self, worker_id: int):
+        while True:
+            try:
+                await self._reap_stale_calls()
+                target = await self.store.claim(self.max_live_calls)
+                if target is None:
+                    await self._wait_for_work()
+                    continue
+
+                self._in_flight.add(target.id)
+                try:
+                    await self._pace()
+                    await self._dial(target)
+                finally:
+                    self._in_flight.discard(target.id)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Campaign worker {worker_id} error: {e}")
+                await asyncio.sleep(POLL_SECONDS)
+
+    async def _wait_for_work(self):
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _pace(self):
+        """Wait for this dial's slot in the calls-per-second budget shared through the database."""
+        slot = await self.store.reserve_dial_slot(1 / self.calls_per_second)
+        delay = slot - time.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _dial(self, target: CampaignTarget):
+        try:
+            call_sid = await self.dialer.dial(target.to_number, target.reason, target.customer_name)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Campaign {target.campaign_id}: dialing {target.to_number} failed: {e}")
+            await self._retry_or_fail(target.id, target.attempts, "dial_error")
+            return
+
+        await self.store.mark_live(target.id, call_sid)
+        metrics.inc("voice_campaign_calls_total", result="dialed")
+        logger.info(f"Campaign {target.campaign_id}: dialed {target.to_number} "
+                    f"(attempt {target.attempts}, {call_sid})")
+
+    async def _reap_stale_calls(self):
+        """
+        Calls whose final status callback never arrived count as no-answer;
+        claims a crashed process never dialed go back in the queue.
+        """
+        now = time.monotonic()
+        if now - self._last_reap < REAP_INTERVAL_SECONDS:
+            return
+        self._last_reap = now
+        requeued = await self.store.requeue_interrupted(time.time() - self.claim_timeout,
+                                                        in_flight=self._in_flight)
+        if requeued:
+            logger.warning(f"Requeued {requeued} campaign targets claimed but never dialed")
+        for target_id, attempts in await self.store.stale_calls(time.time() - self.call_timeout):
+            await self._retry_or_fail(target_id, attempts, "timeout")
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Drain Mode - Kipper Energy Solutions
+=====================================
+
+Takes a voice worker out of rotation without cutting calls off, so the
+voice tier can be redeployed mid-day.
+
+Drain starts on SIGUSR1, POST /admin/drain, or app shutdown:
+- /health answers 503 so the load balancer stops routing here
+- /voice/inbound answers 503, which sends Twilio to the number's fallback
+  URL; outbound calls and campaign dialing stop
+- Calls already connected carry on until they hang up; any still live after
+  VOICE_DRAIN_SECONDS hear a short handoff message and are ended with
+  handoffData {"reason": "drain"}; ConversationRelay posts that to
+  /voice/handoff, which dials them through to the office line
+- Buffered CRM records, transcripts and analytics are flushed last
+
+Deploy by signalling (or POSTing) the drain, waiting for /health to report
+"drained", then stopping the process.
+
+Configuration (environment):
+- VOICE_DRAIN_SECONDS: Longest a drain waits for calls to finish (default 120)
+- VOICE_ADMIN_TOKEN: Required as X-Admin-Token on /admin endpoints when set
+"""
+
+import os
+import time
+import asyncio
+import logging
+from typing import Dict, Any, Awaitable, Callable, List, Optional
+
+from voice_metrics import metrics
+from session_limits import end_call
+
+logger = logging.getLogger("voice_ai")
+
+VOICE_DRAIN_SECONDS = float(os.getenv("VOICE_DRAIN_SECONDS", "120"))
+VOICE_ADMIN_TOKEN = os.getenv("VOICE_ADMIN_TOKEN")
+
+DRAIN_MESSAGE = (
+    "I'm going to connect you with a team member to finish up. "
+    "Please hold for just a moment."
+)
+
+# Time handed-off calls get to close their sockets before being cancelled
+HANDOFF_GRACE_SECONDS = 5.0
+
+metrics.describe("voice_draining", "1 while this worker is draining")
+
+
+class DrainController:
+    """
+    Drain state for one worker.
+
+    Sessions expose websocket and connection_task (see SessionReaper);
+    flush callbacks run once every call has ended.
+    """
+
+    def __init__(
+        self,
+        sessions: Dict[str, Any],
+        deadline: float = VOICE_DRAIN_SECONDS,
+        poll_interval: float = 0.5
+    ):
+        self.sessions = sessions
+        self.deadline = deadline
+        self.poll_interval = poll_interval
+        self.started_at: Optional[float] = None
+        self.finished = False
+        self._task: Optional[asyncio.Task] = None
+        self._flushes: List[Callable[[], Awaitable[Any]]] = []
+
+    @property
+    def draining(self) -> bool:
+        return self.started_at is not None
+
+    def on_drained(self, flush: Callable[[], Awaitable[Any]]):
+        """Register a coroutine function to run after the last call ends."""
+        self._flushes.append(flush)
+
+    def begin(self, reason: str) -> asyncio.Task:
+        """Start draining (idempotent); returns the drain task."""
+        if self._task is None:
+            self.started_at = time.monotonic()
+            metrics.set_gauge("voice_draining", 1)
+            logger.warning(f"Draining ({reason}): {len(self.sessions)} live calls, "
+                           f"{self.deadline:.0f}s deadline")
+            self._task = asyncio.create_task(self._drain())
+        return self._task
+
+    def status(self) -> Dict[str, Any]:
+        if not self.draining:
+            return {"draining": False}
+        return {
+            "draining": True,
+            "drained": self.finished,
+            "live_calls": len(self.sessions),
+            "seconds_left": round(max(0.0, self.deadline - (time.monotonic() - self.started_at)), 1)
+        }
+
+    async def _drain(self):
+        deadline = self.started_at + self.deadline
+        while self.sessions and time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval)
+
+        if self.sessions:
+            await self._hand_off()
+
+        for flush in self._flushes:
+            try:
+                await flush()
+            except Exception as e:
+                logger.error(f"Flush during drain failed: {e}")
+
+        self.finished = True
+        logger.warning(f"Drained in {time.monotonic() - self.started_at:.1f}s")
+
+    async def _hand_off(self):
+        """End the calls still live at the deadline, then make sure their handlers exit."""
+        sessions = list(self.sessions.items())
+        logger.warning(f"Drain deadline reached, handing off {len(sessions)} calls")
+
+        for call_sid, session in sessions:
+            metrics.inc("voice_sessions_ended_total", reason="drain")
+            websocket = getattr(session, "websocket", None)
+            if websocket is None:
+                continue
+            try:
+                await end_call(websocket, "drain", DRAIN_MESSAGE, getattr(session, "handoff_priority", None))
+            except Exception as e:
+                logger.warning(f"[{call_sid}] Could not hand off call: {e}")
+
+        tasks = [s.connection_task for _, s in sessions if s.connection_task and not s.connection_task.done()]
+        if tasks:
+            _, stuck = await asyncio.wait(tasks, timeout=HANDOFF_GRACE_SECONDS)
+            for task in stuck:
+                task.cancel()
+            await asyncio.gather(*stuck, return_exceptions=True)
+
+    async def wait(self):
+        """Wait for a started drain to finish."""
+        if self._task is not None:
+            await asyncio.shield(self._task)
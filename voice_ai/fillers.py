@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Latency-Budget Fillers - Kipper Energy Solutions
+=================================================
+
+Keeps slow turns from going silent. If nothing has been said
+VOICE_FILLER_BUDGET_SECONDS after the caller finished, a short filler
+("Let me check the schedule for you.") is spoken while the real answer
+stays in flight.
+
+- The filler matches what the turn is waiting on: the tool running at the
+  deadline, or Claude itself when no tool is
+- At most one filler per turn, and never once the answer has started
+- Every missed budget is counted in voice_latency_budget_missed_total{tool}
+  (tool is "llm" when Claude was the wait), so the slow tools show up
+
+Configuration (environment):
+- VOICE_FILLER_BUDGET_SECONDS: Silence allowed before a filler (default 1.2; 0 disables)
+"""
+
+import os
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List, Optional
+
+from voice_metrics import metrics, TurnTimer
+
+logger = logging.getLogger("voice_ai")
+
+VOICE_FILLER_BUDGET_SECONDS = float(os.getenv("VOICE_FILLER_BUDGET_SECONDS", "1.2"))
+
+metrics.describe("voice_latency_budget_missed_total", "Turns that went past the silence budget, by what they were waiting on")
+
+FILLERS = {
+    "schedule_service_call": "Let me check the schedule for you.",
+    "check_service_area": "Let me look up your area real quick.",
+    "get_pricing_estimate": "Let me pull up our pricing for that.",
+    "escalate_to_human": "One moment while I get someone for you.",
+    "log_call_disposition": "Just a second while I make a note of that.",
+}
+DEFAULT_FILLER = "One moment."
+
+
+def filler_for(running_tools: List[str]) -> str:
+    """Filler for whatever the turn is waiting on (the first tool with a phrase)."""
+    for tool in running_tools:
+        if tool in FILLERS:
+            return FILLERS[tool]
+    return DEFAULT_FILLER
+
+
+class TurnDeadline:
+    """
+    Watches one turn and speaks a filler if its budget runs out.
+
+    send(text) delivers the filler; call settle() right before the real
+    answer goes out.
+    """
+
+    def __init__(
+        self,
+        timer: TurnTimer,
+        send: Callable[[str], Awaitable[Any]],
+        budget: float = VOICE_FILLER_BUDGET_SECONDS
+    ):
+        self.timer = timer
+        self.send = send
+        self.budget = budget
+        self.filler: Optional[str] = None
+        self._answered = False
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> "TurnDeadline":
+        if self.budget > 0:
+            self._task = asyncio.create_task(self._watch())
+        return self
+
+    async def _watch(self):
+        await asyncio.sleep(max(0.0, self.budget - self.timer.elapsed()))
+        if self._answered:
+            return
+
+        waiting_on = self.timer.running_tools[0] if self.timer.running_tools else "llm"
+        metrics.inc("voice_latency_budget_missed_total", tool=waiting_on)
+        self.filler = filler_for(self.timer.running_tools)
+        self.timer.mark("filler_sent")
+        logger.info(f"Turn over {self.budget:.1f}s budget waiting on {waiting_on}, filling: {self.filler}")
+        await self.send(self.filler)
+
+    async def settle(self):
+        """The answer is ready: stop the watcher, letting a filler already being sent finish first."""
+        if self._answered:
+            return
+        self._answered = True
+        if self._task is None:
+            return
+        if self.filler is None:
+            self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
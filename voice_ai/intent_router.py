@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Fast-Path Intent Router - Kipper Energy Solutions
+==================================================
+
+Answers simple, high-confidence caller questions without a Claude round trip:
+
+- Service area: "do you service Birmingham", "are you guys in Georgia",
+  "do you cover 36602"
+- Pricing: "how much is an AC tune-up", "what do you charge for drain cleaning"
+
+Utterances are matched against precompiled patterns and answered with the
+same tool functions Claude would call. Anything longer, compound, urgent or
+ambiguous returns None so the turn goes to Claude as usual.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, Callable
+
+CONFIDENCE_THRESHOLD = 0.85
+MAX_WORDS = 16
+
+# =============================================================================
+# Places
+# =============================================================================
+
+STATE_CODES = {
+    "alabama": "AL", "alaska": "AK", "arizona": "AZ", "arkansas": "AR", "california": "CA",
+    "colorado": "CO", "connecticut": "CT", "delaware": "DE", "florida": "FL", "georgia": "GA",
+    "hawaii": "HI", "idaho": "ID", "illinois": "IL", "indiana": "IN", "iowa": "IA",
+    "kansas": "KS", "kentucky": "KY", "louisiana": "LA", "maine": "ME", "maryland": "MD",
+    "massachusetts": "MA", "michigan": "MI", "minnesota": "MN", "mississippi": "MS", "missouri": "MO",
+    "montana": "MT", "nebraska": "NE", "nevada": "NV", "new hampshire": "NH", "new jersey": "NJ",
+    "new mexico": "NM", "new york": "NY", "north carolina": "NC", "north dakota": "ND", "ohio": "OH",
+    "oklahoma": "OK", "oregon": "OR", "pennsylvania": "PA", "rhode island": "RI", "south carolina": "SC",
+    "south dakota": "SD", "tennessee": "TN", "texas": "TX", "utah": "UT", "vermont": "VT",
+    "virginia": "VA", "washington": "WA", "west virginia": "WV", "wisconsin": "WI", "wyoming": "WY",
+}
+
+STATE_NAMES = {code: name.title() for name, code in STATE_CODES.items()}
+
+# Cities callers commonly name, mapped to the state we assume they mean
+CITY_STATES = {
+    "birmingham": "AL", "mobile": "AL", "montgomery": "AL", "huntsville": "AL", "tuscaloosa": "AL",
+    "dothan": "AL", "atlanta": "GA", "savannah": "GA", "augusta": "GA", "macon": "GA",
+    "columbus": "GA", "athens": "GA", "jacksonville": "FL", "pensacola": "FL", "tallahassee": "FL",
+    "orlando": "FL", "tampa": "FL", "miami": "FL", "gainesville": "FL", "nashville": "TN",
+    "memphis": "TN", "knoxville": "TN", "chattanooga": "TN",
+}
+
+# City names shared with large cities outside the Southeast
+AMBIGUOUS_CITIES = {"columbus", "athens", "jacksonville", "augusta"}
+
+# =============================================================================
+# Patterns
+# =============================================================================
+
+SERVICE_AREA_PATTERN = re.compile(
+    r"\b(?:do|does|can|will|are|is)\s+(?:you|y'?all|your\s+(?:company|team|guys))\s*(?:guys\s+)?"
+    r"(?:service|serve|cover|work\s+in|come\s+(?:out\s+)?to|go\s+(?:out\s+)?to|in|out\s+in)\s+"
+    r"(?:the\s+)?(?:area\s+(?:of|around)\s+|zip(?:\s+code)?\s+)?(?P<place>[a-z0-9 .']+?)\s*(?:area)?\s*\??$"
+)
+
+PRICING_PATTERN = re.compile(
+    r"\b(?:how\s+much\s+(?:is|are|does|do|would|for|to)|what\s+(?:is|'s|does|do)\s+(?:a|an|the|your)?\s*"
+    r"(?:price|cost|charge)|what\s+do\s+you\s+(?:guys\s+)?charge|price\s+(?:of|for)|cost\s+(?:of|for))\b"
+    r"(?P<service>.*)$"
+)
+
+# Filler around the service name in a pricing question
+SERVICE_LEAD_WORDS = re.compile(
+    r"^(?:(?:it|of|for|to|is|are|a|an|the|your|you|my|get|getting|have|having|cost|costs|be)\s+)+"
+)
+SERVICE_TAIL_WORDS = re.compile(r"\s+(?:cost|costs|run|runs|be|price|usually|typically)(?:\s+.*)?$")
+ACRONYMS = {"ac": "AC", "a/c": "AC", "ev": "EV", "hvac": "HVAC"}
+
+# Anything that means the caller needs more than a one-line answer
+BAIL_PATTERN = re.compile(
+    r"\b(?:and also|also|schedule|book|appointment|emergency|leak|flood|smoke|fire|gas|"
+    r"human|person|representative|manager|cancel|bill|invoice|payment)\b"
+)
+
+# =============================================================================
+# Router
+# =============================================================================
+
+@dataclass
+class RouteResult:
+    """A fast-path answer."""
+
+    intent: str
+    tool: str
+    tool_input: Dict[str, Any]
+    tool_result: Dict[str, Any]
+    answer: str
+    confidence: float
+
+
+def normalize_utterance(text: str) -> str:
+    text = text.lower().replace("’", "'")
+    text = re.sub(r"[^a-z0-9$' .?-]", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def clean_service_phrase(service: str) -> str:
+    """'of a panel upgrade cost' → 'panel upgrade'."""
+    service = SERVICE_LEAD_WORDS.sub("", service.strip(" ?."))
+    service = SERVICE_TAIL_WORDS.sub("", service)
+    return service
+
+
+def speakable_service(service: str) -> str:
+    """'ac tune-up' → 'AC tune-up'."""
+    return " ".join(ACRONYMS.get(word, word) for word in service.split())
+
+
+def speakable_price(price: str) -> str:
+    """'$89-$149' → '$89 to $149' so TTS reads the range naturally."""
+    return re.sub(r"(\$[\d,]+)\s*-\s*(\$[\d,]+)", r"\1 to \2", price)
+
+
+class IntentRouter:
+    """Deterministic router for simple service-area and pricing questions."""
+
+    def __init__(
+        self,
+        check_service_area: Callable[[Dict[str, Any]], Dict[str, Any]],
+        get_pricing_estimate: Callable[[Dict[str, Any]], Dict[str, Any]],
+        service_area: Optional[Any] = None,
+        threshold: float = CONFIDENCE_THRESHOLD
+    ):
+        self.check_service_area = check_service_area
+        self.get_pricing_estimate = get_pricing_estimate
+        self.service_area = service_area
+        self.threshold = threshold
+
+    def route(self, text: str) -> Optional[RouteResult]:
+        """Return a confident answer, or None to fall back to Claude."""
+        utterance = normalize_utterance(text)
+        if not utterance or len(utterance.split()) > MAX_WORDS or BAIL_PATTERN.search(utterance):
+            return None
+
+        for candidate in (self._route_service_area(utterance), self._route_pricing(utterance)):
+            if candidate and candidate.confidence >= self.threshold:
+                return candidate
+        return None
+
+    def _route_service_area(self, utterance: str) -> Optional[RouteResult]:
+        match = SERVICE_AREA_PATTERN.search(utterance)
+        if not match:
+            return None
+
+        place = match.group("place").strip(" .?")
+        place = re.sub(r"^(?:the\s+)?(?:city\s+of\s+|state\s+of\s+)", "", place)
+        resolved = self._resolve_place(place)
+        if not resolved:
+            return None
+
+        tool_input, confidence, label = resolved
+        result = self.check_service_area(tool_input)
+        label = label or result.get("city") or tool_input["zip_code"]
+        state = tool_input.get("state") or result.get("state", "")
+        state_name = STATE_NAMES.get(state, state)
+
+        if result.get("in_service_area"):
+            branch = ""
+            if result.get("nearest_branch"):
+                branch = f" Our {result['nearest_branch']} branch would take care of you."
+            answer = f"Yes, we serve {label}.{branch} Would you like to set up a service visit?"
+        else:
+            answer = (f"I'm sorry, {label} is outside our service area. We serve Alabama, "
+                      f"Georgia, Florida, and Tennessee.")
+            if label != state_name and state_name:
+                answer = answer.replace(label, f"{label}, {state_name},", 1)
+
+        return RouteResult("service_area", "check_service_area", tool_input, result, answer, confidence)
+
+    def _resolve_place(self, place: str) -> Optional[tuple]:
+        # "35203" - the label comes from the index's answer
+        if re.fullmatch(r"\d{5}", place):
+            return {"zip_code": place}, 0.95, None
+
+        if place in STATE_CODES:
+            code = STATE_CODES[place]
+            return {"state": code}, 0.95, STATE_NAMES[code]
+
+        # "Mobile Alabama" / "Mobile, AL"
+        city_state = re.match(r"^(?P<city>[a-z .']+?),?\s+(?P<state>[a-z ]+)$", place)
+        if city_state:
+            city, state = city_state.group("city").strip(), city_state.group("state").strip()
+            code = STATE_CODES.get(state) or (state.upper() if state.upper() in STATE_NAMES else None)
+            if code:
+                return {"city": city.title(), "state": code}, 0.95, city.title()
+
+        state = self.service_area.state_for_city(place) if self.service_area else None
+        state = state or CITY_STATES.get(place)
+        if state:
+            confidence = 0.75 if place in AMBIGUOUS_CITIES else 0.9
+            return {"city": place.title(), "state": state}, confidence, place.title()
+
+        return None
+
+    def _route_pricing(self, utterance: str) -> Optional[RouteResult]:
+        match = PRICING_PATTERN.search(utterance)
+        if not match:
+            return None
+
+        service = clean_service_phrase(match.group("service"))
+        if not service:
+            return None
+
+        # The pricing index searches every trade, so one lookup is enough
+        tool_input = {"service_type": service}
+        result = self.get_pricing_estimate(tool_input)
+        if not result.get("matched_service"):
+            return None
+
+        spoken = speakable_service(result["matched_service"])
+        price = speakable_price(result["estimate"])
+        article = "An" if spoken[0].lower() in "aeio" else "A"
+        answer = (f"{article} {spoken} typically runs {price}. The technician will give you an "
+                  f"exact quote on-site. Would you like to schedule one?")
+        tool_input["trade"] = result["trade"]
+        return RouteResult("pricing", "get_pricing_estimate", tool_input, result, answer, result["match_score"])
@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+Voice Load Test - Kipper Energy Solutions
+==========================================
+
+Simulates many concurrent ConversationRelay calls against one server
+process to find out how many simultaneous callers it can carry.
+
+Each simulated call opens /ws/voice/{call_sid}, waits for the greeting,
+then plays a scripted caller transcript with think time between turns,
+recording:
+- Greeting latency (connect to first text frame)
+- First-response latency per turn (transcript sent to first text frame,
+  i.e. when TTS can start speaking)
+- Full-turn latency (transcript sent to the last frame of the reply)
+- Errors (connect failures, timeouts, dropped sockets)
+
+By default the script starts its own server in a subprocess with a fake
+Claude backend, so it runs offline and the measured latency is the
+server's, not the Anthropic API's. With LLM_TRANSPORT=replay the server
+answers from recorded fixtures instead (see agents/llm_transport.py).
+Point --url at a running server to test a real deployment instead.
+
+Usage:
+    python loadtest.py --calls 200 --ramp 20
+    python loadtest.py --calls 500 --llm-latency 0.8 --token-delay 0.02
+    python loadtest.py --url ws://voice-staging:8000 --calls 100
+    python loadtest.py --serve --port 8765 --llm-latency 0.5   # fake-LLM server only
+"""
+
+import sys
+import json
+import math
+import time
+import random
+import asyncio
+import logging
+import argparse
+import subprocess
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+VOICE_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(VOICE_DIR.parent))
+sys.path.insert(0, str(VOICE_DIR))
+
+import httpx
+import websockets
+from anthropic.types import Message, TextBlock, ToolUseBlock, Usage
+
+# Caller scripts: a mix of fast-path questions and turns that need Claude
+SCRIPTS = [
+    [
+        "Hi, my air conditioner stopped cooling this morning",
+        "It's blowing warm air and the outside unit is humming",
+        "I'm in Mobile, zip code 36602",
+        "Tomorrow morning works, thanks",
+    ],
+    [
+        "How much is an AC tune-up?",
+        "Do you service Birmingham?",
+        "Okay, go ahead and put me down for next week",
+    ],
+    [
+        "We've got a water heater leaking in the garage",
+        "It's a 50 gallon gas unit, about twelve years old",
+        "What would a replacement run?",
+        "Let's schedule someone to come look at it",
+    ],
+    [
+        "I smell something burning when the heat kicks on",
+        "No, nobody's feeling sick, it's just the smell",
+        "I'm in Atlanta",
+    ],
+    [
+        "Do you do panel upgrades?",
+        "How much is a service call?",
+        "Thanks, I'll call back",
+    ],
+]
+
+FAKE_REPLIES = [
+    "I'm sorry to hear that. Let me get a technician out to take a look. Can I get your address?",
+    "Sure thing. We can have someone there tomorrow between eight and noon. Does that work for you?",
+    "Got it. That sounds like something our team should check in person. What's the best number to reach you?",
+    "You're all set. You'll get a text confirmation shortly. Is there anything else I can help with?",
+]
+
+# =============================================================================
+# Fake Claude Backend
+# =============================================================================
+
+class FakeStream:
+    """Stands in for AsyncMessageStreamManager: first-token latency, then paced words."""
+
+    def __init__(self, message: Message, latency: float, token_delay: float):
+        self.message = message
+        self.latency = latency
+        self.token_delay = token_delay
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    @property
+    def text_stream(self):
+        return self._tokens()
+
+    async def _tokens(self):
+        await asyncio.sleep(self.latency)
+        for block in self.message.content:
+            if block.type != "text":
+                continue
+            for word in block.text.split(" "):
+                yield word + " "
+                await asyncio.sleep(self.token_delay)
+
+    async def get_final_message(self) -> Message:
+        if not any(block.type == "text" for block in self.message.content):
+            await asyncio.sleep(self.latency)
+        return self.message
+
+
+class FakeMessages:
+    """Answers create() and stream() with canned replies after injected latency."""
+
+    def __init__(self, latency: float, jitter: float, token_delay: float, tool_rate: float):
+        self.latency = latency
+        self.jitter = jitter
+        self.token_delay = token_delay
+        self.tool_rate = tool_rate
+        self.requests = 0
+
+    def _latency(self) -> float:
+        return max(0.0, random.gauss(self.latency, self.jitter))
+
+    def _reply(self, messages: List[Dict[str, Any]]) -> Message:
+        self.requests += 1
+        last = messages[-1]["content"] if messages else ""
+        after_tool = isinstance(last, list) and any(
+            isinstance(block, dict) and block.get("type") == "tool_result" for block in last
+        )
+        if not after_tool and random.random() < self.tool_rate:
+            content = [ToolUseBlock(type="tool_use", id=f"toolu_{self.requests}",
+                                    name="check_service_area", input={"state": "AL"})]
+            stop_reason = "tool_use"
+        else:
+            content = [TextBlock(type="text", text=random.choice(FAKE_REPLIES))]
+            stop_reason = "end_turn"
+        return Message(
+            id=f"msg_load_{self.requests}", type="message", role="assistant", model="fake-claude",
+            content=content, stop_reason=stop_reason, stop_sequence=None,
+            usage=Usage(input_tokens=1200, output_tokens=40)
+        )
+
+    async def create(self, **kwargs) -> Message:
+        message = self._reply(kwargs.get("messages", []))
+        await asyncio.sleep(self._latency() + self.token_delay * 30)
+        return message
+
+    def stream(self, **kwargs) -> FakeStream:
+        return FakeStream(self._reply(kwargs.get("messages", [])), self._latency(), self.token_delay)
+
+
+class FakeClaude:
+    """AsyncAnthropic-shaped client for offline load tests."""
+
+    def __init__(self, latency: float = 0.6, jitter: float = 0.15, token_delay: float = 0.015,
+                 tool_rate: float = 0.2):
+        self.messages = FakeMessages(latency, jitter, token_delay, tool_rate)
+
+
+def install_fake_llm(**kwargs) -> FakeClaude:
+    """Point the shared LLM pool at a FakeClaude (call before the server takes traffic)."""
+    from agents import llm_client
+
+    fake = FakeClaude(**kwargs)
+    llm_client._pool = llm_client.LLMClientPool(client=fake)
+    return fake
+
+
+def serve(host: str, port: int, verbose: bool = False, **llm_kwargs):
+    """Run the voice server with a fake Claude backend (or recorded fixtures when LLM_TRANSPORT=replay)."""
+    import uvicorn
+    import server
+    from agents.llm_transport import LLM_TRANSPORT
+
+    if LLM_TRANSPORT == "live":
+        install_fake_llm(**llm_kwargs)
+    if not verbose:
+        logging.getLogger("voice_ai").setLevel(logging.WARNING)
+    uvicorn.run(server.app, host=host, port=port, log_level="warning")
+
+
+@asynccontextmanager
+async def fake_server(port: int, verbose: bool, **llm_kwargs):
+    """Start serve() in a subprocess and wait for it to answer health checks."""
+    args = [sys.executable, str(Path(__file__).resolve()), "--serve", "--port", str(port)]
+    for name, value in llm_kwargs.items():
+        args += [f"--{name.replace('_', '-')}", str(value)]
+    if verbose:
+        args.append("--verbose")
+    process = subprocess.Popen(args)
+    try:
+        async with httpx.AsyncClient() as client:
+            deadline = time.monotonic() + 30
+            while True:
+                try:
+                    await client.get(f"http://127.0.0.1:{port}/")
+                    break
+                except httpx.TransportError:
+                    if process.poll() is not None or time.monotonic() > deadline:
+                        raise RuntimeError("fake-LLM voice server did not start")
+                    await asyncio.sleep(0.2)
+        yield f"ws://127.0.0.1:{port}"
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+# =============================================================================
+# Simulated Calls
+# =============================================================================
+
+@dataclass
+class CallResult:
+    """Timings for one simulated call."""
+
+    call_sid: str
+    greeting_latency: Optional[float] = None
+    first_response: List[float] = field(default_factory=list)
+    turn_latency: List[float] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+
+
+async def read_reply(ws, timeout: float) -> float:
+    """Read frames until the end of one reply; return seconds to the first spoken text."""
+    started = time.perf_counter()
+    first = None
+    while True:
+        frame = json.loads(await asyncio.wait_for(ws.recv(), timeout))
+        if frame.get("type") != "text":
+            continue
+        if first is None and frame.get("content"):
+            first = time.perf_counter() - started
+        # Streamed replies end with last=true; single-frame replies carry no flag
+        if frame.get("last", True):
+            return first if first is not None else time.perf_counter() - started
+
+
+async def simulate_call(
+    url: str,
+    call_sid: str,
+    script: List[str],
+    think_time: float = 3.0,
+    timeout: float = 30.0
+) -> CallResult:
+    """Play one caller through a script and time every reply."""
+    result = CallResult(call_sid)
+    try:
+        connected = time.perf_counter()
+        async with websockets.connect(f"{url}/ws/voice/{call_sid}", open_timeout=timeout) as ws:
+            await ws.send(json.dumps({"type": "setup", "callSid": call_sid}))
+            await read_reply(ws, timeout)
+            result.greeting_latency = time.perf_counter() - connected
+
+            for utterance in script:
+                # Callers pause to listen and think; +/-50% around the mean
+                await asyncio.sleep(think_time * random.uniform(0.5, 1.5))
+                sent = time.perf_counter()
+                await ws.send(json.dumps({"type": "transcript", "content": utterance}))
+                result.first_response.append(await read_reply(ws, timeout))
+                result.turn_latency.append(time.perf_counter() - sent)
+
+            await ws.send(json.dumps({"type": "hangup"}))
+    except asyncio.TimeoutError:
+        result.errors.append("timeout")
+    except (OSError, websockets.exceptions.WebSocketException) as e:
+        result.errors.append(type(e).__name__)
+    return result
+
+# =============================================================================
+# Report
+# =============================================================================
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+@dataclass
+class LoadReport:
+    """Aggregated results of one load run."""
+
+    results: List[CallResult]
+    elapsed: float
+
+    def summary(self) -> Dict[str, Any]:
+        def spread(values):
+            return {f"p{p}": round(percentile(values, p) * 1000, 1) for p in (50, 95, 99)}
+
+        greetings = [r.greeting_latency for r in self.results if r.greeting_latency is not None]
+        first = [t for r in self.results for t in r.first_response]
+        turns = [t for r in self.results for t in r.turn_latency]
+        errors: Dict[str, int] = {}
+        for r in self.results:
+            for error in r.errors:
+                errors[error] = errors.get(error, 0) + 1
+
+        return {
+            "calls": len(self.results),
+            "failed_calls": sum(1 for r in self.results if r.errors),
+            "turns": len(turns),
+            "elapsed_seconds": round(self.elapsed, 2),
+            "turns_per_second": round(len(turns) / self.elapsed, 2) if self.elapsed else 0.0,
+            "greeting_ms": spread(greetings),
+            "first_response_ms": spread(first),
+            "turn_ms": spread(turns),
+            "errors": errors
+        }
+
+    def print(self):
+        s = self.summary()
+        print(f"Calls:               {s['calls']} ({s['failed_calls']} failed)")
+        print(f"Turns:               {s['turns']} in {s['elapsed_seconds']}s ({s['turns_per_second']} turns/s)")
+        print(f"{'':21}{'p50':>9}{'p95':>9}{'p99':>9}")
+        for label, key in (("Greeting", "greeting_ms"), ("First response", "first_response_ms"),
+                           ("Full turn", "turn_ms")):
+            row = s[key]
+            print(f"{label + ' (ms)':21}{row['p50']:>9}{row['p95']:>9}{row['p99']:>9}")
+        if s["errors"]:
+            print(f"Errors:              {s['errors']}")
+
+
+async def run_load(
+    url: str,
+    calls: int,
+    ramp: float = 10.0,
+    think_time: float = 3.0,
+    timeout: float = 30.0
+) -> LoadReport:
+    """Start `calls` simulated callers spread evenly over `ramp` seconds."""
+    started = time.perf_counter()
+
+    async def delayed(i: int) -> CallResult:
+        await asyncio.sleep(ramp * i / max(calls, 1))
+        return await simulate_call(url, f"CA-load-{i:05d}", SCRIPTS[i % len(SCRIPTS)], think_time, timeout)
+
+    results = await asyncio.gather(*(delayed(i) for i in range(calls)))
+    return LoadReport(list(results), time.perf_counter() - started)
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the voice server with simulated calls")
+    parser.add_argument("--url", help="ws:// base URL of a running server (default: start a fake-LLM server)")
+    parser.add_argument("--calls", type=int, default=100, help="Simultaneous calls to simulate")
+    parser.add_argument("--ramp", type=float, default=10.0, help="Seconds over which calls are started")
+    parser.add_argument("--think-time", type=float, default=3.0, help="Mean caller pause between turns (s)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Seconds to wait for any one reply")
+    parser.add_argument("--port", type=int, default=8765, help="Port for the fake-LLM server")
+    parser.add_argument("--llm-latency", type=float, default=0.6, help="Fake Claude time to first token (s)")
+    parser.add_argument("--jitter", type=float, default=0.15, help="Std deviation of fake latency (s)")
+    parser.add_argument("--token-delay", type=float, default=0.015, help="Fake delay between streamed words (s)")
+    parser.add_argument("--tool-rate", type=float, default=0.2, help="Share of fake replies that call a tool first")
+    parser.add_argument("--serve", action="store_true", help="Only run the fake-LLM server")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    parser.add_argument("--verbose", action="store_true", help="Keep the server's per-turn logging")
+    args = parser.parse_args()
+
+    llm_kwargs = {"latency": args.llm_latency, "jitter": args.jitter,
+                  "token_delay": args.token_delay, "tool_rate": args.tool_rate}
+
+    if args.serve:
+        serve("127.0.0.1", args.port, args.verbose, **llm_kwargs)
+        return
+
+    async def run() -> LoadReport:
+        if args.url:
+            return await run_load(args.url, args.calls, args.ramp, args.think_time, args.timeout)
+        async with fake_server(args.port, args.verbose,
+                               llm_latency=args.llm_latency, jitter=args.jitter,
+                               token_delay=args.token_delay, tool_rate=args.tool_rate) as url:
+            return await run_load(url, args.calls, args.ramp, args.think_time, args.timeout)
+
+    report = asyncio.run(run())
+    if args.json:
+        print(json.dumps(report.summary(), indent=2))
+    else:
+        report.print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Post-Call Summaries - Kipper Energy Solutions
+==============================================
+
+Turns each finished call into a structured write-up (issue, address,
+outcome, follow-up) in Coperniq, without holding the call's slot open.
+
+- Hangup hands the call's session snapshot to submit(), which queues it
+  and returns at once; the WebSocket handler never waits on a summary
+- POST_CALL_CONCURRENCY workers summarize queued calls with the cheap
+  summary model, forcing one record_call_summary tool call so the output
+  is always the same shape
+- A failed summary retries with backoff; after POST_CALL_MAX_RETRIES the
+  call is written up from its transcript alone, so no call goes unlogged
+- The write-up is a call_summary record on the CRM write-behind queue,
+  under the same call:{CallSid} entity as its disposition
+- Past POST_CALL_QUEUE_MAX waiting calls, new ones are dropped and counted
+  rather than held in memory; the drain flushes the queue before the CRM
+
+Outcomes are counted in voice_post_call_total{result}.
+
+Configuration (environment):
+- VOICE_POST_CALL: Summarize calls at hangup (default true)
+- POST_CALL_MODEL: Model for summaries (default the context-window summary model)
+- POST_CALL_CONCURRENCY: Summaries in flight at once (default 2)
+- POST_CALL_QUEUE_MAX: Calls waiting for a summary before new ones are dropped (default 1000)
+- POST_CALL_MAX_RETRIES: Attempts per call before the transcript-only write-up (default 3)
+"""
+
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime
+from typing import Dict, Any, Deque, List, Optional, Tuple
+
+from agents.context_window import SUMMARY_MODEL, render_transcript, fallback_summary, is_turn_start
+from agents.crm_writer import get_crm_writer
+from agents.llm_client import get_llm_pool
+from session_store import SessionState
+from voice_metrics import metrics
+
+logger = logging.getLogger("voice_ai")
+
+VOICE_POST_CALL = os.getenv("VOICE_POST_CALL", "true").lower() == "true"
+POST_CALL_MODEL = os.getenv("POST_CALL_MODEL", SUMMARY_MODEL)
+POST_CALL_CONCURRENCY = int(os.getenv("POST_CALL_CONCURRENCY", "2"))
+POST_CALL_QUEUE_MAX = int(os.getenv("POST_CALL_QUEUE_MAX", "1000"))
+POST_CALL_MAX_RETRIES = int(os.getenv("POST_CALL_MAX_RETRIES", "3"))
+
+RETRY_BASE_SECONDS = 1.0
+
+metrics.describe("voice_post_call_total", "Ended calls by post-call outcome (summarized/fallback/dropped/skipped)")
+metrics.describe("voice_post_call_seconds", "Time from hangup to the call's write-up being queued for the CRM")
+
+# =============================================================================
+# Summary Schema
+# =============================================================================
+
+SUMMARY_PROMPT = """You write up finished phone calls for Kipper Energy Solutions, an MEP contractor, for the CRM.
+
+Record what the call established, using only facts stated in the transcript. Leave a field out if the call never covered it."""
+
+SUMMARY_TOOL = {
+    "name": "record_call_summary",
+    "description": "Record the structured write-up of a finished call",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "customer_name": {"type": "string"},
+            "callback_number": {"type": "string"},
+            "service_address": {"type": "string"},
+            "trade": {
+                "type": "string",
+                "enum": ["HVAC", "Plumbing", "Electrical", "Solar", "Fire Protection"]
+            },
+            "issue": {
+                "type": "string",
+                "description": "What the caller needed, in one or two sentences"
+            },
+            "outcome": {
+                "type": "string",
+                "enum": ["appointment_scheduled", "information_provided", "transferred_to_human",
+                         "customer_callback_requested", "wrong_number", "spam", "abandoned"]
+            },
+            "appointment": {
+                "type": "string",
+                "description": "Date, time window and confirmation number, if one was booked"
+            },
+            "follow_up_required": {"type": "boolean"},
+            "follow_up": {
+                "type": "string",
+                "description": "What someone needs to do next, and by when"
+            },
+            "summary": {
+                "type": "string",
+                "description": "Plain-prose summary of the call, at most 80 words"
+            }
+        },
+        "required": ["issue", "outcome", "follow_up_required", "summary"]
+    }
+}
+
+# =============================================================================
+# Queue
+# =============================================================================
+
+class PostCallQueue:
+    """
+    Bounded background queue of ended calls awaiting a write-up.
+
+    Workers start on whichever event loop last submitted.
+    """
+
+    def __init__(
+        self,
+        llm: Optional[Any] = None,
+        enabled: bool = VOICE_POST_CALL,
+        model: str = POST_CALL_MODEL,
+        concurrency: int = POST_CALL_CONCURRENCY,
+        max_queue: int = POST_CALL_QUEUE_MAX,
+        max_retries: int = POST_CALL_MAX_RETRIES
+    ):
+        self._llm = llm
+        self.enabled = enabled
+        self.model = model
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.max_retries = max_retries
+
+        self._pending: Deque[Tuple[float, SessionState]] = deque()
+        self._active = 0
+        self._workers: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+        self.submitted = 0
+        self.summarized = 0
+        self.fallbacks = 0
+        self.dropped = 0
+        self.retries = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def llm(self) -> Any:
+        return self._llm or get_llm_pool()
+
+    def submit(self, state: SessionState) -> bool:
+        """Queue an ended call for its write-up; never blocks. Returns False if not queued."""
+        if not self.enabled:
+            return False
+        if not any(is_turn_start(message) for message in state.messages) and not state.summary:
+            metrics.inc("voice_post_call_total", result="skipped")
+            return False
+        if len(self._pending) >= self.max_queue:
+            self.dropped += 1
+            metrics.inc("voice_post_call_total", result="dropped")
+            logger.warning(f"[{state.call_sid}] Post-call queue full ({self.max_queue}), no summary for this call")
+            return False
+
+        self.submitted += 1
+        self._pending.append((time.monotonic(), state))
+        self._ensure_workers()
+        return True
+
+    def _ensure_workers(self):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # no loop yet; queued calls are picked up by the next flush
+        if self._loop is not loop or all(worker.done() for worker in self._workers):
+            if self._loop is not loop:
+                self._active = 0  # calls in progress on a loop that has gone are lost
+            self._loop = loop
+            self._wakeup = asyncio.Event()
+            self._workers = [loop.create_task(self._run()) for _ in range(self.concurrency)]
+        self._wakeup.set()
+
+    # -------------------------------------------------------------------------
+    # Workers (background)
+    # -------------------------------------------------------------------------
+
+    async def _run(self):
+        while True:
+            if not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            queued_at, state = self._pending.popleft()
+            self._active += 1
+            try:
+                await self._process(state, queued_at)
+            except Exception as e:
+                logger.error(f"[{state.call_sid}] Post-call write-up failed: {e}")
+            finally:
+                self._active -= 1
+
+    async def _process(self, state: SessionState, queued_at: float):
+        summary, source = None, "model"
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                summary = await self.summarize(state)
+                break
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                if attempt == self.max_retries:
+                    break
+                self.retries += 1
+                delay = RETRY_BASE_SECONDS * 2 ** (attempt - 1)
+                logger.warning(f"[{state.call_sid}] Call summary failed (attempt {attempt}), "
+                               f"retrying in {delay:.0f}s: {self.last_error}")
+                await asyncio.sleep(delay)
+
+        if summary is None:
+            source = "fallback"
+            summary = {
+                "outcome": state.call_disposition or "abandoned",
+                "follow_up_required": True,
+                "summary": fallback_summary(state.summary, state.messages)
+            }
+
+        get_crm_writer().submit("call_summary", f"call:{state.call_sid}", {
+            **summary,
+            "source": source,
+            "disposition": state.call_disposition,
+            "trade": summary.get("trade") or state.trade,
+            "turns": state.turns,
+            "started_at": state.started_at,
+            "duration_seconds": self._duration(state),
+            "usage": state.usage,
+        })
+
+        if source == "model":
+            self.summarized += 1
+        else:
+            self.fallbacks += 1
+        metrics.inc("voice_post_call_total", result="summarized" if source == "model" else "fallback")
+        metrics.observe("voice_post_call_seconds", time.monotonic() - queued_at)
+
+    async def summarize(self, state: SessionState) -> Dict[str, Any]:
+        """Structured summary of one call (raises if the model doesn't return one)."""
+        transcript = render_transcript(state.messages)
+        if state.summary:
+            transcript = f"Earlier in the call (summarized): {state.summary}\n\n{transcript}"
+
+        response = await self.llm.create(
+            model=self.model,
+            max_tokens=600,
+            system=SUMMARY_PROMPT,
+            tools=[SUMMARY_TOOL],
+            tool_choice={"type": "tool", "name": SUMMARY_TOOL["name"]},
+            messages=[{"role": "user", "content": f"Call transcript:\n{transcript}"}]
+        )
+        for block in response.content:
+            if block.type == "tool_use" and block.name == SUMMARY_TOOL["name"]:
+                return dict(block.input)
+        raise ValueError("No record_call_summary call in response")
+
+    @staticmethod
+    def _duration(state: SessionState) -> Optional[int]:
+        if not state.started_at:
+            return None
+        return round((datetime.now() - datetime.fromisoformat(state.started_at)).total_seconds())
+
+    # -------------------------------------------------------------------------
+    # Lifecycle
+    # -------------------------------------------------------------------------
+
+    async def flush(self, timeout: Optional[float] = None):
+        """Wait until every call queued so far has been written up."""
+        async def drained():
+            while self._pending or self._active:
+                self._ensure_workers()
+                await asyncio.sleep(0.01)
+
+        await asyncio.wait_for(drained(), timeout)
+
+    async def close(self, timeout: float = 30.0):
+        """Finish the queue, then stop the workers (call from app shutdown)."""
+        try:
+            await self.flush(timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Post-call queue closed with {len(self._pending)} calls not written up")
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "queued": len(self._pending),
+            "in_progress": self._active,
+            "submitted": self.submitted,
+            "summarized": self.summarized,
+            "fallbacks": self.fallbacks,
+            "dropped": self.dropped,
+            "retries": self.retries,
+            "last_error": self.last_error
+        }
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Caller-ID Prefetch - Kipper Energy Solutions
+=============================================
+
+Looks the caller up while the call is still connecting, so a returning
+customer isn't asked who they are and the first reply doesn't pay for
+cold connections.
+
+- /voice/inbound starts a lookup of the caller's contact, open work
+  orders, equipment and service plan by normalized phone number, and
+  warms the Claude connection pool, then returns its TwiML at once
+- Results sit in a short-lived cache keyed by CallSid
+  (PREFETCH_TTL_SECONDS); the call's first Claude turn waits at most
+  PREFETCH_WAIT_SECONDS for a lookup still in flight
+- A match is added to the call's system context; no match (or no
+  Coperniq key) changes nothing
+
+Lookups go through one keep-alive HTTP client, so the connection to
+Coperniq is already open when the call needs it again.
+
+Outcomes are counted in voice_prefetch_total{result}.
+
+Configuration (environment):
+- VOICE_PREFETCH: Enable caller-ID prefetch (default true)
+- PREFETCH_TTL_SECONDS: How long a lookup is kept for its call (default 120)
+- PREFETCH_WAIT_SECONDS: Longest the first turn waits for a lookup (default 1.5)
+- PREFETCH_LOOKUP_TIMEOUT: HTTP timeout for one lookup (default 3.0)
+- COPERNIQ_API_URL / COPERNIQ_API_KEY / COPERNIQ_INSTANCE_ID: GraphQL endpoint and credentials
+"""
+
+import os
+import re
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Any, Awaitable, Iterable, List, Optional, Tuple
+
+import httpx
+
+from voice_metrics import metrics
+
+logger = logging.getLogger("voice_ai")
+
+VOICE_PREFETCH = os.getenv("VOICE_PREFETCH", "true").lower() == "true"
+PREFETCH_TTL_SECONDS = float(os.getenv("PREFETCH_TTL_SECONDS", "120"))
+PREFETCH_WAIT_SECONDS = float(os.getenv("PREFETCH_WAIT_SECONDS", "1.5"))
+PREFETCH_LOOKUP_TIMEOUT = float(os.getenv("PREFETCH_LOOKUP_TIMEOUT", "3.0"))
+PREFETCH_CACHE_MAX = 5000
+
+COPERNIQ_API_URL = os.getenv("COPERNIQ_API_URL", "https://api.coperniq.io/graphql")
+COPERNIQ_API_KEY = os.getenv("COPERNIQ_API_KEY")
+COPERNIQ_INSTANCE_ID = os.getenv("COPERNIQ_INSTANCE_ID", "388")
+
+metrics.describe("voice_prefetch_total", "Caller-ID lookups by outcome (match/unknown/timeout/error/expired/none)")
+metrics.describe("voice_prefetch_seconds", "Time to look a caller up by phone number")
+
+
+def normalize_phone(number: Optional[str]) -> Optional[str]:
+    """E.164 form of a phone number (US numbers without +1 included), or None."""
+    digits = re.sub(r"\D", "", number or "")
+    if len(digits) == 10:
+        return f"+1{digits}"
+    if len(digits) == 11 and digits.startswith("1"):
+        return f"+{digits}"
+    if 8 <= len(digits) <= 15 and (number or "").strip().startswith("+"):
+        return f"+{digits}"
+    return None
+
+# =============================================================================
+# Customer Context
+# =============================================================================
+
+@dataclass
+class CustomerContext:
+    """What we know about a caller before they say anything."""
+
+    phone: str
+    contact: Dict[str, Any]
+    work_orders: List[Dict[str, Any]] = field(default_factory=list)
+    assets: List[Dict[str, Any]] = field(default_factory=list)
+    service_plan: Optional[Dict[str, Any]] = None
+
+    def as_context(self) -> str:
+        """System text for Claude describing the caller."""
+        name = self.contact.get("name") or "Unknown name"
+        company = self.contact.get("companyName")
+        lines = [
+            "Caller ID matches an existing customer. Greet them by name and confirm it "
+            "before relying on these details; don't ask again for anything listed here.",
+            f"- Customer: {name}" + (f" ({company})" if company else ""),
+            f"- Phone: {self.phone}" + (f", email {self.contact['email']}" if self.contact.get("email") else ""),
+        ]
+        if self.work_orders:
+            lines.append("- Open work orders: " + "; ".join(
+                f"{wo.get('title', 'Work order')} ({wo.get('status', 'open')}"
+                + (f", scheduled {wo['scheduledDate']}" if wo.get("scheduledDate") else "") + ")"
+                for wo in self.work_orders
+            ))
+        if self.assets:
+            lines.append("- Equipment on file: " + "; ".join(
+                (" ".join(filter(None, [a.get("make"), a.get("model")])) or "Unit")
+                + (f" (installed {a['installDate']})" if a.get("installDate") else "")
+                + (f" (warranty to {a['warrantyEnd']})" if a.get("warrantyEnd") else "")
+                for a in self.assets
+            ))
+        if self.service_plan:
+            plan = self.service_plan
+            lines.append(f"- Service plan: {plan.get('name', 'Plan')} ({plan.get('status', 'unknown')}"
+                         + (f", renews {plan['renewalDate']}" if plan.get("renewalDate") else "") + ")")
+        return "\n".join(lines)
+
+# =============================================================================
+# Directory
+# =============================================================================
+
+CALLER_QUERY = """
+query CallerLookup($phone: String!) {
+    contacts(filter: {phone: {equalTo: $phone}}, first: 1) {
+        nodes {
+            id
+            name
+            email
+            phone
+            companyName
+            servicePlan { name status renewalDate }
+            tasks(filter: {status: {notIn: ["COMPLETED", "CANCELLED"]}}, first: 5, orderBy: CREATED_AT_DESC) {
+                nodes { id title status scheduledDate }
+            }
+            assets(first: 5) {
+                nodes { id make model installDate warrantyEnd }
+            }
+        }
+    }
+}
+"""
+
+
+class CustomerDirectory:
+    """Looks customers up by E.164 phone number."""
+
+    async def lookup(self, phone: str) -> Optional[CustomerContext]:
+        raise NotImplementedError
+
+    async def aclose(self):
+        pass
+
+
+class CoperniqDirectory(CustomerDirectory):
+    """One GraphQL round trip for the contact and everything hanging off it."""
+
+    def __init__(
+        self,
+        api_url: str = COPERNIQ_API_URL,
+        api_key: Optional[str] = COPERNIQ_API_KEY,
+        instance_id: str = COPERNIQ_INSTANCE_ID,
+        timeout: float = PREFETCH_LOOKUP_TIMEOUT
+    ):
+        self.api_url = api_url
+        self.api_key = api_key
+        self.instance_id = instance_id
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def lookup(self, phone: str) -> Optional[CustomerContext]:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        response = await self._client.post(
+            self.api_url,
+            json={"query": CALLER_QUERY, "variables": {"phone": phone}},
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json",
+                "X-Instance-ID": self.instance_id
+            }
+        )
+        response.raise_for_status()
+        result = response.json()
+        if result.get("errors"):
+            raise RuntimeError(result["errors"][0].get("message", "GraphQL error"))
+
+        nodes = ((result.get("data") or {}).get("contacts") or {}).get("nodes") or []
+        if not nodes:
+            return None
+        contact = dict(nodes[0])
+        return CustomerContext(
+            phone=phone,
+            work_orders=(contact.pop("tasks", None) or {}).get("nodes", []),
+            assets=(contact.pop("assets", None) or {}).get("nodes", []),
+            service_plan=contact.pop("servicePlan", None),
+            contact=contact
+        )
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def default_directory() -> Optional[CustomerDirectory]:
+    return CoperniqDirectory() if COPERNIQ_API_KEY else None
+
+# =============================================================================
+# Prefetcher
+# =============================================================================
+
+class CallerPrefetcher:
+    """Starts caller lookups at ring time and hands them to the call's first turn."""
+
+    def __init__(
+        self,
+        directory: Optional[CustomerDirectory] = None,
+        ttl: float = PREFETCH_TTL_SECONDS,
+        wait_timeout: float = PREFETCH_WAIT_SECONDS,
+        max_entries: int = PREFETCH_CACHE_MAX
+    ):
+        self.directory = directory
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, asyncio.Task]]" = OrderedDict()
+        self._background: set = set()
+
+    def start(self, call_sid: str, from_number: Optional[str], warm: Iterable[Awaitable[Any]] = ()):
+        """Begin looking up a ringing call's number and run the given warm-up coroutines."""
+        for coroutine in warm:
+            task = asyncio.ensure_future(coroutine)
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+
+        phone = normalize_phone(from_number)
+        if self.directory is None or phone is None:
+            return
+
+        self._expire(time.monotonic())
+        self._entries[call_sid] = (time.monotonic() + self.ttl, asyncio.create_task(self._lookup(phone)))
+
+    async def _lookup(self, phone: str) -> Optional[CustomerContext]:
+        started = time.perf_counter()
+        try:
+            customer = await self.directory.lookup(phone)
+        finally:
+            metrics.observe("voice_prefetch_seconds", time.perf_counter() - started)
+        return customer
+
+    def _expire(self, now: float):
+        while self._entries:
+            call_sid, (expires_at, task) = next(iter(self._entries.items()))
+            if expires_at > now and len(self._entries) < self.max_entries:
+                break
+            del self._entries[call_sid]
+            task.cancel()
+            metrics.inc("voice_prefetch_total", result="expired")
+
+    async def take(self, call_sid: str) -> Optional[CustomerContext]:
+        """The caller's record, if a lookup for this call finds one in time; never raises."""
+        entry = self._entries.pop(call_sid, None)
+        if entry is None:
+            metrics.inc("voice_prefetch_total", result="none")
+            return None
+        expires_at, task = entry
+        if expires_at < time.monotonic():
+            task.cancel()
+            metrics.inc("voice_prefetch_total", result="expired")
+            return None
+
+        try:
+            customer = await asyncio.wait_for(task, self.wait_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"[{call_sid}] Caller lookup still running after {self.wait_timeout}s, going without")
+            metrics.inc("voice_prefetch_total", result="timeout")
+            return None
+        except Exception as e:
+            logger.warning(f"[{call_sid}] Caller lookup failed: {e}")
+            metrics.inc("voice_prefetch_total", result="error")
+            return None
+
+        metrics.inc("voice_prefetch_total", result="match" if customer else "unknown")
+        return customer
+
+    async def aclose(self):
+        for _, task in self._entries.values():
+            task.cancel()
+        self._entries.clear()
+        if self.directory is not None:
+            await self.directory.aclose()
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Pricing Phrase Index - Kipper Energy Solutions
+===============================================
+
+Matches spoken service descriptions to the pricing table, tolerating the way
+callers (and speech-to-text) actually phrase things:
+
+- "tune up for my air conditioner" → HVAC / ac tune-up
+- "hot water heater went out, need a new one" → Plumbing / water heater replacement
+- "how much for a generater install" → Electrical / generator installation
+
+The table is compiled once into:
+1. A token trie of multi-word synonyms ("air conditioner" → ac), applied
+   longest-match-first in a single left-to-right pass
+2. A SymSpell-style deletion dictionary for edit-distance matching of ASR
+   typos against the known vocabulary
+3. An inverted index from canonical token → services, so a query only
+   scores services that share a token with it
+
+Query cost depends on the length of the utterance, not the size of the
+table.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple, Set
+
+MATCH_THRESHOLD = 0.6
+FUZZY_WEIGHT = 0.8
+TRADE_HINT_BONUS = 0.05
+CORRECTION_CACHE_SIZE = 4096
+
+# =============================================================================
+# Vocabulary
+# =============================================================================
+
+# Spoken phrase → canonical phrase. Multi-word sources go through the trie.
+SYNONYMS = {
+    "air conditioner": "ac", "air conditioning": "ac", "a c": "ac", "a/c": "ac",
+    "ac unit": "ac", "central air": "ac", "cooling system": "ac", "air": "ac",
+    "tune up": "tuneup", "tune-up": "tuneup", "maintenance": "tuneup", "check up": "tuneup",
+    "checkup": "tuneup", "annual service": "tuneup", "precision tune": "tuneup",
+    "heating system": "furnace", "heater": "furnace", "heat": "furnace",
+    "heat pump": "heat pump", "water heater": "water heater",
+    "hot water heater": "water heater", "water tank": "water heater", "hot water tank": "water heater",
+    "tankless": "water heater", "hot water": "water heater",
+    "new water heater": "water heater replacement", "new hot water heater": "water heater replacement",
+    "install": "installation", "installed": "installation", "installing": "installation",
+    "put in": "installation", "hook up": "installation", "new": "installation", "add": "installation",
+    "replace": "replacement", "replaced": "replacement", "replacing": "replacement",
+    "swap out": "replacement", "swap": "replacement",
+    "fix": "repair", "fixed": "repair", "fixing": "repair", "broken": "repair",
+    "not working": "repair", "stopped working": "repair", "went out": "repair",
+    "clean": "cleaning", "cleaned": "cleaning", "clean out": "cleaning", "wash": "cleaning",
+    "clogged": "clog", "unclog": "clog", "backed up": "clog", "snake": "clog",
+    "clogged drain": "drain cleaning", "drain clog": "drain cleaning", "rooter": "drain cleaning",
+    "electrical panel": "panel", "breaker box": "panel", "breaker panel": "panel",
+    "fuse box": "panel", "service panel": "panel", "upgraded": "upgrade",
+    "electric car charger": "ev charger", "car charger": "ev charger", "tesla charger": "ev charger",
+    "charging station": "ev charger", "level 2 charger": "ev charger", "e v": "ev",
+    "backup generator": "generator", "standby generator": "generator", "generac": "generator",
+    "plug": "outlet", "receptacle": "outlet", "socket": "outlet",
+    "solar panel": "panel", "solar panels": "panel", "solar": "panel",
+    "powerwall": "battery", "battery backup": "battery", "home battery": "battery",
+    "fire sprinkler": "sprinkler", "sprinkler system": "sprinkler",
+    "inspect": "inspection", "inspected": "inspection", "look at": "inspection",
+    "fire alarm": "alarm", "smoke alarm": "alarm", "smoke detector": "alarm", "alarm system": "alarm",
+    "test": "testing", "tested": "testing",
+    "fire extinguisher": "extinguisher", "recharge": "service", "refill": "service",
+    "diagnostic": "service call", "diagnosis": "service call", "trip charge": "service call",
+    "come out": "service call", "house call": "service call",
+    "leaking": "leak", "leaky": "leak", "dripping": "leak", "drip": "leak",
+}
+
+STOPWORDS = {
+    "a", "an", "the", "my", "our", "for", "to", "of", "on", "in", "at", "i", "we", "you",
+    "need", "needs", "want", "get", "got", "how", "much", "is", "it", "its", "be", "would",
+    "does", "do", "what", "price", "cost", "costs", "charge", "about", "some", "just",
+    "please", "um", "uh", "like", "kind", "sort", "one", "and", "me", "can", "could",
+}
+
+# Base pricing estimates by trade
+PRICING_TABLE = {
+    "HVAC": {
+        "service call": "$89-$129 diagnostic fee",
+        "ac tune-up": "$89-$149",
+        "furnace tune-up": "$89-$129",
+        "ac repair": "$150-$500+ depending on parts",
+        "heat pump installation": "$5,000-$15,000",
+        "ac installation": "$4,000-$12,000"
+    },
+    "Plumbing": {
+        "service call": "$79-$119 diagnostic fee",
+        "drain cleaning": "$99-$299",
+        "water heater repair": "$150-$400",
+        "water heater replacement": "$1,200-$3,500",
+        "leak repair": "$150-$600"
+    },
+    "Electrical": {
+        "service call": "$89-$149 diagnostic fee",
+        "outlet repair": "$75-$200",
+        "panel upgrade": "$1,500-$4,000",
+        "ev charger installation": "$500-$2,500",
+        "generator installation": "$5,000-$15,000"
+    },
+    "Solar": {
+        "system inspection": "$150-$300",
+        "panel cleaning": "$150-$400",
+        "inverter replacement": "$1,500-$3,500",
+        "battery installation": "$10,000-$25,000"
+    },
+    "Fire Protection": {
+        "sprinkler inspection": "$150-$400",
+        "alarm testing": "$100-$300",
+        "extinguisher service": "$20-$50 per unit"
+    }
+}
+
+# =============================================================================
+# Text Helpers
+# =============================================================================
+
+def tokenize(text: str) -> List[str]:
+    text = text.lower().replace("’", "'").replace("-", " ")
+    return re.findall(r"[a-z0-9/']+", text)
+
+
+def stem(token: str) -> str:
+    """Strip simple plurals ('drains' → 'drain', 'batteries' → 'battery')."""
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Damerau-Levenshtein distance, giving up early past ``limit``."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2: List[int] = []
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        row = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            row[j] = min(prev[j] + 1, row[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                row[j] = min(row[j], prev2[j - 2] + 1)
+        if min(row) > limit:
+            return limit + 1
+        prev2, prev = prev, row
+    return prev[-1]
+
+
+def deletes(word: str, distance: int) -> Set[str]:
+    """All strings reachable from ``word`` by up to ``distance`` deletions."""
+    results = {word}
+    frontier = {word}
+    for _ in range(distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        results |= frontier
+    return results
+
+
+def max_typos(word: str) -> int:
+    if len(word) >= 8:
+        return 2
+    if len(word) >= 5:
+        return 1
+    return 0
+
+# =============================================================================
+# Index
+# =============================================================================
+
+@dataclass
+class PricingMatch:
+    """Best pricing-table entry for an utterance."""
+
+    trade: str
+    service: str
+    price: str
+    score: float
+
+
+class PricingIndex:
+    """Compiled, typo-tolerant lookup over a {trade: {service: price}} table."""
+
+    def __init__(self, table: Dict[str, Dict[str, str]], synonyms: Dict[str, str] = SYNONYMS):
+        self.table = table
+        self.trie: Dict = {}
+        self.entries: List[Tuple[str, str, str, frozenset]] = []
+        self.postings: Dict[str, List[int]] = {}
+        self.vocabulary: Set[str] = set()
+        self.deletions: Dict[str, Set[str]] = {}
+        self._corrections: Dict[str, Optional[str]] = {}
+
+        for source, target in synonyms.items():
+            self._add_phrase(tokenize(source), [stem(t) for t in tokenize(target)])
+
+        for trade, services in table.items():
+            for service, price in services.items():
+                tokens = frozenset(self.normalize(service))
+                entry_id = len(self.entries)
+                self.entries.append((trade, service, price, tokens))
+                for token in tokens:
+                    self.postings.setdefault(token, []).append(entry_id)
+
+        # Fuzzy matching corrects toward words the table or synonyms know
+        self.vocabulary = set(self.postings) | self._trie_words(self.trie)
+        for word in self.vocabulary:
+            for deleted in deletes(word, max_typos(word)):
+                self.deletions.setdefault(deleted, set()).add(word)
+
+    def _add_phrase(self, tokens: List[str], replacement: List[str]):
+        node = self.trie
+        for token in tokens:
+            node = node.setdefault(stem(token), {})
+        node[None] = replacement
+
+    def _trie_words(self, node: Dict) -> Set[str]:
+        words = set()
+        for key, child in node.items():
+            if key is not None:
+                words.add(key)
+                words |= self._trie_words(child)
+        return words
+
+    def normalize(self, text: str) -> List[str]:
+        """Tokenize and rewrite synonyms to canonical tokens (exact matches only)."""
+        return [token for token, _ in self._canonical([(t, 1.0) for t in tokenize(text)])]
+
+    def _canonical(self, tokens: List[Tuple[str, float]]) -> List[Tuple[str, float]]:
+        """
+        Longest-match synonym rewrite over (token, weight) pairs.
+
+        A rewritten phrase carries the lowest weight of the tokens it consumed,
+        so a typo-corrected word never counts as much as an exact one.
+        """
+        stems = [stem(token) for token, _ in tokens]
+        out: List[Tuple[str, float]] = []
+        i = 0
+        while i < len(tokens):
+            node, j, match = self.trie, i, None
+            while j < len(tokens) and stems[j] in node:
+                node = node[stems[j]]
+                j += 1
+                if None in node:
+                    match = (j, node[None])
+            if match:
+                end, replacement = match
+                weight = min(w for _, w in tokens[i:end])
+                out.extend((token, weight) for token in replacement)
+                i = end
+                continue
+            if tokens[i][0] not in STOPWORDS and stems[i] not in STOPWORDS:
+                out.append((stems[i], tokens[i][1]))
+            i += 1
+        return out
+
+    def correct(self, token: str) -> Optional[str]:
+        """Closest vocabulary word within the typo budget, if any."""
+        if token in self.vocabulary or stem(token) in self.vocabulary:
+            return token
+        if token in self._corrections:
+            return self._corrections[token]
+        if len(self._corrections) >= CORRECTION_CACHE_SIZE:
+            self._corrections.clear()
+        self._corrections[token] = self._closest(token)
+        return self._corrections[token]
+
+    def _closest(self, token: str) -> Optional[str]:
+        budget = max_typos(token)
+        if budget == 0 or token in STOPWORDS:
+            return None
+        best, best_distance = None, budget + 1
+        for deleted in deletes(token, budget):
+            for candidate in self.deletions.get(deleted, ()):
+                distance = edit_distance(token, candidate, budget)
+                if distance < best_distance or (distance == best_distance and candidate < best):
+                    best, best_distance = candidate, distance
+        return best
+
+    def query_tokens(self, text: str) -> Dict[str, float]:
+        """Canonical tokens for an utterance, with typo corrections down-weighted."""
+        corrected: List[Tuple[str, float]] = []
+        for raw in tokenize(text):
+            fixed = self.correct(raw)
+            if fixed is None or fixed == raw:
+                corrected.append((raw, 1.0))
+            else:
+                corrected.append((fixed, FUZZY_WEIGHT))
+
+        query: Dict[str, float] = {}
+        for token, weight in self._canonical(corrected):
+            query[token] = max(query.get(token, 0.0), weight)
+        return query
+
+    def match(self, text: str, trade_hint: Optional[str] = None) -> Optional[PricingMatch]:
+        """Best-scoring service for an utterance, or None below the threshold."""
+        query = self.query_tokens(text)
+        candidates: Set[int] = set()
+        for token in query:
+            candidates.update(self.postings.get(token, ()))
+
+        scored = []
+        for entry_id in candidates:
+            trade, service, price, tokens = self.entries[entry_id]
+            matched = sum(query.get(token, 0.0) for token in tokens)
+            score = matched / len(tokens)
+            if trade_hint and trade == trade_hint:
+                score += TRADE_HINT_BONUS
+            scored.append((score, len(tokens), trade, service, price))
+
+        if not scored:
+            return None
+
+        scored.sort(key=lambda s: (-s[0], -s[1], s[2], s[3]))
+        best = scored[0]
+
+        # Two different services equally good means we don't know which one
+        if len(scored) > 1 and scored[1][0] == best[0] and scored[1][1] == best[1]:
+            return None
+
+        score = min(best[0], 1.0)
+        if score < MATCH_THRESHOLD:
+            return None
+        return PricingMatch(trade=best[2], service=best[3], price=best[4], score=round(score, 3))
+
+    def linear_scan(self, text: str, trade: str) -> Optional[str]:
+        """The original substring lookup, kept for benchmarking."""
+        for key, price in self.table.get(trade, {}).items():
+            if key in text.lower():
+                return price
+        return None
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Emergency Safety Classifier - Kipper Energy Solutions
+======================================================
+
+Spots life-safety calls (gas leaks, flooding, no heat/AC, electrical fire,
+commercial refrigeration failure) in each caller transcript before Claude
+sees it, so escalation and dispatch don't wait for a model round trip.
+
+- One compiled regex alternation over every phrase for every emergency
+  type in the dispatch agent's EMERGENCY_TYPES; a transcript is scanned
+  once, in microseconds
+- A phrase preceded by a negation in the same clause ("there's no gas
+  smell", "it's not flooding anymore") doesn't count
+- Hazard words need hazard context ("smoke coming from the outlet", "CO
+  alarm going off", "water in the basement"); a product or service
+  ("smoke detectors", "flood restoration", "gas fireplace") never escalates
+- Confidence is the phrase's weight, combined across phrases for the same
+  type, raised by urgency words ("strong", "everywhere", "right now") and
+  lowered by hedges ("maybe", "a little") and past tense ("last year")
+
+Hits at or above SAFETY_ESCALATE_CONFIDENCE escalate the call and start an
+emergency dispatch while Claude answers; weaker hits are only counted.
+
+Counters: voice_safety_hits_total{emergency, action}; timings in
+voice_safety_classify_seconds.
+
+Configuration (environment):
+- VOICE_SAFETY: Enable the classifier (default true)
+- SAFETY_ESCALATE_CONFIDENCE: Confidence that triggers escalation (default 0.85)
+"""
+
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from agents.dispatch_agent import EMERGENCY_TYPES
+from voice_metrics import metrics
+
+VOICE_SAFETY = os.getenv("VOICE_SAFETY", "true").lower() == "true"
+SAFETY_ESCALATE_CONFIDENCE = float(os.getenv("SAFETY_ESCALATE_CONFIDENCE", "0.85"))
+
+metrics.describe("voice_safety_hits_total", "Emergency phrases heard, by type and action (escalated/logged/negated)")
+metrics.describe("voice_safety_classify_seconds", "Time to run the emergency classifier on one transcript")
+
+# =============================================================================
+# Patterns
+# =============================================================================
+
+# Things that smoke or burn when something is wrong (not a fireplace or a cigarette)
+HAZARD_SOURCES = (
+    r"(?:outlet|plug|socket|panel|breaker(?: box)?|fuse box|wall|wiring|wires?|switch|light|fixture|"
+    r"unit|furnace|heater|ac|air handler|compressor|dryer|fan|vent|ceiling|attic|meter)s?"
+)
+
+# Phrases per emergency type, with how sure each one alone makes us. Single
+# hazard words ("smoke", "flood", "flames", "co") aren't enough on their own:
+# callers use them for products and services too
+EMERGENCY_PHRASES: Dict[str, List[Tuple[str, float]]] = {
+    "gas_leak": [
+        (r"gas leak(?:ing|s)?", 0.95),
+        (r"leaking gas", 0.95),
+        (r"smell(?:s|ing)?\s+(?:of\s+|like\s+)?(?:natural\s+)?gas", 0.9),
+        (r"gas\s+smell", 0.9),
+        (r"rotten eggs?", 0.75),
+        (r"(?:carbon monoxide|co)\s+(?:alarm|detector)s?\s+(?:is\s+|are\s+|keeps?\s+)?(?:going off|went off|beeping|sounding)", 0.95),
+        (r"carbon monoxide\s+(?:leak\w*|poisoning|in the (?:house|home|building))", 0.95),
+    ],
+    "flooding": [
+        (r"(?:basement|house|home|kitchen|bathroom|garage|floor|crawl\s?space|room|building|store)\s+"
+         r"(?:is\s+|has\s+|got\s+|just\s+)?(?:flooding|flooded)", 0.9),
+        (r"(?:it'?s|we'?re|we are|keeps?)\s+flooding", 0.85),
+        (r"water\s+(?:in|all over)\s+(?:the|my|our)\s+(?:house|home|basement|kitchen|floor|garage|building)", 0.85),
+        (r"burst(?:ed)?\s+pipe|pipe\s+(?:burst|broke|exploded)", 0.9),
+        (r"water\s+(?:everywhere|pouring|gushing|spraying)", 0.9),
+        (r"water\s+(?:is\s+)?coming\s+(?:through|down|in)", 0.8),
+        (r"water damage", 0.6),
+    ],
+    "no_heat": [
+        (r"no heat", 0.8),
+        (r"(?:heat|heater|heating|furnace)\s+(?:is\s+|has\s+)?(?:out|dead|died|stopped|not working|won'?t (?:come|turn) on)", 0.75),
+        (r"freezing\s+(?:in here|inside|in the house)", 0.6),
+    ],
+    "no_ac": [
+        (r"no (?:ac|a/c|air conditioning|cooling|air)", 0.75),
+        (r"(?:ac|a/c|air conditioner|air conditioning)\s+(?:is\s+|has\s+)?(?:out|dead|died|stopped|not working|quit)", 0.7),
+    ],
+    "electrical_fire": [
+        (r"(?:electrical|electric)\s+fire", 0.97),
+        (r"on fire|caught fire", 0.95),
+        (r"flames?\s+(?:coming\s+)?(?:from|out of)\s+(?:the|my|our)\s+" + HAZARD_SOURCES, 0.95),
+        (r"spark(?:s|ing)", 0.85),
+        (r"smok(?:e|ing)\s+(?:is\s+)?(?:coming\s+)?(?:from|out of)\s+(?:the|my|our)\s+" + HAZARD_SOURCES, 0.9),
+        (HAZARD_SOURCES + r"\s+(?:is\s+|was\s+|started\s+)?smoking", 0.9),
+        (r"(?:full of|filling (?:up )?with)\s+smoke|there'?s\s+smoke", 0.85),
+        (r"smoke\s+(?:alarm|detector)s?\s+(?:is\s+|are\s+|keeps?\s+)?(?:going off|went off|sounding)", 0.8),
+        (r"burning smell|smell(?:s|ing)?\s+(?:like\s+)?(?:something\s+)?burning", 0.85),
+        (r"(?:outlet|panel|breaker|wire|wiring)\s+(?:is\s+)?(?:melting|melted|hot to the touch|buzzing)", 0.8),
+    ],
+    "refrigeration_failure": [
+        (r"(?:walk-?in|cooler|freezer|refrigerat\w*)\s+(?:is\s+|has\s+)?(?:down|out|dead|died|failed|warm|not (?:cooling|working))", 0.8),
+        (r"food\s+(?:is\s+)?(?:spoiling|going bad|thawing)", 0.75),
+    ],
+}
+
+# A hazard word followed by one of these names something we sell, not an emergency
+SERVICE_NOUNS = re.compile(
+    r"^\s*(?:detectors?|alarms?|restoration|clean-?up|insurance|testing|tests?|inspections?|"
+    r"installation|install|fireplace|sump pumps?|barrier|vents?|prevention)\b"
+)
+
+NEGATIONS = re.compile(r"\b(?:no|not|never|don'?t|doesn'?t|didn'?t|isn'?t|wasn'?t|aren'?t|without|nothing like)\b")
+
+# Words that end a negation's scope
+CLAUSE_BREAK = re.compile(r"[.,;!?]|\b(?:but|and|though|however|because)\b")
+NEGATION_WINDOW = 4  # words before a phrase that can negate it
+
+URGENT = re.compile(r"\b(?:strong|really bad|everywhere|right now|help|hurry|kids?|baby|elderly|oxygen|can'?t breathe)\b")
+HEDGES = re.compile(r"\b(?:maybe|might|i think|not sure|a little|slight(?:ly)?|faint|kind of|sort of)\b")
+PAST = re.compile(r"\b(?:last (?:year|month|week|winter|summer|time)|used to|already fixed|was fixed|got fixed|years ago)\b")
+
+
+def _compile() -> Tuple[re.Pattern, Dict[str, Tuple[str, float]]]:
+    """One alternation with a named group per phrase."""
+    groups, parts = {}, []
+    for emergency, phrases in EMERGENCY_PHRASES.items():
+        if emergency not in EMERGENCY_TYPES:
+            raise ValueError(f"Unknown emergency type: {emergency}")
+        for pattern, weight in phrases:
+            name = f"p{len(parts)}"
+            groups[name] = (emergency, weight)
+            parts.append(f"(?P<{name}>{pattern})")
+    return re.compile(r"\b(?:" + "|".join(parts) + r")\b"), groups
+
+EMERGENCY_PATTERN, PHRASE_GROUPS = _compile()
+
+# =============================================================================
+# Classifier
+# =============================================================================
+
+@dataclass
+class SafetyHit:
+    """The most likely emergency in a transcript."""
+
+    emergency: str
+    confidence: float
+    phrases: List[str]
+    negated: List[str] = field(default_factory=list)
+
+    @property
+    def label(self) -> str:
+        return EMERGENCY_TYPES[self.emergency]["label"]
+
+    @property
+    def trade(self) -> str:
+        return EMERGENCY_TYPES[self.emergency]["trade"]
+
+
+def _is_negated(text: str, start: int) -> bool:
+    """Whether a negation in the same clause sits just before position `start`."""
+    before = text[:start]
+    brk = None
+    for brk in CLAUSE_BREAK.finditer(before):
+        pass
+    clause = before[brk.end():] if brk else before
+    words = clause.split()[-NEGATION_WINDOW:]
+    return bool(NEGATIONS.search(" ".join(words)))
+
+
+class SafetyClassifier:
+    """Scores a transcript for emergencies."""
+
+    def __init__(self, escalate_confidence: float = SAFETY_ESCALATE_CONFIDENCE):
+        self.escalate_confidence = escalate_confidence
+
+    def classify(self, transcript: str) -> Optional[SafetyHit]:
+        """The highest-confidence emergency mentioned (and not negated), or None."""
+        started = time.perf_counter()
+        text = transcript.lower()
+
+        scores: Dict[str, float] = {}
+        phrases: Dict[str, List[str]] = {}
+        negated: Dict[str, List[str]] = {}
+        for match in EMERGENCY_PATTERN.finditer(text):
+            emergency, weight = PHRASE_GROUPS[match.lastgroup]
+            if SERVICE_NOUNS.match(text, match.end()):
+                continue
+            if _is_negated(text, match.start()):
+                negated.setdefault(emergency, []).append(match.group())
+                continue
+            # Independent phrases for the same emergency reinforce each other
+            scores[emergency] = 1 - (1 - scores.get(emergency, 0.0)) * (1 - weight)
+            phrases.setdefault(emergency, []).append(match.group())
+
+        metrics.observe("voice_safety_classify_seconds", time.perf_counter() - started)
+
+        for emergency in negated:
+            if emergency not in scores:
+                metrics.inc("voice_safety_hits_total", emergency=emergency, action="negated")
+        if not scores:
+            return None
+
+        adjustment = 0.0
+        if URGENT.search(text):
+            adjustment += 0.05
+        if HEDGES.search(text):
+            adjustment -= 0.2
+        if PAST.search(text):
+            adjustment -= 0.4
+
+        emergency = max(scores, key=scores.get)
+        confidence = round(min(1.0, max(0.0, scores[emergency] + adjustment)), 3)
+        return SafetyHit(emergency, confidence, phrases[emergency], negated.get(emergency, []))
+
+    def should_escalate(self, hit: Optional[SafetyHit]) -> bool:
+        return hit is not None and hit.confidence >= self.escalate_confidence
+
+# What Claude should tell the caller while help is on the way
+SAFETY_INSTRUCTIONS = {
+    "gas_leak": "Tell them to leave the building now, not to use light switches, phones or flames inside, "
+                "and to call 911 or the gas company from outside.",
+    "flooding": "If it's safe, tell them to shut off the main water valve and keep away from water near "
+                "outlets or appliances.",
+    "electrical_fire": "If there is fire or smoke, tell them to get everyone out and call 911; they should "
+                       "not touch the panel or outlet.",
+}
+
+
+def emergency_context(hit: SafetyHit) -> str:
+    """System text telling Claude the emergency has already been escalated."""
+    lines = [
+        f"Safety check: the caller appears to be reporting an emergency ({hit.label}). "
+        "Emergency dispatch and a transfer to the on-call team have already been started, "
+        "so don't call escalate_to_human again for it.",
+        "Keep replies short: confirm the service address and a callback number, and tell them help is on the way."
+    ]
+    if hit.emergency in SAFETY_INSTRUCTIONS:
+        lines.append(SAFETY_INSTRUCTIONS[hit.emergency])
+    return "\n".join(lines)
@@ -13,26 +13,66 @@ Endpoints:
 - /ws/voice - WebSocket for ConversationRelay
 - /voice/inbound - Twilio webhook for inbound calls
 - /voice/outbound - API to initiate outbound calls
-- /voice/status - Call status webhook
+- /voice/outbound-twiml - Twilio webhook for answered outbound calls (campaign context for the session)
+- /voice/status - Call status webhook (also drives campaign retries and call analytics)
+- /voice/analytics - Rolling call statistics (JSON)
+- /campaigns - Queue an outbound call campaign; /campaigns/{id} for progress
+- /metrics - Per-turn latency and counters (Prometheus format)
+- /admin/drain - Stop taking calls ahead of a deploy (also SIGUSR1)
 
 Requirements:
     pip install fastapi uvicorn websockets anthropic httpx python-dotenv twilio
 """
 
 import os
+import re
+import sys
 import json
+import time
+import signal
 import asyncio
 import logging
 from datetime import datetime
-from typing import Optional, Dict, Any, List
-from contextlib import asynccontextmanager
-
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request, HTTPException
-from fastapi.responses import JSONResponse
+from pathlib import Path
+from typing import Optional, Dict, Any, List, AsyncIterator, Tuple
+from urllib.parse import urlencode
+from contextlib import aclosing, asynccontextmanager
+
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request, HTTPException, Header
+from fastapi.responses import JSONResponse, PlainTextResponse
+from pydantic import BaseModel
 from dotenv import load_dotenv
-import anthropic
 import httpx
 
+# Shared agent-fleet modules live in the repo root; voice modules sit here
+VOICE_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(VOICE_DIR.parent))
+sys.path.insert(0, str(VOICE_DIR))
+from agents.llm_client import get_llm_pool, close_llm_pool
+from agents.crm_writer import CRMJournalError, get_crm_writer, close_crm_writer
+from agents.prompt_cache import build_cached_request, TokenUsage, min_cacheable_tokens, prefix_tokens
+from agents.tool_selection import ToolSelector
+from agents.context_window import ConversationWindow, summarize_turns
+from agents.dispatch_agent import get_available_technicians, send_dispatch_notification
+from voice_metrics import metrics, TurnTimer
+from intent_router import IntentRouter, STATE_CODES, CITY_STATES
+from pricing_index import PricingIndex, PRICING_TABLE
+from service_area import ServiceAreaIndex
+from session_store import SessionState, create_session_store
+from campaigns import CampaignEngine, CampaignStore, TwilioDialer
+from speculation import Speculation, Speculator, VOICE_SPECULATIVE
+from transcript_store import TranscriptStore
+from call_analytics import CallAnalytics
+from drain import DrainController, VOICE_ADMIN_TOKEN
+from prefetch import CallerPrefetcher, default_directory, VOICE_PREFETCH
+from safety import SafetyClassifier, SafetyHit, emergency_context, VOICE_SAFETY
+from fillers import TurnDeadline
+from post_call import PostCallQueue
+from session_limits import (
+    SessionReaper, session_bytes, end_call, handoff_target, BUSY_MESSAGE, HANDOFF_MESSAGE, CALLBACK_MESSAGE,
+    VOICE_MAX_ACTIVE_SESSIONS, VOICE_IDLE_TIMEOUT_SECONDS, VOICE_MAX_SESSION_BYTES, VOICE_MAX_TURNS
+)
+
 # Load environment variables
 load_dotenv()
 
@@ -47,6 +87,21 @@ TWILIO_PHONE_NUMBER = os.getenv("TWILIO_PHONE_NUMBER")
 COPERNIQ_API_KEY = os.getenv("COPERNIQ_API_KEY")
 COPERNIQ_INSTANCE = os.getenv("COPERNIQ_COMPANY_ID", "388")
 
+CLAUDE_MODEL = "claude-sonnet-4-20250514"
+
+# Stream Claude tokens to ConversationRelay as they arrive (set "false" to
+# send one text frame per turn)
+VOICE_STREAMING = os.getenv("VOICE_STREAMING", "true").lower() == "true"
+
+# Answer simple service-area / pricing questions without calling Claude
+VOICE_FAST_PATH = os.getenv("VOICE_FAST_PATH", "true").lower() == "true"
+
+# Send only the tools the conversation is likely to need (see TOOL_INTENTS)
+VOICE_TOOL_SUBSET = os.getenv("VOICE_TOOL_SUBSET", "true").lower() == "true"
+
+# Tool-use round trips allowed per caller turn before Claude must answer
+MAX_TOOL_STEPS = int(os.getenv("VOICE_MAX_TOOL_STEPS", "4"))
+
 # Voice AI System Prompt for MEP Contractor
 SYSTEM_PROMPT = """You are a friendly, professional AI assistant for Kipper Energy Solutions, a multi-trade MEP contractor in the Southeast United States.
 
@@ -77,6 +132,29 @@ SYSTEM_PROMPT = """You are a friendly, professional AI assistant for Kipper Ener
 - Office hours: Monday-Friday 7am-6pm, Saturday 8am-2pm
 """
 
+# Why we're calling, by outbound call / campaign reason
+OUTBOUND_PURPOSES = {
+    "pm_reminder": "scheduling their preventive maintenance visit",
+    "collections": "an open balance on their account",
+    "service_follow_up": "following up on their recent service",
+}
+
+
+def outbound_opening(reason: str, customer_name: Optional[str] = None) -> Tuple[str, str]:
+    """Greeting and system context for a call we placed."""
+    purpose = OUTBOUND_PURPOSES.get(reason, reason.replace("_", " "))
+    if customer_name:
+        greeting = f"Hi, this is the AI assistant calling from Kipper Energy Solutions. Am I speaking with {customer_name}?"
+    else:
+        greeting = f"Hi, this is the AI assistant calling from Kipper Energy Solutions about {purpose}."
+    context = "\n".join([
+        "This is an outbound call Kipper Energy Solutions placed; the customer did not call us.",
+        f"- Calling about: {purpose}",
+        f"- Calling for: {customer_name}" if customer_name else "- Customer name unknown; ask who you're speaking with",
+        "Confirm you're speaking with the right person before discussing account details."
+    ])
+    return greeting, context
+
 # Tool definitions for Claude
 TOOLS = [
     {
@@ -212,6 +290,37 @@ TOOLS = [
     }
 ]
 
+# What in a caller's words makes each tool worth offering; tools stay offered
+# for the rest of the call once they are
+TOOL_INTENTS = {
+    "schedule_service_call": (
+        r"\b(?:schedul\w*|book\w*|appointment|come (?:out|by|over)|send (?:someone|somebody|a tech\w*)|"
+        r"tech(?:nician)?s?|visit|repair|fix|broke\w*|not (?:working|cooling|heating)|stopped|won'?t|"
+        r"leak\w*|clog\w*|install\w*|replac\w*|inspect\w*|tune-?up|maintenance|service call|"
+        r"availab\w*|today|tomorrow|this week|next week|monday|tuesday|wednesday|thursday|friday|saturday|"
+        r"morning|afternoon|problem|issue|emergency|urgent|asap|right away|warm|noise|noisy)\b"
+    ),
+    "check_service_area": (
+        r"\b(?:service area|serve|(?:do|does) (?:you|y'?all) (?:guys )?(?:service|cover|work in|go to)|"
+        r"area|zip|located|live in|address|\d{5}|"
+        + "|".join(sorted(STATE_CODES) + sorted(CITY_STATES)) + r")\b"
+    ),
+    "get_pricing_estimate": (
+        r"\b(?:price\w*|pricing|cost\w*|charge\w*|how much|estimate|quote|fee|rates?|expensive|cheap|afford\w*)\b"
+    ),
+    "log_call_disposition": (
+        r"\b(?:bye|goodbye|thanks|thank you|that'?s (?:all|it|everything)|call (?:me )?back|callback|"
+        r"wrong number|not interested|take me off|stop calling)\b"
+    ),
+}
+
+# Offered on every request
+ALWAYS_TOOLS = ["escalate_to_human"]
+
+# A subset that leaves tools + system prompt under the model's cache minimum
+# is never cached, so it costs more than the full list; send every tool then
+TOOL_SUBSET_MIN_TOKENS = min_cacheable_tokens(CLAUDE_MODEL) - prefix_tokens(SYSTEM_PROMPT)
+
 # =============================================================================
 # Logging Setup
 # =============================================================================
@@ -268,76 +377,71 @@ async def schedule_service_call(params: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
+# Served ZIP prefixes, cities and branches, loaded once at startup
+service_area_index = ServiceAreaIndex.load()
+
+
+def branch_phrase(branch: str, miles: int) -> str:
+    """Spoken sentence naming the branch that would send the technician."""
+    if miles < 15:
+        return f"Our {branch} branch is right nearby."
+    return f"Our {branch} branch is about {miles} miles away."
+
+
 def check_service_area(params: Dict[str, Any]) -> Dict[str, Any]:
     """Check if location is in service area."""
     state = params.get("state", "").upper()
 
-    # Kipper Energy Solutions service states
-    service_states = ["AL", "GA", "FL", "TN"]
+    match = service_area_index.resolve(
+        zip_code=params.get("zip_code"), city=params.get("city"), state=state
+    )
+    label = (match.city if match and match.matched_by != "state" else None) or params.get("zip_code") or state
 
-    if state in service_states:
-        return {
+    if match and match.in_service_area:
+        result = {
             "in_service_area": True,
-            "message": f"Great news! We service {state}. We can definitely help you."
+            "message": f"Great news! We service {label}. We can definitely help you."
         }
     else:
-        return {
+        result = {
             "in_service_area": False,
-            "message": f"Unfortunately, {state} is outside our current service area. We serve Alabama, Georgia, Florida, and Tennessee."
+            "message": f"Unfortunately, {label} is outside our current service area. We serve Alabama, Georgia, Florida, and Tennessee."
         }
 
+    if match:
+        result.update({"matched_by": match.matched_by, "state": match.state})
+        if match.nearest_branch:
+            result.update({
+                "city": match.city,
+                "nearest_branch": match.nearest_branch,
+                "distance_miles": match.distance_miles
+            })
+            if match.in_service_area:
+                result["message"] += f" {branch_phrase(match.nearest_branch, match.distance_miles)}"
+
+    return result
+
+
+# Compiled once; lookups cost the same however large the table grows
+pricing_index = PricingIndex(PRICING_TABLE)
+
 
 def get_pricing_estimate(params: Dict[str, Any]) -> Dict[str, Any]:
     """Get pricing estimate for service."""
     service_type = params.get("service_type", "").lower()
     trade = params.get("trade", "General")
 
-    # Base pricing estimates
-    estimates = {
-        "HVAC": {
-            "service call": "$89-$129 diagnostic fee",
-            "ac tune-up": "$89-$149",
-            "furnace tune-up": "$89-$129",
-            "ac repair": "$150-$500+ depending on parts",
-            "heat pump installation": "$5,000-$15,000",
-            "ac installation": "$4,000-$12,000"
-        },
-        "Plumbing": {
-            "service call": "$79-$119 diagnostic fee",
-            "drain cleaning": "$99-$299",
-            "water heater repair": "$150-$400",
-            "water heater replacement": "$1,200-$3,500",
-            "leak repair": "$150-$600"
-        },
-        "Electrical": {
-            "service call": "$89-$149 diagnostic fee",
-            "outlet repair": "$75-$200",
-            "panel upgrade": "$1,500-$4,000",
-            "ev charger installation": "$500-$2,500",
-            "generator installation": "$5,000-$15,000"
-        },
-        "Solar": {
-            "system inspection": "$150-$300",
-            "panel cleaning": "$150-$400",
-            "inverter replacement": "$1,500-$3,500",
-            "battery installation": "$10,000-$25,000"
-        },
-        "Fire Protection": {
-            "sprinkler inspection": "$150-$400",
-            "alarm testing": "$100-$300",
-            "extinguisher service": "$20-$50 per unit"
-        }
-    }
-
-    trade_estimates = estimates.get(trade, {})
+    match = pricing_index.match(service_type, trade_hint=trade)
 
-    for key, price in trade_estimates.items():
-        if key in service_type:
-            return {
-                "estimate": price,
-                "message": f"For {service_type}, typical pricing is {price}. Final price depends on specific conditions at your property.",
-                "disclaimer": "This is an estimate. A technician will provide an exact quote on-site."
-            }
+    if match:
+        return {
+            "estimate": match.price,
+            "matched_service": match.service,
+            "trade": match.trade,
+            "match_score": match.score,
+            "message": f"For {match.service}, typical pricing is {match.price}. Final price depends on specific conditions at your property.",
+            "disclaimer": "This is an estimate. A technician will provide an exact quote on-site."
+        }
 
     return {
         "estimate": "Varies",
@@ -368,137 +472,639 @@ async def escalate_to_human(params: Dict[str, Any]) -> Dict[str, Any]:
 
 
 async def log_call_disposition(params: Dict[str, Any]) -> Dict[str, Any]:
-    """Log call outcome to CRM."""
+    """Log call outcome to CRM (write-behind; returns once the record is journaled)."""
     disposition = params.get("disposition", "unknown")
     notes = params.get("notes", "")
+    call_sid = params.get("call_sid", "unknown")
+    timestamp = datetime.now().isoformat()
 
-    logger.info(f"Call disposition logged: {disposition} - {notes}")
+    writer = get_crm_writer()
+    seq = writer.submit("call_disposition", f"call:{call_sid}", {
+        "call_sid": call_sid,
+        "disposition": disposition,
+        "notes": notes,
+        "timestamp": timestamp
+    })
+    try:
+        await writer.journaled(seq)
+    except CRMJournalError as e:
+        logger.error(f"Call disposition not saved: {e}")
+        return {"success": False, "logged": False, "disposition": disposition, "error": str(e)}
+    call_analytics.note_disposition(call_sid, disposition)
+    logger.info(f"Call disposition queued: {disposition} - {notes}")
 
     return {
         "success": True,
         "logged": True,
+        "queued": True,
         "disposition": disposition,
-        "timestamp": datetime.now().isoformat()
+        "timestamp": timestamp
     }
 
+async def start_emergency_dispatch(call_sid: str, hit: SafetyHit, transcript: str) -> Dict[str, Any]:
+    """Page the first available technician for an emergency, ahead of the work order."""
+    technicians = get_available_technicians(hit.trade, is_emergency=True)
+    if not technicians:
+        logger.error(f"[{call_sid}] No {hit.trade} technician to dispatch for {hit.label}")
+        return {"success": False, "reason": f"No {hit.trade} technician available"}
+
+    return await send_dispatch_notification(
+        technicians[0]["id"], f"EMG-{call_sid}", "emergency", f"{hit.label} reported by caller: {transcript}"
+    )
+
+# =============================================================================
+# Fast-Path Router
+# =============================================================================
+
+intent_router = IntentRouter(check_service_area, get_pricing_estimate, service_area=service_area_index)
+
+metrics.describe("voice_fast_path_total", "Caller turns checked by the fast-path router, by result")
+metrics.describe("voice_fast_path_saved_seconds_total", "Estimated seconds saved by answering without Claude")
+
+# =============================================================================
+# Speech Streaming
+# =============================================================================
+
+# Sentence ends always flush; clause breaks flush once enough text is buffered
+# that TTS won't produce choppy one-word fragments
+SENTENCE_BOUNDARY = re.compile(r'[.!?](?:["\')\]]*)\s+')
+CLAUSE_BOUNDARY = re.compile(r'[,;:—](?:["\')\]]*)\s+')
+MIN_CLAUSE_CHARS = 24
+
+
+class SpeechChunker:
+    """Buffers streamed tokens and releases speakable sentence/clause chunks."""
+
+    def __init__(self, min_clause_chars: int = MIN_CLAUSE_CHARS):
+        self.min_clause_chars = min_clause_chars
+        self.buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        """Add streamed text and return any chunks ready to speak."""
+        self.buffer += text
+        chunks = []
+
+        while True:
+            cut = self._find_cut()
+            if cut is None:
+                break
+            chunk = self.buffer[:cut].strip()
+            self.buffer = self.buffer[cut:]
+            if chunk:
+                chunks.append(chunk)
+
+        return chunks
+
+    def flush(self) -> List[str]:
+        """Return whatever is left in the buffer at the end of a response."""
+        chunk = self.buffer.strip()
+        self.buffer = ""
+        return [chunk] if chunk else []
+
+    def _find_cut(self) -> Optional[int]:
+        sentence = SENTENCE_BOUNDARY.search(self.buffer)
+        if sentence:
+            return sentence.end()
+
+        for clause in CLAUSE_BOUNDARY.finditer(self.buffer):
+            if clause.start() >= self.min_clause_chars:
+                return clause.end()
+
+        return None
+
+
+def content_block_to_param(block: Any) -> Dict[str, Any]:
+    """Convert a response content block into a message param for the history."""
+    if block.type == "tool_use":
+        return {"type": "tool_use", "id": block.id, "name": block.name, "input": block.input}
+    return {"type": "text", "text": block.text}
+
 # =============================================================================
 # Voice AI Session Manager
 # =============================================================================
 
+# Token and prompt-cache totals across every call in this process
+voice_usage = TokenUsage()
+
+# Every turn, tool call and timing of every call, written in the background
+transcripts = TranscriptStore()
+
+
 class VoiceAISession:
     """Manages a single voice conversation session."""
 
     def __init__(self, call_sid: str):
         self.call_sid = call_sid
-        self.conversation: List[Dict[str, Any]] = []
-        self.client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
+        self.llm = get_llm_pool()
+        self.conversation = ConversationWindow(summarizer=self._summarize)
+        self.usage = TokenUsage()
         self.started_at = datetime.now()
         self.call_disposition = None
+        self.trade: Optional[str] = None
+
+        # The caller message that opened the latest turn, and the text sent
+        # to TTS since, so an interrupted turn can be trimmed to what was said
+        self.turn_message: Optional[Dict[str, Any]] = None
+        self.turn_spoken: List[str] = []
+
+        # Caller turns so far, and liveness for the session reaper
+        self.turns = 0
+        self.last_activity = time.monotonic()
+        self.connection_task: Optional[asyncio.Task] = None
+        self.websocket: Optional[WebSocket] = None
+
+        # Caller-ID lookup started at ring time, and what it found
+        self.prefetch: Optional[asyncio.Task] = None
+        self.caller_context: Optional[str] = None
+
+        # Emergency escalated for this call by the safety classifier, if any
+        self.emergency: Optional[SafetyHit] = None
+        self.escalation: Optional[asyncio.Task] = None
+
+        # Tools offered to Claude so far this call
+        self.tool_selector = ToolSelector(TOOLS, TOOL_INTENTS, always=ALWAYS_TOOLS, min_tokens=TOOL_SUBSET_MIN_TOKENS)
+
+    @property
+    def handoff_priority(self) -> Optional[str]:
+        """Priority for a transfer to a person: emergencies go to the on-call line."""
+        return "emergency" if self.emergency else None
+
+    def snapshot(self) -> SessionState:
+        """Serializable state for the session store."""
+        return SessionState(
+            call_sid=self.call_sid,
+            messages=self.conversation.messages,
+            summary=self.conversation.summary,
+            folded_turns=self.conversation.folded_turns,
+            trade=self.trade,
+            call_disposition=self.call_disposition,
+            started_at=self.started_at.isoformat(),
+            usage=self.usage.as_dict(),
+            turns=self.turns,
+            caller_context=self.caller_context,
+            offered_tools=sorted(self.tool_selector.offered)
+        )
 
-    async def process_message(self, user_message: str) -> str:
+    @classmethod
+    def restore(cls, state: SessionState) -> "VoiceAISession":
+        """Rebuild a session saved by another worker (e.g. after a reconnect)."""
+        session = cls(state.call_sid)
+        session.conversation.messages = list(state.messages)
+        session.conversation.summary = state.summary
+        session.conversation.folded_turns = state.folded_turns
+        session.trade = state.trade
+        session.call_disposition = state.call_disposition
+        session.started_at = datetime.fromisoformat(state.started_at)
+        session.usage = TokenUsage(**{k: v for k, v in state.usage.items() if k != "cache_hit_rate"})
+        session.turns = state.turns
+        session.caller_context = state.caller_context
+        session.tool_selector.offered.update(state.offered_tools)
+        return session
+
+    async def process_message(
+        self,
+        user_message: str,
+        timer: Optional[TurnTimer] = None,
+        speculation: Optional[Speculation] = None
+    ) -> str:
         """Process user message and return AI response."""
+        timer = timer or TurnTimer(trade=self.trade)
+
+        fast_answer = self._try_fast_path(user_message, timer)
+        if fast_answer:
+            if speculation:
+                speculation.discard("fast_path")
+            return fast_answer
+
+        await self._apply_prefetch()
 
         # Add user message to conversation
-        self.conversation.append({
-            "role": "user",
-            "content": user_message
-        })
+        self._begin_turn(user_message)
 
-        # Call Claude API
+        # Call Claude until it stops asking for tools
         try:
-            response = self.client.messages.create(
-                model="claude-sonnet-4-20250514",
-                max_tokens=1024,
-                system=SYSTEM_PROMPT,
-                tools=TOOLS,
-                messages=self.conversation
-            )
-
-            # Process response
-            assistant_content = []
-            text_response = ""
-
-            for block in response.content:
-                if block.type == "text":
-                    text_response = block.text
-                    assistant_content.append({"type": "text", "text": block.text})
-
-                elif block.type == "tool_use":
-                    # Execute the tool
-                    tool_result = await execute_tool(block.name, block.input)
-
-                    # Add tool use to conversation
-                    assistant_content.append({
-                        "type": "tool_use",
-                        "id": block.id,
-                        "name": block.name,
-                        "input": block.input
-                    })
-
-                    # Add assistant message with tool use
-                    self.conversation.append({
-                        "role": "assistant",
-                        "content": assistant_content
-                    })
-
-                    # Add tool result
-                    self.conversation.append({
-                        "role": "user",
-                        "content": [{
-                            "type": "tool_result",
-                            "tool_use_id": block.id,
-                            "content": json.dumps(tool_result)
-                        }]
-                    })
-
-                    # Get follow-up response from Claude
-                    follow_up = self.client.messages.create(
-                        model="claude-sonnet-4-20250514",
-                        max_tokens=1024,
-                        system=SYSTEM_PROMPT,
-                        tools=TOOLS,
-                        messages=self.conversation
-                    )
-
-                    for fb in follow_up.content:
-                        if fb.type == "text":
-                            text_response = fb.text
-                            self.conversation.append({
-                                "role": "assistant",
-                                "content": [{"type": "text", "text": fb.text}]
-                            })
-                            break
-
-                    return text_response
-
-            # If no tool was used, add text response to conversation
-            if assistant_content:
-                self.conversation.append({
-                    "role": "assistant",
-                    "content": assistant_content
-                })
+            spoken = []
 
-            return text_response
+            for step in range(MAX_TOOL_STEPS + 1):
+                timer.mark("llm_request_start")
+                response = await self._adopt(speculation, timer) if step == 0 else None
+                if response is None:
+                    with timer.llm_call("initial" if step == 0 else "follow_up"):
+                        response = await self.llm.create(**self._claude_request(step))
+                timer.mark("first_token")
+                spoken.extend(block.text for block in response.content if block.type == "text")
+
+                if not await self._record_response(response, timer):
+                    break
+
+            self.conversation.maybe_fold()
+            return " ".join(spoken)
 
         except Exception as e:
             logger.error(f"Error processing message: {e}")
+            metrics.inc("voice_errors_total", stage="llm")
             return "I apologize, but I'm having technical difficulties. Let me transfer you to a team member."
 
+    async def stream_message(
+        self,
+        user_message: str,
+        timer: Optional[TurnTimer] = None,
+        speculation: Optional[Speculation] = None
+    ) -> AsyncIterator[str]:
+        """
+        Process user message, yielding speakable chunks as Claude streams them.
+
+        Text is released at sentence/clause boundaries so TTS can start on the
+        first clause. Tool calls are gathered from the final streamed message,
+        run concurrently, and the follow-up is streamed the same way. A
+        confirmed speculation stands in for the first Claude call.
+        """
+        timer = timer or TurnTimer(trade=self.trade)
+
+        fast_answer = self._try_fast_path(user_message, timer)
+        if fast_answer:
+            if speculation:
+                speculation.discard("fast_path")
+            yield fast_answer
+            return
+
+        await self._apply_prefetch()
+        self._begin_turn(user_message)
+
+        chunker = SpeechChunker()
+
+        try:
+            for step in range(MAX_TOOL_STEPS + 1):
+                timer.mark("llm_request_start")
+                response = await self._adopt(speculation, timer) if step == 0 else None
+                if response is not None:
+                    timer.mark("first_token")
+                    for block in response.content:
+                        if block.type == "text":
+                            for chunk in chunker.feed(block.text):
+                                yield chunk
+                else:
+                    with timer.llm_call("initial" if step == 0 else "follow_up"):
+                        async with self.llm.stream(**self._claude_request(step)) as stream:
+                            async for text in stream.text_stream:
+                                timer.mark("first_token")
+                                for chunk in chunker.feed(text):
+                                    yield chunk
+                            response = await stream.get_final_message()
+
+                if not await self._record_response(response, timer):
+                    break
+
+            for chunk in chunker.flush():
+                yield chunk
+
+            self.conversation.maybe_fold()
+
+        except Exception as e:
+            logger.error(f"Error streaming message: {e}")
+            metrics.inc("voice_errors_total", stage="llm")
+            yield "I apologize, but I'm having technical difficulties. Let me transfer you to a team member."
+
+    def _begin_turn(self, user_message: str):
+        """Append the caller's message and start tracking what gets spoken."""
+        self.turn_message = {"role": "user", "content": user_message}
+        self.turn_spoken = []
+        self.turns += 1
+        self.conversation.append(self.turn_message)
+        transcripts.record(self.call_sid, "caller", text=user_message)
+
+    def note_spoken(self, text: str):
+        """Record text that has been sent to TTS for the current turn."""
+        self.turn_spoken.append(text)
+
+    def abandon_turn(self, heard: Optional[str] = None):
+        """
+        Trim the latest turn to what the caller actually heard (barge-in).
+
+        Completed tool round trips are kept, so Claude still knows about an
+        appointment that was booked, but their unspoken text is dropped, as is
+        a tool_use whose results never came back. What was spoken is recorded
+        as the assistant's reply.
+
+        Args:
+            heard: Text Twilio reports as played before the interruption;
+                defaults to everything sent to TTS this turn
+        """
+        messages = self.conversation.messages
+        start = next((i for i in range(len(messages) - 1, -1, -1) if messages[i] is self.turn_message), None)
+        if start is None:
+            return
+
+        turn = messages[start:]
+        kept = [turn[0]]
+        for call, results in zip(turn[1::2], turn[2::2]):
+            tool_uses = [b for b in call["content"] if b.get("type") == "tool_use"]
+            if call["role"] != "assistant" or not tool_uses or results["role"] != "user":
+                break
+            kept.extend([{"role": "assistant", "content": tool_uses}, results])
+
+        spoken = heard if heard is not None else " ".join(self.turn_spoken)
+        if spoken.strip():
+            kept.append({"role": "assistant", "content": [{"type": "text", "text": spoken.strip()}]})
+
+        del messages[start:]
+        messages.extend(kept)
+        transcripts.record(self.call_sid, "barge_in", heard=spoken.strip())
+
+    def _try_fast_path(self, user_message: str, timer: TurnTimer) -> Optional[str]:
+        """
+        Answer a simple question deterministically, skipping Claude.
+
+        The exchange is still added to the conversation so later turns have
+        the context. Returns None when the router isn't confident.
+        """
+        if not VOICE_FAST_PATH:
+            return None
+
+        started = time.perf_counter()
+        routed = intent_router.route(user_message)
+        elapsed = time.perf_counter() - started
+
+        if routed is None:
+            metrics.inc("voice_fast_path_total", result="miss", intent="none")
+            return None
+
+        self._begin_turn(user_message)
+        self.conversation.append({
+            "role": "assistant",
+            "content": [{"type": "text", "text": routed.answer}]
+        })
+        self.conversation.maybe_fold()
+        transcripts.record(self.call_sid, "assistant", text=routed.answer, intent=routed.intent)
+
+        timer.path = "fast_path"
+        metrics.inc("voice_fast_path_total", result="hit", intent=routed.intent)
+        metrics.observe("voice_fast_path_seconds", elapsed, intent=routed.intent)
+
+        typical_llm_turn = metrics.quantile("voice_turn_seconds", 0.5, path="llm")
+        if typical_llm_turn is not None:
+            metrics.inc("voice_fast_path_saved_seconds_total", max(0.0, typical_llm_turn - elapsed))
+
+        logger.info(f"[{self.call_sid}] Fast path ({routed.intent}, {elapsed * 1e6:.0f}us)")
+        return routed.answer
+
+    def _claude_request(
+        self,
+        step: int,
+        messages: Optional[List[Dict[str, Any]]] = None,
+        commit: bool = True
+    ) -> Dict[str, Any]:
+        """Build request kwargs for one step of the tool loop (commit=False leaves offered tools as they were)."""
+        messages = self.conversation.messages if messages is None else messages
+        request = build_cached_request(
+            model=CLAUDE_MODEL,
+            max_tokens=1024,
+            system=SYSTEM_PROMPT,
+            tools=self.tool_selector.select(messages, commit=commit) if VOICE_TOOL_SUBSET else TOOLS,
+            messages=messages,
+            context=[
+                self.caller_context,
+                emergency_context(self.emergency) if self.emergency else None,
+                self.conversation.summary_context()
+            ]
+        )
+
+        # Out of tool steps: keep the tool list (and prompt prefix) identical
+        # but force a spoken answer
+        if step >= MAX_TOOL_STEPS:
+            request["tool_choice"] = {"type": "none"}
+
+        return request
+
+    async def _summarize(self, previous: str, messages: List[Dict[str, Any]]) -> str:
+        """Fold old turns into the running summary (runs in the background)."""
+        return await summarize_turns(self.llm, previous, messages)
+
+    def check_safety(self, transcript: str) -> bool:
+        """
+        Run the emergency classifier on a final transcript (before Claude sees it).
+
+        A high-confidence emergency is escalated and dispatched in the
+        background, once per call, and Claude is told so for this and later
+        turns. Returns True when an escalation was started.
+        """
+        hit = safety_classifier.classify(transcript)
+        if hit is None:
+            return False
+        if not safety_classifier.should_escalate(hit):
+            metrics.inc("voice_safety_hits_total", emergency=hit.emergency, action="logged")
+            return False
+        if self.emergency and self.emergency.emergency == hit.emergency:
+            return False
+
+        metrics.inc("voice_safety_hits_total", emergency=hit.emergency, action="escalated")
+        logger.warning(f"[{self.call_sid}] Emergency detected: {hit.label} ({hit.confidence:.2f}, {hit.phrases})")
+        transcripts.record(self.call_sid, "safety", emergency=hit.emergency, confidence=hit.confidence,
+                           phrases=hit.phrases)
+        self.emergency = hit
+        if not self.trade:
+            self.trade = hit.trade
+        self.escalation = asyncio.create_task(self._escalate(hit, transcript))
+        return True
+
+    async def _escalate(self, hit: SafetyHit, transcript: str):
+        """Hand off to the on-call team and dispatch a technician, concurrently."""
+        results = await asyncio.gather(
+            escalate_to_human({"priority": "emergency", "reason": f"{hit.label}: {transcript}"}),
+            start_emergency_dispatch(self.call_sid, hit, transcript),
+            return_exceptions=True
+        )
+        for step, result in zip(("escalation", "dispatch"), results):
+            if isinstance(result, Exception):
+                logger.error(f"[{self.call_sid}] Emergency {step} failed: {result}")
+                metrics.inc("voice_errors_total", stage=f"emergency_{step}")
+            else:
+                transcripts.record(self.call_sid, "tool_result", name=f"emergency_{step}", content=json.dumps(result),
+                                   is_error=False)
+
+    async def _apply_prefetch(self):
+        """Add the caller-ID lookup to the system context (first turn only)."""
+        task = self.prefetch
+        if task is None:
+            return
+        # Shielded: a cancelled speculation mustn't cancel the lookup for the real turn
+        customer = await asyncio.shield(task)
+        if self.prefetch is task:
+            self.prefetch = None
+            if customer is not None:
+                self.caller_context = customer.as_context()
+                logger.info(f"[{self.call_sid}] Caller identified: {customer.contact.get('name')}")
+
+    async def speculate(self, partial: str) -> Any:
+        """First Claude call for a turn the caller hasn't finished; the conversation is left untouched."""
+        await self._apply_prefetch()
+        messages = self.conversation.messages + [{"role": "user", "content": partial}]
+        # The partial may not stand, so it doesn't add tools to the call
+        return await self.llm.create(**self._claude_request(0, messages, commit=False))
+
+    async def _adopt(self, speculation: Optional[Speculation], timer: TurnTimer) -> Any:
+        """The confirmed speculative response, or None to make the call normally."""
+        if speculation is None:
+            return None
+        try:
+            with timer.llm_call("speculative"):
+                response = await speculation.adopt()
+        except Exception as e:
+            logger.warning(f"[{self.call_sid}] Speculative request failed, reissuing: {e}")
+            return None
+        # Offer from now on what the final transcript asks for
+        if VOICE_TOOL_SUBSET:
+            self.tool_selector.select(self.conversation.messages)
+        timer.path = "speculative"
+        return response
+
+    async def _record_response(self, response: Any, timer: TurnTimer) -> bool:
+        """
+        Add a Claude response to the conversation and run its tool calls.
+
+        All tool_use blocks run concurrently and their results go back in a
+        single user message. Returns True if tools ran and Claude needs a
+        follow-up call.
+        """
+        self.usage.add(response.usage)
+        voice_usage.add(response.usage)
+
+        if response.content:
+            self.conversation.append({
+                "role": "assistant",
+                "content": [content_block_to_param(block) for block in response.content]
+            })
+
+        text = " ".join(block.text for block in response.content if block.type == "text")
+        if text:
+            transcripts.record(self.call_sid, "assistant", text=text)
+
+        tool_blocks = [block for block in response.content if block.type == "tool_use"]
+        if not tool_blocks:
+            return False
+
+        results = await asyncio.gather(
+            *(self._run_tool(block, timer) for block in tool_blocks),
+            return_exceptions=True
+        )
+
+        tool_results = []
+        for block, result in zip(tool_blocks, results):
+            if isinstance(result, Exception):
+                logger.error(f"[{self.call_sid}] Tool {block.name} failed: {result}")
+                tool_results.append({
+                    "type": "tool_result",
+                    "tool_use_id": block.id,
+                    "content": json.dumps({"error": str(result)}),
+                    "is_error": True
+                })
+            else:
+                tool_results.append({
+                    "type": "tool_result",
+                    "tool_use_id": block.id,
+                    "content": json.dumps(result)
+                })
+
+        self.conversation.append({
+            "role": "user",
+            "content": tool_results
+        })
+        for block, result in zip(tool_blocks, tool_results):
+            transcripts.record(self.call_sid, "tool_result", name=block.name, content=result["content"],
+                               is_error=result.get("is_error", False))
+
+        return True
+
+    async def _run_tool(self, block: Any, timer: TurnTimer) -> Dict[str, Any]:
+        """Execute one tool call, timing it and noting the call's trade and disposition."""
+        trade = block.input.get("trade")
+        if trade and not self.trade:
+            self.trade = timer.trade = trade
+        if block.name == "log_call_disposition" and block.input.get("disposition"):
+            self.call_disposition = block.input["disposition"]
+
+        transcripts.record(self.call_sid, "tool_call", name=block.name, input=block.input)
+        with timer.tool(block.name):
+            return await execute_tool(block.name, {**block.input, "call_sid": self.call_sid})
+
 # =============================================================================
 # FastAPI Application
 # =============================================================================
 
-# Store active sessions
+# Live sessions on this worker
 active_sessions: Dict[str, VoiceAISession] = {}
 
+# Drops sessions whose socket died without a hangup
+session_reaper = SessionReaper(active_sessions)
+
+# Emergency phrase matcher run on every caller transcript
+safety_classifier = SafetyClassifier()
+
+# Caller lookups started by /voice/inbound, picked up by the call's first turn
+caller_prefetcher = CallerPrefetcher(default_directory() if VOICE_PREFETCH else None)
+
+# Takes this worker out of rotation without cutting calls off
+worker_drain = DrainController(active_sessions)
+
+# Snapshots of every call in progress, shared across workers when SESSION_STORE=sqlite
+session_store = create_session_store()
+
+# Rolling call-lifecycle statistics from status callbacks
+call_analytics = CallAnalytics()
+
+# Structured write-ups of ended calls, summarized off the WebSocket path
+post_call = PostCallQueue()
+
+# Outbound dialing: one shared Twilio client, and the campaign queue and workers
+twilio_dialer = TwilioDialer()
+campaign_engine = CampaignEngine(CampaignStore(), twilio_dialer)
+
+async def start_drain(reason: str) -> asyncio.Task:
+    """Stop taking calls and let live ones finish (see drain.py)."""
+    task = worker_drain.begin(reason)
+    await campaign_engine.stop()
+    return task
+
+
+async def flush_buffers():
+    """Write out everything held in memory for calls that have ended."""
+    await post_call.flush(timeout=60)
+    await get_crm_writer().flush(timeout=30)
+    await transcripts.flush()
+    await call_analytics.refresh()
+    await call_analytics.snapshot()
+
+worker_drain.on_drained(flush_buffers)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager."""
     logger.info("Voice AI Server starting up...")
     logger.info(f"Coperniq Instance: {COPERNIQ_INSTANCE}")
     logger.info(f"Twilio Phone: {TWILIO_PHONE_NUMBER}")
+    if campaign_engine.dialer.configured:
+        await campaign_engine.start()
+    session_reaper.start()
+    call_analytics.start()
+    try:
+        asyncio.get_running_loop().add_signal_handler(
+            signal.SIGUSR1, lambda: asyncio.ensure_future(start_drain("SIGUSR1"))
+        )
+    except (NotImplementedError, RuntimeError, ValueError):
+        pass  # no signals off the main thread or on Windows; use POST /admin/drain
     yield
     logger.info("Voice AI Server shutting down...")
+    await start_drain("shutdown")
+    await worker_drain.wait()
+    await session_reaper.stop()
+    await call_analytics.stop()
+    await campaign_engine.stop()
+    await post_call.close()
+    await close_llm_pool()
+    await caller_prefetcher.aclose()
+    await close_crm_writer()
+    await transcripts.close()
+    await session_store.close()
 
 app = FastAPI(
     title="Kipper Energy Solutions Voice AI",
@@ -512,26 +1118,159 @@ app = FastAPI(
 async def root():
     """Health check endpoint."""
     return {
-        "status": "healthy",
+        "status": "draining" if worker_drain.draining else "healthy",
         "service": "Kipper Energy Solutions Voice AI",
         "instance": COPERNIQ_INSTANCE,
-        "active_calls": len(active_sessions)
+        "active_calls": await session_store.count()
     }
 
 
 @app.get("/health")
 async def health():
-    """Detailed health check."""
-    return {
-        "status": "healthy",
+    """Detailed health check (503 while draining, so new calls route elsewhere)."""
+    body = {
+        "status": "draining" if worker_drain.draining else "healthy",
         "components": {
             "anthropic_api": "configured" if ANTHROPIC_API_KEY else "missing",
             "twilio": "configured" if all([TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN]) else "missing",
             "coperniq": "configured" if COPERNIQ_API_KEY else "missing"
         },
-        "active_sessions": len(active_sessions),
+        "active_sessions": await session_store.count(),
+        "worker_sessions": len(active_sessions),
+        "llm_pool": get_llm_pool().stats(),
+        "crm_queue": get_crm_writer().stats(),
+        "post_call": post_call.stats(),
+        "transcripts": transcripts.stats(),
+        "token_usage": voice_usage.as_dict(),
+        "drain": worker_drain.status(),
         "timestamp": datetime.now().isoformat()
     }
+    return JSONResponse(body, status_code=503 if worker_drain.draining else 200)
+
+
+@app.post("/admin/drain")
+async def admin_drain(x_admin_token: Optional[str] = Header(None)):
+    """Start draining this worker ahead of a deploy."""
+    if VOICE_ADMIN_TOKEN and x_admin_token != VOICE_ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    await start_drain("admin")
+    return worker_drain.status()
+
+
+async def send_streamed_response(
+    websocket: WebSocket,
+    session: VoiceAISession,
+    user_text: str,
+    timer: TurnTimer,
+    speculation: Optional[Speculation] = None,
+    deadline: Optional[TurnDeadline] = None
+) -> str:
+    """
+    Stream a response to ConversationRelay one clause at a time.
+
+    Each chunk goes out as a partial text frame; an empty frame with
+    ``last: True`` closes the utterance. Returns the full spoken text.
+    """
+    spoken = []
+
+    # A barge-in cancels this task mid-stream; aclosing shuts the generator
+    # (and the Claude stream inside it) right away rather than at GC
+    async with aclosing(session.stream_message(user_text, timer, speculation)) as chunks:
+        async for chunk in chunks:
+            if deadline is not None and not spoken:
+                await deadline.settle()
+            spoken.append(chunk)
+            await websocket.send_json({
+                "type": "text",
+                "content": chunk,
+                "last": False
+            })
+            session.note_spoken(chunk)
+            timer.mark("first_response_sent")
+
+    await websocket.send_json({
+        "type": "text",
+        "content": "",
+        "last": True
+    })
+    timer.finish()
+
+    return " ".join(spoken)
+
+
+async def respond_to_caller(
+    websocket: WebSocket,
+    session: VoiceAISession,
+    user_text: str,
+    timer: TurnTimer,
+    speculation: Optional[Speculation] = None
+):
+    """Generate and send the reply to one caller turn (runs as its own task)."""
+    async def send_filler(text: str):
+        await websocket.send_json({"type": "text", "content": text, "last": True})
+        transcripts.record(session.call_sid, "filler", text=text)
+
+    # Say something if the answer is slow to start
+    deadline = TurnDeadline(timer, send_filler).start()
+
+    try:
+        if VOICE_STREAMING:
+            # Stream clauses to Twilio for TTS as Claude produces them
+            response_text = await send_streamed_response(websocket, session, user_text, timer, speculation, deadline)
+        else:
+            # Process with Claude
+            response_text = await session.process_message(user_text, timer, speculation)
+            await deadline.settle()
+
+            # Send response back to Twilio for TTS
+            await websocket.send_json({
+                "type": "text",
+                "content": response_text
+            })
+            session.note_spoken(response_text)
+            timer.mark("first_response_sent")
+            timer.finish()
+
+        logger.info(f"[{session.call_sid}] AI: {response_text}")
+        transcripts.record(session.call_sid, "timing", path=timer.path, stages=timer.stages)
+
+        if session_bytes(session) > VOICE_MAX_SESSION_BYTES:
+            session.conversation.trim()
+            metrics.inc("voice_session_trims_total")
+            if session_bytes(session) > VOICE_MAX_SESSION_BYTES:
+                logger.warning(f"[{session.call_sid}] Conversation over memory cap, handing off")
+                metrics.inc("voice_sessions_ended_total", reason="memory")
+                await end_call(websocket, "memory", HANDOFF_MESSAGE, session.handoff_priority)
+
+        await session_store.save(session.snapshot())
+
+    except Exception as e:
+        logger.error(f"[{session.call_sid}] Error responding: {e}")
+        metrics.inc("voice_errors_total", stage="websocket")
+
+    finally:
+        await deadline.settle()
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Per-turn latency histograms and counters in Prometheus text format."""
+    metrics.set_gauge("voice_active_sessions", len(active_sessions))
+    metrics.set_gauge("voice_llm_in_flight", get_llm_pool().in_flight)
+    if campaign_engine.running:
+        metrics.set_gauge("voice_campaign_live_calls", await campaign_engine.store.live_calls())
+
+    speculations = metrics.counter_sum("voice_speculation_total")
+    if speculations:
+        metrics.set_gauge("voice_speculation_hit_rate",
+                          metrics.counter_sum("voice_speculation_total", result="hit") / speculations)
+
+    fast_path_hits = metrics.counter_sum("voice_fast_path_total", result="hit")
+    fast_path_checked = metrics.counter_sum("voice_fast_path_total")
+    if fast_path_checked:
+        metrics.set_gauge("voice_fast_path_hit_rate", fast_path_hits / fast_path_checked)
+
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 
 @app.websocket("/ws/voice/{call_sid}")
@@ -545,36 +1284,99 @@ async def voice_websocket(websocket: WebSocket, call_sid: str):
     await websocket.accept()
     logger.info(f"WebSocket connected for call: {call_sid}")
 
-    # Create session
-    session = VoiceAISession(call_sid)
+    if call_sid not in active_sessions and len(active_sessions) >= VOICE_MAX_ACTIVE_SESSIONS:
+        logger.warning(f"[{call_sid}] At session limit ({VOICE_MAX_ACTIVE_SESSIONS}), turning call away")
+        metrics.inc("voice_calls_rejected_total", reason="capacity")
+        await end_call(websocket, "capacity", BUSY_MESSAGE)
+        await websocket.close()
+        return
+
+    # Create session, or pick up a call another worker was handling
+    saved = await session_store.load(call_sid)
+    session = VoiceAISession.restore(saved) if saved else VoiceAISession(call_sid)
+    session.connection_task = asyncio.current_task()
+    session.websocket = websocket
     active_sessions[call_sid] = session
+    transcripts.record(call_sid, "call_start", resumed=bool(saved), worker=os.getpid())
 
     try:
-        # Send initial greeting
-        greeting = "Hello, thank you for calling Kipper Energy Solutions. I'm your AI assistant. How can I help you today?"
-        await websocket.send_json({
-            "type": "text",
-            "content": greeting
-        })
+        if saved:
+            logger.info(f"[{call_sid}] Resumed session from worker {saved.worker}")
+        else:
+            session.prefetch = asyncio.create_task(caller_prefetcher.take(call_sid))
+
+            # Calls we placed (see /voice/outbound-twiml) open with why we're calling
+            reason = websocket.query_params.get("reason")
+            if reason:
+                greeting, session.caller_context = outbound_opening(reason, websocket.query_params.get("customer_name"))
+            else:
+                greeting = "Hello, thank you for calling Kipper Energy Solutions. I'm your AI assistant. How can I help you today?"
+            await session_store.save(session.snapshot())
+
+            # Send initial greeting
+            await websocket.send_json({
+                "type": "text",
+                "content": greeting
+            })
+            transcripts.record(call_sid, "assistant", text=greeting)
+
+        # Responses are generated in a separate task so the socket keeps
+        # being read; a caller talking over the bot cancels the stale answer
+        turn_task: Optional[asyncio.Task] = None
+
+        # Interim transcripts start the Claude request before the caller finishes
+        speculator = Speculator(session) if VOICE_SPECULATIVE else None
+
+        async def barge_in(reason: str, heard: Optional[str] = None):
+            if turn_task and not turn_task.done():
+                turn_task.cancel()
+                await asyncio.gather(turn_task, return_exceptions=True)
+                metrics.inc("voice_barge_in_total", reason=reason)
+                logger.info(f"[{call_sid}] Caller interrupted ({reason}), response cancelled")
+            elif heard is None:
+                return
+            session.abandon_turn(heard)
+            await session_store.save(session.snapshot())
 
         while True:
-            # Receive message from Twilio
-            data = await websocket.receive_json()
+            # Receive message from Twilio; a socket that goes quiet this long
+            # is half-dead (no hangup or disconnect will ever arrive)
+            try:
+                data = await asyncio.wait_for(websocket.receive_json(), VOICE_IDLE_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                logger.warning(f"[{call_sid}] No activity for {VOICE_IDLE_TIMEOUT_SECONDS:.0f}s, ending call")
+                metrics.inc("voice_sessions_ended_total", reason="idle")
+                await asyncio.gather(end_call(websocket, "idle"), return_exceptions=True)
+                break
+            session.last_activity = time.monotonic()
+
+            if data.get("type") == "transcript" and data.get("last") is False:
+                # Interim result while the caller is still speaking
+                if speculator and (turn_task is None or turn_task.done()):
+                    speculator.observe(data.get("content", ""))
 
-            if data.get("type") == "transcript":
+            elif data.get("type") == "transcript":
                 # User speech transcribed
                 user_text = data.get("content", "")
+                await barge_in("transcript")
+                if session.turns >= VOICE_MAX_TURNS:
+                    logger.warning(f"[{call_sid}] Reached {VOICE_MAX_TURNS} turns, handing off")
+                    metrics.inc("voice_sessions_ended_total", reason="max_turns")
+                    await end_call(websocket, "max_turns", HANDOFF_MESSAGE, session.handoff_priority)
+                    break
+                escalated = VOICE_SAFETY and session.check_safety(user_text)
+                timer = TurnTimer(trade=session.trade)
+                speculation = speculator.take(user_text) if speculator else None
+                if speculation and escalated:
+                    # Started before Claude knew about the emergency
+                    speculation.discard("safety")
+                    speculation = None
                 logger.info(f"[{call_sid}] User: {user_text}")
+                turn_task = asyncio.create_task(respond_to_caller(websocket, session, user_text, timer, speculation))
 
-                # Process with Claude
-                response_text = await session.process_message(user_text)
-                logger.info(f"[{call_sid}] AI: {response_text}")
-
-                # Send response back to Twilio for TTS
-                await websocket.send_json({
-                    "type": "text",
-                    "content": response_text
-                })
+            elif data.get("type") == "interrupt":
+                # Caller spoke over TTS; Twilio reports what was played
+                await barge_in("interrupt", data.get("utteranceUntilInterrupt"))
 
             elif data.get("type") == "hangup":
                 # Call ended
@@ -585,10 +1387,32 @@ async def voice_websocket(websocket: WebSocket, call_sid: str):
         logger.info(f"WebSocket disconnected for call: {call_sid}")
     except Exception as e:
         logger.error(f"Error in WebSocket: {e}")
+        metrics.inc("voice_errors_total", stage="websocket")
     finally:
-        # Clean up session
+        if speculator:
+            speculator.cancel()
+        if session.prefetch:
+            session.prefetch.cancel()
+        if session.escalation:
+            # A caller hanging up mustn't stop an emergency dispatch
+            await asyncio.gather(session.escalation, return_exceptions=True)
+        if turn_task and not turn_task.done():
+            turn_task.cancel()
+            await asyncio.gather(turn_task, return_exceptions=True)
+
+        logger.info(f"[{call_sid}] Token usage: {session.usage.as_dict()}")
+        transcripts.record(call_sid, "call_end", turns=session.turns, disposition=session.call_disposition,
+                           usage=session.usage.as_dict())
+        transcripts.end_call(call_sid)
+
+        # Summarized in the background; a hangup never waits on it
+        post_call.submit(session.snapshot())
+
+        # Clean up session (a worker that crashes mid-call never gets here,
+        # so its snapshot stays available to the worker the call reconnects to)
         if call_sid in active_sessions:
             del active_sessions[call_sid]
+        await session_store.delete(call_sid)
 
 
 @app.post("/voice/inbound")
@@ -605,20 +1429,114 @@ async def inbound_call(request: Request):
 
     logger.info(f"Inbound call received: {call_sid} from {from_number}")
 
+    if worker_drain.draining:
+        # An error sends Twilio to the number's fallback URL (another instance)
+        logger.warning(f"Draining, refusing {call_sid}")
+        metrics.inc("voice_calls_rejected_total", reason="draining")
+        raise HTTPException(status_code=503, detail="Draining")
+
     response = VoiceResponse()
 
-    # Connect to ConversationRelay WebSocket
-    connect = Connect()
-    connect.conversationRelay(
-        url=f"wss://{request.url.hostname}/ws/voice/{call_sid}",
+    if len(active_sessions) >= VOICE_MAX_ACTIVE_SESSIONS:
+        logger.warning(f"At session limit ({VOICE_MAX_ACTIVE_SESSIONS}), turning away {call_sid}")
+        metrics.inc("voice_calls_rejected_total", reason="capacity")
+        response.say(BUSY_MESSAGE, voice="Polly.Joanna-Neural")
+        response.hangup()
+        return response.to_xml()
+
+    # Look the caller up and warm the Claude pool while Twilio opens the stream
+    if VOICE_PREFETCH:
+        caller_prefetcher.start(call_sid, from_number, warm=[get_llm_pool().warm(CLAUDE_MODEL)])
+
+    response.append(relay_connect(request.url.hostname, call_sid))
+
+    return response.to_xml()
+
+
+def relay_connect(host: str, call_sid: str, context: Optional[Dict[str, str]] = None):
+    """
+    <Connect> to our ConversationRelay WebSocket.
+
+    Calls we end with a handoff come back to /voice/handoff; `context`
+    rides along as query parameters on the WebSocket URL.
+    """
+    from twilio.twiml.voice_response import Connect
+
+    query = {key: value for key, value in (context or {}).items() if value}
+    connect = Connect(action=f"https://{host}/voice/handoff")
+    connect.conversation_relay(
+        url=f"wss://{host}/ws/voice/{call_sid}" + (f"?{urlencode(query)}" if query else ""),
         voice="Polly.Joanna-Neural",  # Use Amazon Polly neural voice
         language="en-US",
         transcriptionProvider="google",
-        speechModel="phone_call"
+        speechModel="phone_call",
+        partialPrompts=str(VOICE_SPECULATIVE).lower()  # interim transcripts for speculation
     )
-    response.append(connect)
+    return connect
 
-    return response.to_xml()
+
+@app.post("/voice/outbound-twiml")
+async def outbound_call_answered(request: Request, reason: str = "service_follow_up",
+                                 customer_name: Optional[str] = None):
+    """
+    Twilio webhook for an answered outbound call (the dialer's Url).
+
+    Connects the call to ConversationRelay with why we're calling and who
+    we're calling, so the session opens with the right greeting.
+    """
+    from twilio.twiml.voice_response import VoiceResponse
+
+    form_data = await request.form()
+    call_sid = form_data.get("CallSid", "unknown")
+    logger.info(f"Outbound call answered: {call_sid} ({reason})")
+
+    response = VoiceResponse()
+    response.append(relay_connect(request.url.hostname, call_sid,
+                                  {"reason": reason, "customer_name": customer_name}))
+    return PlainTextResponse(response.to_xml(), media_type="application/xml")
+
+
+@app.post("/voice/handoff")
+async def conversation_ended(request: Request):
+    """
+    ConversationRelay action URL: runs after a session ends.
+
+    Calls we ended with a promise of a person (max turns, memory cap, drain)
+    are dialed through to the office or on-call line; anything else hangs up.
+    """
+    from twilio.twiml.voice_response import VoiceResponse
+
+    form_data = await request.form()
+    call_sid = form_data.get("CallSid", "unknown")
+    target = handoff_target(form_data.get("HandoffData"))
+    response = VoiceResponse()
+
+    if target:
+        logger.info(f"[{call_sid}] Handing off to {target}")
+        metrics.inc("voice_handoffs_total", result="dialed")
+        response.dial(target, timeout=30)
+    elif target == "":
+        # Promised a person but there's no line to send them to
+        logger.warning(f"[{call_sid}] No handoff number configured, taking a callback request")
+        metrics.inc("voice_handoffs_total", result="callback")
+        writer = get_crm_writer()
+        seq = writer.submit("callback_request", f"call:{call_sid}", {
+            "call_sid": call_sid,
+            "from": form_data.get("From"),
+            "handoff": form_data.get("HandoffData"),
+            "timestamp": datetime.now().isoformat()
+        })
+        try:
+            await writer.journaled(seq)
+        except CRMJournalError as e:
+            logger.error(f"[{call_sid}] Callback request not saved: {e}")
+        response.say(CALLBACK_MESSAGE, voice="Polly.Joanna-Neural")
+        response.hangup()
+    else:
+        metrics.inc("voice_handoffs_total", result="none")
+        response.hangup()
+
+    return PlainTextResponse(response.to_xml(), media_type="application/xml")
 
 
 @app.post("/voice/outbound")
@@ -630,26 +1548,19 @@ async def initiate_outbound_call(
     """
     API endpoint to initiate outbound calls.
     """
-    from twilio.rest import Client as TwilioClient
-
-    if not all([TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_PHONE_NUMBER]):
+    if not twilio_dialer.configured:
         raise HTTPException(status_code=500, detail="Twilio not configured")
-
-    client = TwilioClient(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+    if worker_drain.draining:
+        raise HTTPException(status_code=503, detail="Draining")
 
     try:
-        call = client.calls.create(
-            to=to_number,
-            from_=TWILIO_PHONE_NUMBER,
-            url=f"{os.getenv('BASE_URL', 'https://localhost:8000')}/voice/outbound-twiml",
-            status_callback=f"{os.getenv('BASE_URL', 'https://localhost:8000')}/voice/status"
-        )
+        call_sid = await twilio_dialer.dial(to_number, reason, customer_name)
 
-        logger.info(f"Outbound call initiated: {call.sid} to {to_number}")
+        logger.info(f"Outbound call initiated: {call_sid} to {to_number}")
 
         return {
             "success": True,
-            "call_sid": call.sid,
+            "call_sid": call_sid,
             "to_number": to_number,
             "reason": reason
         }
@@ -659,6 +1570,45 @@ async def initiate_outbound_call(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+class CampaignTargetRequest(BaseModel):
+    to_number: str
+    customer_name: Optional[str] = None
+    reason: Optional[str] = None
+
+
+class CampaignRequest(BaseModel):
+    name: str
+    reason: str = "service_follow_up"
+    targets: List[CampaignTargetRequest]
+
+
+@app.post("/campaigns")
+async def create_campaign(campaign: CampaignRequest):
+    """Queue an outbound campaign (e.g. PM reminders, collections)."""
+    if not campaign.targets:
+        raise HTTPException(status_code=400, detail="Campaign has no targets")
+
+    campaign_id = await campaign_engine.create_campaign(
+        campaign.name, campaign.reason, [target.model_dump() for target in campaign.targets]
+    )
+
+    return {
+        "success": True,
+        "campaign_id": campaign_id,
+        "queued": len(campaign.targets),
+        "dialing": campaign_engine.running
+    }
+
+
+@app.get("/campaigns/{campaign_id}")
+async def campaign_progress(campaign_id: int):
+    """Progress counters for a campaign."""
+    progress = await campaign_engine.store.progress(campaign_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    return progress
+
+
 @app.post("/voice/status")
 async def call_status(request: Request):
     """Webhook for call status updates."""
@@ -667,8 +1617,18 @@ async def call_status(request: Request):
     call_status = form_data.get("CallStatus")
 
     logger.info(f"Call {call_sid} status: {call_status}")
+    call_analytics.ingest(form_data)
+
+    campaign_call = await campaign_engine.handle_status(call_sid, call_status)
+
+    return {"received": True, "campaign_call": campaign_call}
+
 
-    return {"received": True}
+@app.get("/voice/analytics")
+async def voice_analytics():
+    """Rolling call statistics (5m / 1h / 24h) from status callbacks."""
+    await call_analytics.refresh()
+    return call_analytics.summary()
 
 
 # =============================================================================
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Service Area Index - Kipper Energy Solutions
+=============================================
+
+Offline coverage lookup for check_service_area and the fast-path router.
+
+Loads data/service_area.json (served ZIP prefixes, cities and branch
+locations) into flat dicts and resolves a location by ZIP code, then city,
+then state. The nearest branch and its straight-line distance are computed
+once per ZIP prefix and city at load time, so a lookup is a couple of dict
+reads.
+"""
+
+import json
+import math
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_DATA_PATH = Path(__file__).resolve().parent / "data" / "service_area.json"
+
+EARTH_RADIUS_MILES = 3958.8
+
+# (city, state, nearest branch, distance in miles)
+Place = Tuple[str, str, str, int]
+
+
+def haversine_miles(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points in miles."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * math.asin(math.sqrt(a))
+
+
+def normalize_city(city: str) -> str:
+    """'St Petersburg' / 'saint petersburg' → 'st. petersburg'."""
+    city = " ".join(city.lower().replace(".", " ").split())
+    for prefix in ("saint ", "st "):
+        if city.startswith(prefix):
+            city = "st. " + city[len(prefix):]
+    if city.startswith("ft "):
+        city = "fort " + city[3:]
+    return city
+
+
+@dataclass
+class ServiceAreaMatch:
+    """Result of resolving a caller's location."""
+
+    in_service_area: bool
+    matched_by: str
+    state: str
+    city: Optional[str] = None
+    nearest_branch: Optional[str] = None
+    distance_miles: Optional[int] = None
+
+
+class ServiceAreaIndex:
+    """ZIP prefix → city → state coverage lookup with nearest-branch distances."""
+
+    def __init__(self, data: Dict):
+        self.service_states = frozenset(data["service_states"])
+        self.branches = data["branches"]
+        self.zip3: Dict[str, Place] = {}
+        self.cities: Dict[Tuple[str, str], Place] = {}
+        self.city_names: Dict[str, List[str]] = {}
+
+        for prefix, (city, state, lat, lon) in data["zip3"].items():
+            self.zip3[prefix] = (city, state) + self._nearest_branch(lat, lon)
+
+        for city, state, lat, lon in data["cities"]:
+            key = normalize_city(city)
+            self.cities[(key, state)] = (city, state) + self._nearest_branch(lat, lon)
+            self.city_names.setdefault(key, []).append(state)
+
+    @classmethod
+    def load(cls, path: Path = DEFAULT_DATA_PATH) -> "ServiceAreaIndex":
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def _nearest_branch(self, lat: float, lon: float) -> Tuple[str, int]:
+        name, miles = min(
+            ((b["name"], haversine_miles(lat, lon, b["lat"], b["lon"])) for b in self.branches),
+            key=lambda pair: pair[1]
+        )
+        return name, round(miles)
+
+    def state_for_city(self, city: str) -> Optional[str]:
+        """State of a served city, if the name is unique in the index."""
+        states = self.city_names.get(normalize_city(city), [])
+        return states[0] if len(states) == 1 else None
+
+    def resolve(
+        self,
+        zip_code: Optional[str] = None,
+        city: Optional[str] = None,
+        state: Optional[str] = None
+    ) -> Optional[ServiceAreaMatch]:
+        """
+        Resolve coverage from the most specific location given.
+
+        Args:
+            zip_code: 5-digit ZIP (ZIP+4 accepted)
+            city: City name
+            state: 2-letter state code
+
+        Returns:
+            ServiceAreaMatch, or None if nothing usable was given
+        """
+        state = (state or "").strip().upper() or None
+        digits = "".join(ch for ch in (zip_code or "") if ch.isdigit())
+
+        if len(digits) >= 5:
+            place = self.zip3.get(digits[:3])
+            if place:
+                return self._match(place, "zip")
+            # Every prefix in the served states is indexed, so this ZIP is outside
+            return ServiceAreaMatch(False, "zip", state or "", city=city)
+
+        if city:
+            key = normalize_city(city)
+            place = self.cities.get((key, state)) if state else None
+            if place is None and not state:
+                found = self.state_for_city(city)
+                place = self.cities.get((key, found)) if found else None
+            if place:
+                return self._match(place, "city")
+
+        if state:
+            return ServiceAreaMatch(state in self.service_states, "state", state, city=city)
+
+        return None
+
+    def _match(self, place: Place, matched_by: str) -> ServiceAreaMatch:
+        city, state, branch, miles = place
+        return ServiceAreaMatch(
+            in_service_area=state in self.service_states,
+            matched_by=matched_by,
+            state=state,
+            city=city,
+            nearest_branch=branch,
+            distance_miles=miles
+        )
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Voice Session Limits - Kipper Energy Solutions
+===============================================
+
+Keeps one worker's memory bounded however long it runs.
+
+- Idle timeout: a call that sends nothing for VOICE_IDLE_TIMEOUT_SECONDS is
+  ended by its own WebSocket handler (half-dead sockets never send a hangup)
+- Reaper: a background sweep every VOICE_REAPER_INTERVAL_SECONDS drops
+  sessions whose handler has already exited, and cancels handlers that have
+  been silent for twice the idle timeout (stuck mid-send)
+- Per-call caps: a call over VOICE_MAX_SESSION_BYTES has its older turns
+  folded into the summary immediately, and is handed off to a person if
+  that isn't enough; a call past VOICE_MAX_TURNS caller turns is handed off
+- Global cap: with VOICE_MAX_ACTIVE_SESSIONS calls live on this worker, new
+  calls get a short apology instead of a session
+
+Calls ended with a promise of a person (max turns, memory cap, drain) end
+with handoffData naming the reason; ConversationRelay posts it to the
+<Connect> action URL (/voice/handoff), which dials VOICE_HANDOFF_NUMBER
+(VOICE_ONCALL_NUMBER for emergencies), or takes a callback request when no
+line is configured.
+
+Counters: voice_sessions_reaped_total{reason}, voice_sessions_ended_total{reason},
+voice_session_trims_total, voice_calls_rejected_total{reason}.
+
+Configuration (environment):
+- VOICE_MAX_ACTIVE_SESSIONS: Live calls per worker (default 200)
+- VOICE_IDLE_TIMEOUT_SECONDS: Silence before a call is considered dead (default 300)
+- VOICE_REAPER_INTERVAL_SECONDS: Reaper sweep interval (default 30)
+- VOICE_MAX_SESSION_BYTES: Serialized conversation size per call (default 262144)
+- VOICE_MAX_TURNS: Caller turns per call (default 80)
+- VOICE_HANDOFF_NUMBER: Office line handed-off calls are dialed through to
+- VOICE_ONCALL_NUMBER: On-call line for emergency handoffs (default VOICE_HANDOFF_NUMBER)
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional
+
+from voice_metrics import metrics
+
+logger = logging.getLogger("voice_ai")
+
+VOICE_MAX_ACTIVE_SESSIONS = int(os.getenv("VOICE_MAX_ACTIVE_SESSIONS", "200"))
+VOICE_IDLE_TIMEOUT_SECONDS = float(os.getenv("VOICE_IDLE_TIMEOUT_SECONDS", "300"))
+VOICE_REAPER_INTERVAL_SECONDS = float(os.getenv("VOICE_REAPER_INTERVAL_SECONDS", "30"))
+VOICE_MAX_SESSION_BYTES = int(os.getenv("VOICE_MAX_SESSION_BYTES", str(256 * 1024)))
+VOICE_MAX_TURNS = int(os.getenv("VOICE_MAX_TURNS", "80"))
+VOICE_HANDOFF_NUMBER = os.getenv("VOICE_HANDOFF_NUMBER")
+VOICE_ONCALL_NUMBER = os.getenv("VOICE_ONCALL_NUMBER") or VOICE_HANDOFF_NUMBER
+
+# Reasons a call is ended with a promise of a person
+TRANSFER_REASONS = {"max_turns", "memory", "drain"}
+
+BUSY_MESSAGE = (
+    "Thank you for calling Kipper Energy Solutions. All of our lines are busy right now. "
+    "Please call back in a few minutes. We're sorry for the wait."
+)
+HANDOFF_MESSAGE = (
+    "We've covered a lot on this call, so let me connect you with a team member "
+    "who can pick it up from here. Please hold for just a moment."
+)
+
+CALLBACK_MESSAGE = (
+    "I'm sorry, no one is free to take your call right now. "
+    "A team member will call you back shortly. Thank you for calling Kipper Energy Solutions."
+)
+
+metrics.describe("voice_handoffs_total", "Ended ConversationRelay sessions by what happened next (dialed/callback/none)")
+metrics.describe("voice_sessions_reaped_total", "Sessions removed by the idle reaper, by reason")
+metrics.describe("voice_sessions_ended_total", "Calls ended by the server, by reason (idle/max_turns/memory)")
+metrics.describe("voice_session_trims_total", "Conversations folded early to stay under the per-call memory cap")
+metrics.describe("voice_calls_rejected_total", "Calls turned away, by reason")
+
+
+def session_bytes(session: Any) -> int:
+    """Approximate memory held by a call: its serialized history and summary."""
+    conversation = session.conversation
+    return len(json.dumps(conversation.messages, default=str)) + len(conversation.summary)
+
+
+async def end_call(websocket: Any, reason: str, message: Optional[str] = None, priority: Optional[str] = None):
+    """Say a last message and tell ConversationRelay to end the session."""
+    if message:
+        await websocket.send_json({"type": "text", "content": message})
+    handoff = {"reason": reason, **({"priority": priority} if priority else {})}
+    await websocket.send_json({"type": "end", "handoffData": json.dumps(handoff)})
+
+
+def handoff_target(handoff_data: Optional[str]) -> Optional[str]:
+    """
+    Where a call ended by the server should be transferred.
+
+    Returns the number to dial, "" when the caller was promised a person but
+    no line is configured, or None when the call should simply end.
+    """
+    try:
+        data = json.loads(handoff_data) if handoff_data else {}
+    except ValueError:
+        return None
+    if not isinstance(data, dict) or data.get("reason") not in TRANSFER_REASONS:
+        return None
+    number = VOICE_ONCALL_NUMBER if data.get("priority") == "emergency" else VOICE_HANDOFF_NUMBER
+    return number or ""
+
+# =============================================================================
+# Reaper
+# =============================================================================
+
+class SessionReaper:
+    """
+    Periodic sweep over the worker's live sessions.
+
+    Sessions expose last_activity (time.monotonic() of the last frame from
+    Twilio) and connection_task (the WebSocket handler's task).
+    """
+
+    def __init__(
+        self,
+        sessions: Dict[str, Any],
+        idle_timeout: float = VOICE_IDLE_TIMEOUT_SECONDS,
+        interval: float = VOICE_REAPER_INTERVAL_SECONDS
+    ):
+        self.sessions = sessions
+        self.idle_timeout = idle_timeout
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def sweep(self) -> List[str]:
+        """Reap dead and stuck sessions; returns the CallSids removed or cancelled."""
+        now = time.monotonic()
+        reaped = []
+        for call_sid, session in list(self.sessions.items()):
+            task = getattr(session, "connection_task", None)
+            if task is None or task.done():
+                # Handler is gone; nothing else will ever remove this entry
+                self.sessions.pop(call_sid, None)
+                reason = "orphaned"
+            elif now - session.last_activity > 2 * self.idle_timeout:
+                # Handler missed its own idle timeout, so it is stuck; the
+                # rest of its cleanup runs as the cancellation unwinds
+                self.sessions.pop(call_sid, None)
+                task.cancel()
+                reason = "stuck"
+            else:
+                continue
+            metrics.inc("voice_sessions_reaped_total", reason=reason)
+            logger.warning(f"[{call_sid}] Reaped session ({reason})")
+            reaped.append(call_sid)
+        return reaped
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Session reaper sweep failed: {e}")
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Voice Session Store - Kipper Energy Solutions
+==============================================
+
+Where call state lives between turns, so the voice tier can run with
+several uvicorn workers on one host without sticky routing.
+
+Backends:
+- memory: In-process LRU. Single worker only; the default.
+- sqlite: One SQLite database in WAL mode shared by every worker on the
+  host. Conversations are stored as zlib-compressed JSON. WAL needs shared
+  memory between the processes, so the file must be on a local disk; it
+  does not work across hosts on a network filesystem (NFS, EFS, SMB).
+
+Each worker still holds its live VoiceAISession objects locally; the store
+holds a snapshot written after every turn. A reconnect that lands on a
+different worker restores the conversation from the snapshot, and /health
+counts calls across all workers.
+
+Configuration (environment):
+- SESSION_STORE: memory | sqlite (default memory)
+- SESSION_DB_PATH: SQLite file (default voice_sessions.db)
+- SESSION_TTL_SECONDS: Snapshots untouched this long are treated as ended calls (default 7200)
+"""
+
+import os
+import json
+import time
+import zlib
+import asyncio
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field, asdict
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger("voice_ai")
+
+SESSION_STORE = os.getenv("SESSION_STORE", "memory").lower()
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "voice_sessions.db")
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", "7200"))
+MEMORY_STORE_MAX_SESSIONS = 10_000
+
+# =============================================================================
+# Session Snapshot
+# =============================================================================
+
+@dataclass
+class SessionState:
+    """Serializable snapshot of one call."""
+
+    call_sid: str
+    messages: List[Dict[str, Any]] = field(default_factory=list)
+    summary: str = ""
+    folded_turns: int = 0
+    trade: Optional[str] = None
+    call_disposition: Optional[str] = None
+    started_at: str = ""
+    usage: Dict[str, Any] = field(default_factory=dict)
+    turns: int = 0
+    caller_context: Optional[str] = None
+    offered_tools: List[str] = field(default_factory=list)
+    worker: str = field(default_factory=lambda: str(os.getpid()))
+    updated_at: float = field(default_factory=time.time)
+
+    def encode(self) -> bytes:
+        return zlib.compress(json.dumps(asdict(self), separators=(",", ":"), default=str).encode())
+
+    @classmethod
+    def decode(cls, blob: bytes) -> "SessionState":
+        return cls(**json.loads(zlib.decompress(blob)))
+
+# =============================================================================
+# Backends
+# =============================================================================
+
+class SessionStore:
+    """Interface shared by the session store backends."""
+
+    async def save(self, state: SessionState):
+        raise NotImplementedError
+
+    async def load(self, call_sid: str) -> Optional[SessionState]:
+        raise NotImplementedError
+
+    async def delete(self, call_sid: str):
+        raise NotImplementedError
+
+    async def count(self) -> int:
+        """Calls in progress across every worker using this store."""
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class MemorySessionStore(SessionStore):
+    """In-process LRU of session snapshots, ordered by last save."""
+
+    def __init__(self, max_sessions: int = MEMORY_STORE_MAX_SESSIONS, ttl_seconds: int = SESSION_TTL_SECONDS):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.sessions: "OrderedDict[str, SessionState]" = OrderedDict()
+
+    async def save(self, state: SessionState):
+        state.updated_at = time.time()
+        self.sessions[state.call_sid] = state
+        self.sessions.move_to_end(state.call_sid)
+        while len(self.sessions) > self.max_sessions:
+            evicted, _ = self.sessions.popitem(last=False)
+            logger.warning(f"Session store full, evicted {evicted}")
+
+    async def load(self, call_sid: str) -> Optional[SessionState]:
+        return self.sessions.get(call_sid)
+
+    async def delete(self, call_sid: str):
+        self.sessions.pop(call_sid, None)
+
+    async def count(self) -> int:
+        # Least recently saved first, so expired snapshots sit at the front
+        cutoff = time.time() - self.ttl_seconds
+        while self.sessions and next(iter(self.sessions.values())).updated_at < cutoff:
+            self.sessions.popitem(last=False)
+        return len(self.sessions)
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    SQLite (WAL) store shared by every worker on a host.
+
+    Queries run in a worker thread so a slow disk never blocks the event
+    loop; one connection per store, serialized with a lock.
+    """
+
+    def __init__(self, path: str = SESSION_DB_PATH, ttl_seconds: int = SESSION_TTL_SECONDS):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS voice_sessions ("
+            "call_sid TEXT PRIMARY KEY, state BLOB NOT NULL, worker TEXT, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS voice_sessions_updated ON voice_sessions (updated_at)")
+
+    def _execute(self, sql: str, params: tuple = ()) -> List[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    async def save(self, state: SessionState):
+        state.updated_at = time.time()
+        await asyncio.to_thread(
+            self._execute,
+            "INSERT OR REPLACE INTO voice_sessions (call_sid, state, worker, updated_at) VALUES (?, ?, ?, ?)",
+            (state.call_sid, state.encode(), state.worker, state.updated_at)
+        )
+
+    async def load(self, call_sid: str) -> Optional[SessionState]:
+        rows = await asyncio.to_thread(
+            self._execute,
+            "SELECT state FROM voice_sessions WHERE call_sid = ? AND updated_at >= ?",
+            (call_sid, time.time() - self.ttl_seconds)
+        )
+        return SessionState.decode(rows[0][0]) if rows else None
+
+    async def delete(self, call_sid: str):
+        await asyncio.to_thread(self._execute, "DELETE FROM voice_sessions WHERE call_sid = ?", (call_sid,))
+
+    async def count(self) -> int:
+        # Calls whose worker died never get deleted; expire them here
+        cutoff = time.time() - self.ttl_seconds
+        await asyncio.to_thread(self._execute, "DELETE FROM voice_sessions WHERE updated_at < ?", (cutoff,))
+        rows = await asyncio.to_thread(self._execute, "SELECT COUNT(*) FROM voice_sessions")
+        return rows[0][0]
+
+    async def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def create_session_store(backend: str = SESSION_STORE) -> SessionStore:
+    """Build the configured session store backend."""
+    if backend == "sqlite":
+        logger.info(f"Session store: SQLite at {SESSION_DB_PATH}")
+        return SQLiteSessionStore()
+    if backend != "memory":
+        logger.warning(f"Unknown SESSION_STORE '{backend}', using memory")
+    return MemorySessionStore()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Speculative Responses - Kipper Energy Solutions
+================================================
+
+Starts the Claude request for a caller turn while the caller is still
+talking, from ConversationRelay's interim (partial) transcripts.
+
+- A partial that stops changing for SPECULATION_STABLE_SECONDS (and has at
+  least SPECULATION_MIN_WORDS words) starts one speculative request
+- A later partial that no longer matches supersedes it
+- When the final transcript arrives, the speculation is kept if the two
+  texts are at least SPECULATION_SIMILARITY alike, otherwise it is
+  cancelled and the turn is issued normally
+
+Only the first Claude call is speculative. Tool calls in a speculative
+response run after the final transcript confirms it, so nothing is
+booked or logged from words the caller didn't finish saying.
+
+Hit rate and the tokens spent on discarded speculations are exported as
+voice_speculation_total{result} and voice_speculation_wasted_tokens_total.
+
+Configuration (environment):
+- VOICE_SPECULATIVE: Enable speculation (default false)
+- SPECULATION_STABLE_SECONDS: Quiet time before a partial counts as stable (default 0.3)
+- SPECULATION_MIN_WORDS: Shortest partial worth speculating on (default 3)
+- SPECULATION_SIMILARITY: Partial/final similarity needed to keep a speculation (default 0.85)
+"""
+
+import os
+import re
+import asyncio
+import logging
+from difflib import SequenceMatcher
+from typing import Any, Optional
+
+from voice_metrics import metrics
+
+logger = logging.getLogger("voice_ai")
+
+VOICE_SPECULATIVE = os.getenv("VOICE_SPECULATIVE", "false").lower() == "true"
+SPECULATION_STABLE_SECONDS = float(os.getenv("SPECULATION_STABLE_SECONDS", "0.3"))
+SPECULATION_MIN_WORDS = int(os.getenv("SPECULATION_MIN_WORDS", "3"))
+SPECULATION_SIMILARITY = float(os.getenv("SPECULATION_SIMILARITY", "0.85"))
+
+metrics.describe("voice_speculation_total", "Speculative Claude requests by outcome (hit/mismatch/superseded/fast_path/safety/abandoned)")
+metrics.describe("voice_speculation_wasted_tokens_total", "Tokens spent on speculative responses that were thrown away")
+
+WORD_PATTERN = re.compile(r"[a-z0-9']+")
+
+
+def transcript_words(text: str) -> list:
+    return WORD_PATTERN.findall(text.lower())
+
+
+def transcript_similarity(a: str, b: str) -> float:
+    """Word-level similarity of two transcripts (0-1), ignoring case and punctuation."""
+    words_a, words_b = transcript_words(a), transcript_words(b)
+    if not words_a and not words_b:
+        return 1.0
+    return SequenceMatcher(None, words_a, words_b, autojunk=False).ratio()
+
+# =============================================================================
+# Speculation
+# =============================================================================
+
+class Speculation:
+    """One in-flight (or finished) speculative Claude request."""
+
+    def __init__(self, text: str, task: asyncio.Task, history_length: int):
+        self.text = text
+        self.task = task
+        self.history_length = history_length
+
+    async def adopt(self) -> Any:
+        """Use the speculative response for the turn (waits if still in flight)."""
+        metrics.inc("voice_speculation_total", result="hit")
+        return await self.task
+
+    def discard(self, reason: str):
+        """Throw the speculation away, counting any tokens it already cost."""
+        metrics.inc("voice_speculation_total", result=reason)
+        if not self.task.done():
+            self.task.cancel()
+            return
+        if self.task.cancelled() or self.task.exception() is not None:
+            return
+        usage = getattr(self.task.result(), "usage", None)
+        if usage is not None:
+            wasted = (usage.input_tokens + usage.output_tokens
+                      + (getattr(usage, "cache_creation_input_tokens", None) or 0)
+                      + (getattr(usage, "cache_read_input_tokens", None) or 0))
+            metrics.inc("voice_speculation_wasted_tokens_total", wasted)
+
+
+class Speculator:
+    """
+    Tracks a call's partial transcripts and the speculation built on them.
+
+    The session supplies speculate(text) (the first Claude request for a
+    turn, without touching the conversation) and its current history length,
+    so a speculation started before the history changed is never adopted.
+    """
+
+    def __init__(
+        self,
+        session: Any,
+        stable_seconds: float = SPECULATION_STABLE_SECONDS,
+        min_words: int = SPECULATION_MIN_WORDS,
+        similarity: float = SPECULATION_SIMILARITY
+    ):
+        self.session = session
+        self.stable_seconds = stable_seconds
+        self.min_words = min_words
+        self.similarity = similarity
+        self.current: Optional[Speculation] = None
+        self._pending: Optional[asyncio.Task] = None
+
+    def _history_length(self) -> int:
+        return len(self.session.conversation.messages)
+
+    def observe(self, partial: str):
+        """Note an interim transcript; speculate once it stops changing."""
+        if self._pending and not self._pending.done():
+            self._pending.cancel()
+        if len(transcript_words(partial)) < self.min_words:
+            return
+        self._pending = asyncio.create_task(self._when_stable(partial))
+
+    async def _when_stable(self, partial: str):
+        await asyncio.sleep(self.stable_seconds)
+
+        if self.current is not None:
+            if transcript_similarity(self.current.text, partial) >= self.similarity:
+                return
+            self.current.discard("superseded")
+
+        task = asyncio.create_task(self.session.speculate(partial))
+        self.current = Speculation(partial, task, self._history_length())
+        logger.info(f"[{self.session.call_sid}] Speculating on: {partial}")
+
+    def take(self, final: str) -> Optional[Speculation]:
+        """
+        Hand over the speculation matching the final transcript, or None.
+
+        A speculation that doesn't match (or was built on older history) is
+        cancelled here.
+        """
+        if self._pending and not self._pending.done():
+            self._pending.cancel()
+        speculation, self.current = self.current, None
+        if speculation is None:
+            return None
+
+        if speculation.history_length != self._history_length():
+            speculation.discard("stale")
+            return None
+        if transcript_similarity(speculation.text, final) < self.similarity:
+            logger.info(f"[{self.session.call_sid}] Speculation missed: '{speculation.text}' vs '{final}'")
+            speculation.discard("mismatch")
+            return None
+        return speculation
+
+    def cancel(self):
+        """Drop any pending or in-flight speculation (call ended or bot is talking)."""
+        if self._pending and not self._pending.done():
+            self._pending.cancel()
+        if self.current is not None:
+            self.current.discard("abandoned")
+            self.current = None
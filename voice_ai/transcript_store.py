@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Call Transcript Store - Kipper Energy Solutions
+================================================
+
+Append-only record of every voice call: caller turns, replies, tool calls
+and results, barge-ins and per-turn timings.
+
+- record() only appends to an in-memory buffer; a background task hands
+  the buffer to a worker thread, so the call path never touches the disk
+- The writer holds each call's events until the call ends, then writes
+  them as one gzip member appended to the current segment file
+  (concatenated members form a valid .gz) and one index line; nothing is
+  ever rewritten. Calls still open at midnight are written into the day
+  they started, and a call past TRANSCRIPT_CALL_EVENTS_MAX held events is
+  written early, so a call is one member (a few at most), not one per flush
+- Events of a call in progress live only in memory, so a worker crash
+  loses them; close() writes out every open call
+- Segments rotate at TRANSCRIPT_SEGMENT_BYTES or at midnight, and live in
+  one directory per day next to that day's index
+- A per-call lookup file holds the day, segment, offset and length of
+  each of the call's members, so reading a call seeks straight to them
+  without opening any day's index
+
+Layout:
+    transcripts/2026-10-17/segment-093015-4242-0001.jsonl.gz
+    transcripts/2026-10-17/index.jsonl   {"call_sid", "segment", "offset", "length"}
+    transcripts/calls/ab/CA...ab         {"day", "segment", "offset", "length"} per member of the call
+
+Several workers can share a directory: segment names carry the pid, and
+index and lookup lines are small single appends.
+
+Configuration (environment):
+- TRANSCRIPT_DIR: Root directory (default transcripts); empty disables the store
+- TRANSCRIPT_SEGMENT_BYTES: Compressed size at which a segment rotates (default 64 MB)
+- TRANSCRIPT_FLUSH_SECONDS: How often new events are handed to the writer (default 1.0)
+- TRANSCRIPT_BUFFER_MAX: Events held in memory, open calls included, before new ones are dropped
+  (default 100000)
+"""
+
+import os
+import gzip
+import json
+import time
+import asyncio
+import logging
+import threading
+from datetime import datetime, date
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Set
+
+from voice_metrics import metrics
+
+logger = logging.getLogger("voice_ai")
+
+TRANSCRIPT_DIR = os.getenv("TRANSCRIPT_DIR", "transcripts")
+TRANSCRIPT_SEGMENT_BYTES = int(os.getenv("TRANSCRIPT_SEGMENT_BYTES", str(64 * 1024 * 1024)))
+TRANSCRIPT_FLUSH_SECONDS = float(os.getenv("TRANSCRIPT_FLUSH_SECONDS", "1.0"))
+TRANSCRIPT_BUFFER_MAX = int(os.getenv("TRANSCRIPT_BUFFER_MAX", "100000"))
+TRANSCRIPT_BATCH_MAX = 2000
+TRANSCRIPT_CALL_EVENTS_MAX = 5000
+
+metrics.describe("voice_transcript_events_total", "Transcript events written to disk")
+metrics.describe("voice_transcript_dropped_total", "Transcript events dropped because the write buffer was full")
+metrics.describe("voice_transcript_batch_seconds", "Time to compress and append one transcript batch")
+
+
+class TranscriptStore:
+    """Buffered, batched writer and reader for call transcripts."""
+
+    def __init__(
+        self,
+        directory: str = TRANSCRIPT_DIR,
+        segment_bytes: int = TRANSCRIPT_SEGMENT_BYTES,
+        flush_seconds: float = TRANSCRIPT_FLUSH_SECONDS,
+        buffer_max: int = TRANSCRIPT_BUFFER_MAX
+    ):
+        self.directory = Path(directory) if directory else None
+        self.segment_bytes = segment_bytes
+        self.flush_seconds = flush_seconds
+        self.buffer_max = buffer_max
+
+        self._buffer: List[Dict[str, Any]] = []
+        self._ended: Set[str] = set()
+        self._seq: Dict[str, int] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._flushing = asyncio.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+        # Writer state, touched only from the writer thread
+        self._write_lock = threading.Lock()
+        self._held: Dict[str, List[Dict[str, Any]]] = {}
+        self._held_day: Optional[date] = None
+        self._held_count = 0
+        self._segment: Optional[Path] = None
+        self._segment_day: Optional[date] = None
+        self._segment_count = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None
+
+    # -------------------------------------------------------------------------
+    # Recording (call path)
+    # -------------------------------------------------------------------------
+
+    def record(self, call_sid: str, kind: str, **data):
+        """Buffer one event for a call; never blocks."""
+        if not self.enabled:
+            return
+        if len(self._buffer) + self._held_count >= self.buffer_max:
+            metrics.inc("voice_transcript_dropped_total")
+            return
+
+        seq = self._seq.get(call_sid, 0)
+        self._seq[call_sid] = seq + 1
+        self._buffer.append({"call_sid": call_sid, "seq": seq, "ts": time.time(), "type": kind, **data})
+
+        self._ensure_writer()
+        if len(self._buffer) >= TRANSCRIPT_BATCH_MAX:
+            self._wakeup.set()
+
+    def end_call(self, call_sid: str):
+        """Mark a call finished: its events go to disk with the next flush."""
+        self._seq.pop(call_sid, None)
+        if self.enabled:
+            self._ended.add(call_sid)
+
+    def _ensure_writer(self):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # no loop yet; buffered events go out with the next flush
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._loop = loop
+            self._wakeup = asyncio.Event()
+            self._task = loop.create_task(self._run())
+
+    # -------------------------------------------------------------------------
+    # Writing (background)
+    # -------------------------------------------------------------------------
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self, everything: bool = False):
+        """Hand buffered events to the writer, which writes out ended calls (every call if `everything`)."""
+        # One flush at a time, so a call's last events always reach the writer before its end does
+        async with self._flushing:
+            if not self._buffer and not self._ended and not (everything and self._held_count):
+                return
+            batch, self._buffer = self._buffer, []
+            ended, self._ended = self._ended, set()
+            try:
+                await asyncio.to_thread(self._write_batch, batch, ended, everything)
+            except Exception as e:
+                logger.error(f"Transcript write of {len(ended)} ended calls failed: {e}")
+
+    def _segment_for(self, day: date) -> Path:
+        if self._segment is not None and self._segment_day == day and \
+                self._segment.stat().st_size < self.segment_bytes:
+            return self._segment
+
+        day_dir = self.directory / day.isoformat()
+        day_dir.mkdir(parents=True, exist_ok=True)
+        self._segment_count += 1
+        stamp = datetime.now().strftime("%H%M%S")
+        self._segment = day_dir / f"segment-{stamp}-{os.getpid()}-{self._segment_count:04d}.jsonl.gz"
+        self._segment.touch()
+        self._segment_day = day
+        return self._segment
+
+    def _write_batch(self, batch: List[Dict[str, Any]], ended: Set[str], everything: bool = False):
+        started = time.perf_counter()
+        written = 0
+        with self._write_lock:
+            today = date.today()
+            if self._held_day is not None and self._held_day != today:
+                # Past midnight: open calls' events so far go into the day they were recorded
+                day = self._held_day
+                written += self._write_members(self._segment_for(day), day, self._take(list(self._held)))
+
+            for event in batch:
+                self._held.setdefault(event["call_sid"], []).append(event)
+            self._held_count += len(batch)
+            if self._held and self._held_day is None:
+                self._held_day = today
+
+            due = [call_sid for call_sid, events in self._held.items()
+                   if everything or call_sid in ended or len(events) >= TRANSCRIPT_CALL_EVENTS_MAX]
+            if due:
+                written += self._write_members(self._segment_for(today), today, self._take(due))
+
+        if written:
+            metrics.inc("voice_transcript_events_total", written)
+            metrics.observe("voice_transcript_batch_seconds", time.perf_counter() - started)
+
+    def _take(self, call_sids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Stop holding some calls' events and return them."""
+        calls = {call_sid: self._held.pop(call_sid) for call_sid in call_sids}
+        self._held_count -= sum(len(events) for events in calls.values())
+        if not self._held:
+            self._held_day = None
+        return calls
+
+    def _write_members(self, segment: Path, day: date, calls: Dict[str, List[Dict[str, Any]]]) -> int:
+        """One gzip member, index line and lookup line per call; returns events written."""
+        locations = {}
+        with open(segment, "ab") as f:
+            offset = f.tell()
+            for call_sid, events in calls.items():
+                payload = "".join(json.dumps(e, separators=(",", ":"), default=str) + "\n" for e in events)
+                member = gzip.compress(payload.encode(), compresslevel=6)
+                f.write(member)
+                locations[call_sid] = {"segment": segment.name, "offset": offset, "length": len(member)}
+                offset += len(member)
+
+        with open(segment.parent / "index.jsonl", "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps({"call_sid": call_sid, **location}) + "\n"
+                            for call_sid, location in locations.items()))
+
+        for call_sid, location in locations.items():
+            lookup = self._lookup_path(call_sid)
+            lookup.parent.mkdir(parents=True, exist_ok=True)
+            with open(lookup, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"day": day.isoformat(), **location}) + "\n")
+        return sum(len(events) for events in calls.values())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "buffered": len(self._buffer),
+            "held": self._held_count,
+            "open_calls": len(self._held),
+            "written": metrics.counter_value("voice_transcript_events_total"),
+            "dropped": metrics.counter_value("voice_transcript_dropped_total"),
+            "segment": self._segment.name if self._segment else None
+        }
+
+    async def close(self):
+        """Write out every call, open or ended, and stop the writer (call from app shutdown)."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush(everything=True)
+
+    # -------------------------------------------------------------------------
+    # Reading
+    # -------------------------------------------------------------------------
+
+    def _lookup_path(self, call_sid: str) -> Path:
+        return self.directory / "calls" / call_sid[-2:] / call_sid
+
+    def _members(self, call_sid: str) -> List[Dict[str, Any]]:
+        """Where a call's members are ({"day", "segment", "offset", "length"}), from its lookup file."""
+        if not self.enabled:
+            return []
+        try:
+            with open(self._lookup_path(call_sid), encoding="utf-8") as f:
+                return [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def call_days(self, call_sid: str) -> List[str]:
+        """Dates (YYYY-MM-DD) with events for a call."""
+        return list(dict.fromkeys(member["day"] for member in self._members(call_sid)))
+
+    def _index(self, day: str) -> List[Dict[str, Any]]:
+        path = self.directory / day / "index.jsonl"
+        if not path.exists():
+            return []
+        with open(path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def days(self) -> List[str]:
+        """Dates that have transcripts, newest first."""
+        if not self.enabled or not self.directory.exists():
+            return []
+        return sorted((p.name for p in self.directory.iterdir() if (p / "index.jsonl").exists()), reverse=True)
+
+    def calls(self, day: str) -> List[str]:
+        """CallSids with transcript events on a date (YYYY-MM-DD)."""
+        return list(dict.fromkeys(entry["call_sid"] for entry in self._index(day)))
+
+    def load(self, call_sid: str, day: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Every event written for a call (on one day, if given), in order."""
+        events = []
+        for member in self._members(call_sid):
+            if day and member["day"] != day:
+                continue
+            with open(self.directory / member["day"] / member["segment"], "rb") as f:
+                f.seek(member["offset"])
+                data = f.read(member["length"])
+            events.extend(json.loads(line) for line in gzip.decompress(data).decode().splitlines())
+        return sorted(events, key=lambda e: (e["ts"], e["seq"]))
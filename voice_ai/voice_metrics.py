@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Voice AI Metrics - Kipper Energy Solutions
+===========================================
+
+In-process latency and counter metrics for the voice server, served in the
+Prometheus text format from /metrics.
+
+- Summaries keep a rolling window of recent samples per label set and
+  report p50/p95/p99 plus lifetime _sum/_count
+- Counters and gauges for everything else
+- TurnTimer marks the stages of one caller turn (transcript received →
+  LLM request → first token → tools → follow-up → response sent)
+
+No external dependencies; all updates happen on the event loop thread.
+"""
+
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Tuple
+
+QUANTILES = (0.5, 0.95, 0.99)
+WINDOW_SIZE = 2048
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+# =============================================================================
+# Metric Types
+# =============================================================================
+
+class RollingSummary:
+    """Quantiles over the most recent samples, plus lifetime sum/count."""
+
+    def __init__(self, window_size: int = WINDOW_SIZE):
+        self.samples: deque = deque(maxlen=window_size)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float):
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+
+    def quantile(self, q: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(q * len(ordered)))
+        return ordered[index]
+
+
+class MetricsRegistry:
+    """Named summaries, counters and gauges keyed by label set."""
+
+    def __init__(self):
+        self.summaries: Dict[str, Dict[LabelKey, RollingSummary]] = {}
+        self.counters: Dict[str, Dict[LabelKey, float]] = {}
+        self.gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self.help: Dict[str, str] = {}
+
+    def describe(self, name: str, help_text: str):
+        self.help[name] = help_text
+
+    def observe(self, name: str, value: float, **labels):
+        series = self.summaries.setdefault(name, {})
+        key = _label_key(labels)
+        if key not in series:
+            series[key] = RollingSummary()
+        series[key].observe(value)
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        series = self.counters.setdefault(name, {})
+        key = _label_key(labels)
+        series[key] = series.get(key, 0) + amount
+
+    def set_gauge(self, name: str, value: float, **labels):
+        self.gauges.setdefault(name, {})[_label_key(labels)] = value
+
+    def counter_value(self, name: str, **labels) -> float:
+        return self.counters.get(name, {}).get(_label_key(labels), 0)
+
+    def counter_sum(self, name: str, **match) -> float:
+        """Sum of every series of a counter whose labels include ``match``."""
+        wanted = set(_label_key(match))
+        return sum(v for key, v in self.counters.get(name, {}).items() if wanted <= set(key))
+
+    def quantile(self, name: str, q: float, **labels) -> Optional[float]:
+        summary = self.summaries.get(name, {}).get(_label_key(labels))
+        if summary is None or not summary.count:
+            return None
+        return summary.quantile(q)
+
+    def render(self) -> str:
+        """Prometheus text exposition format."""
+        lines: List[str] = []
+
+        for name, series in sorted(self.summaries.items()):
+            self._header(lines, name, "summary")
+            for key, summary in sorted(series.items()):
+                for q in QUANTILES:
+                    lines.append(f"{name}{_format_labels(key, quantile=str(q))} {summary.quantile(q):.6f}")
+                lines.append(f"{name}_sum{_format_labels(key)} {summary.total:.6f}")
+                lines.append(f"{name}_count{_format_labels(key)} {summary.count}")
+
+        for name, series in sorted(self.counters.items()):
+            self._header(lines, name, "counter")
+            for key, value in sorted(series.items()):
+                lines.append(f"{name}{_format_labels(key)} {value:g}")
+
+        for name, series in sorted(self.gauges.items()):
+            self._header(lines, name, "gauge")
+            for key, value in sorted(series.items()):
+                lines.append(f"{name}{_format_labels(key)} {value:g}")
+
+        return "\n".join(lines) + "\n"
+
+    def _header(self, lines: List[str], name: str, metric_type: str):
+        if name in self.help:
+            lines.append(f"# HELP {name} {self.help[name]}")
+        lines.append(f"# TYPE {name} {metric_type}")
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+def _format_labels(key: LabelKey, **extra: str) -> str:
+    pairs = list(key) + sorted(extra.items())
+    if not pairs:
+        return ""
+    body = ",".join(f'{k}="{_escape(v)}"' for k, v in pairs)
+    return "{" + body + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+# =============================================================================
+# Voice Metrics
+# =============================================================================
+
+metrics = MetricsRegistry()
+
+metrics.describe("voice_turn_stage_seconds", "Seconds from transcript received to each stage of a caller turn")
+metrics.describe("voice_llm_call_seconds", "Duration of Claude calls by kind (initial/follow_up/speculative)")
+metrics.describe("voice_tool_seconds", "Tool execution time")
+metrics.describe("voice_turns_total", "Caller turns processed")
+metrics.describe("voice_turn_seconds", "Seconds from transcript received to response sent, by path (llm/fast_path/speculative)")
+metrics.describe("voice_barge_in_total", "Responses cancelled because the caller spoke over them, by reason")
+
+
+class TurnTimer:
+    """
+    Stage timings for one caller turn.
+
+    Stage marks are measured from when the transcript arrived, so each one
+    reads as "how long the caller has been waiting".
+    """
+
+    def __init__(self, registry: MetricsRegistry = metrics, trade: Optional[str] = None):
+        self.registry = registry
+        self.trade = trade or "unknown"
+        self.path = "llm"
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.running_tools: List[str] = []
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def mark(self, stage: str, once: bool = True):
+        """Record the time to reach a stage (first occurrence only by default)."""
+        if once and stage in self.stages:
+            return
+        elapsed = self.elapsed()
+        self.stages[stage] = elapsed
+        self.registry.observe("voice_turn_stage_seconds", elapsed, stage=stage, trade=self.trade)
+
+    @contextmanager
+    def llm_call(self, kind: str):
+        """Time one Claude call (kind: initial or follow_up)."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registry.observe(
+                "voice_llm_call_seconds", time.perf_counter() - started, kind=kind, trade=self.trade
+            )
+
+    @contextmanager
+    def tool(self, tool_name: str):
+        """Time one tool execution."""
+        started = time.perf_counter()
+        self.running_tools.append(tool_name)
+        try:
+            yield
+        finally:
+            self.running_tools.remove(tool_name)
+            self.registry.observe(
+                "voice_tool_seconds", time.perf_counter() - started, tool=tool_name, trade=self.trade
+            )
+
+    def finish(self):
+        """Mark the response as fully sent and count the turn."""
+        self.mark("response_sent")
+        self.registry.observe("voice_turn_seconds", self.stages["response_sent"], path=self.path)
+        self.registry.inc("voice_turns_total", trade=self.trade)